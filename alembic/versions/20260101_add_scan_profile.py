@@ -0,0 +1,24 @@
+"""add scan_profile column for cached scanned-document detection
+
+Revision ID: 20260101_add_scan_profile
+Revises: 7a7490408ff1
+Create Date: 2026-01-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260101_add_scan_profile'
+down_revision = '7a7490408ff1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL; extraction computes and caches the profile on first use
+    op.add_column('invoices', sa.Column('scan_profile', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('invoices', 'scan_profile')
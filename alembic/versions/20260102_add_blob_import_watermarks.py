@@ -0,0 +1,35 @@
+"""add blob_import_watermarks table and content_sha256 index for incremental imports
+
+Revision ID: 20260102_add_import_watermarks
+Revises: 20260101_add_scan_profile
+Create Date: 2026-01-02
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260102_add_import_watermarks'
+down_revision = '20260101_add_scan_profile'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'blob_import_watermarks',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('container_name', sa.String(length=255), nullable=False),
+        sa.Column('prefix', sa.String(length=1024), nullable=False, server_default=''),
+        sa.Column('last_modified', sa.DateTime(), nullable=True),
+        sa.Column('etags', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('container_name', 'prefix', name='uq_blob_import_watermarks_container_prefix'),
+    )
+    # Dedupe lookups by content hash during incremental imports
+    op.create_index('ix_invoices_content_sha256', 'invoices', ['content_sha256'])
+
+
+def downgrade():
+    op.drop_index('ix_invoices_content_sha256', table_name='invoices')
+    op.drop_table('blob_import_watermarks')
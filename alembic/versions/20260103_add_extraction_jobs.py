@@ -0,0 +1,52 @@
+"""add extraction_jobs table for the durable extraction job queue
+
+Revision ID: 20260103_add_extraction_jobs
+Revises: 20260102_add_import_watermarks
+Create Date: 2026-01-03
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260103_add_extraction_jobs'
+down_revision = '20260102_add_import_watermarks'
+branch_labels = None
+depends_on = None
+
+ACTIVE_JOB = sa.text("state IN ('QUEUED', 'RUNNING')")
+
+
+def upgrade():
+    op.create_table(
+        'extraction_jobs',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('invoice_id', sa.String(length=36), nullable=False),
+        sa.Column('state', sa.String(length=32), nullable=False, server_default='QUEUED'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('lease_owner', sa.String(length=255), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    # Claim query: next QUEUED (or lease-expired RUNNING) job by available_at
+    op.create_index('ix_extraction_jobs_state_available_at', 'extraction_jobs', ['state', 'available_at'])
+    op.create_index('ix_extraction_jobs_invoice_id', 'extraction_jobs', ['invoice_id'])
+    # At most one QUEUED / RUNNING job per invoice, even with concurrent enqueues
+    op.create_index(
+        'ux_extraction_jobs_active_invoice', 'extraction_jobs', ['invoice_id'], unique=True,
+        sqlite_where=ACTIVE_JOB, mssql_where=ACTIVE_JOB, postgresql_where=ACTIVE_JOB,
+    )
+
+
+def downgrade():
+    op.drop_index('ux_extraction_jobs_active_invoice', table_name='extraction_jobs')
+    op.drop_index('ix_extraction_jobs_invoice_id', table_name='extraction_jobs')
+    op.drop_index('ix_extraction_jobs_state_available_at', table_name='extraction_jobs')
+    op.drop_table('extraction_jobs')
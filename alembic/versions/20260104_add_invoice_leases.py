@@ -0,0 +1,29 @@
+"""add extraction lease columns to invoices
+
+Revision ID: 20260104_add_invoice_leases
+Revises: 20260103_add_extraction_jobs
+Create Date: 2026-01-04
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260104_add_invoice_leases'
+down_revision = '20260103_add_extraction_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows already PROCESSING have no lease; the reaper treats them as expired
+    # once updated_at is older than one lease period
+    op.add_column('invoices', sa.Column('lease_owner', sa.String(length=255), nullable=True))
+    op.add_column('invoices', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_invoices_processing_state_lease', 'invoices', ['processing_state', 'lease_expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_invoices_processing_state_lease', table_name='invoices')
+    op.drop_column('invoices', 'lease_expires_at')
+    op.drop_column('invoices', 'lease_owner')
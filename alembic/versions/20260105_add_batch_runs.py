@@ -0,0 +1,61 @@
+"""add batch_runs and batch_run_items tables for checkpointed batch runs
+
+Revision ID: 20260105_add_batch_runs
+Revises: 20260104_add_invoice_leases
+Create Date: 2026-01-05
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260105_add_batch_runs'
+down_revision = '20260104_add_invoice_leases'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'batch_runs',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('kind', sa.String(length=32), nullable=False, server_default='ids'),
+        sa.Column('priority', sa.String(length=16), nullable=False, server_default='normal'),
+        sa.Column('status', sa.String(length=32), nullable=False, server_default='queued'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('owner', sa.String(length=255), nullable=True),
+        sa.Column('lease_owner', sa.String(length=255), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    # Startup sweep: queued / running runs whose heartbeat went stale
+    op.create_index('ix_batch_runs_status_heartbeat_at', 'batch_runs', ['status', 'heartbeat_at'])
+    op.create_index('ix_batch_runs_created_at', 'batch_runs', ['created_at'])
+
+    op.create_table(
+        'batch_run_items',
+        sa.Column('batch_id', sa.String(length=36), primary_key=True),
+        sa.Column('position', sa.Integer(), primary_key=True),
+        sa.Column('invoice_id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False, server_default='pending'),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('elapsed_seconds', sa.Float(), nullable=True),
+        sa.Column('stage_timings', sa.JSON(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    # Resume: pending items of one run; status counts per run
+    op.create_index('ix_batch_run_items_batch_id_status', 'batch_run_items', ['batch_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_batch_run_items_batch_id_status', table_name='batch_run_items')
+    op.drop_table('batch_run_items')
+    op.drop_index('ix_batch_runs_created_at', table_name='batch_runs')
+    op.drop_index('ix_batch_runs_status_heartbeat_at', table_name='batch_runs')
+    op.drop_table('batch_runs')
@@ -0,0 +1,50 @@
+"""composite indexes for keyset-paginated invoice listings
+
+Revision ID: 20260106_add_list_indexes
+Revises: 20260105_add_batch_runs
+Create Date: 2026-01-06
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260106_add_list_indexes'
+down_revision = '20260105_add_batch_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQL Server cannot index NVARCHAR(MAX); bound vendor_name first.
+    # SQLite ignores VARCHAR lengths, so there is nothing to alter there.
+    if op.get_bind().dialect.name == 'mssql':
+        op.alter_column(
+            'invoices', 'vendor_name',
+            existing_type=sa.String(), type_=sa.String(length=450), existing_nullable=True,
+        )
+
+    # Listings order by (upload_date DESC, id DESC) and seek past the cursor;
+    # each filter column leads its own index so filtered pages seek as well.
+    # The composites cover the old single-column status / upload_date indexes.
+    op.create_index('ix_invoices_upload_date_id', 'invoices', ['upload_date', 'id'])
+    op.create_index('ix_invoices_status_upload_date', 'invoices', ['status', 'upload_date', 'id'])
+    op.create_index('ix_invoices_processing_state_upload_date', 'invoices', ['processing_state', 'upload_date', 'id'])
+    op.create_index('ix_invoices_vendor_name_upload_date', 'invoices', ['vendor_name', 'upload_date', 'id'])
+    op.drop_index('ix_invoices_status', table_name='invoices')
+    op.drop_index('ix_invoices_upload_date', table_name='invoices')
+
+
+def downgrade():
+    op.create_index('ix_invoices_upload_date', 'invoices', ['upload_date'])
+    op.create_index('ix_invoices_status', 'invoices', ['status'])
+    op.drop_index('ix_invoices_vendor_name_upload_date', table_name='invoices')
+    op.drop_index('ix_invoices_processing_state_upload_date', table_name='invoices')
+    op.drop_index('ix_invoices_status_upload_date', table_name='invoices')
+    op.drop_index('ix_invoices_upload_date_id', table_name='invoices')
+
+    if op.get_bind().dialect.name == 'mssql':
+        op.alter_column(
+            'invoices', 'vendor_name',
+            existing_type=sa.String(length=450), type_=sa.String(), existing_nullable=True,
+        )
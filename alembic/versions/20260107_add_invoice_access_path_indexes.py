@@ -0,0 +1,64 @@
+"""access-path indexes: vendor + invoice number, unique content hash
+
+Revision ID: 20260107_add_access_indexes
+Revises: 20260106_add_list_indexes
+Create Date: 2026-01-07
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260107_add_access_indexes'
+down_revision = '20260106_add_list_indexes'
+branch_labels = None
+depends_on = None
+
+NOT_NULL_HASH = sa.text('content_sha256 IS NOT NULL')
+
+# Hashes cleared on later duplicate invoices, kept so downgrade can restore them
+CLEARED_HASHES_TABLE = 'invoice_cleared_content_hashes'
+LATER_DUPLICATE = (
+    "content_sha256 IS NOT NULL AND EXISTS ("
+    " SELECT 1 FROM invoices earlier"
+    " WHERE earlier.content_sha256 = invoices.content_sha256"
+    "  AND (earlier.upload_date < invoices.upload_date"
+    "   OR (earlier.upload_date = invoices.upload_date AND earlier.id < invoices.id)))"
+)
+
+
+def upgrade():
+    op.create_index('ix_invoices_vendor_name_invoice_number', 'invoices', ['vendor_name', 'invoice_number'])
+
+    # Keep the hash only on the earliest invoice for each file content so the
+    # unique index can be built; later copies remain, without a hash. The
+    # cleared hashes are copied aside first so downgrade can put them back.
+    op.create_table(
+        CLEARED_HASHES_TABLE,
+        sa.Column('invoice_id', sa.String(36), primary_key=True),
+        sa.Column('content_sha256', sa.String(128), nullable=False),
+    )
+    op.execute(
+        f"INSERT INTO {CLEARED_HASHES_TABLE} (invoice_id, content_sha256)"
+        f" SELECT id, content_sha256 FROM invoices WHERE {LATER_DUPLICATE}"
+    )
+    op.execute(f"UPDATE invoices SET content_sha256 = NULL WHERE {LATER_DUPLICATE}")
+    op.drop_index('ix_invoices_content_sha256', table_name='invoices')
+    op.create_index(
+        'ux_invoices_content_sha256', 'invoices', ['content_sha256'], unique=True,
+        sqlite_where=NOT_NULL_HASH, mssql_where=NOT_NULL_HASH, postgresql_where=NOT_NULL_HASH,
+    )
+
+
+def downgrade():
+    op.drop_index('ux_invoices_content_sha256', table_name='invoices')
+    # Put back the hashes upgrade cleared on duplicate invoices
+    op.execute(
+        f"UPDATE invoices SET content_sha256 = ("
+        f" SELECT cleared.content_sha256 FROM {CLEARED_HASHES_TABLE} cleared"
+        f" WHERE cleared.invoice_id = invoices.id)"
+        f" WHERE content_sha256 IS NULL AND id IN (SELECT invoice_id FROM {CLEARED_HASHES_TABLE})"
+    )
+    op.drop_table(CLEARED_HASHES_TABLE)
+    op.create_index('ix_invoices_content_sha256', 'invoices', ['content_sha256'])
+    op.drop_index('ix_invoices_vendor_name_invoice_number', table_name='invoices')
@@ -0,0 +1,90 @@
+"""add invoice_review_events table and backfill it from review_notes
+
+Revision ID: 20260108_add_review_events
+Revises: 20260107_add_access_indexes
+Create Date: 2026-01-08
+"""
+
+from datetime import datetime
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260108_add_review_events'
+down_revision = '20260107_add_access_indexes'
+branch_labels = None
+depends_on = None
+
+# Invoices read per batch while backfilling
+BATCH_SIZE = 500
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def upgrade():
+    events = op.create_table(
+        'invoice_review_events',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('invoice_id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('reviewer', sa.String(length=255), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('review_version', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_invoice_review_events_invoice_id_created_at', 'invoice_review_events', ['invoice_id', 'created_at']
+    )
+
+    # Backfill: review_notes held the history as a JSON array of
+    # {status, reviewer, notes, timestamp}. Other text in review_notes (e.g.
+    # extraction error summaries) is not history and is skipped. The column
+    # itself is left as is.
+    # The ids are read up front and each batch is fetched in full, so no
+    # result set is left open while inserting (pyodbc without MARS) and
+    # every batch is a bounded primary-key lookup.
+    connection = op.get_bind()
+    invoice_ids = [
+        row[0] for row in connection.execute(
+            sa.text("SELECT id FROM invoices WHERE review_notes IS NOT NULL ORDER BY id")
+        ).fetchall()
+    ]
+    select_batch = sa.text(
+        "SELECT id, review_notes, updated_at FROM invoices WHERE id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True))
+    for start in range(0, len(invoice_ids), BATCH_SIZE):
+        rows = connection.execute(select_batch, {'ids': invoice_ids[start:start + BATCH_SIZE]}).fetchall()
+        backfill = []
+        for invoice_id, review_notes, updated_at in rows:
+            try:
+                history = json.loads(review_notes)
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(history, list):
+                continue
+            fallback_time = _parse_timestamp(updated_at) if not isinstance(updated_at, datetime) else updated_at
+            for entry in history:
+                if not isinstance(entry, dict):
+                    continue
+                backfill.append({
+                    'invoice_id': invoice_id,
+                    'status': entry.get('status'),
+                    'reviewer': entry.get('reviewer'),
+                    'notes': entry.get('notes'),
+                    'review_version': None,
+                    'created_at': _parse_timestamp(entry.get('timestamp')) or fallback_time or datetime.utcnow(),
+                })
+        if backfill:
+            op.bulk_insert(events, backfill)
+
+
+def downgrade():
+    op.drop_index('ix_invoice_review_events_invoice_id_created_at', table_name='invoice_review_events')
+    op.drop_table('invoice_review_events')
@@ -0,0 +1,151 @@
+"""add invoice_search_documents with a full-text index and backfill it
+
+Revision ID: 20260109_add_invoice_search
+Revises: 20260108_add_review_events
+Create Date: 2026-01-09
+"""
+
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260109_add_invoice_search'
+down_revision = '20260108_add_review_events'
+branch_labels = None
+depends_on = None
+
+# Invoices read per batch while backfilling
+BATCH_SIZE = 500
+
+FTS_COLUMNS = ('vendor_name', 'numbers', 'line_descriptions', 'document_text')
+NUMBER_COLUMNS = ('invoice_number', 'po_number', 'reference_number', 'contract_id', 'standing_offer_number')
+
+# Frozen copy of db_models.INVOICE_SEARCH_FTS_DDL as of this revision, so the
+# migration does not change when the models do. create_all must produce the
+# same schema: test_invoice_search compares the two.
+_fts_columns = ', '.join(FTS_COLUMNS)
+_fts_new = ', '.join(f'new.{name}' for name in FTS_COLUMNS)
+_fts_old = ', '.join(f'old.{name}' for name in FTS_COLUMNS)
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE invoice_search_fts USING fts5({_fts_columns},"
+    f" content='invoice_search_documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER invoice_search_documents_ai AFTER INSERT ON invoice_search_documents BEGIN"
+    f" INSERT INTO invoice_search_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+    f"CREATE TRIGGER invoice_search_documents_ad AFTER DELETE ON invoice_search_documents BEGIN"
+    f" INSERT INTO invoice_search_fts(invoice_search_fts, rowid, {_fts_columns})"
+    f" VALUES ('delete', old.id, {_fts_old}); END",
+    f"CREATE TRIGGER invoice_search_documents_au AFTER UPDATE ON invoice_search_documents BEGIN"
+    f" INSERT INTO invoice_search_fts(invoice_search_fts, rowid, {_fts_columns})"
+    f" VALUES ('delete', old.id, {_fts_old});"
+    f" INSERT INTO invoice_search_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+)
+
+
+def _number_search_text(numbers):
+    """Numbers plus the 3+ character suffixes of their alphanumeric form (as db_utils_search)"""
+    terms = []
+    for number in numbers:
+        if not number:
+            continue
+        terms.append(number)
+        compact = re.sub(r'[\W_]+', '', number)
+        terms.extend(compact[start:] for start in range(len(compact) - 2))
+    return ' '.join(dict.fromkeys(terms)) or None
+
+
+def _json_descriptions(items):
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except ValueError:
+            return []
+    return [item.get('description') for item in items or [] if isinstance(item, dict)]
+
+
+def upgrade():
+    connection = op.get_bind()
+    dialect = connection.dialect.name
+
+    documents = op.create_table(
+        'invoice_search_documents',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('invoice_id', sa.String(length=36), nullable=False),
+        sa.Column('vendor_name', sa.Text(), nullable=True),
+        sa.Column('numbers', sa.Text(), nullable=True),
+        sa.Column('line_descriptions', sa.Text(), nullable=True),
+        sa.Column('document_text', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', name='pk_invoice_search_documents'),
+    )
+    op.create_index(
+        'ux_invoice_search_documents_invoice_id', 'invoice_search_documents', ['invoice_id'], unique=True
+    )
+
+    # SQLite: the triggers index rows as the backfill inserts them
+    if dialect == 'sqlite' and connection.exec_driver_sql(
+        "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+    ).scalar():
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+    # Backfill from stored invoices. OCR text was never stored, so
+    # document_text stays empty until an invoice is next extracted.
+    # The ids are read up front and every query is fetched in full, so no
+    # result set is left open while inserting (pyodbc without MARS).
+    now = sa.func.current_timestamp()
+    invoice_ids = [row[0] for row in connection.execute(sa.text("SELECT id FROM invoices ORDER BY id")).fetchall()]
+    select_batch = sa.text(
+        f"SELECT id, vendor_name, line_items, {', '.join(NUMBER_COLUMNS)} FROM invoices WHERE id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True))
+    select_lines = sa.text(
+        "SELECT invoice_id, description FROM line_items WHERE invoice_id IN :ids"
+        " ORDER BY invoice_id, line_number"
+    ).bindparams(sa.bindparam('ids', expanding=True))
+    for start in range(0, len(invoice_ids), BATCH_SIZE):
+        ids = invoice_ids[start:start + BATCH_SIZE]
+        rows = connection.execute(select_batch, {'ids': ids}).fetchall()
+        descriptions = {}
+        for invoice_id, description in connection.execute(select_lines, {'ids': ids}).fetchall():
+            descriptions.setdefault(invoice_id, []).append(description)
+        backfill = []
+        for row in rows:
+            invoice_id, vendor_name, line_items = row[0], row[1], row[2]
+            lines = descriptions.get(invoice_id) or _json_descriptions(line_items)
+            backfill.append({
+                'invoice_id': invoice_id,
+                'vendor_name': vendor_name,
+                'numbers': _number_search_text(row[3:]),
+                'line_descriptions': '\n'.join(d for d in lines if d) or None,
+                'document_text': None,
+            })
+        connection.execute(documents.insert().values(updated_at=now), backfill)
+
+    # SQL Server: full-text catalog and index (not allowed inside a transaction).
+    # The index populates from the backfilled rows and tracks changes itself.
+    if dialect == 'mssql':
+        with op.get_context().autocommit_block():
+            op.execute(
+                "IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'invoice_search_catalog')"
+                " CREATE FULLTEXT CATALOG invoice_search_catalog"
+            )
+            op.execute(
+                f"CREATE FULLTEXT INDEX ON invoice_search_documents ({_fts_columns})"
+                " KEY INDEX pk_invoice_search_documents ON invoice_search_catalog"
+                " WITH CHANGE_TRACKING AUTO"
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mssql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP FULLTEXT INDEX ON invoice_search_documents")
+            op.execute("DROP FULLTEXT CATALOG invoice_search_catalog")
+    elif dialect == 'sqlite':
+        # The triggers go with invoice_search_documents
+        op.execute("DROP TABLE IF EXISTS invoice_search_fts")
+    op.drop_index('ux_invoice_search_documents_invoice_id', table_name='invoice_search_documents')
+    op.drop_table('invoice_search_documents')
@@ -1,5 +1,8 @@
 """Simplified FastAPI application entry point"""
 
+from contextlib import asynccontextmanager
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -10,10 +13,54 @@ setup_logging()
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+async def _init_database() -> None:
+    """Ensure database tables exist (demo-friendly)."""
+    from src.models.database import Base, engine
+    # Import all models to ensure they're registered with Base
+    from src.models.db_models import Invoice, BlobImportWatermark, ExtractionJob, BatchRunRecord, BatchRunItem, InvoiceReviewEvent, InvoiceSearchDocument  # noqa: F401
+    from src.models.line_item_db_models import LineItem  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared services and recover abandoned batches on startup; interrupt work and release clients on shutdown."""
+    from src.config import settings
+    from src.ingestion.blob_client_pool import close_blob_clients
+    from src.services.batch_run_manager import batch_run_manager
+    from src.services.progress_tracker import progress_tracker
+    from src.services.service_container import close_service_container, get_service_container
+
+    await _init_database()
+    try:
+        # Batches whose process died mid-run become resumable
+        await batch_run_manager.mark_interrupted()
+        if getattr(settings, "BATCH_RUN_AUTO_RESUME", False):
+            await batch_run_manager.resume_interrupted()
+    except Exception as e:
+        logger.warning(f"Could not recover interrupted batch runs: {e}")
+    services = get_service_container()
+    services.warm()
+    app.state.services = services
+    try:
+        yield
+    finally:
+        await batch_run_manager.shutdown()
+        await progress_tracker.aclose()
+        await close_service_container()
+        close_blob_clients()
+
+
 app = FastAPI(
     title="FinDataExtractor Vanilla API",
     description="Simplified Invoice Processing System",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -25,18 +72,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def _init_database() -> None:
-    """Ensure database tables exist (demo-friendly)."""
-    from src.models.database import Base, engine
-    # Import all models to ensure they're registered with Base
-    from src.models.db_models import Invoice  # noqa: F401
-    from src.models.line_item_db_models import LineItem  # noqa: F401
-
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -54,7 +89,7 @@ async def health():
 
 
 # Import routes
-from api.routes import ingestion, extraction, matching, overlay, hitl, staging, azure_import, batch, progress
+from api.routes import ingestion, extraction, matching, overlay, hitl, staging, azure_import, batch, progress, jobs, load
 app.include_router(ingestion.router, prefix="/api", tags=["ingestion"])
 app.include_router(extraction.router, prefix="/api", tags=["extraction"])
 app.include_router(matching.router, prefix="/api", tags=["matching"])
@@ -64,6 +99,8 @@ app.include_router(staging.router, prefix="/api", tags=["staging"])
 app.include_router(azure_import.router, prefix="/api", tags=["azure-import"])
 app.include_router(batch.router, tags=["batch"])
 app.include_router(progress.router, prefix="/api", tags=["progress"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(load.router, prefix="/api", tags=["load"])
 
 
 if __name__ == "__main__":
@@ -5,14 +5,11 @@ from fastapi.responses import JSONResponse
 from typing import Optional, List
 import logging
 
-from src.ingestion.azure_blob_utils import AzureBlobBrowser
-from src.ingestion.ingestion_service import IngestionService
-from src.ingestion.file_handler import FileHandler
-from src.ingestion.pdf_processor import PDFProcessor
-from src.extraction.extraction_service import ExtractionService
-from src.extraction.document_intelligence_client import DocumentIntelligenceClient
-from src.extraction.field_extractor import FieldExtractor
-from src.services.db_service import DatabaseService
+from starlette.concurrency import run_in_threadpool
+
+from src.services.blob_import_service import BlobImportService
+from src.services.admission_control import admit, admit_headroom
+from src.services.service_container import get_service_container
 from src.models.database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -20,12 +17,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/azure-import", tags=["azure-import"])
 
+def _get_blob_import_service() -> BlobImportService:
+    # Long-lived import service from the application service container
+    return get_service_container().blob_import_service
+
 
 @router.get("/list-containers")
 async def list_containers():
     """List all containers in Azure Storage"""
     try:
-        browser = AzureBlobBrowser()
+        browser = _get_blob_import_service().browser
         containers = browser.list_containers()
         return JSONResponse(
             status_code=200,
@@ -53,7 +54,7 @@ async def list_blobs(
     - List files in specific path: /api/azure-import/list-blobs?container_name=invoices-raw&prefix=RAW Basic/
     """
     try:
-        browser = AzureBlobBrowser()
+        browser = _get_blob_import_service().browser
         blobs = browser.list_blobs(container_name=container_name, prefix=prefix)
         
         # Filter by extension if provided
@@ -85,11 +86,15 @@ async def process_blob(
     container_name: str = Query(..., description="Container name"),
     blob_name: str = Query(..., description="Blob name/path"),
     run_extraction: bool = Query(True, description="Run extraction after ingestion"),
+    defer: bool = Query(False, description="When saturated, ingest now and leave extraction for later"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Download a blob from Azure Storage and run it through the end-to-end workflow
     
+    Refused with 429 and ``Retry-After`` while extraction is saturated, unless
+    ``defer=true`` (the blob is then ingested without running extraction).
+    
     Args:
         container_name: Container name
         blob_name: Blob name/path (e.g., "RAW Basic/invoice.pdf")
@@ -98,22 +103,22 @@ async def process_blob(
     Returns:
         Processing result with invoice_id and status
     """
+    admission = await admit(incoming=1, defer=defer, db=db)
+    run_extraction = run_extraction and not admission["deferred"]
     try:
+        import_service = _get_blob_import_service()
+        
         # Step 1: Download blob from Azure
-        browser = AzureBlobBrowser()
         logger.info(f"Downloading blob '{blob_name}' from container '{container_name}'")
-        file_content = browser.download_blob(container_name, blob_name)
+        file_content = await run_in_threadpool(
+            import_service.browser.download_blob, container_name, blob_name
+        )
         
         # Extract file name from blob path
         file_name = blob_name.split("/")[-1] if "/" in blob_name else blob_name
         
         # Step 2: Ingest invoice
-        ingestion_service = IngestionService(
-            file_handler=FileHandler(use_azure=True),
-            pdf_processor=PDFProcessor()
-        )
-        
-        ingest_result = await ingestion_service.ingest_invoice(
+        ingest_result = await import_service.ingestion_service.ingest_invoice(
             file_content=file_content,
             file_name=file_name
         )
@@ -135,13 +140,7 @@ async def process_blob(
         # Step 3: Extract invoice (if requested)
         extraction_result = None
         if run_extraction:
-            extraction_service = ExtractionService(
-                doc_intelligence_client=DocumentIntelligenceClient(),
-                file_handler=FileHandler(use_azure=True),
-                field_extractor=FieldExtractor()
-            )
-            
-            extraction_result = await extraction_service.extract_invoice(
+            extraction_result = await import_service.extraction_service.extract_invoice(
                 invoice_id=invoice_id,
                 file_identifier=file_path,
                 file_name=file_name,
@@ -154,6 +153,7 @@ async def process_blob(
                 "status": "success",
                 "message": "Blob processed successfully",
                 "invoice_id": invoice_id,
+                "deferred": admission["deferred"],
                 "ingestion": {
                     "status": ingest_result["status"],
                     "file_name": file_name,
@@ -177,106 +177,79 @@ async def process_batch(
     container_name: str = Query(..., description="Container name"),
     prefix: Optional[str] = Query(None, description="Path prefix to filter"),
     file_extension: Optional[str] = Query("pdf", description="File extension filter"),
-    max_files: int = Query(10, description="Maximum number of files to process"),
+    max_files: int = Query(10, ge=0, description="Maximum number of files to process (0 = no limit)"),
     run_extraction: bool = Query(True, description="Run extraction after ingestion"),
+    incremental: bool = Query(False, description="Only import blobs added or changed since the last incremental run"),
+    defer: bool = Query(False, description="When saturated, ingest now and leave extraction for later"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Process multiple blobs from Azure Storage
     
+    Blobs are listed page by page, downloaded and ingested with bounded
+    concurrency, and extracted while later blobs are still being ingested.
+    Admission control applies as for ``process-blob`` (``max_files`` invoices);
+    with ``max_files=0`` the run is capped at the backlog headroom admission
+    leaves, and reports ``truncated`` when blobs were left for a later run.
+    
     Args:
         container_name: Container name
         prefix: Path prefix (e.g., "RAW Basic/")
         file_extension: File extension to filter (default: "pdf")
-        max_files: Maximum number of files to process
+        max_files: Maximum number of files to process (0 = no limit)
         run_extraction: Whether to run extraction after ingestion
+        incremental: Skip blobs behind the stored container/prefix watermark and
+            files already ingested (same content hash), then advance the watermark
         
     Returns:
         Batch processing results
     """
+    if max_files:
+        admission = await admit(incoming=max_files, defer=defer, db=db)
+    else:
+        # No limit asked for: import only what the backlog has room for
+        admission = await admit_headroom(defer=defer, db=db)
+        max_files = admission["incoming"]
+    run_extraction = run_extraction and not admission["deferred"]
     try:
-        # List blobs
-        browser = AzureBlobBrowser()
-        blobs = browser.list_blobs(
+        summary = await _get_blob_import_service().import_blobs(
             container_name=container_name,
-            prefix=prefix
+            prefix=prefix,
+            file_extension=file_extension,
+            max_files=max_files,
+            run_extraction=run_extraction,
+            incremental=incremental,
         )
         
-        # Filter by extension
-        if file_extension:
-            blobs = [
-                blob for blob in blobs
-                if blob["name"].lower().endswith(f".{file_extension.lower()}")
-            ]
-        
-        # Limit number of files
-        blobs = blobs[:max_files]
-        
-        results = []
-        errors = []
-        
-        for blob in blobs:
-            try:
-                # Process each blob
-                file_content = browser.download_blob(container_name, blob["name"])
-                file_name = blob["name"].split("/")[-1]
-                
-                # Ingest
-                ingestion_service = IngestionService(
-                    file_handler=FileHandler(use_azure=True),
-                    pdf_processor=PDFProcessor()
-                )
-                
-                ingest_result = await ingestion_service.ingest_invoice(
-                    file_content=file_content,
-                    file_name=file_name
-                )
-                
-                if ingest_result["status"] == "uploaded":
-                    invoice_id = ingest_result["invoice_id"]
-                    
-                    # Extract if requested
-                    if run_extraction:
-                        extraction_service = ExtractionService(
-                            doc_intelligence_client=DocumentIntelligenceClient(),
-                            file_handler=FileHandler(use_azure=True),
-                            field_extractor=FieldExtractor()
-                        )
-                        
-                        await extraction_service.extract_invoice(
-                            invoice_id=invoice_id,
-                            file_identifier=ingest_result["file_path"],
-                            file_name=file_name,
-                            upload_date=ingest_result["upload_date"]
-                        )
-                    
-                    results.append({
-                        "blob_name": blob["name"],
-                        "invoice_id": invoice_id,
-                        "status": "success"
-                    })
-                else:
-                    errors.append({
-                        "blob_name": blob["name"],
-                        "error": "Ingestion failed",
-                        "details": ingest_result.get("errors", [])
-                    })
-                    
-            except Exception as e:
-                errors.append({
-                    "blob_name": blob["name"],
-                    "error": str(e)
-                })
-        
         return JSONResponse(
             status_code=200,
             content={
                 "status": "completed",
-                "total": len(blobs),
-                "successful": len(results),
-                "failed": len(errors),
-                "results": results,
-                "errors": errors
+                "deferred": admission["deferred"],
+                "total": summary["total"],
+                "successful": summary["successful"],
+                "failed": summary["failed"],
+                "skipped": summary["skipped"],
+                "truncated": summary["truncated"],
+                "watermark": summary["watermark"],
+                "elapsed_seconds": summary["elapsed_seconds"],
+                "results": [
+                    {
+                        "blob_name": item["blob_name"],
+                        "invoice_id": item["invoice_id"],
+                        "status": item["status"],
+                        "extraction_status": item.get("extraction_status"),
+                    }
+                    for item in summary["results"]
+                ],
+                "errors": [
+                    {
+                        key: item[key]
+                        for key in ("blob_name", "error", "details")
+                        if key in item
+                    }
+                    for item in summary["errors"]
+                ],
             }
         )
         
@@ -286,4 +259,3 @@ async def process_batch(
             status_code=500,
             detail=f"Error processing batch: {str(e)}"
         )
-
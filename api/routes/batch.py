@@ -1,12 +1,20 @@
 """Batch processing API routes"""
 
-from fastapi import APIRouter, Depends, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 
 from src.models.database import get_db
-from src.services.batch_processing_service import BatchProcessingService
+from src.models.invoice import InvoiceState
+from src.services.batch_run_manager import batch_run_manager, BatchRun, BatchRunConflict, BatchRunNotFound
+from src.services.batch_run_store import BatchRunStore
+from src.services.db_service import DatabaseService
+from src.services.priority_scheduler import Priority
 
 router = APIRouter(prefix="/api/batch", tags=["batch"])
 
@@ -14,71 +22,182 @@ router = APIRouter(prefix="/api/batch", tags=["batch"])
 class BatchProcessRequest(BaseModel):
     """Request to process a batch of invoices"""
     invoice_ids: List[str]
+    priority: Priority = Priority.NORMAL
 
 
 class BatchProcessPendingRequest(BaseModel):
     """Request to process pending invoices"""
     limit: Optional[int] = None
+    priority: Priority = Priority.BULK
 
 
-@router.post("/process")
-async def process_batch(
-    request: BatchProcessRequest,
-    db: AsyncSession = Depends(get_db)
-):
+class BatchResumeRequest(BaseModel):
+    """Request to resume an interrupted batch"""
+    retry_failed: bool = False
+
+
+def _batch_priority(priority: Priority) -> Priority:
+    # Interactive capacity is for single invoices someone is waiting on
+    if priority == Priority.INTERACTIVE:
+        raise HTTPException(status_code=400, detail="Batches run at 'normal' or 'bulk' priority")
+    return priority
+
+
+def _accepted(run: BatchRun) -> dict:
+    return {
+        "batch_id": run.batch_id,
+        "status": run.status,
+        "priority": run.priority.value,
+        "total": len(run.invoice_ids),
+        "pending": len(run.invoice_ids) - len(run.results),
+        "status_url": f"/api/batch/{run.batch_id}",
+        "stream_url": f"/api/batch/{run.batch_id}/stream",
+    }
+
+
+@router.post("/process", status_code=202)
+async def process_batch(request: BatchProcessRequest):
     """
-    Process a batch of invoices by ID
-    
-    Returns summary of batch processing results
+    Start extraction of a batch of invoices by ID
+
+    Returns a batch id immediately; poll GET /api/batch/{batch_id} or
+    stream GET /api/batch/{batch_id}/stream for results. Runs at ``normal``
+    priority unless the request asks for ``bulk``.
     """
     if not request.invoice_ids:
         raise HTTPException(status_code=400, detail="invoice_ids list cannot be empty")
-    
+
     if len(request.invoice_ids) > 100:
         raise HTTPException(
             status_code=400,
             detail="Maximum 100 invoices per batch request"
         )
-    
-    batch_service = BatchProcessingService()
-    result = await batch_service.process_batch(request.invoice_ids, db=db)
-    
-    return result
+
+    return _accepted(await batch_run_manager.start(request.invoice_ids, kind="ids", priority=_batch_priority(request.priority)))
 
 
-@router.post("/process-pending")
+@router.post("/process-pending", status_code=202)
 async def process_pending(
     request: BatchProcessPendingRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Process all pending invoices (status='uploaded')
-    
-    Optionally limit the number of invoices to process
+    Start extraction of all pending invoices (processing_state PENDING)
+
+    Optionally limit the number of invoices to process. Runs at ``bulk``
+    priority by default.
     """
-    batch_service = BatchProcessingService()
-    result = await batch_service.process_pending_invoices(
-        limit=request.limit,
-        db=db
+    invoice_ids = await DatabaseService.list_invoice_ids_by_state(
+        [InvoiceState.PENDING.value], limit=request.limit, db=db
     )
-    
-    return result
+    return _accepted(await batch_run_manager.start(invoice_ids, kind="pending", priority=_batch_priority(request.priority)))
 
 
-@router.post("/reprocess-failed")
+@router.post("/reprocess-failed", status_code=202)
 async def reprocess_failed(
     request: BatchProcessPendingRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Reprocess all failed invoices (status='error')
-    
-    Optionally limit the number of invoices to reprocess
+    Start re-extraction of all failed invoices (processing_state FAILED)
+
+    Optionally limit the number of invoices to reprocess. Runs at ``bulk``
+    priority by default.
     """
-    batch_service = BatchProcessingService()
-    result = await batch_service.reprocess_failed_invoices(
-        limit=request.limit,
-        db=db
+    invoice_ids = await DatabaseService.list_invoice_ids_by_state(
+        [InvoiceState.FAILED.value], limit=request.limit, db=db
     )
-    
-    return result
+    return _accepted(await batch_run_manager.start(invoice_ids, kind="failed", priority=_batch_priority(request.priority)))
+
+
+@router.get("")
+async def list_batches(
+    status: Optional[str] = Query(None, description="Only runs in this status (e.g. interrupted)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    """List batch runs (newest first) with their counts, without per-invoice results"""
+    return {"batches": await BatchRunStore.list_runs(status=status, skip=skip, limit=limit, db=db)}
+
+
+@router.get("/{batch_id}")
+async def get_batch(
+    batch_id: str,
+    item_status: Optional[str] = Query(None, description="Only results in this status (success, failed, error, pending)"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Batch summary with its per-invoice results
+
+    Read from the batch checkpoints, so finished and interrupted runs stay
+    queryable after a restart. Invoices not processed yet are listed as
+    ``pending``.
+    """
+    run = await BatchRunStore.get_run(batch_id, item_status=item_status, skip=skip, limit=limit, db=db)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return run
+
+
+@router.post("/{batch_id}/resume", status_code=202)
+async def resume_batch(batch_id: str, request: Optional[BatchResumeRequest] = None):
+    """
+    Resume an interrupted, failed or cancelled batch
+
+    Only invoices without a checkpointed result are re-submitted
+    (``retry_failed`` re-submits failed ones too). A run still owned by a
+    live process is refused with 409.
+    """
+    request = request or BatchResumeRequest()
+    try:
+        run = await batch_run_manager.resume(batch_id, retry_failed=request.retry_failed)
+    except BatchRunNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BatchRunConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _accepted(run)
+
+
+def _encode(event: dict, format: str) -> str:
+    payload = json.dumps(jsonable_encoder(event))
+    if format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@router.get("/{batch_id}/stream")
+async def stream_batch(
+    batch_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stream batch events as each invoice finishes
+
+    Emits one ``result`` event per invoice (with ``elapsed_seconds`` and
+    ``stage_timings``) followed by a final ``summary`` event. Events already
+    emitted are replayed first, so late subscribers see the whole batch.
+    Batches not running in this process are replayed from their checkpoints.
+    Newline-delimited JSON by default; ``format=sse`` for Server-Sent Events.
+    """
+    run = batch_run_manager.get(batch_id)
+    if run is not None:
+        async def events():
+            async for event in run.stream():
+                yield _encode(event, format)
+    else:
+        record = await BatchRunStore.get_run(batch_id, db=db)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+        results = [item for item in record.pop("results") if item["status"] != "pending"]
+
+        async def events():
+            for index, item in enumerate(results, start=1):
+                yield _encode({"event": "result", "batch_id": batch_id, "index": index, **item}, format)
+            yield _encode({"event": "summary", **record}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
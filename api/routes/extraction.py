@@ -6,22 +6,17 @@ from fastapi.encoders import jsonable_encoder
 import logging
 
 from src.extraction.extraction_service import ExtractionService
-from src.extraction.document_intelligence_client import DocumentIntelligenceClient
-from src.ingestion.file_handler import FileHandler
+from src.services.priority_scheduler import Priority, priority_scope
+from src.services.service_container import ServiceContainer, get_services
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def get_extraction_service() -> ExtractionService:
-    """Dependency to get extraction service instance"""
-    doc_client = DocumentIntelligenceClient()
-    file_handler = FileHandler()
-    return ExtractionService(
-        doc_intelligence_client=doc_client,
-        file_handler=file_handler
-    )
+def get_extraction_service(services: ServiceContainer = Depends(get_services)) -> ExtractionService:
+    """Dependency to get the shared extraction service instance"""
+    return services.extraction_service
 
 
 @router.post("/extraction/extract/{invoice_id}")
@@ -53,12 +48,14 @@ async def extract_invoice(
             file_name = "invoice.pdf"
         
         from datetime import datetime
-        result = await extraction_service.extract_invoice(
-            invoice_id=invoice_id,
-            file_identifier=file_identifier,
-            file_name=file_name,
-            upload_date=datetime.utcnow()
-        )
+        # Single extraction with the caller waiting on the response
+        with priority_scope(Priority.INTERACTIVE):
+            result = await extraction_service.extract_invoice(
+                invoice_id=invoice_id,
+                file_identifier=file_identifier,
+                file_name=file_name,
+                upload_date=datetime.utcnow()
+            )
         
         if result["status"] == "error":
             raise HTTPException(
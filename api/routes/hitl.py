@@ -1,8 +1,9 @@
 """HITL (Human-in-the-Loop) API routes for invoice validation"""
 
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -12,14 +13,13 @@ import json
 from pathlib import Path
 from typing import List
 
-from src.services.db_service import DatabaseService
+from src.services.db_service import DatabaseService, InvalidCursor
 from src.models.database import get_db
 from src.models.invoice import Invoice, LineItem, Address
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.extraction.extraction_service import ExtractionService, LLM_SYSTEM_PROMPT
-from src.extraction.document_intelligence_client import DocumentIntelligenceClient
-from src.extraction.field_extractor import FieldExtractor
-from src.ingestion.file_handler import FileHandler
+from src.services.service_container import get_service_container
+from src.services.priority_scheduler import Priority, priority_scope
 from src.config import settings
 from src.models.db_utils import address_to_dict, line_items_to_json, _sanitize_tax_breakdown
 from src.models.invoice import InvoiceState
@@ -77,6 +77,10 @@ ALLOWED_CLEAR_FIELDS = {
 }
 
 
+# Review history entries returned per page (validation response and /history default)
+REVIEW_HISTORY_PAGE_SIZE = 100
+
+
 class InvoiceValidationResponse(BaseModel):
     """Response for invoice validation"""
     success: bool
@@ -87,12 +91,7 @@ class InvoiceValidationResponse(BaseModel):
 
 
 def _get_extraction_service() -> ExtractionService:
-    doc_client = DocumentIntelligenceClient()
-    file_handler = FileHandler()
-    return ExtractionService(
-        doc_intelligence_client=doc_client,
-        file_handler=file_handler
-    )
+    return get_service_container().extraction_service
 
 
 @router.post("/invoice/{invoice_id}/review")
@@ -999,7 +998,7 @@ async def validate_invoice(
 
         # Recompute overall confidence after corrections
         try:
-            fe = FieldExtractor()
+            fe = get_service_container().field_extractor
             if invoice.field_confidence:
                 invoice.extraction_confidence = fe._calculate_overall_confidence(invoice.field_confidence)
                 patch_fields["extraction_confidence"] = invoice.extraction_confidence
@@ -1055,27 +1054,15 @@ async def validate_invoice(
         invoice.review_status = request.overall_validation_status
         invoice.reviewer = request.reviewer
         invoice.review_timestamp = now
-        history_entry = {
+        review_event = {
             "status": request.overall_validation_status,
             "reviewer": request.reviewer,
             "notes": request.validation_notes,
-            "timestamp": now.isoformat()
         }
-        existing_history = []
-        try:
-            if invoice.review_notes:
-                existing_history = json.loads(invoice.review_notes)
-                if not isinstance(existing_history, list):
-                    existing_history = []
-        except Exception:
-            existing_history = []
-        existing_history.append(history_entry)
-        invoice.review_notes = json.dumps(existing_history)
 
         patch_fields["review_status"] = invoice.review_status
         patch_fields["reviewer"] = invoice.reviewer
         patch_fields["review_timestamp"] = invoice.review_timestamp
-        patch_fields["review_notes"] = invoice.review_notes
 
         # Update status based on validation
         if request.overall_validation_status == "validated":
@@ -1115,6 +1102,7 @@ async def validate_invoice(
             patch=patch_fields,
             expected_review_version=request.expected_review_version,
             db=db,
+            review_event=review_event,
         )
         if not success:
             logger.warning(f"Update failed for invoice {invoice.id}: stale write (expected review_version {request.expected_review_version})")
@@ -1147,7 +1135,9 @@ async def validate_invoice(
             invoice_id=request.invoice_id,
             validation_status=request.overall_validation_status,
             message="Invoice validation completed successfully",
-            review_history=existing_history
+            review_history=list(reversed(await DatabaseService.list_review_events(
+                invoice.id, limit=REVIEW_HISTORY_PAGE_SIZE, newest_first=True, db=db
+            ))),
         )
         
     except HTTPException:
@@ -1163,20 +1153,17 @@ async def validate_invoice(
 @router.get("/invoice/{invoice_id}/history")
 async def get_invoice_history(
     invoice_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(REVIEW_HISTORY_PAGE_SIZE, ge=1, le=1000),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="asc = oldest first, desc = newest first"),
     db: AsyncSession = Depends(get_db)
 ) -> List[dict]:
-    """Return review/validation history for an invoice."""
-    invoice = await DatabaseService.get_invoice(invoice_id, db=db)
-    if not invoice:
+    """Return a page of review/validation history for an invoice."""
+    if await DatabaseService.get_state(invoice_id, db=db) is None:
         raise HTTPException(status_code=404, detail=f"Invoice {invoice_id} not found")
-    try:
-        if invoice.review_notes:
-            parsed = json.loads(invoice.review_notes)
-            if isinstance(parsed, list):
-                return parsed
-    except Exception:
-        pass
-    return []
+    return await DatabaseService.list_review_events(
+        invoice_id, skip=skip, limit=limit, newest_first=order == "desc", db=db
+    )
 
 
 @router.post("/invoice/{invoice_id}/reextract")
@@ -1201,13 +1188,15 @@ async def reextract_invoice(
 
         extraction_service = _get_extraction_service()
         from datetime import datetime
-        result = await extraction_service.extract_invoice(
-            invoice_id=invoice_id,
-            file_identifier=invoice.file_path,
-            file_name=invoice.file_name or "invoice.pdf",
-            upload_date=invoice.upload_date or datetime.utcnow(),
-            db=db,
-        )
+        # A reviewer is waiting: take DI / LLM slots ahead of batch and import work
+        with priority_scope(Priority.INTERACTIVE):
+            result = await extraction_service.extract_invoice(
+                invoice_id=invoice_id,
+                file_identifier=invoice.file_path,
+                file_name=invoice.file_name or "invoice.pdf",
+                upload_date=invoice.upload_date or datetime.utcnow(),
+                db=db,
+            )
         if result.get("status") == "conflict":
             raise HTTPException(status_code=409, detail="Invoice is already processing")
         if result.get("status") not in ["extracted"]:
@@ -1253,52 +1242,21 @@ async def get_invoice_pdf(
         
         pdf_content = None
 
-        # If file_path is a URL (Azure blob), try HTTP then SDK
+        # If file_path is a URL (Azure blob), fetch it through the pooled HTTP/SDK clients
         if invoice.file_path and str(invoice.file_path).lower().startswith(("http://", "https://")):
             url_path = str(invoice.file_path)
             try:
-                import requests
+                from src.ingestion.blob_client_pool import fetch_url
 
-                resp = requests.get(url_path, timeout=15)
-                if resp.status_code == 200:
-                    pdf_content = resp.content
-                else:
-                    logger.warning(f"HTTP download failed for PDF {url_path} status={resp.status_code}; will try SDK/local fallback")
+                pdf_content = await run_in_threadpool(fetch_url, url_path, 15)
             except Exception as e:
-                logger.error(f"Error downloading PDF from URL: {e}", exc_info=True)
-
-            if pdf_content is None:
-                try:
-                    from urllib.parse import urlsplit
-                    from azure.storage.blob import BlobServiceClient
-                    from src.config import settings
-
-                    split = urlsplit(url_path)
-                    parts = split.path.lstrip("/").split("/", 1)
-                    if len(parts) == 2:
-                        container, blob_name = parts
-                        if settings.AZURE_STORAGE_CONNECTION_STRING:
-                            svc = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
-                            blob_client = svc.get_blob_client(container=container, blob=blob_name)
-                            pdf_content = blob_client.download_blob().readall()
-                        elif settings.AZURE_STORAGE_ACCOUNT_NAME and settings.AZURE_STORAGE_ACCOUNT_KEY:
-                            from azure.core.credentials import AzureNamedKeyCredential
-                            credential = AzureNamedKeyCredential(settings.AZURE_STORAGE_ACCOUNT_NAME, settings.AZURE_STORAGE_ACCOUNT_KEY)
-                            account_url = f"https://{settings.AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
-                            svc = BlobServiceClient(account_url=account_url, credential=credential)
-                            blob_client = svc.get_blob_client(container=container, blob=blob_name)
-                            pdf_content = blob_client.download_blob().readall()
-                    else:
-                        logger.error(f"Could not parse container/blob from URL: {url_path}")
-                except Exception as e:
-                    logger.error(f"Error downloading PDF via Azure SDK: {e}", exc_info=True)
+                logger.error(f"Error downloading PDF from URL {url_path}: {e}", exc_info=True)
 
         if pdf_content is None:
             # Download PDF from storage (local or azure blob name)
-            from src.ingestion.file_handler import FileHandler
-            file_handler = FileHandler()
+            file_handler = get_service_container().file_handler
             try:
-                pdf_content = file_handler.download_file(invoice.file_path)
+                pdf_content = await run_in_threadpool(file_handler.download_file, invoice.file_path)
             except Exception as e:
                 logger.error(f"Error downloading PDF from storage: {e}", exc_info=True)
                 raise HTTPException(
@@ -1331,59 +1289,81 @@ async def get_invoice_pdf(
         )
 
 
+def _summary_json(row: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-ready invoice summary row (amount as float, dates as ISO strings)"""
+    return {
+        **row,
+        "total_amount": float(row["total_amount"]) if row["total_amount"] else None,
+        "invoice_date": row["invoice_date"].isoformat() if row["invoice_date"] else None,
+        "upload_date": row["upload_date"].isoformat() if row["upload_date"] else None,
+    }
+
+
 @router.get("/invoices")
 async def list_invoices_for_review(
     skip: int = 0,
     limit: int = 50,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    processing_state: Optional[str] = None,
+    vendor_name: Optional[str] = None,
+    upload_date_from: Optional[datetime] = None,
+    upload_date_to: Optional[datetime] = None,
+    include_total: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
     """
     List invoices for HITL review
     
+    Newest uploads first. Pass the returned ``next_cursor`` as ``cursor`` to
+    fetch the following page; cursor pages seek on (upload_date, id) instead
+    of skipping rows, so deep pages stay fast.
+    
     Args:
-        skip: Number of records to skip
+        skip: Number of records to skip (offset paging; prefer cursor)
         limit: Maximum number of records to return
         status: Optional status filter (e.g., "extracted", "in_review")
+        cursor: next_cursor from the previous page
+        processing_state: Optional processing state filter (e.g., "EXTRACTED")
+        vendor_name: Optional exact vendor name filter
+        upload_date_from: Optional inclusive lower bound on upload date
+        upload_date_to: Optional exclusive upper bound on upload date
+        include_total: Include the number of matching invoices (cached briefly)
         
     Returns:
-        List of invoices with summary information
+        List of invoices with summary information, next_cursor and total
     """
     try:
-        invoices = await DatabaseService.list_invoices(
-            skip=skip,
+        # Summary columns only: no line items or full invoice models are loaded
+        page = await DatabaseService.list_invoice_page(
             limit=limit,
+            cursor=cursor,
+            skip=skip,
+            include_total=include_total,
+            db=db,
             status=status,
-            db=db
+            processing_state=processing_state,
+            vendor_name=vendor_name,
+            upload_date_from=upload_date_from,
+            upload_date_to=upload_date_to,
         )
         
-        summary = [
-            {
-                "invoice_id": inv.id,
-                "invoice_number": inv.invoice_number,
-                "vendor_name": inv.vendor_name,
-                "total_amount": float(inv.total_amount) if inv.total_amount else None,
-                "currency": inv.currency,
-                "invoice_date": inv.invoice_date.isoformat() if inv.invoice_date else None,
-                "status": inv.status,
-                "review_status": inv.review_status,
-                "extraction_confidence": inv.extraction_confidence,
-                "upload_date": inv.upload_date.isoformat() if inv.upload_date else None,
-                "line_item_count": len(inv.line_items) if inv.line_items else 0
-            }
-            for inv in invoices
-        ]
+        summary = [_summary_json(row) for row in page["invoices"]]
         
         return JSONResponse(
             status_code=200,
             content={
                 "invoices": summary,
-                "total": len(summary),
+                "total": page["total"],
+                "next_cursor": page["next_cursor"],
+                "has_more": page["has_more"],
                 "skip": skip,
                 "limit": limit
             }
         )
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing invoices for review: {e}", exc_info=True)
         raise HTTPException(
@@ -1391,3 +1371,51 @@ async def list_invoices_for_review(
             detail=f"Internal server error: {str(e)}"
         )
 
+
+@router.get("/invoices/search")
+async def search_invoices(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text invoice search
+    
+    Matches vendor names, invoice / PO / reference numbers (including
+    fragments), line item descriptions and the document's OCR text. Every
+    word must match, as a word prefix. Best matches first.
+    
+    Args:
+        q: Search text
+        skip: Number of results to skip
+        limit: Maximum number of results to return
+        include_total: Include the number of matching invoices
+        
+    Returns:
+        Invoice summaries with rank (higher is better) and snippet (matched
+        OCR / line item text with hits in **bold**, None for vendor or
+        number hits), has_more and total
+    """
+    try:
+        page = await DatabaseService.search_invoices(
+            q, skip=skip, limit=limit, include_total=include_total, db=db
+        )
+        return JSONResponse(
+            status_code=200,
+            content={
+                "query": q,
+                "invoices": [_summary_json(row) for row in page["invoices"]],
+                "total": page["total"],
+                "has_more": page["has_more"],
+                "skip": skip,
+                "limit": limit,
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error searching invoices: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
@@ -1,6 +1,6 @@
 """Simplified API routes for invoice ingestion"""
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 from pathlib import Path
@@ -9,39 +9,51 @@ from sqlalchemy import text
 import logging
 
 from src.ingestion.ingestion_service import IngestionService
-from src.ingestion.file_handler import FileHandler
-from src.ingestion.pdf_processor import PDFProcessor
 from src.ingestion.azure_blob_utils import AzureBlobBrowser
 from src.models.database import get_db
+from src.services.admission_control import admit, admit_ingestion
+from src.services.service_container import ServiceContainer, get_services
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def get_ingestion_service() -> IngestionService:
-    """Dependency to get ingestion service instance"""
-    file_handler = FileHandler()
-    pdf_processor = PDFProcessor()
+def get_ingestion_service(services: ServiceContainer = Depends(get_services)) -> IngestionService:
+    """Dependency to get ingestion service instance over the shared file handler"""
     return IngestionService(
-        file_handler=file_handler,
-        pdf_processor=pdf_processor
+        file_handler=services.file_handler,
+        pdf_processor=services.pdf_processor
     )
 
 
-def get_blob_browser() -> AzureBlobBrowser:
-    """Dependency to get Azure blob browser"""
-    return AzureBlobBrowser()
+def get_blob_browser(services: ServiceContainer = Depends(get_services)) -> AzureBlobBrowser:
+    """Dependency to get the shared Azure blob browser"""
+    return services.blob_import_service.browser
+
+
+def _admission_fields(admission: dict) -> dict:
+    """Deferred-mode hints added to ingestion responses"""
+    if not admission.get("deferred"):
+        return {"deferred": False}
+    return {"deferred": True, "retry_after_seconds": admission["retry_after_seconds"]}
 
 
 @router.post("/ingestion/upload")
 async def upload_invoice(
     file: UploadFile = File(...),
-    ingestion_service: IngestionService = Depends(get_ingestion_service)
+    ingestion_service: IngestionService = Depends(get_ingestion_service),
+    admission: dict = Depends(admit_ingestion),
 ):
     """
     Upload a single invoice PDF
     
+    Refused with 429 and ``Retry-After`` while extraction is saturated, unless
+    ``defer=true``: the upload is then accepted with 202 and ``deferred: true``.
+    Uploading never starts extraction, so ``defer`` only bypasses the 429;
+    the invoice is PENDING like any other and whoever extracts it later should
+    wait until GET /api/load reports capacity.
+    
     Args:
         file: PDF file to upload
         
@@ -81,7 +93,7 @@ async def upload_invoice(
             )
         
         return JSONResponse(
-            status_code=201,
+            status_code=202 if admission["deferred"] else 201,
             content={
                 "message": "Invoice uploaded successfully",
                 "invoice_id": result["invoice_id"],
@@ -90,7 +102,8 @@ async def upload_invoice(
                 "file_path": result["file_path"],
                 "file_size": result["file_size"],
                 "page_count": result["page_count"],
-                "upload_date": result["upload_date"].isoformat()
+                "upload_date": result["upload_date"].isoformat(),
+                **_admission_fields(admission),
             }
         )
         
@@ -107,17 +120,23 @@ async def upload_invoice(
 @router.post("/ingestion/batch-upload")
 async def batch_upload_invoices(
     files: List[UploadFile] = File(...),
-    ingestion_service: IngestionService = Depends(get_ingestion_service)
+    ingestion_service: IngestionService = Depends(get_ingestion_service),
+    defer: bool = Query(False, description="Accept while saturated instead of answering 429"),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Upload multiple invoice PDFs
     
+    The whole batch is admitted or refused (429 + ``Retry-After``) against the
+    extraction backlog; see ``upload_invoice`` for ``defer``.
+    
     Args:
         files: List of PDF files to upload
         
     Returns:
         Batch ingestion results
     """
+    admission = await admit(incoming=len(files), defer=defer, db=db)
     results = []
     errors = []
     
@@ -141,13 +160,14 @@ async def batch_upload_invoices(
             })
     
     return JSONResponse(
-        status_code=200,
+        status_code=202 if admission["deferred"] else 200,
         content={
             "message": f"Processed {len(files)} files",
             "successful": len(results),
             "failed": len(errors),
             "results": results,
-            "errors": errors
+            "errors": errors,
+            **_admission_fields(admission),
         }
     )
 
@@ -173,6 +193,7 @@ async def extract_blob(
     blob_name: str,
     ingestion_service: IngestionService = Depends(get_ingestion_service),
     blob_browser: AzureBlobBrowser = Depends(get_blob_browser),
+    admission: dict = Depends(admit_ingestion),
 ):
     """Download a blob from storage and ingest it like an uploaded PDF."""
     try:
@@ -193,7 +214,7 @@ async def extract_blob(
             )
 
         return JSONResponse(
-            status_code=201,
+            status_code=202 if admission["deferred"] else 201,
             content={
                 "message": "Blob ingested successfully",
                 "invoice_id": result["invoice_id"],
@@ -205,6 +226,7 @@ async def extract_blob(
                 "upload_date": result["upload_date"].isoformat() if result.get("upload_date") else None,
                 "container": container,
                 "blob_name": blob_name,
+                **_admission_fields(admission),
             }
         )
     except HTTPException:
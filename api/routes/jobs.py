@@ -0,0 +1,80 @@
+"""Extraction job queue API routes
+
+Enqueueing returns immediately with job ids; extraction itself runs in
+worker processes (``python -m src.workers.extraction_worker``).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from pydantic import BaseModel
+import logging
+
+from src.models.database import get_db
+from src.services.job_queue import ExtractionJobQueue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class EnqueueExtractionRequest(BaseModel):
+    """Request to queue extraction for invoices"""
+    invoice_ids: List[str]
+    max_attempts: Optional[int] = None
+
+
+@router.post("/jobs/extraction")
+async def enqueue_extraction(
+    request: EnqueueExtractionRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue extraction jobs for invoices
+    
+    Invoices that already have a queued or running job return that job's id.
+    
+    Returns:
+        202 with {"jobs": [{"invoice_id", "job_id", "created"}], "not_found": [...]}
+    """
+    if not request.invoice_ids:
+        raise HTTPException(status_code=400, detail="invoice_ids list cannot be empty")
+    if len(request.invoice_ids) > 1000:
+        raise HTTPException(status_code=400, detail="Maximum 1000 invoices per enqueue request")
+    
+    result = await ExtractionJobQueue.enqueue(
+        request.invoice_ids,
+        max_attempts=request.max_attempts,
+        db=db,
+    )
+    return JSONResponse(status_code=202, content=jsonable_encoder(result))
+
+
+@router.get("/jobs")
+async def list_jobs(
+    state: Optional[str] = Query(None, description="QUEUED, RUNNING, SUCCEEDED or FAILED"),
+    invoice_id: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """List extraction jobs (newest first) with per-state queue depth"""
+    jobs = await ExtractionJobQueue.list_jobs(
+        state=state, invoice_id=invoice_id, skip=skip, limit=limit, db=db
+    )
+    counts = await ExtractionJobQueue.count_by_state(db=db)
+    return jsonable_encoder({"jobs": jobs, "counts": counts})
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str = Path(..., description="Job ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the state of an extraction job"""
+    job = await ExtractionJobQueue.get_job(job_id, db=db)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return jsonable_encoder(job)
@@ -0,0 +1,27 @@
+"""API route reporting extraction load for admission control"""
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database import get_db
+from src.services import admission_control
+
+router = APIRouter()
+
+
+@router.get("/load")
+async def get_load(response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Current extraction load
+
+    ``status`` is ``ok``, ``busy`` or ``saturated``; while saturated,
+    ingestion answers 429 and ``retry_after_seconds`` says when to try again
+    (also sent as ``Retry-After``). Includes the backlog and, per shared
+    resource (``di``, ``llm``), active and queued calls, observed latency and
+    per-priority stats.
+    """
+    load = await admission_control.admission_controller.load(db=db)
+    if load["retry_after_seconds"]:
+        response.headers["Retry-After"] = str(load["retry_after_seconds"])
+    return jsonable_encoder(load)
@@ -8,8 +8,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.db_service import DatabaseService
 from src.erp.pdf_overlay_renderer import PDFOverlayRenderer
-from src.ingestion.file_handler import FileHandler
 from src.models.database import get_db
+from src.services.service_container import ServiceContainer, get_services
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +19,7 @@ router = APIRouter(prefix="/overlay", tags=["overlay"])
 @router.get("/{invoice_id}")
 async def get_overlay_pdf(
     invoice_id: str,
-    file_handler: FileHandler = Depends(lambda: FileHandler()),
+    services: ServiceContainer = Depends(get_services),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -38,7 +38,7 @@ async def get_overlay_pdf(
             raise HTTPException(status_code=404, detail=f"Invoice {invoice_id} not found")
         
         # Create overlay renderer
-        renderer = PDFOverlayRenderer(file_handler=file_handler)
+        renderer = PDFOverlayRenderer(file_handler=services.file_handler)
         
         # Generate overlay PDF
         overlay_pdf = renderer.render_overlay(invoice)
@@ -1,10 +1,14 @@
 """API routes for progress tracking"""
 
-from fastapi import APIRouter, HTTPException, Path
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Path, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Iterable, List, Optional
+import asyncio
+import json
 import logging
 
+from src.config import settings
 from src.services.progress_tracker import progress_tracker
 
 logger = logging.getLogger(__name__)
@@ -12,6 +16,111 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _parse_invoice_ids(values: Iterable[str]) -> List[str]:
+    """Invoice ids from repeated and/or comma-separated values, de-duplicated"""
+    ids = []
+    for value in values or []:
+        ids.extend(part.strip() for part in str(value).split(",") if part.strip())
+    ids = list(dict.fromkeys(ids))
+    max_ids = getattr(settings, "PROGRESS_STREAM_MAX_INVOICES", 500)
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} invoice ids per subscription")
+    return ids
+
+
+@router.get("/progress/stream")
+async def stream_progress(
+    request: Request,
+    invoice_ids: List[str] = Query(..., description="Invoice ids to follow (repeat or comma-separate)"),
+    until_done: bool = Query(True, description="Close the stream once every invoice is complete or failed"),
+):
+    """
+    Stream progress for one or more invoices as Server-Sent Events
+    
+    Each change is pushed as a ``progress`` event carrying the same payload
+    as GET /api/progress/{invoice_id}; the current progress of each invoice
+    is sent first. With ``until_done`` a final ``done`` event closes the
+    stream once all invoices have finished. Comment lines are sent as
+    keep-alives while nothing changes.
+    """
+    try:
+        ids = _parse_invoice_ids(invoice_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ids:
+        raise HTTPException(status_code=400, detail="invoice_ids cannot be empty")
+    keepalive = getattr(settings, "PROGRESS_STREAM_KEEPALIVE_SECONDS", 15.0)
+
+    async def events():
+        async with progress_tracker.subscribe(ids) as feed:
+            while True:
+                snapshot = await feed.get(timeout=keepalive)
+                if await request.is_disconnected():
+                    return
+                if snapshot is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: progress\ndata: {json.dumps(jsonable_encoder(snapshot))}\n\n"
+                if until_done and feed.all_done:
+                    yield f"event: done\ndata: {json.dumps({'invoice_ids': ids})}\n\n"
+                    return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/progress/ws")
+async def progress_websocket(websocket: WebSocket):
+    """
+    Follow progress for many invoices over one WebSocket
+    
+    Optional ``invoice_ids`` query parameters subscribe on connect. Clients
+    then send ``{"subscribe": [...]}`` / ``{"unsubscribe": [...]}`` messages
+    to change the set; the server answers with a ``subscribed`` message and
+    pushes ``{"event": "progress", ...}`` for every change.
+    """
+    await websocket.accept()
+    try:
+        initial = _parse_invoice_ids(websocket.query_params.getlist("invoice_ids"))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    async with progress_tracker.subscribe(initial) as feed:
+        async def receive_commands():
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    message = json.loads(text)
+                    add = _parse_invoice_ids(message.get("subscribe") or [])
+                    drop = _parse_invoice_ids(message.get("unsubscribe") or [])
+                    if len(feed.invoice_ids | set(add)) > getattr(settings, "PROGRESS_STREAM_MAX_INVOICES", 500):
+                        raise ValueError("Too many invoice ids for one subscription")
+                except (AttributeError, ValueError) as e:
+                    await websocket.send_json({"event": "error", "message": str(e)})
+                    continue
+                await feed.remove(drop)
+                await feed.add(add)
+                await websocket.send_json({"event": "subscribed", "invoice_ids": sorted(feed.invoice_ids)})
+
+        commands = asyncio.create_task(receive_commands())
+        try:
+            await websocket.send_json({"event": "subscribed", "invoice_ids": sorted(feed.invoice_ids)})
+            while not commands.done():
+                # Wake up now and then to notice a closed connection
+                snapshot = await feed.get(timeout=1.0)
+                if snapshot is not None:
+                    await websocket.send_json(jsonable_encoder({"event": "progress", **snapshot}))
+            commands.result()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            commands.cancel()
+
+
 @router.get("/progress/{invoice_id}")
 async def get_progress(invoice_id: str = Path(..., description="Invoice ID to get progress for")):
     """
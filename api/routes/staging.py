@@ -9,7 +9,7 @@ import logging
 from src.erp.staging_service import ERPStagingService, ERPPayloadFormat
 from src.services.db_service import DatabaseService
 from src.models.database import get_db
-from src.ingestion.file_handler import FileHandler
+from src.services.service_container import get_service_container
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -68,7 +68,7 @@ async def stage_invoice(
         # Create staging service
         staging_service = ERPStagingService(
             erp_format=erp_format,
-            file_handler=FileHandler()
+            file_handler=get_service_container().file_handler
         )
         
         # Stage invoice
@@ -130,7 +130,7 @@ async def batch_stage_invoices(
         # Create staging service
         staging_service = ERPStagingService(
             erp_format=erp_format,
-            file_handler=FileHandler()
+            file_handler=get_service_container().file_handler
         )
         
         # Batch stage
@@ -0,0 +1,144 @@
+"""
+DB <-> Pydantic converter micro-benchmark.
+
+Times converting invoice rows to Pydantic models and back, with 0, 10, 100
+and 1,000 line items per invoice, comparing:
+  validated - db_to_pydantic_invoice(row, validate=True), full Pydantic validation
+  trusted   - db_to_pydantic_invoice(row), model_construct (the DB read path)
+  write     - pydantic_to_db_invoice(invoice), the validated write path
+
+Rows are saved to an in-memory SQLite database and loaded once with their
+line items (as DatabaseService.get_invoice loads them); the timings are
+conversion CPU only, without database I/O.
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, selectinload
+
+from src.models.database import Base
+from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_utils import db_to_pydantic_invoice, pydantic_to_db_invoice
+from src.models.line_item_db_models import LineItem as LineItemDB
+
+SIZES = (0, 10, 100, 1000)
+
+
+def _new_row(lines: int) -> InvoiceDB:
+    invoice_id = str(uuid.uuid4())
+    address = {"street": "1 Main St", "city": "Ottawa", "province": "ON", "postal_code": "K1A 0B1", "country": "CA"}
+    row = InvoiceDB(
+        id=invoice_id,
+        file_path=f"benchmark/{invoice_id}.pdf",
+        file_name="benchmark.pdf",
+        upload_date=datetime(2026, 1, 1),
+        status="extracted",
+        review_version=3,
+        processing_state="EXTRACTED",
+        invoice_number="INV-1",
+        invoice_date=date(2026, 1, 1),
+        vendor_name="Acme Corp",
+        vendor_address=address,
+        bill_to_address=address,
+        remit_to_address=address,
+        subtotal=Decimal("1305.00"),
+        gst_amount=Decimal("65.25"),
+        tax_breakdown={"GST": "65.25", "PST": "104.40"},
+        tax_amount=Decimal("169.65"),
+        total_amount=Decimal("1474.65"),
+        currency="CAD",
+        invoice_subtype="STANDARD_INVOICE",
+        extraction_confidence=0.9,
+        field_confidence={f"field_{n}": 0.9 for n in range(40)},
+        extraction_timestamp=datetime(2026, 1, 1),
+    )
+    row.line_items_relationship = [
+        LineItemDB(
+            id=str(uuid.uuid4()),
+            invoice_id=invoice_id,
+            line_number=n,
+            description=f"Line {n}",
+            quantity=Decimal("3"),
+            unit_price=Decimal("19.99"),
+            amount=Decimal("59.97"),
+            confidence=0.92,
+            unit_of_measure="EA",
+        )
+        for n in range(1, lines + 1)
+    ]
+    return row
+
+
+def _row(session: Session, lines: int) -> InvoiceDB:
+    """Save a row with ``lines`` line items and load it back the way get_invoice does"""
+    row = _new_row(lines)
+    session.add(row)
+    session.commit()
+    session.expunge_all()
+    return session.execute(
+        select(InvoiceDB).options(selectinload(InvoiceDB.line_items_relationship)).where(InvoiceDB.id == row.id)
+    ).scalar_one()
+
+
+def _per_call_us(convert, value, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        convert(value)
+    return (time.perf_counter() - started) * 1_000_000 / repeat
+
+
+def benchmark_size(session: Session, lines: int, repeat: int) -> dict:
+    row = _row(session, lines)
+    invoice = db_to_pydantic_invoice(row, validate=True)
+    # Scale repetitions down for large invoices so each size takes similar time
+    repeat = max(1, repeat // max(1, lines // 10))
+    results = {
+        "lines": lines,
+        "validated_us": _per_call_us(lambda r: db_to_pydantic_invoice(r, validate=True), row, repeat),
+        "trusted_us": _per_call_us(db_to_pydantic_invoice, row, repeat),
+        "write_us": _per_call_us(pydantic_to_db_invoice, invoice, repeat),
+    }
+    assert db_to_pydantic_invoice(row).model_dump() == invoice.model_dump()
+    return results
+
+
+def print_report(results: list):
+    print("\n" + "=" * 80)
+    print("DB <-> PYDANTIC CONVERSION BENCHMARK (microseconds per invoice)")
+    print("=" * 80)
+    print(f"{'lines':>6}{'validated read':>16}{'trusted read':>14}{'read speedup':>14}{'write':>12}")
+    for r in results:
+        speedup = r["validated_us"] / r["trusted_us"] if r["trusted_us"] else 0.0
+        print(
+            f"{r['lines']:>6}{r['validated_us']:>16.1f}{r['trusted_us']:>14.1f}"
+            f"{speedup:>13.1f}x{r['write_us']:>12.1f}"
+        )
+
+
+def main(args):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        results = [benchmark_size(session, size, args.repeat) for size in args.sizes]
+    engine.dispose()
+    print_report(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DB <-> Pydantic invoice conversion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Line item counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=2000, help="Conversions per size (scaled down for large invoices)")
+
+    main(parser.parse_args())
@@ -0,0 +1,155 @@
+"""
+Concurrent-writer benchmark for the database engine configuration.
+
+Runs N async writers that each commit M small invoice transactions (an
+insert followed by a status update, like ingestion and extraction do) while
+readers poll the invoice list, and reports throughput, commit latency and
+"database is locked" failures for writers and readers.
+
+By default it compares two SQLite engines on fresh temp files:
+  baseline - plain create_async_engine (rollback journal, driver defaults)
+  tuned    - src.models.database.create_engine_for_url (WAL and pragmas)
+
+Pass --database-url to benchmark a single existing database instead (e.g.
+an Azure SQL test database); tables are created if missing and the rows
+written by the run are deleted afterwards.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from src.models.database import Base, create_engine_for_url
+from src.models.db_models import Invoice
+from src.models.line_item_db_models import LineItem  # noqa: F401  (registers the mapper)
+
+
+async def _writer(session_factory, run_tag: str, writes: int, latencies: list, errors: list):
+    for _ in range(writes):
+        invoice_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        try:
+            async with session_factory() as session:
+                session.add(Invoice(
+                    id=invoice_id,
+                    file_path=f"benchmark/{run_tag}/{invoice_id}.pdf",
+                    file_name=f"{invoice_id}.pdf",
+                    upload_date=datetime.utcnow(),
+                    status="processing",
+                    processing_state="PENDING",
+                ))
+                await session.commit()
+                await session.execute(
+                    update(Invoice).where(Invoice.id == invoice_id).values(status="extracted", processing_state="EXTRACTED")
+                )
+                await session.commit()
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def _reader(session_factory, stop: asyncio.Event, counter: list, errors: list):
+    while not stop.is_set():
+        try:
+            async with session_factory() as session:
+                await session.execute(select(Invoice.id, Invoice.status).order_by(Invoice.upload_date.desc()).limit(50))
+            counter[0] += 1
+        except OperationalError as e:
+            errors.append(str(e.orig))
+        await asyncio.sleep(0)
+
+
+async def run_benchmark(engine, label: str, writers: int, writes: int, readers: int) -> dict:
+    """Run one benchmark against ``engine`` and return its summary"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    run_tag = uuid.uuid4().hex[:8]
+    latencies: list = []
+    errors: list = []
+    read_errors: list = []
+    reads = [0]
+    stop = asyncio.Event()
+
+    reader_tasks = [asyncio.create_task(_reader(session_factory, stop, reads, read_errors)) for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(_writer(session_factory, run_tag, writes, latencies, errors) for _ in range(writers)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*reader_tasks)
+
+    async with session_factory() as session:
+        await session.execute(delete(Invoice).where(Invoice.file_path.like(f"benchmark/{run_tag}/%")))
+        await session.commit()
+    await engine.dispose()
+
+    ordered = sorted(latencies)
+    return {
+        "label": label,
+        "writers": writers,
+        "committed": len(latencies),
+        "lock_errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "writes_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(ordered) * 1000, 2) if ordered else None,
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2) if ordered else None,
+        "reads": reads[0],
+        "read_errors": len(read_errors),
+    }
+
+
+def print_report(results: list):
+    print("\n" + "=" * 80)
+    print("CONCURRENT WRITER BENCHMARK")
+    print("=" * 80)
+    print(f"{'engine':<10}{'writers':>8}{'committed':>11}{'locked':>8}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'reads':>8}{'read err':>10}")
+    for r in results:
+        print(
+            f"{r['label']:<10}{r['writers']:>8}{r['committed']:>11}{r['lock_errors']:>8}"
+            f"{r['writes_per_second']:>10}{str(r['p50_ms']):>9}{str(r['p95_ms']):>9}{r['reads']:>8}{r['read_errors']:>10}"
+        )
+
+
+async def main(args):
+    results = []
+    if args.database_url:
+        results.append(await run_benchmark(
+            create_engine_for_url(args.database_url, echo=False), "configured", args.writers, args.writes, args.readers
+        ))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_url = f"sqlite+aiosqlite:///{Path(tmp) / 'baseline.db'}"
+            tuned_url = f"sqlite+aiosqlite:///{Path(tmp) / 'tuned.db'}"
+            # What database.py used to build: driver defaults only (5s lock wait, rollback journal)
+            baseline = create_async_engine(baseline_url)
+            results.append(await run_benchmark(baseline, "baseline", args.writers, args.writes, args.readers))
+            results.append(await run_benchmark(
+                create_engine_for_url(tuned_url, echo=False), "tuned", args.writers, args.writes, args.readers
+            ))
+    print_report(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent database writers")
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writer tasks")
+    parser.add_argument("--writes", type=int, default=50, help="Transactions per writer")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader tasks")
+    parser.add_argument("--database-url", type=str, help="Benchmark this database instead of temp SQLite files")
+
+    asyncio.run(main(parser.parse_args()))
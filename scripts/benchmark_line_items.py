@@ -0,0 +1,121 @@
+"""
+Line-item persistence benchmark.
+
+Times saving line items to the line_items table at 10, 100, 1,000 and 5,000
+lines, for the initial save of a new invoice and for a HITL-style edit of a
+single line, comparing:
+  legacy - delete every row, then session.add() one ORM object per line
+  bulk   - save_line_items_to_table (executemany INSERT / diff-based upsert)
+
+Runs against a temp SQLite file configured like the application engine, or
+against --database-url (rows written by the run are deleted afterwards).
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.database import Base, create_engine_for_url
+from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_utils_line_items import line_item_values, save_line_items_to_table
+from src.models.invoice import LineItem
+from src.models.line_item_db_models import LineItem as LineItemDB
+
+SIZES = (10, 100, 1000, 5000)
+
+
+def _lines(count):
+    return [
+        LineItem(
+            line_number=n,
+            description=f"Line {n}",
+            quantity=Decimal("3"),
+            unit_price=Decimal("19.99"),
+            amount=Decimal("59.97"),
+            confidence=0.92,
+            unit_of_measure="EA",
+        )
+        for n in range(1, count + 1)
+    ]
+
+
+async def _legacy_save(session, invoice_id, line_items):
+    """The per-row ORM path save_line_items_to_table used to take"""
+    await session.execute(delete(LineItemDB).where(LineItemDB.invoice_id == invoice_id))
+    for item in line_items:
+        session.add(LineItemDB(id=str(uuid.uuid4()), invoice_id=invoice_id, **line_item_values(item)))
+
+
+async def _timed(session_factory, save, invoice_id, line_items) -> float:
+    async with session_factory() as session:
+        started = time.perf_counter()
+        await save(session, invoice_id, line_items)
+        await session.commit()
+        return (time.perf_counter() - started) * 1000
+
+
+async def benchmark_size(session_factory, size: int) -> dict:
+    lines = _lines(size)
+    edited = list(lines)
+    middle = size // 2
+    edited[middle] = edited[middle].model_copy(update={"description": "Corrected", "amount": Decimal("60.00")})
+
+    results = {"lines": size}
+    for label, save in (("legacy", _legacy_save), ("bulk", save_line_items_to_table)):
+        invoice_id = str(uuid.uuid4())
+        async with session_factory() as session:
+            session.add(InvoiceDB(id=invoice_id, file_path=f"benchmark/{invoice_id}.pdf", file_name="benchmark.pdf"))
+            await session.commit()
+        results[f"{label}_insert_ms"] = await _timed(session_factory, save, invoice_id, lines)
+        results[f"{label}_edit_ms"] = await _timed(session_factory, save, invoice_id, edited)
+        async with session_factory() as session:
+            await session.execute(delete(LineItemDB).where(LineItemDB.invoice_id == invoice_id))
+            await session.execute(delete(InvoiceDB).where(InvoiceDB.id == invoice_id))
+            await session.commit()
+    return results
+
+
+def print_report(results: list):
+    print("\n" + "=" * 80)
+    print("LINE ITEM PERSISTENCE BENCHMARK (ms)")
+    print("=" * 80)
+    print(f"{'lines':>6}{'legacy insert':>15}{'bulk insert':>13}{'legacy edit':>13}{'diff edit':>11}{'edit speedup':>14}")
+    for r in results:
+        speedup = r["legacy_edit_ms"] / r["bulk_edit_ms"] if r["bulk_edit_ms"] else 0.0
+        print(
+            f"{r['lines']:>6}{r['legacy_insert_ms']:>15.1f}{r['bulk_insert_ms']:>13.1f}"
+            f"{r['legacy_edit_ms']:>13.1f}{r['bulk_edit_ms']:>11.1f}{speedup:>13.1f}x"
+        )
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'line_items.db'}"
+        engine = create_engine_for_url(database_url, echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        results = [await benchmark_size(session_factory, size) for size in args.sizes]
+        await engine.dispose()
+    print_report(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark line item persistence")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Line counts to benchmark")
+    parser.add_argument("--database-url", type=str, help="Benchmark this database instead of a temp SQLite file")
+
+    asyncio.run(main(parser.parse_args()))
@@ -88,13 +88,29 @@ class Settings(BaseSettings):
     # Azure Storage (Optional - can use local storage)
     AZURE_STORAGE_ACCOUNT_NAME: Optional[str] = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
     AZURE_STORAGE_CONNECTION_STRING: Optional[str] = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    AZURE_STORAGE_ACCOUNT_KEY: Optional[str] = os.getenv("AZURE_STORAGE_ACCOUNT_KEY")  # Shared key auth (alternative to connection string / DefaultAzureCredential)
     AZURE_STORAGE_CONTAINER_RAW: str = os.getenv("AZURE_STORAGE_CONTAINER_RAW", "invoices-raw")
     AZURE_STORAGE_CONTAINER_PROCESSED: str = os.getenv("AZURE_STORAGE_CONTAINER_PROCESSED", "invoices-processed")
     # Force SDK for blob URLs (avoid public HTTP fetch); if true, blob URLs will be fetched via SDK first
     USE_BLOB_SDK_FOR_URLS: bool = os.getenv("USE_BLOB_SDK_FOR_URLS", "False").lower() == "true"
+    BLOB_HTTP_POOL_SIZE: int = int(os.getenv("BLOB_HTTP_POOL_SIZE", "16"))  # Keep-alive connections per host for pooled blob/HTTP clients
     
     # Database
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./findataextractor.db")
+    # SQLite connection pragmas (applied on every new connection)
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL lets readers run alongside a writer
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable across crashes in WAL mode
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))  # Wait for the write lock instead of failing with "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # Page cache per connection (64 MiB)
+    SQLITE_MMAP_SIZE_BYTES: int = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", "268435456"))  # Memory-mapped I/O window (256 MiB, 0 disables)
+    # Connection pool for server databases (Azure SQL / SQL Server, PostgreSQL)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))  # Connections kept open per process
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))  # Wait for a free connection before raising
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))  # Reconnect before Azure SQL's idle-connection cutoff
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"  # Check connections on checkout (drops stale ones after failover)
+    INVOICE_COUNT_CACHE_SECONDS: float = float(os.getenv("INVOICE_COUNT_CACHE_SECONDS", "30"))  # Reuse invoice list totals for this long (0 counts every request)
+    SEARCH_DOCUMENT_TEXT_MAX_CHARS: int = int(os.getenv("SEARCH_DOCUMENT_TEXT_MAX_CHARS", "200000"))  # DI text kept per invoice in the full-text search index
 
     # LLM Fallback (optional)
     USE_LLM_FALLBACK: bool = os.getenv("USE_LLM_FALLBACK", "False").lower() == "true"
@@ -132,6 +148,71 @@ class Settings(BaseSettings):
     PDF_PREPROCESS_TARGET_DPI: int = int(os.getenv("PDF_PREPROCESS_TARGET_DPI", "300"))  # Target DPI for image optimization
     PDF_PREPROCESS_MAX_DPI: int = int(os.getenv("PDF_PREPROCESS_MAX_DPI", "600"))  # Maximum DPI before downscaling
     PDF_PREPROCESS_TIMEOUT_SEC: float = float(os.getenv("PDF_PREPROCESS_TIMEOUT_SEC", "30"))  # Timeout in seconds for preprocessing (SLO)
+    PDF_PREPROCESS_MAX_WORKERS: int = int(os.getenv("PDF_PREPROCESS_MAX_WORKERS", "0"))  # Worker processes for page-parallel image optimization (0 = CPU count, 1 = serial)
+    PDF_PREPROCESS_PAGE_CHUNK_SIZE: int = int(os.getenv("PDF_PREPROCESS_PAGE_CHUNK_SIZE", "4"))  # Pages rendered per worker task / written back per chunk
+    PDF_PREPROCESS_MAX_PAGE_PIXELS: int = int(os.getenv("PDF_PREPROCESS_MAX_PAGE_PIXELS", "12000000"))  # Per-page pixel budget; DPI is lowered for oversized pages
+    
+    # Scanned-document detection (shared by ingestion and extraction)
+    SCAN_DETECTION_SAMPLE_PAGES: int = int(os.getenv("SCAN_DETECTION_SAMPLE_PAGES", "5"))  # Pages sampled (first, last, evenly spaced)
+    SCAN_DETECTION_MIN_TEXT_CHARS: int = int(os.getenv("SCAN_DETECTION_MIN_TEXT_CHARS", "50"))  # Pages with less extractable text are scanned
+    SCAN_DETECTION_IMAGE_COVERAGE: float = float(os.getenv("SCAN_DETECTION_IMAGE_COVERAGE", "0.6"))  # Image coverage at which a thin text layer still counts as scanned
+    
+    # Azure blob batch import (streaming pipeline)
+    BLOB_IMPORT_PAGE_SIZE: int = int(os.getenv("BLOB_IMPORT_PAGE_SIZE", "500"))  # Blobs per List Blobs page
+    BLOB_IMPORT_DOWNLOAD_CONCURRENCY: int = int(os.getenv("BLOB_IMPORT_DOWNLOAD_CONCURRENCY", "8"))  # Concurrent download+ingest workers
+    BLOB_IMPORT_EXTRACTION_CONCURRENCY: int = int(os.getenv("BLOB_IMPORT_EXTRACTION_CONCURRENCY", "4"))  # Concurrent extraction workers
+    BLOB_IMPORT_QUEUE_SIZE: int = int(os.getenv("BLOB_IMPORT_QUEUE_SIZE", "32"))  # Bounded queue between pipeline stages (backpressure)
+    
+    # Extraction claim leases (stuck PROCESSING invoices are requeued once the lease expires)
+    EXTRACTION_LEASE_SECONDS: int = int(os.getenv("EXTRACTION_LEASE_SECONDS", "300"))  # Lease taken by claim_for_extraction
+    EXTRACTION_LEASE_RENEW_SECONDS: float = float(os.getenv("EXTRACTION_LEASE_RENEW_SECONDS", "60"))  # Heartbeat interval while DI/LLM calls run
+    
+    # Durable extraction job queue (workers: python -m src.workers.extraction_worker)
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # Attempts before a job is marked FAILED
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "300"))  # Lease on a claimed job; expired leases are reclaimed
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))  # Base delay before retrying a failed attempt (doubles per attempt)
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))  # Worker sleep when the queue is empty
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))  # Jobs processed concurrently per worker process
+    
+    # Pipelined batch extraction (per-resource stage limits)
+    PIPELINE_DOWNLOAD_CONCURRENCY: int = int(os.getenv("PIPELINE_DOWNLOAD_CONCURRENCY", "8"))  # Concurrent PDF downloads
+    PIPELINE_DI_CONCURRENCY: int = int(os.getenv("PIPELINE_DI_CONCURRENCY", "4"))  # Concurrent Document Intelligence analyses (process-wide)
+    PIPELINE_DI_RATE_LIMIT: float = float(os.getenv("PIPELINE_DI_RATE_LIMIT", "0"))  # DI calls started per second, process-wide (0 = unlimited)
+    PIPELINE_MAP_CONCURRENCY: int = int(os.getenv("PIPELINE_MAP_CONCURRENCY", "2"))  # Concurrent field mapping / validation
+    PIPELINE_DB_CONCURRENCY: int = int(os.getenv("PIPELINE_DB_CONCURRENCY", "4"))  # Concurrent claim / persist writes
+    PIPELINE_LLM_CONCURRENCY: int = int(os.getenv("PIPELINE_LLM_CONCURRENCY", "4"))  # Concurrent LLM refinements (process-wide)
+    PIPELINE_LLM_RATE_LIMIT: float = float(os.getenv("PIPELINE_LLM_RATE_LIMIT", "0"))  # LLM refinements started per second, process-wide (0 = unlimited)
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))  # Bounded queue between stages (backpressure)
+    PIPELINE_MAX_IN_FLIGHT: int = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "32"))  # Invoices claimed but not finished
+    BATCH_RUN_RETENTION: int = int(os.getenv("BATCH_RUN_RETENTION", "100"))  # Background batch runs kept for status / streaming
+    BATCH_RUN_HEARTBEAT_SECONDS: float = float(os.getenv("BATCH_RUN_HEARTBEAT_SECONDS", "30"))  # Running batches refresh their checkpoint heartbeat this often
+    BATCH_RUN_STALE_SECONDS: float = float(os.getenv("BATCH_RUN_STALE_SECONDS", "120"))  # Heartbeat age at which a queued/running batch counts as abandoned
+    BATCH_RUN_AUTO_RESUME: bool = os.getenv("BATCH_RUN_AUTO_RESUME", "False").lower() == "true"  # Resume interrupted batches on startup
+    PROGRESS_STREAM_KEEPALIVE_SECONDS: float = float(os.getenv("PROGRESS_STREAM_KEEPALIVE_SECONDS", "15"))  # Idle interval before an SSE keep-alive comment
+    PROGRESS_STREAM_MAX_INVOICES: int = int(os.getenv("PROGRESS_STREAM_MAX_INVOICES", "500"))  # Invoice ids one progress subscription may follow
+    PROGRESS_STORE_BACKEND: str = os.getenv("PROGRESS_STORE_BACKEND", "memory")  # "memory" (per process) or "sqlite" (shared by all uvicorn workers)
+    PROGRESS_STORE_PATH: str = os.getenv("PROGRESS_STORE_PATH", "./storage/progress.sqlite3")  # SQLite progress file (sqlite backend)
+    PROGRESS_STORE_TTL_SECONDS: float = float(os.getenv("PROGRESS_STORE_TTL_SECONDS", "21600"))  # Progress entries expire this long after their last update
+    PROGRESS_STORE_MAX_ENTRIES: int = int(os.getenv("PROGRESS_STORE_MAX_ENTRIES", "10000"))  # Least recently used entries beyond this are evicted
+    PROGRESS_STORE_POLL_SECONDS: float = float(os.getenv("PROGRESS_STORE_POLL_SECONDS", "0.5"))  # How often subscribers pick up other workers' changes (sqlite backend)
+    
+    # Priority scheduling of the shared DI / LLM capacity (weighted fair queuing)
+    PRIORITY_WEIGHT_INTERACTIVE: float = float(os.getenv("PRIORITY_WEIGHT_INTERACTIVE", "16"))  # HITL re-extracts, single extractions
+    PRIORITY_WEIGHT_NORMAL: float = float(os.getenv("PRIORITY_WEIGHT_NORMAL", "4"))  # Batch requests
+    PRIORITY_WEIGHT_BULK: float = float(os.getenv("PRIORITY_WEIGHT_BULK", "1"))  # Blob imports, pending / failed sweeps
+    PRIORITY_INTERACTIVE_RESERVED_SLOTS: int = int(os.getenv("PRIORITY_INTERACTIVE_RESERVED_SLOTS", "0"))  # DI / LLM slots only interactive work may use
+    
+    # Admission control for ingestion (429 + Retry-After when extraction is saturated)
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_BACKLOG: int = int(os.getenv("ADMISSION_MAX_BACKLOG", "500"))  # PENDING + PROCESSING invoices before uploads are refused
+    ADMISSION_MAX_DEFERRED_BACKLOG: int = int(os.getenv("ADMISSION_MAX_DEFERRED_BACKLOG", "2000"))  # Hard cap for defer=true uploads
+    ADMISSION_BUSY_RATIO: float = float(os.getenv("ADMISSION_BUSY_RATIO", "0.8"))  # Backlog fraction reported as busy
+    ADMISSION_MAX_QUEUED_CALLS: int = int(os.getenv("ADMISSION_MAX_QUEUED_CALLS", "64"))  # Calls waiting for DI / LLM slots
+    ADMISSION_MAX_DI_LATENCY_SECONDS: float = float(os.getenv("ADMISSION_MAX_DI_LATENCY_SECONDS", "120"))  # Smoothed DI call time
+    ADMISSION_MAX_LLM_LATENCY_SECONDS: float = float(os.getenv("ADMISSION_MAX_LLM_LATENCY_SECONDS", "180"))  # Smoothed LLM refinement time
+    ADMISSION_REFRESH_SECONDS: float = float(os.getenv("ADMISSION_REFRESH_SECONDS", "2"))  # Load snapshot reuse
+    ADMISSION_RETRY_AFTER_MIN_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_MIN_SECONDS", "5"))
+    ADMISSION_RETRY_AFTER_MAX_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_MAX_SECONDS", "300"))
     
     # Storage (local file storage path if not using Azure)
     LOCAL_STORAGE_PATH: str = os.getenv("LOCAL_STORAGE_PATH", "./storage")
@@ -1,17 +1,19 @@
 """Simplified extraction service with field extractor and database integration"""
 
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Mapping, Awaitable, Callable
 from datetime import datetime, date
 from decimal import Decimal
-from io import BytesIO
 import logging
 import json
 import re
 import hashlib
 import base64
-from typing import Any, Mapping, Dict
 import time
 import asyncio
+import dataclasses
+import os
+import socket
+import uuid
 from collections import OrderedDict
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,12 +22,15 @@ from starlette.concurrency import run_in_threadpool
 from .document_intelligence_client import DocumentIntelligenceClient
 from .field_extractor import FieldExtractor
 from src.ingestion.file_handler import FileHandler
+from src.ingestion.scan_detector import detect_scanned_pages, is_cacheable_profile
 from src.models.invoice import Invoice
 from src.services.db_service import DatabaseService
 from src.services.validation_service import ValidationService
 from src.validation.aggregation_validator import AggregationValidator
 from src.models.db_utils import address_to_dict, line_items_to_json, _sanitize_tax_breakdown
 from src.services.progress_tracker import progress_tracker, ProcessingStep
+from src.services.priority_scheduler import Priority, current_priority, resource_slot
+from src.services.unit_of_work import UnitOfWork
 from src.config import settings
 try:
     from openai import AzureOpenAI, AsyncAzureOpenAI
@@ -38,6 +43,14 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Identifies this process in invoice extraction leases
+_LEASE_OWNER_PREFIX = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def new_lease_owner() -> str:
+    """Lease owner token for one claim: host, process and a random suffix"""
+    return f"{_LEASE_OWNER_PREFIX}:{uuid.uuid4().hex[:8]}"
+
 
 class TTLCache:
     """Simple in-memory cache with TTL and size limits using LRU eviction."""
@@ -204,6 +217,36 @@ Formatting rules:
 """
 
 
+@dataclasses.dataclass
+class ExtractionContext:
+    """State for one invoice as it moves through the extraction stages"""
+    invoice_id: str
+    file_identifier: str
+    file_name: str
+    upload_date: datetime
+    db: Optional[AsyncSession] = None
+    errors: List[str] = dataclasses.field(default_factory=list)
+    lease_owner: Optional[str] = None
+    claimed: bool = False  # Already claimed under lease_owner (bulk claim); its owner renews the lease
+    heartbeat: Optional[asyncio.Task] = None
+    file_content: Optional[bytes] = None
+    di_data: Optional[Dict[str, Any]] = None
+    invoice: Optional[Invoice] = None
+    aggregation_validation: Optional[Dict[str, Any]] = None
+    low_conf_fields: List[str] = dataclasses.field(default_factory=list)
+    llm_changed: bool = False
+    extraction_ts: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None  # Set by the stage that finishes (or stops) the extraction
+    timings: Dict[str, float] = dataclasses.field(default_factory=dict)  # Seconds per stage (pipelined runs)
+    elapsed_seconds: Optional[float] = None
+    priority: Priority = dataclasses.field(default_factory=current_priority)  # Scheduling class for DI / LLM slots
+    uow: Optional[UnitOfWork] = None  # Batches this pass's database writes (created from invoice_id / db)
+
+    def __post_init__(self) -> None:
+        if self.uow is None:
+            self.uow = UnitOfWork(self.invoice_id, db=self.db)
+
+
 class ExtractionService:
     """Service for extracting data from invoice PDFs"""
     
@@ -211,7 +254,9 @@ class ExtractionService:
         self,
         doc_intelligence_client: Optional[DocumentIntelligenceClient] = None,
         file_handler: Optional[FileHandler] = None,
-        field_extractor: Optional[FieldExtractor] = None
+        field_extractor: Optional[FieldExtractor] = None,
+        llm_cache: Optional[TTLCache] = None,
+        image_cache: Optional[TTLCache] = None,
     ):
         """
         Initialize extraction service
@@ -220,6 +265,8 @@ class ExtractionService:
             doc_intelligence_client: DocumentIntelligenceClient instance
             file_handler: FileHandler instance
             field_extractor: FieldExtractor instance
+            llm_cache: LLM suggestion cache to share with other services
+            image_cache: Rendered page image cache to share with other services
         """
         # Initialize Document Intelligence client - will raise ValueError if credentials missing
         # This is intentional - we want to fail fast if Azure DI is not configured
@@ -239,15 +286,39 @@ class ExtractionService:
         # In-memory cache with TTL and size limits to avoid re-spending tokens for identical requests
         cache_ttl = getattr(settings, "LLM_CACHE_TTL_SECONDS", 3600)
         cache_max_size = getattr(settings, "LLM_CACHE_MAX_SIZE", 1000)
-        self._llm_cache = TTLCache(ttl_seconds=cache_ttl, max_size=cache_max_size)
+        self._llm_cache = llm_cache or TTLCache(ttl_seconds=cache_ttl, max_size=cache_max_size)
         # In-memory cache for rendered images to avoid re-rendering the same PDF pages
         image_cache_enabled = getattr(settings, "MULTIMODAL_IMAGE_CACHE_ENABLED", True)
         if image_cache_enabled:
             image_cache_ttl = getattr(settings, "MULTIMODAL_IMAGE_CACHE_TTL_SECONDS", 7200)
             image_cache_max_size = getattr(settings, "MULTIMODAL_IMAGE_CACHE_MAX_SIZE", 500)
-            self._image_cache = TTLCache(ttl_seconds=image_cache_ttl, max_size=image_cache_max_size)
+            self._image_cache = image_cache or TTLCache(ttl_seconds=image_cache_ttl, max_size=image_cache_max_size)
         else:
             self._image_cache = None
+        # Azure OpenAI clients by endpoint, reused so calls share one connection pool
+        self._aoai_clients: Dict[str, Any] = {}
+    
+    def _get_aoai_client(self, endpoint: str):
+        """Shared AsyncAzureOpenAI client for an endpoint"""
+        client = self._aoai_clients.get(endpoint)
+        if client is None:
+            client = AsyncAzureOpenAI(
+                api_key=settings.AOAI_API_KEY,
+                api_version=settings.AOAI_API_VERSION,
+                azure_endpoint=endpoint,
+            )
+            self._aoai_clients[endpoint] = client
+        return client
+    
+    async def aclose(self) -> None:
+        """Close the shared Azure OpenAI clients (application shutdown)"""
+        clients = list(self._aoai_clients.values())
+        self._aoai_clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Closing Azure OpenAI client failed: {e}")
     
     async def extract_invoice(
         self,
@@ -260,6 +331,9 @@ class ExtractionService:
         """
         Extract data from an invoice PDF
         
+        DI and LLM stages wait for the shared capacity at the current priority
+        class (see ``priority_scope``).
+        
         Args:
             invoice_id: Unique invoice ID
             file_identifier: File path (local) or blob name (Azure)
@@ -270,230 +344,371 @@ class ExtractionService:
         Returns:
             Dictionary with extraction result
         """
-        errors = []
-        
+        ctx = ExtractionContext(
+            invoice_id=invoice_id,
+            file_identifier=file_identifier,
+            file_name=file_name,
+            upload_date=upload_date,
+            db=db,
+        )
         try:
-            logger.info(f"Starting extraction for invoice: {invoice_id}")
+            if await self.claim_extraction(ctx):
+                for resource, stage in self.extraction_stages():
+                    # DI / LLM capacity is shared process-wide and scheduled by priority
+                    async with resource_slot(resource, ctx.priority):
+                        await stage(ctx)
+                    if ctx.result is not None:
+                        break
+            return ctx.result
+        except Exception as e:
+            return await self.fail_extraction(ctx, e)
+        finally:
+            self.release_extraction(ctx)
+    
+    def extraction_stages(self) -> List[Tuple[str, Callable[[ExtractionContext], Awaitable[None]]]]:
+        """
+        Ordered (resource, stage) pairs that make up one extraction
+        
+        Each stage reads and writes the shared ExtractionContext and sets
+        ``ctx.result`` to stop early. ``resource`` names the limiter the
+        pipelined engine applies to the stage.
+        """
+        return [
+            ("download", self._stage_download),
+            ("di", self._stage_analyze),
+            ("map", self._stage_map),
+            ("db", self._stage_persist),
+            ("llm", self._stage_refine),
+            ("db", self._stage_finalize),
+        ]
+    
+    async def claim_extraction(self, ctx: ExtractionContext) -> bool:
+        """
+        Claim the invoice (PROCESSING lease) and start the lease heartbeat
 
-            claimed = await DatabaseService.claim_for_extraction(invoice_id)
+        Contexts already claimed in bulk (``ctx.claimed``) skip both; the bulk
+        claimer renews their leases.
+        """
+        invoice_id = ctx.invoice_id
+        logger.info(f"Starting extraction for invoice: {invoice_id}")
+        if not ctx.claimed:
+            ctx.lease_owner = new_lease_owner()
+            # Committed on its own: the lease must be visible to other workers now
+            claimed = await ctx.uow.run(
+                lambda s: DatabaseService.claim_for_extraction(invoice_id, lease_owner=ctx.lease_owner, db=s)
+            )
             if not claimed:
-                return {
+                ctx.result = {
                     "invoice_id": invoice_id,
                     "status": "conflict",
                     "errors": ["Invoice is already processing"],
                 }
-            
-            # Step 1: Download PDF
-            logger.info(f"Downloading PDF: {file_identifier}")
-            file_content = await run_in_threadpool(self.file_handler.download_file, file_identifier)
-            
-            if not file_content:
-                errors.append("Failed to download file")
-                return {
-                    "invoice_id": invoice_id,
-                    "status": "error",
-                    "errors": errors
-                }
-            
-            # Step 2: Analyze with Document Intelligence
-            if self.doc_intelligence_client is None:
-                error_msg = getattr(self, '_di_init_error', 'Document Intelligence client not initialized')
-                errors.append(f"Document Intelligence not available: {error_msg}")
-                await DatabaseService.set_extraction_failed(invoice_id, "; ".join(errors), db=db)
-                return {
-                    "invoice_id": invoice_id,
-                    "status": "upstream_error",
-                    "errors": errors
-                }
-            
-            logger.info(f"Analyzing invoice with Document Intelligence: {invoice_id}")
-            doc_intelligence_data = await run_in_threadpool(
-                self.doc_intelligence_client.analyze_invoice,
-                file_content,
+                return False
+            # Keep the claim alive through long DI/LLM calls; if this process dies
+            # the lease expires and the invoice is reclaimable
+            ctx.heartbeat = asyncio.create_task(self._keep_extraction_lease(invoice_id, ctx.lease_owner))
+            ctx.claimed = True
+        await progress_tracker.start(invoice_id, ProcessingStep.EXTRACTION, "Extraction started")
+        await progress_tracker.update(invoice_id, 50)
+        return True
+    
+    def release_extraction(self, ctx: ExtractionContext) -> None:
+        """Stop the lease heartbeat and record the pass's commit count"""
+        if ctx.heartbeat is not None:
+            ctx.heartbeat.cancel()
+            ctx.heartbeat = None
+        ctx.uow.finish()
+    
+    async def fail_extraction(self, ctx: ExtractionContext, exc: Exception) -> Dict[str, Any]:
+        """Record an unexpected stage error on the invoice and build the error result"""
+        invoice_id = ctx.invoice_id
+        logger.error(f"Error extracting invoice {invoice_id}: {exc}", exc_info=exc)
+        ctx.errors.append(str(exc))
+        error_summary = "; ".join(ctx.errors)
+        ctx.uow.discard()
+        await ctx.uow.run(lambda s: DatabaseService.set_extraction_failed(
+            invoice_id, error_summary, lease_owner=ctx.lease_owner, db=s
+        ))
+        await progress_tracker.error(invoice_id, str(exc), ProcessingStep.EXTRACTION)
+        ctx.result = {
+            "invoice_id": invoice_id,
+            "status": "error",
+            "errors": ctx.errors
+        }
+        return ctx.result
+    
+    async def _stage_download(self, ctx: ExtractionContext) -> None:
+        invoice_id, file_identifier, errors = ctx.invoice_id, ctx.file_identifier, ctx.errors
+
+        # Step 1: Download PDF
+        logger.info(f"Downloading PDF: {file_identifier}")
+        await progress_tracker.update(invoice_id, 52, "Downloading PDF...")
+        ctx.file_content = await run_in_threadpool(self.file_handler.download_file, file_identifier)
+
+        if not ctx.file_content:
+            errors.append("Failed to download file")
+            await progress_tracker.error(invoice_id, "Failed to download file", ProcessingStep.EXTRACTION)
+            ctx.result = {
+                "invoice_id": invoice_id,
+                "status": "error",
+                "errors": errors
+            }
+    
+    async def _stage_analyze(self, ctx: ExtractionContext) -> None:
+        invoice_id, errors = ctx.invoice_id, ctx.errors
+
+        # Step 2: Analyze with Document Intelligence
+        if self.doc_intelligence_client is None:
+            error_msg = getattr(self, '_di_init_error', 'Document Intelligence client not initialized')
+            errors.append(f"Document Intelligence not available: {error_msg}")
+            error_summary = "; ".join(errors)
+            await ctx.uow.run(lambda s: DatabaseService.set_extraction_failed(
+                invoice_id, error_summary, lease_owner=ctx.lease_owner, db=s
+            ))
+            await progress_tracker.error(invoice_id, errors[-1], ProcessingStep.EXTRACTION)
+            ctx.result = {
+                "invoice_id": invoice_id,
+                "status": "upstream_error",
+                "errors": errors
+            }
+            return
+
+        logger.info(f"Analyzing invoice with Document Intelligence: {invoice_id}")
+        await progress_tracker.update(invoice_id, 55, "Analyzing with Document Intelligence...")
+        doc_intelligence_data = await run_in_threadpool(
+            self.doc_intelligence_client.analyze_invoice,
+            ctx.file_content,
+        )
+
+        if not doc_intelligence_data or doc_intelligence_data.get("error"):
+            errors.append(
+                doc_intelligence_data.get("error", "Document Intelligence analysis failed")
             )
-            
-            if not doc_intelligence_data or doc_intelligence_data.get("error"):
-                errors.append(
-                    doc_intelligence_data.get("error", "Document Intelligence analysis failed")
+            await progress_tracker.error(invoice_id, errors[-1], ProcessingStep.EXTRACTION)
+            ctx.result = {
+                "invoice_id": invoice_id,
+                "status": "upstream_error",
+                "errors": errors
+            }
+            return
+        ctx.di_data = doc_intelligence_data
+    
+    async def _stage_map(self, ctx: ExtractionContext) -> None:
+        """Map DI output to the Invoice model, validate aggregates and find low-confidence fields (CPU)"""
+        invoice_id, doc_intelligence_data = ctx.invoice_id, ctx.di_data
+        file_identifier, file_name, upload_date = ctx.file_identifier, ctx.file_name, ctx.upload_date
+
+        # Step 3: Extract text for subtype detection (optional, for better subtype extraction)
+        invoice_text = None  # Could extract from PDF if needed
+
+        # Step 4: Map to Invoice model using FieldExtractor
+        logger.info(f"Mapping extracted data to Invoice model: {invoice_id}")
+        file_path = self.file_handler.get_file_path(file_identifier)
+
+        # CPU-bound; off the event loop so other invoices' I/O stages keep running
+        invoice = await run_in_threadpool(
+            self.field_extractor.extract_invoice,
+            doc_intelligence_data=doc_intelligence_data,
+            file_path=file_path,
+            file_name=file_name,
+            upload_date=upload_date,
+            invoice_text=doc_intelligence_data.get("content") or invoice_text
+        )
+        invoice.id = invoice_id
+        invoice.status = "extracted"
+
+        # Validate aggregation consistency (invoice totals = sum of line items)
+        aggregation_validation = None
+        if invoice.line_items:
+            aggregation_validation = AggregationValidator.get_validation_summary(invoice)
+            if not aggregation_validation["all_valid"]:
+                logger.warning(
+                    f"Aggregation validation failed for invoice {invoice_id}: "
+                    f"{aggregation_validation['failed_validations']} validation(s) failed"
                 )
-                return {
-                    "invoice_id": invoice_id,
-                    "status": "upstream_error",
-                    "errors": errors
-                }
-            
-            # Step 3: Extract text for subtype detection (optional, for better subtype extraction)
-            invoice_text = None  # Could extract from PDF if needed
-            
-            # Step 4: Map to Invoice model using FieldExtractor
-            logger.info(f"Mapping extracted data to Invoice model: {invoice_id}")
-            file_path = self.file_handler.get_file_path(file_identifier)
-            
-            invoice = self.field_extractor.extract_invoice(
-                doc_intelligence_data=doc_intelligence_data,
-                file_path=file_path,
-                file_name=file_name,
-                upload_date=upload_date,
-                invoice_text=doc_intelligence_data.get("content") or invoice_text
-            )
-            invoice.id = invoice_id
-            invoice.status = "extracted"
-            
-            # Validate aggregation consistency (invoice totals = sum of line items)
-            aggregation_validation = None
-            if invoice.line_items:
-                aggregation_validation = AggregationValidator.get_validation_summary(invoice)
-                if not aggregation_validation["all_valid"]:
-                    logger.warning(
-                        f"Aggregation validation failed for invoice {invoice_id}: "
-                        f"{aggregation_validation['failed_validations']} validation(s) failed"
-                    )
-                    for error in aggregation_validation["errors"]:
-                        logger.warning(f"  - {error}")
-                else:
-                    logger.info(
-                        f"Aggregation validation passed for invoice {invoice_id}: "
-                        f"all {aggregation_validation['total_validations']} validations passed"
-                    )
-            
-            await progress_tracker.update(invoice_id, 70, "Fields mapped, saving to database...")
-            
-            # Step 5: Save to database
-            logger.info(f"Saving extracted invoice to database: {invoice_id}")
-            patch = self._invoice_to_patch(invoice)
-            ok = await DatabaseService.set_extraction_result(invoice_id, patch, db=db)
-            if not ok:
-                raise ValueError("Failed to persist extraction result; state mismatch")
-            
-            await progress_tracker.update(invoice_id, 75, "Extraction complete, checking for LLM evaluation...")
-            await progress_tracker.complete_step(invoice_id, ProcessingStep.EXTRACTION, "Extraction complete")
-            
-            # Prepare JSON-serializable payload
-            invoice_dict = invoice.model_dump(mode="json")
-            extraction_ts = invoice.extraction_timestamp.isoformat() if invoice.extraction_timestamp else None
-
-            # Low-confidence fallback: trigger when required fields are missing or low,
-            # and when any field is explicitly low or blank/"Not Extracted".
-            low_conf_threshold = getattr(settings, "LLM_LOW_CONF_THRESHOLD", 0.75)
-            low_conf_fields: List[str] = []
-            fc = invoice.field_confidence or {}
+                for error in aggregation_validation["errors"]:
+                    logger.warning(f"  - {error}")
+            else:
+                logger.info(
+                    f"Aggregation validation passed for invoice {invoice_id}: "
+                    f"all {aggregation_validation['total_validations']} validations passed"
+                )
+        ctx.invoice = invoice
+        ctx.aggregation_validation = aggregation_validation
+        
+        # Low-confidence fallback: trigger when required fields are missing or low,
+        # and when any field is explicitly low or blank/"Not Extracted".
+        low_conf_threshold = getattr(settings, "LLM_LOW_CONF_THRESHOLD", 0.75)
+        low_conf_fields: List[str] = []
+        fc = invoice.field_confidence or {}
 
-            def _is_blank(value: Any) -> bool:
-                if value is None:
-                    return True
-                if isinstance(value, str):
-                    return value.strip() == "" or value.strip().lower() == "not extracted"
-                if isinstance(value, (list, dict)):
-                    return len(value) == 0
-                return False
+        def _is_blank(value: Any) -> bool:
+            if value is None:
+                return True
+            if isinstance(value, str):
+                return value.strip() == "" or value.strip().lower() == "not extracted"
+            if isinstance(value, (list, dict)):
+                return len(value) == 0
+            return False
 
-            required = [
-                "invoice_number",
-                "invoice_date",
-                "vendor_name",
-                "total_amount",
-                "vendor_address",
-                "bill_to_address",
-                "remit_to_address",
-            ]
-            for field in required:
-                val = getattr(invoice, field, None)
-                conf = fc.get(field)
-                if _is_blank(val) or conf is None or conf < low_conf_threshold:
-                    low_conf_fields.append(field)
+        required = [
+            "invoice_number",
+            "invoice_date",
+            "vendor_name",
+            "total_amount",
+            "vendor_address",
+            "bill_to_address",
+            "remit_to_address",
+        ]
+        for field in required:
+            val = getattr(invoice, field, None)
+            conf = fc.get(field)
+            if _is_blank(val) or conf is None or conf < low_conf_threshold:
+                low_conf_fields.append(field)
+
+        # Include any blank/"Not Extracted" fields across the invoice payload,
+        # even if they don't have an explicit confidence score.
+        invoice_payload = invoice.model_dump()
+        excluded_fields = {
+            "id",
+            "created_at",
+            "updated_at",
+            "upload_date",
+            "extraction_timestamp",
+            "status",
+            "processing_state",
+            "extraction_confidence",
+            "field_confidence",
+        }
+        for field, value in invoice_payload.items():
+            if field in excluded_fields:
+                continue
+            if _is_blank(value):
+                low_conf_fields.append(field)
+
+        for name, conf in fc.items():
+            if name in required:
+                continue
+            if conf is None or conf < low_conf_threshold:
+                low_conf_fields.append(name)
+
+        # Deduplicate while preserving order
+        seen = set()
+        low_conf_fields = [x for x in low_conf_fields if not (x in seen or seen.add(x))]
+        ctx.low_conf_fields = low_conf_fields
+        
+        await progress_tracker.update(invoice_id, 70, "Fields mapped, saving to database...")
+    
+    async def _stage_persist(self, ctx: ExtractionContext) -> None:
+        invoice_id, invoice = ctx.invoice_id, ctx.invoice
 
-            # Include any blank/"Not Extracted" fields across the invoice payload,
-            # even if they don't have an explicit confidence score.
-            invoice_payload = invoice.model_dump()
-            excluded_fields = {
-                "id",
-                "created_at",
-                "updated_at",
-                "upload_date",
-                "extraction_timestamp",
-                "status",
-                "processing_state",
-                "extraction_confidence",
-                "field_confidence",
-            }
-            for field, value in invoice_payload.items():
-                if field in excluded_fields:
-                    continue
-                if _is_blank(value):
-                    low_conf_fields.append(field)
+        # Step 5: Save to database
+        logger.info(f"Saving extracted invoice to database: {invoice_id}")
+        patch = self._invoice_to_patch(invoice)
 
-            for name, conf in fc.items():
-                if name in required:
-                    continue
-                if conf is None or conf < low_conf_threshold:
-                    low_conf_fields.append(name)
-
-            # Deduplicate while preserving order
-            seen = set()
-            low_conf_fields = [x for x in low_conf_fields if not (x in seen or seen.add(x))]
-
-            llm_changed = False
-            # Skip LLM fallback if disabled
-            if not getattr(settings, "USE_LLM_FALLBACK", False):
-                if low_conf_fields:
-                    logger.info("LLM disabled - skipping LLM fallback for %d low-confidence fields", len(low_conf_fields))
-                await progress_tracker.update(invoice_id, 100, "No LLM evaluation needed (LLM disabled)")
-            elif not low_conf_fields:
-                logger.info("No fields below low_conf_threshold=%.2f, skipping LLM fallback", low_conf_threshold)
-                await progress_tracker.update(invoice_id, 100, "No LLM evaluation needed")
-            else:
-                aoai_ready = self._has_aoai_config()
-                use_llm = bool(getattr(settings, "USE_LLM_FALLBACK", False))
+        async def write_result(session: AsyncSession) -> None:
+            if not await DatabaseService.set_extraction_result(invoice_id, patch, lease_owner=ctx.lease_owner, db=session):
+                raise ValueError("Failed to persist extraction result; state mismatch")
+
+        if self._will_refine(ctx):
+            # Commit before the LLM round so the DI result is durable and no
+            # transaction stays open across remote calls
+            await ctx.uow.run(write_result)
+        else:
+            # Nothing slow follows; commit together with the final writes
+            ctx.uow.defer(write_result)
+
+        await progress_tracker.update(invoice_id, 75, "Extraction complete, checking for LLM evaluation...")
+        await progress_tracker.complete_step(invoice_id, ProcessingStep.EXTRACTION, "Extraction complete")
+        
+        # Prepare JSON-serializable payload
+        ctx.extraction_ts = invoice.extraction_timestamp.isoformat() if invoice.extraction_timestamp else None
+    
+    async def _stage_refine(self, ctx: ExtractionContext) -> None:
+        """LLM / multimodal refinement of low-confidence fields (mutates ctx.invoice)"""
+        invoice_id, invoice, db = ctx.invoice_id, ctx.invoice, ctx.db
+        doc_intelligence_data, low_conf_fields = ctx.di_data, ctx.low_conf_fields
+        low_conf_threshold = getattr(settings, "LLM_LOW_CONF_THRESHOLD", 0.75)
+        fc = invoice.field_confidence or {}
+
+        llm_changed = False
+        # Skip LLM fallback if disabled
+        if not getattr(settings, "USE_LLM_FALLBACK", False):
+            if low_conf_fields:
+                logger.info("LLM disabled - skipping LLM fallback for %d low-confidence fields", len(low_conf_fields))
+            await progress_tracker.update(invoice_id, 100, "No LLM evaluation needed (LLM disabled)")
+        elif not low_conf_fields:
+            logger.info("No fields below low_conf_threshold=%.2f, skipping LLM fallback", low_conf_threshold)
+            await progress_tracker.update(invoice_id, 100, "No LLM evaluation needed")
+        else:
+            aoai_ready = self._has_aoai_config()
+            use_llm = bool(getattr(settings, "USE_LLM_FALLBACK", False))
 
-                # Check for address fields specifically
-                address_fields = [f for f in low_conf_fields if f in {"vendor_address", "bill_to_address", "remit_to_address"}]
+            # Check for address fields specifically
+            address_fields = [f for f in low_conf_fields if f in {"vendor_address", "bill_to_address", "remit_to_address"}]
+            if address_fields:
+                logger.info("Address fields with low confidence detected: %s", address_fields)
+
+            if not use_llm:
+                logger.warning("LLM fallback disabled; skipping %d low-confidence fields (including %d address fields: %s)", 
+                             len(low_conf_fields), len(address_fields), address_fields if address_fields else "none")
                 if address_fields:
-                    logger.info("Address fields with low confidence detected: %s", address_fields)
-
-                if not use_llm:
-                    logger.warning("LLM fallback disabled; skipping %d low-confidence fields (including %d address fields: %s)", 
-                                 len(low_conf_fields), len(address_fields), address_fields if address_fields else "none")
-                    if address_fields:
-                        logger.warning("ADDRESSES WILL NOT BE EXTRACTED: LLM fallback is disabled and addresses have low confidence")
-                    await progress_tracker.update(invoice_id, 100, f"LLM evaluation disabled - {len(low_conf_fields)} fields skipped")
-                else:
-                    await progress_tracker.start(
-                        invoice_id,
-                        ProcessingStep.LLM_EVALUATION,
-                        f"Evaluating {len(low_conf_fields)} low-confidence fields with LLM...",
-                    )
-                    await progress_tracker.update(
-                        invoice_id,
-                        75,
-                        f"Starting LLM evaluation for {len(low_conf_fields)} fields...",
-                    )
-                    invoice_before_llm = invoice.model_dump(mode="json")
-                    llm_error_details = []
-                    try:
-                        # Get file content for multimodal fallback if needed
-                        file_content = None
-                        use_multimodal = bool(getattr(settings, "USE_MULTIMODAL_LLM_FALLBACK", False))
-                        if use_multimodal:
-                            try:
-                                file_content = await run_in_threadpool(
-                                    self.file_handler.download_file,
-                                    invoice.file_path
-                                )
-                            except Exception as e:
-                                logger.warning(f"Could not download file for multimodal fallback: {e}")
-                                file_content = None
-                        
-                        # Check if PDF is scanned and use multimodal if appropriate
-                        is_scanned = False
-                        if file_content and use_multimodal:
-                            is_scanned = await run_in_threadpool(
-                                self._is_scanned_pdf,
-                                file_content
+                    logger.warning("ADDRESSES WILL NOT BE EXTRACTED: LLM fallback is disabled and addresses have low confidence")
+                await progress_tracker.update(invoice_id, 100, f"LLM evaluation disabled - {len(low_conf_fields)} fields skipped")
+            else:
+                await progress_tracker.start(
+                    invoice_id,
+                    ProcessingStep.LLM_EVALUATION,
+                    f"Evaluating {len(low_conf_fields)} low-confidence fields with LLM...",
+                )
+                await progress_tracker.update(
+                    invoice_id,
+                    75,
+                    f"Starting LLM evaluation for {len(low_conf_fields)} fields...",
+                )
+                invoice_before_llm = invoice.model_dump(mode="json")
+                llm_error_details = []
+                try:
+                    # Get file content for multimodal fallback if needed
+                    file_content = ctx.file_content
+                    use_multimodal = bool(getattr(settings, "USE_MULTIMODAL_LLM_FALLBACK", False))
+                    if use_multimodal and not file_content:
+                        try:
+                            file_content = await run_in_threadpool(
+                                self.file_handler.download_file,
+                                invoice.file_path
                             )
-                        
-                        if is_scanned and use_multimodal:
-                            logger.info("PDF detected as scanned, using multimodal LLM fallback")
-                            llm_result = await self._run_multimodal_fallback(
+                        except Exception as e:
+                            logger.warning(f"Could not download file for multimodal fallback: {e}")
+                            file_content = None
+
+                    # Check if PDF is scanned and use multimodal if appropriate
+                    is_scanned = False
+                    if file_content and use_multimodal:
+                        is_scanned = await self._resolve_is_scanned(invoice_id, file_content, db=db, uow=ctx.uow)
+
+                    if is_scanned and use_multimodal:
+                        logger.info("PDF detected as scanned, using multimodal LLM fallback")
+                        llm_result = await self._run_multimodal_fallback(
+                            invoice,
+                            low_conf_fields,
+                            doc_intelligence_data,
+                            fc,
+                            file_content,
+                            invoice_id=invoice_id,
+                        )
+                    else:
+                        llm_result = await self._run_low_confidence_fallback(
+                            invoice,
+                            low_conf_fields,
+                            doc_intelligence_data,
+                            fc,
+                            invoice_id=invoice_id,
+                        )
+                        # If text-based LLM didn't improve fields and multimodal is enabled, try multimodal
+                        if llm_result and llm_result.get("groups_succeeded", 0) == 0 and use_multimodal and file_content:
+                            logger.info("Text-based LLM did not improve fields, trying multimodal fallback")
+                            multimodal_result = await self._run_multimodal_fallback(
                                 invoice,
                                 low_conf_fields,
                                 doc_intelligence_data,
@@ -501,164 +716,173 @@ class ExtractionService:
                                 file_content,
                                 invoice_id=invoice_id,
                             )
-                        else:
-                            llm_result = await self._run_low_confidence_fallback(
-                                invoice,
-                                low_conf_fields,
-                                doc_intelligence_data,
-                                fc,
-                                invoice_id=invoice_id,
+                            # Use multimodal result if it succeeded
+                            if multimodal_result and multimodal_result.get("groups_succeeded", 0) > 0:
+                                llm_result = multimodal_result
+                    # Log per-group results
+                    if llm_result:
+                        groups_succeeded = llm_result.get("groups_succeeded", 0)
+                        groups_failed = llm_result.get("groups_failed", 0)
+                        overall_success = llm_result.get("success", False)
+
+                        if groups_succeeded > 0:
+                            logger.info(
+                                f"LLM fallback partial success: {groups_succeeded} groups succeeded, "
+                                f"{groups_failed} groups failed for invoice {invoice_id}"
                             )
-                            # If text-based LLM didn't improve fields and multimodal is enabled, try multimodal
-                            if llm_result and llm_result.get("groups_succeeded", 0) == 0 and use_multimodal and file_content:
-                                logger.info("Text-based LLM did not improve fields, trying multimodal fallback")
-                                multimodal_result = await self._run_multimodal_fallback(
-                                    invoice,
-                                    low_conf_fields,
-                                    doc_intelligence_data,
-                                    fc,
-                                    file_content,
-                                    invoice_id=invoice_id,
-                                )
-                                # Use multimodal result if it succeeded
-                                if multimodal_result and multimodal_result.get("groups_succeeded", 0) > 0:
-                                    llm_result = multimodal_result
-                        # Log per-group results
-                        if llm_result:
-                            groups_succeeded = llm_result.get("groups_succeeded", 0)
-                            groups_failed = llm_result.get("groups_failed", 0)
-                            overall_success = llm_result.get("success", False)
-                            
-                            if groups_succeeded > 0:
-                                logger.info(
-                                    f"LLM fallback partial success: {groups_succeeded} groups succeeded, "
-                                    f"{groups_failed} groups failed for invoice {invoice_id}"
-                                )
-                                # Log failed groups for debugging
-                                for grp_name, result in llm_result.get("group_results", {}).items():
-                                    if not result.get("success"):
-                                        logger.warning(
-                                            f"LLM group '{grp_name}' failed: {result.get('error', 'Unknown error')}"
-                                        )
-                            
-                            if groups_failed > 0 and groups_succeeded == 0:
-                                # All groups failed - this is a complete failure
-                                failed_groups = [
-                                    f"{name}: {r.get('error', 'Unknown')}"
-                                    for name, r in llm_result.get("group_results", {}).items()
-                                    if not r.get("success")
-                                ]
-                                error_summary = f"LLM evaluation failed for all {groups_failed} groups"
-                                if failed_groups:
-                                    error_summary += f": {', '.join(failed_groups[:3])}"
-                                await progress_tracker.error(invoice_id, error_summary, ProcessingStep.LLM_EVALUATION)
-                            elif overall_success:
-                                # At least one group succeeded
-                                await progress_tracker.complete_step(
-                                    invoice_id, 
-                                    ProcessingStep.LLM_EVALUATION, 
-                                    f"LLM evaluation complete ({groups_succeeded} groups succeeded, {groups_failed} failed)"
-                                )
-                    
-                        llm_changed = invoice.model_dump(mode="json") != invoice_before_llm
-                        if llm_changed:
-                            await progress_tracker.update(invoice_id, 95, "LLM evaluation complete - fields updated")
-                        else:
-                            await progress_tracker.update(invoice_id, 95, "LLM evaluation complete - no changes")
-                        
-                        # Only mark as complete if we haven't already marked it as error
-                        if llm_result and llm_result.get("groups_succeeded", 0) > 0:
-                            await progress_tracker.complete_step(invoice_id, ProcessingStep.LLM_EVALUATION, "LLM evaluation complete")
-                    except Exception as e:
-                        error_msg = str(e)
-                        # Extract more details from the error
-                        if hasattr(e, 'response') and hasattr(e.response, 'status_code'):
-                            error_msg = f"HTTP {e.response.status_code}: {error_msg}"
-                        if hasattr(e, 'response') and hasattr(e.response, 'url'):
-                            error_msg += f" (URL: {e.response.url})"
-                        # Check if addresses were affected
-                        address_fields_affected = [f for f in low_conf_fields if f in {"vendor_address", "bill_to_address", "remit_to_address"}]
-                        if address_fields_affected:
-                            logger.error("LLM FAILED FOR ADDRESSES: invoice %s - Address fields NOT evaluated: %s. Error: %s", 
-                                       invoice_id, address_fields_affected, error_msg, exc_info=True)
-                        else:
-                            logger.error("LLM fallback failed for invoice %s: %s. Low-confidence fields that were NOT evaluated: %s", 
-                                       invoice_id, error_msg, low_conf_fields, exc_info=True)
-                        
-                        error_summary = f"LLM evaluation failed: {error_msg}"
-                        if address_fields_affected:
-                            error_summary += f" | ADDRESSES MISSING: {', '.join(address_fields_affected)}"
-                        error_summary += f" | Fields not evaluated: {', '.join(low_conf_fields[:5])}{'...' if len(low_conf_fields) > 5 else ''}"
-                        await progress_tracker.error(invoice_id, error_summary, ProcessingStep.LLM_EVALUATION)
-                        # Store error details for later retrieval
-                        llm_error_details.append({
-                            "error": error_msg,
-                            "fields_affected": low_conf_fields,
-                            "endpoint": settings.AOAI_ENDPOINT,
-                            "deployment": settings.AOAI_DEPLOYMENT_NAME
-                        })
-
-            # Final save after LLM post-processing only when there was a change
-            if llm_changed:
-                logger.info("Saving extracted invoice to database (after LLM) for: %s", invoice_id)
-                await progress_tracker.update(invoice_id, 98, "Saving LLM-enhanced results...")
-                patch = self._invoice_to_patch(invoice)
+                            # Log failed groups for debugging
+                            for grp_name, result in llm_result.get("group_results", {}).items():
+                                if not result.get("success"):
+                                    logger.warning(
+                                        f"LLM group '{grp_name}' failed: {result.get('error', 'Unknown error')}"
+                                    )
+
+                        if groups_failed > 0 and groups_succeeded == 0:
+                            # All groups failed - this is a complete failure
+                            failed_groups = [
+                                f"{name}: {r.get('error', 'Unknown')}"
+                                for name, r in llm_result.get("group_results", {}).items()
+                                if not r.get("success")
+                            ]
+                            error_summary = f"LLM evaluation failed for all {groups_failed} groups"
+                            if failed_groups:
+                                error_summary += f": {', '.join(failed_groups[:3])}"
+                            await progress_tracker.error(invoice_id, error_summary, ProcessingStep.LLM_EVALUATION)
+                        elif overall_success:
+                            # At least one group succeeded
+                            await progress_tracker.complete_step(
+                                invoice_id, 
+                                ProcessingStep.LLM_EVALUATION, 
+                                f"LLM evaluation complete ({groups_succeeded} groups succeeded, {groups_failed} failed)"
+                            )
+
+                    llm_changed = invoice.model_dump(mode="json") != invoice_before_llm
+                    if llm_changed:
+                        await progress_tracker.update(invoice_id, 95, "LLM evaluation complete - fields updated")
+                    else:
+                        await progress_tracker.update(invoice_id, 95, "LLM evaluation complete - no changes")
+
+                    # Only mark as complete if we haven't already marked it as error
+                    if llm_result and llm_result.get("groups_succeeded", 0) > 0:
+                        await progress_tracker.complete_step(invoice_id, ProcessingStep.LLM_EVALUATION, "LLM evaluation complete")
+                except Exception as e:
+                    error_msg = str(e)
+                    # Extract more details from the error
+                    if hasattr(e, 'response') and hasattr(e.response, 'status_code'):
+                        error_msg = f"HTTP {e.response.status_code}: {error_msg}"
+                    if hasattr(e, 'response') and hasattr(e.response, 'url'):
+                        error_msg += f" (URL: {e.response.url})"
+                    # Check if addresses were affected
+                    address_fields_affected = [f for f in low_conf_fields if f in {"vendor_address", "bill_to_address", "remit_to_address"}]
+                    if address_fields_affected:
+                        logger.error("LLM FAILED FOR ADDRESSES: invoice %s - Address fields NOT evaluated: %s. Error: %s", 
+                                   invoice_id, address_fields_affected, error_msg, exc_info=True)
+                    else:
+                        logger.error("LLM fallback failed for invoice %s: %s. Low-confidence fields that were NOT evaluated: %s", 
+                                   invoice_id, error_msg, low_conf_fields, exc_info=True)
+
+                    error_summary = f"LLM evaluation failed: {error_msg}"
+                    if address_fields_affected:
+                        error_summary += f" | ADDRESSES MISSING: {', '.join(address_fields_affected)}"
+                    error_summary += f" | Fields not evaluated: {', '.join(low_conf_fields[:5])}{'...' if len(low_conf_fields) > 5 else ''}"
+                    await progress_tracker.error(invoice_id, error_summary, ProcessingStep.LLM_EVALUATION)
+                    # Store error details for later retrieval
+                    llm_error_details.append({
+                        "error": error_msg,
+                        "fields_affected": low_conf_fields,
+                        "endpoint": settings.AOAI_ENDPOINT,
+                        "deployment": settings.AOAI_DEPLOYMENT_NAME
+                    })
+        ctx.llm_changed = llm_changed
+    
+    async def _stage_finalize(self, ctx: ExtractionContext) -> None:
+        """Persist LLM changes, run business-rule validation and build the result"""
+        invoice_id, invoice = ctx.invoice_id, ctx.invoice
+        aggregation_validation, low_conf_fields = ctx.aggregation_validation, ctx.low_conf_fields
+
+        # Final save after LLM post-processing only when there was a change
+        if ctx.llm_changed:
+            logger.info("Saving extracted invoice to database (after LLM) for: %s", invoice_id)
+            await progress_tracker.update(invoice_id, 98, "Saving LLM-enhanced results...")
+            patch = self._invoice_to_patch(invoice)
+
+            async def write_llm_result(session: AsyncSession) -> None:
                 # After initial extraction, state is EXTRACTED, so we need to update with that expectation
-                ok2 = await DatabaseService.set_extraction_result(invoice_id, patch, expected_processing_state="EXTRACTED", db=db)
+                ok2 = await DatabaseService.set_extraction_result(
+                    invoice_id, patch, expected_processing_state="EXTRACTED", db=session
+                )
                 if not ok2:
                     raise ValueError("Failed to persist post-LLM extraction result; state mismatch")
-                
-                # Re-run aggregation validation after LLM changes (in case line items or totals were modified)
-                if invoice.line_items:
-                    aggregation_validation = AggregationValidator.get_validation_summary(invoice)
-                    if not aggregation_validation["all_valid"]:
-                        logger.warning(
-                            f"Aggregation validation failed after LLM processing for invoice {invoice_id}: "
-                            f"{aggregation_validation['failed_validations']} validation(s) failed"
-                        )
-                        for error in aggregation_validation["errors"]:
-                            logger.warning(f"  - {error}")
-                    else:
-                        logger.info(
-                            f"Aggregation validation passed after LLM processing for invoice {invoice_id}: "
-                            f"all {aggregation_validation['total_validations']} validations passed"
-                        )
-            else:
-                logger.info("Skipping post-LLM save; no LLM changes detected.")
-            invoice_dict = invoice.model_dump(mode="json")
 
-            # Run business rule validation
-            validation_result = self.validation_service.validate(invoice)
-            logger.info(
-                f"Invoice {invoice_id} validation: {validation_result['passed_rules']}/{validation_result['total_rules']} rules passed"
-            )
+            ctx.uow.defer(write_llm_result)
 
-            result = {
-                "invoice_id": invoice_id,
-                "status": "extracted",
-                "invoice": invoice_dict,
-                "confidence": invoice.extraction_confidence,
-                "field_confidence": invoice.field_confidence,
-                "extraction_timestamp": extraction_ts,
-                "errors": [],
-                "low_confidence_fields": low_conf_fields,
-                "low_confidence_triggered": bool(low_conf_fields),
-                "validation": validation_result,
-                "aggregation_validation": aggregation_validation
-            }
-            
-            logger.info(f"Extraction completed successfully for invoice: {invoice_id}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error extracting invoice {invoice_id}: {e}", exc_info=True)
-            errors.append(str(e))
-            await DatabaseService.set_extraction_failed(invoice_id, "; ".join(errors), db=db)
-            return {
-                "invoice_id": invoice_id,
-                "status": "error",
-                "errors": errors
-            }
+            # Re-run aggregation validation after LLM changes (in case line items or totals were modified)
+            if invoice.line_items:
+                aggregation_validation = AggregationValidator.get_validation_summary(invoice)
+                if not aggregation_validation["all_valid"]:
+                    logger.warning(
+                        f"Aggregation validation failed after LLM processing for invoice {invoice_id}: "
+                        f"{aggregation_validation['failed_validations']} validation(s) failed"
+                    )
+                    for error in aggregation_validation["errors"]:
+                        logger.warning(f"  - {error}")
+                else:
+                    logger.info(
+                        f"Aggregation validation passed after LLM processing for invoice {invoice_id}: "
+                        f"all {aggregation_validation['total_validations']} validations passed"
+                    )
+        else:
+            logger.info("Skipping post-LLM save; no LLM changes detected.")
+        # Search index from the stored result plus the DI text, committed with it
+        document_text = (ctx.di_data or {}).get("content")
+        ctx.uow.defer(
+            lambda session: DatabaseService.index_invoice_for_search(invoice_id, document_text=document_text, db=session)
+        )
+        # One transaction for everything still queued (result, scan profile, search document)
+        await ctx.uow.commit()
+        invoice_dict = invoice.model_dump(mode="json")
+
+        # Run business rule validation
+        validation_result = self.validation_service.validate(invoice)
+        logger.info(
+            f"Invoice {invoice_id} validation: {validation_result['passed_rules']}/{validation_result['total_rules']} rules passed"
+        )
+
+        result = {
+            "invoice_id": invoice_id,
+            "status": "extracted",
+            "invoice": invoice_dict,
+            "confidence": invoice.extraction_confidence,
+            "field_confidence": invoice.field_confidence,
+            "extraction_timestamp": ctx.extraction_ts,
+            "errors": [],
+            "low_confidence_fields": low_conf_fields,
+            "low_confidence_triggered": bool(low_conf_fields),
+            "validation": validation_result,
+            "aggregation_validation": aggregation_validation
+        }
+
+        logger.info(f"Extraction completed successfully for invoice: {invoice_id}")
+        await progress_tracker.complete(invoice_id, "Extraction complete")
+        ctx.result = result
+    
+    @staticmethod
+    def _will_refine(ctx: ExtractionContext) -> bool:
+        """Whether _stage_refine will call the LLM for this invoice"""
+        return bool(getattr(settings, "USE_LLM_FALLBACK", False) and ctx.low_conf_fields)
+
+    async def _keep_extraction_lease(self, invoice_id: str, lease_owner: str) -> None:
+        """Renew the PROCESSING lease until the invoice leaves PROCESSING or the task is cancelled"""
+        interval = max(1.0, getattr(settings, "EXTRACTION_LEASE_RENEW_SECONDS", 60))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await DatabaseService.renew_extraction_lease(invoice_id, lease_owner):
+                    return
+            except Exception as e:
+                # A transient error must not end the heartbeat: the lease would
+                # expire and the invoice be reaped while still being extracted
+                logger.warning(f"Lease renewal for invoice {invoice_id} failed, retrying: {e}")
     
     async def run_ai_extraction(
         self,
@@ -753,10 +977,7 @@ class ExtractionService:
             # Check if PDF is scanned and use multimodal if appropriate
             is_scanned = False
             if file_content and use_multimodal:
-                is_scanned = await run_in_threadpool(
-                    self._is_scanned_pdf,
-                    file_content
-                )
+                is_scanned = await self._resolve_is_scanned(invoice_id, file_content, db=db)
             
             # Run LLM fallback
             if is_scanned and use_multimodal:
@@ -968,29 +1189,9 @@ class ExtractionService:
             groups_succeeded = 0
             groups_failed = 0
             
-            # Progress update task for long-running LLM calls
-            progress_task = None
-            if invoice_id:
-                async def send_progress_updates():
-                    """Send periodic progress updates during LLM calls"""
-                    update_interval = 7  # Update every 7 seconds
-                    base_progress = 75
-                    max_progress = 94
-                    iteration = 0
-                    
-                    while True:
-                        await asyncio.sleep(update_interval)
-                        iteration += 1
-                        # Gradually increase progress, but cap at max_progress
-                        progress = min(base_progress + (iteration * 2), max_progress)
-                        await progress_tracker.update(
-                            invoice_id,
-                            progress,
-                            f"LLM evaluation in progress... (processing group {iteration})",
-                            ProcessingStep.LLM_EVALUATION
-                        )
-                
-                progress_task = asyncio.create_task(send_progress_updates())
+            # Groups that will actually be sent (for per-group progress, 75-90%)
+            total_groups = len([g for g in groups if any(f in low_conf_fields for f in g[1])])
+            groups_started = 0
 
             for idx, (grp_name, grp_fields) in enumerate(groups):
                 sub_fields = [f for f in low_conf_fields if f in grp_fields]
@@ -1032,11 +1233,7 @@ class ExtractionService:
                         settings.AOAI_API_VERSION
                     )
                     
-                    client = AsyncAzureOpenAI(
-                        api_key=settings.AOAI_API_KEY,
-                        api_version=settings.AOAI_API_VERSION,
-                        azure_endpoint=aoai_endpoint,
-                    )
+                    client = self._get_aoai_client(aoai_endpoint)
                     
                     # Retry logic for OpenAI calls
                     max_retries = 3
@@ -1045,12 +1242,14 @@ class ExtractionService:
                     exponential_base = 2.0
                     resp = None
                     
-                    # Update progress before starting LLM call
-                    if invoice_id and idx == 0:
+                    # Report each group as its LLM call starts
+                    groups_started += 1
+                    if invoice_id and total_groups:
                         await progress_tracker.update(
                             invoice_id,
-                            78,
-                            f"Calling LLM for group '{grp_name}' ({len(sub_fields)} fields)...",
+                            75 + int(((groups_started - 1) / total_groups) * 15),
+                            f"Calling LLM for group '{grp_name}' ({len(sub_fields)} fields, "
+                            f"group {groups_started}/{total_groups})...",
                             ProcessingStep.LLM_EVALUATION
                         )
                     
@@ -1170,7 +1369,6 @@ class ExtractionService:
                 
                 # Update progress after successful group
                 if invoice_id:
-                    total_groups = len([g for g in groups if any(f in low_conf_fields for f in g[1])])
                     if total_groups > 0:
                         progress_pct = 75 + int((groups_succeeded / total_groups) * 15)  # 75-90% range
                         await progress_tracker.update(
@@ -1188,14 +1386,6 @@ class ExtractionService:
                 if not result["success"] and result["error"] is None:
                     result["error"] = error_msg
                     groups_failed += 1
-        finally:
-            # Cancel progress update task if it's still running
-            if progress_task and not progress_task.done():
-                progress_task.cancel()
-                try:
-                    await progress_task
-                except asyncio.CancelledError:
-                    pass
         
         # Return results summary
         groups_processed = len(group_results)
@@ -1322,22 +1512,41 @@ class ExtractionService:
     
     def _is_scanned_pdf(self, file_content: bytes) -> bool:
         """Detect if PDF is primarily scanned/images (vs text-based)."""
-        try:
-            import PyPDF2
-        except Exception:
-            return False
+        return bool(self._detect_scan_profile(file_content).get("is_scanned"))
+
+    def _detect_scan_profile(self, file_content: bytes) -> Dict[str, Any]:
+        """Run the shared sampled scanned-page classifier."""
+        return detect_scanned_pages(file_content)
+
+    async def _resolve_is_scanned(
+        self,
+        invoice_id: str,
+        file_content: bytes,
+        db: Optional[AsyncSession] = None,
+        uow: Optional[UnitOfWork] = None,
+    ) -> bool:
+        """
+        Return whether the invoice PDF is scanned, preferring the profile cached at ingestion.
 
+        Invoices ingested before the profile existed are classified once and the
+        result is cached on the record for later re-extractions; with ``uow``
+        the cache write is queued for the pass's next commit. A profile from a
+        failed or unavailable detection is never cached, so the next pass
+        detects again.
+        """
         try:
-            pdf_file = BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            if len(pdf_reader.pages) == 0:
-                return False
-            first_page = pdf_reader.pages[0]
-            text = first_page.extract_text()
-            return text is None or len(text.strip()) < 50
+            profile = await DatabaseService.get_scan_profile(invoice_id, db=db)
         except Exception:
-            logger.debug("Could not determine if PDF is scanned, assuming text-based")
-            return False
+            profile = None
+        if is_cacheable_profile(profile):
+            return bool(profile.get("is_scanned"))
+        profile = await run_in_threadpool(self._detect_scan_profile, file_content)
+        if is_cacheable_profile(profile):
+            if uow is not None:
+                uow.defer(lambda s: DatabaseService.set_scan_profile(invoice_id, profile, db=s))
+            else:
+                await DatabaseService.set_scan_profile(invoice_id, profile, db=db)
+        return bool(profile.get("is_scanned"))
 
     def _render_multimodal_images(self, file_content: bytes, file_hash: Optional[str] = None) -> List[str]:
         """
@@ -1660,11 +1869,7 @@ class ExtractionService:
                         settings.AOAI_API_VERSION
                     )
                     
-                    client = AsyncAzureOpenAI(
-                        api_key=settings.AOAI_API_KEY,
-                        api_version=settings.AOAI_API_VERSION,
-                        azure_endpoint=settings.AOAI_ENDPOINT,
-                    )
+                    client = self._get_aoai_client(settings.AOAI_ENDPOINT)
                     
                     # Retry logic for OpenAI calls
                     max_retries = 3
@@ -2304,7 +2509,6 @@ class ExtractionService:
         return {
             "status": invoice.status,
             "processing_state": invoice.processing_state,
-            "content_sha256": invoice.content_sha256,
             "invoice_number": invoice.invoice_number,
             "invoice_date": invoice.invoice_date,
             "due_date": invoice.due_date,
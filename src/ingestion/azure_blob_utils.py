@@ -1,12 +1,10 @@
 """Azure Blob Storage utilities for browsing and downloading files"""
 
-from typing import List, Optional, Dict, Any
-from azure.storage.blob import BlobServiceClient, ContainerClient
-from azure.identity import DefaultAzureCredential
+from typing import List, Optional, Dict, Any, Iterator
 from azure.core.exceptions import AzureError
 import logging
 
-from src.config import settings
+from .blob_client_pool import get_blob_service_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,21 +13,8 @@ class AzureBlobBrowser:
     """Utility class for browsing Azure Blob Storage"""
     
     def __init__(self):
-        """Initialize Azure Blob Storage client"""
-        connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
-        if connection_string:
-            self.blob_service_client = BlobServiceClient.from_connection_string(
-                connection_string
-            )
-        elif settings.AZURE_STORAGE_ACCOUNT_NAME:
-            account_url = f"https://{settings.AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
-            credential = DefaultAzureCredential()
-            self.blob_service_client = BlobServiceClient(
-                account_url=account_url,
-                credential=credential
-            )
-        else:
-            raise ValueError("Azure storage credentials not configured")
+        """Initialize Azure Blob Storage client (shared pooled client for the configured account)"""
+        self.blob_service_client = get_blob_service_client()
     
     def list_blobs(
         self,
@@ -54,15 +39,10 @@ class AzureBlobBrowser:
             # Use prefix if provided, otherwise name_starts_with
             filter_prefix = prefix or name_starts_with
             
-            blobs = []
-            for blob in container_client.list_blobs(name_starts_with=filter_prefix):
-                blobs.append({
-                    "name": blob.name,
-                    "size": blob.size,
-                    "content_type": blob.content_settings.content_type if blob.content_settings else None,
-                    "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
-                    "metadata": blob.metadata or {}
-                })
+            blobs = [
+                self._blob_to_dict(blob)
+                for blob in container_client.list_blobs(name_starts_with=filter_prefix)
+            ]
             
             logger.info(f"Found {len(blobs)} blobs in container '{container_name}' with prefix '{filter_prefix}'")
             return blobs
@@ -71,6 +51,45 @@ class AzureBlobBrowser:
             logger.error(f"Error listing blobs: {e}")
             raise
     
+    def iter_blob_pages(
+        self,
+        container_name: str,
+        prefix: Optional[str] = None,
+        page_size: int = 500,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily page through blobs in a container
+        
+        Each ``next()`` issues at most one List Blobs request, so callers can
+        start processing the first page before the container has been listed.
+        
+        Args:
+            container_name: Name of the container
+            prefix: Path prefix to filter
+            page_size: Blobs requested per page (service maximum is 5000)
+            
+        Yields:
+            Lists of blob information dictionaries, one list per service page
+        """
+        container_client = self.blob_service_client.get_container_client(container_name)
+        pages = container_client.list_blobs(
+            name_starts_with=prefix,
+            results_per_page=page_size,
+        ).by_page()
+        for page in pages:
+            yield [self._blob_to_dict(blob) for blob in page]
+    
+    @staticmethod
+    def _blob_to_dict(blob) -> Dict[str, Any]:
+        return {
+            "name": blob.name,
+            "size": blob.size,
+            "content_type": blob.content_settings.content_type if blob.content_settings else None,
+            "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+            "etag": blob.etag,
+            "metadata": blob.metadata or {}
+        }
+    
     def download_blob(
         self,
         container_name: str,
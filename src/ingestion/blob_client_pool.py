@@ -0,0 +1,222 @@
+"""Shared, lazily created Azure Blob Storage clients
+
+Every blob download and upload goes through one ``BlobServiceClient`` per
+storage account/credential. Each client keeps its own keep-alive connection
+pool, so repeated fetches (e.g. PDFs in the HITL review loop) reuse open TLS
+connections instead of paying connection setup on every call. Plain HTTP
+fetches of blob URLs share one ``requests.Session`` for the same reason.
+"""
+
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit, unquote
+import logging
+import threading
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+try:
+    from azure.storage.blob import BlobServiceClient
+    from azure.core.pipeline.transport import RequestsTransport
+    AZURE_STORAGE_AVAILABLE = True
+except ImportError:
+    AZURE_STORAGE_AVAILABLE = False
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_service_clients: Dict[Tuple[str, str], "BlobServiceClient"] = {}
+_ensured_containers: Set[Tuple[Tuple[str, str], str]] = set()
+_http_session = None
+_default_credential = None
+
+
+def _pooled_session() -> "requests.Session":
+    """requests.Session with a keep-alive pool sized for concurrent downloads"""
+    pool_size = max(1, getattr(settings, "BLOB_HTTP_POOL_SIZE", 16))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> "requests.Session":
+    """Shared HTTP session for fetching blob URLs directly"""
+    global _http_session
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests is not installed")
+    with _lock:
+        if _http_session is None:
+            _http_session = _pooled_session()
+        return _http_session
+
+
+def _connection_string_account(connection_string: str) -> Optional[str]:
+    for part in connection_string.split(";"):
+        key, _, value = part.partition("=")
+        if key.strip().lower() == "accountname":
+            return value.strip()
+    return None
+
+
+def _resolve_auth(account_name: Optional[str]) -> Tuple[str, str]:
+    """
+    Pick credentials for an account
+
+    Returns:
+        (account_key, auth_kind) where auth_kind is "connection_string",
+        "shared_key", "default_credential" or "anonymous"
+    """
+    connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
+    configured_account = settings.AZURE_STORAGE_ACCOUNT_NAME
+    if connection_string:
+        cs_account = _connection_string_account(connection_string)
+        if account_name is None or account_name == cs_account:
+            return cs_account or "", "connection_string"
+    if configured_account and account_name in (None, configured_account):
+        if getattr(settings, "AZURE_STORAGE_ACCOUNT_KEY", None):
+            return configured_account, "shared_key"
+        return configured_account, "default_credential"
+    if account_name is None:
+        raise ValueError("Azure storage credentials not configured")
+    # Any other account is only reachable for public containers
+    return account_name, "anonymous"
+
+
+def _build_client(account_name: str, auth_kind: str) -> "BlobServiceClient":
+    global _default_credential
+    transport = RequestsTransport(session=_pooled_session(), session_owner=True)
+    if auth_kind == "connection_string":
+        return BlobServiceClient.from_connection_string(
+            settings.AZURE_STORAGE_CONNECTION_STRING, transport=transport
+        )
+    account_url = f"https://{account_name}.blob.core.windows.net"
+    if auth_kind == "shared_key":
+        from azure.core.credentials import AzureNamedKeyCredential
+        credential = AzureNamedKeyCredential(account_name, settings.AZURE_STORAGE_ACCOUNT_KEY)
+    elif auth_kind == "default_credential":
+        if _default_credential is None:
+            from azure.identity import DefaultAzureCredential
+            _default_credential = DefaultAzureCredential()
+        credential = _default_credential
+    else:
+        credential = None
+    return BlobServiceClient(account_url=account_url, credential=credential, transport=transport)
+
+
+def get_blob_service_client(account_name: Optional[str] = None) -> "BlobServiceClient":
+    """
+    Return the shared BlobServiceClient for an account
+
+    Args:
+        account_name: Storage account (defaults to the configured account)
+
+    Raises:
+        ValueError: If no account is given and no storage credentials are configured
+    """
+    if not AZURE_STORAGE_AVAILABLE:
+        raise ImportError("azure-storage-blob is not installed")
+    key = _resolve_auth(account_name)
+    with _lock:
+        client = _service_clients.get(key)
+        if client is None:
+            client = _build_client(*key)
+            _service_clients[key] = client
+            logger.debug(f"Created pooled BlobServiceClient for account '{key[0]}' ({key[1]})")
+        return client
+
+
+def get_container_client(container_name: str, ensure_exists: bool = False, account_name: Optional[str] = None):
+    """
+    Return a container client on the shared service client
+
+    Args:
+        container_name: Container name
+        ensure_exists: Create the container if missing (checked once per process)
+        account_name: Storage account (defaults to the configured account)
+    """
+    key = _resolve_auth(account_name)
+    container_client = get_blob_service_client(account_name).get_container_client(container_name)
+    if ensure_exists and (key, container_name) not in _ensured_containers:
+        try:
+            container_client.get_container_properties()
+        except Exception:
+            container_client.create_container()
+            logger.info(f"Created container '{container_name}'")
+        _ensured_containers.add((key, container_name))
+    return container_client
+
+
+def parse_blob_url(url: str) -> Tuple[Optional[str], str, str]:
+    """
+    Split a blob URL into (account_name, container, blob_name)
+
+    account_name is None when the host is not a ``*.blob.core.windows.net``
+    endpoint (e.g. a custom domain); the configured account is used then.
+    """
+    split = urlsplit(url)
+    host = split.hostname or ""
+    account_name = host.split(".")[0] if ".blob." in host else None
+    parts = unquote(split.path).lstrip("/").split("/", 1)
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        raise ValueError("Could not parse container/blob from URL")
+    return account_name, parts[0], parts[1]
+
+
+def download_blob_url(url: str) -> bytes:
+    """Download a blob URL through the pooled SDK client for its account"""
+    account_name, container, blob_name = parse_blob_url(url)
+    blob_client = get_blob_service_client(account_name).get_blob_client(container=container, blob=blob_name)
+    return blob_client.download_blob().readall()
+
+
+def fetch_url(url: str, timeout: float = 30) -> bytes:
+    """
+    Fetch a blob URL, preferring plain HTTP unless USE_BLOB_SDK_FOR_URLS is set
+
+    Falls back to the other method when the first one fails.
+    """
+    sdk_first = getattr(settings, "USE_BLOB_SDK_FOR_URLS", False)
+    if sdk_first:
+        try:
+            return download_blob_url(url)
+        except Exception as e:
+            logger.warning(f"SDK download failed for URL, falling back to HTTP: {e}")
+
+    try:
+        resp = get_http_session().get(url, timeout=timeout)
+        resp.raise_for_status()
+        return resp.content
+    except Exception as e:
+        if sdk_first:
+            raise
+        logger.warning(f"HTTP download failed, trying blob SDK: {e}")
+        try:
+            return download_blob_url(url)
+        except Exception as e2:
+            logger.error(f"Failed to download file via Azure SDK: {e2}")
+        # If both fail, re-raise original
+        raise e
+
+
+def close_blob_clients() -> None:
+    """Close every pooled client and session (application shutdown / tests)"""
+    global _http_session
+    with _lock:
+        for client in _service_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _service_clients.clear()
+        _ensured_containers.clear()
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
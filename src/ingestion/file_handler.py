@@ -39,30 +39,15 @@ class FileHandler:
             self.processed_path.mkdir(exist_ok=True)
             logger.info(f"Using local storage at: {self.storage_path}")
         else:
-            # Setup Azure Blob Storage
+            # Setup Azure Blob Storage (shared pooled client; container checked once per process)
             try:
-                from azure.storage.blob import BlobServiceClient
-                from azure.identity import DefaultAzureCredential
+                from .blob_client_pool import get_blob_service_client, get_container_client
                 
-                connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
-                if connection_string:
-                    self.blob_service_client = BlobServiceClient.from_connection_string(
-                        connection_string
-                    )
-                elif settings.AZURE_STORAGE_ACCOUNT_NAME:
-                    account_url = f"https://{settings.AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
-                    credential = DefaultAzureCredential()
-                    self.blob_service_client = BlobServiceClient(
-                        account_url=account_url,
-                        credential=credential
-                    )
-                else:
-                    raise ValueError("Azure storage credentials not configured")
-                
-                self.container_client = self.blob_service_client.get_container_client(
-                    settings.AZURE_STORAGE_CONTAINER_RAW
+                self.blob_service_client = get_blob_service_client()
+                self.container_client = get_container_client(
+                    settings.AZURE_STORAGE_CONTAINER_RAW,
+                    ensure_exists=True,
                 )
-                self._ensure_container_exists()
                 logger.info("Using Azure Blob Storage")
             except ImportError:
                 logger.warning("Azure storage libraries not available, falling back to local storage")
@@ -181,45 +166,8 @@ class FileHandler:
         """
         # If identifier is a URL, optionally force SDK first (for private blobs), else HTTP then SDK fallback
         if isinstance(file_identifier, str) and file_identifier.lower().startswith(("http://", "https://")):
-            def download_via_sdk() -> bytes:
-                from urllib.parse import urlsplit
-                from azure.storage.blob import BlobServiceClient
-                split = urlsplit(file_identifier)
-                parts = split.path.lstrip("/").split("/", 1)
-                if len(parts) == 2:
-                    container, blob_name = parts
-                    if settings.AZURE_STORAGE_CONNECTION_STRING:
-                        svc = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
-                        blob_client = svc.get_blob_client(container=container, blob=blob_name)
-                        return blob_client.download_blob().readall()
-                    elif settings.AZURE_STORAGE_ACCOUNT_NAME and settings.AZURE_STORAGE_ACCOUNT_KEY:
-                        from azure.core.credentials import AzureNamedKeyCredential
-                        credential = AzureNamedKeyCredential(settings.AZURE_STORAGE_ACCOUNT_NAME, settings.AZURE_STORAGE_ACCOUNT_KEY)
-                        account_url = f"https://{settings.AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
-                        svc = BlobServiceClient(account_url=account_url, credential=credential)
-                        blob_client = svc.get_blob_client(container=container, blob=blob_name)
-                        return blob_client.download_blob().readall()
-                raise ValueError("Could not parse container/blob from URL")
-
-            if getattr(settings, "USE_BLOB_SDK_FOR_URLS", False):
-                try:
-                    return download_via_sdk()
-                except Exception as e:
-                    logger.warning(f"SDK download failed for URL, falling back to HTTP: {e}")
-
-            try:
-                import requests
-                resp = requests.get(file_identifier, timeout=30)
-                resp.raise_for_status()
-                return resp.content
-            except Exception as e:
-                logger.warning(f"HTTP download failed, trying blob SDK: {e}")
-                try:
-                    return download_via_sdk()
-                except Exception as e2:
-                    logger.error(f"Failed to download file via Azure SDK: {e2}")
-                # If both fail, re-raise original
-                raise
+            from .blob_client_pool import fetch_url
+            return fetch_url(file_identifier, timeout=30)
 
         if self.use_azure:
             blob_client = self.container_client.get_blob_client(file_identifier)
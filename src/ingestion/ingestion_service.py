@@ -3,15 +3,18 @@
 from typing import Dict, Any, Optional
 from datetime import datetime
 from uuid import uuid4
+import hashlib
 import logging
 import asyncio
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.concurrency import run_in_threadpool
 
 from .file_handler import FileHandler
 from .pdf_processor import PDFProcessor
 from .pdf_preprocessor import PDFPreprocessor
+from .scan_detector import detect_scanned_pages, is_cacheable_profile
 from src.models.invoice import Invoice
 from src.services.db_service import DatabaseService
 from src.services.progress_tracker import progress_tracker, ProcessingStep
@@ -46,6 +49,7 @@ class IngestionService:
         file_content: bytes,
         file_name: str,
         db: Optional[AsyncSession] = None,
+        skip_duplicates: bool = False,
     ) -> Dict[str, Any]:
         """
         Ingest an invoice PDF
@@ -54,6 +58,8 @@ class IngestionService:
             file_content: PDF file content as bytes
             file_name: Original file name
             db: Optional async DB session (uses default if not provided)
+            skip_duplicates: If True, return status "duplicate" with the existing
+                invoice_id when a file with the same content_sha256 was already ingested
             
         Returns:
             Dictionary with ingestion result
@@ -82,8 +88,37 @@ class IngestionService:
                     "errors": errors
                 }
             
+            content_sha256 = hashlib.sha256(file_content).hexdigest()
+
+            async def duplicate_of(existing_id: str) -> Dict[str, Any]:
+                logger.info(f"Skipping duplicate of invoice {existing_id}: {file_name}")
+                # invoice_id is never saved; drop the progress it started
+                await progress_tracker.clear(invoice_id)
+                # Callers re-run extraction for copies whose earlier extraction failed
+                existing = await DatabaseService.get_invoice(existing_id, db=db)
+                return {
+                    "status": "duplicate",
+                    "invoice_id": existing_id,
+                    "file_name": file_name,
+                    "content_sha256": content_sha256,
+                    "processing_state": existing.processing_state if existing else None,
+                    "file_path": existing.file_path if existing else None,
+                    "upload_date": existing.upload_date if existing else None,
+                    "errors": []
+                }
+
+            # content_sha256 is unique: only the first invoice ingested from a
+            # file keeps it, later copies (skip_duplicates off) are stored without it
+            existing_id = await DatabaseService.find_invoice_id_by_content_hash(content_sha256, db=db)
+            if existing_id and skip_duplicates:
+                return await duplicate_of(existing_id)
+            
             await progress_tracker.update(invoice_id, 10, "PDF validated, starting preprocessing...")
             
+            # Detect scanned pages once; the profile is stored on the invoice so
+            # preprocessing and extraction never have to recompute it
+            scan_profile = await run_in_threadpool(detect_scanned_pages, file_content)
+            
             # Step 2: Preprocess PDF (optional - optimizes for extraction)
             # Run with timeout (30 second SLO)
             preprocessing_timeout = getattr(settings, "PDF_PREPROCESS_TIMEOUT_SEC", 30.0)
@@ -93,7 +128,8 @@ class IngestionService:
                     run_in_threadpool(
                         self.pdf_preprocessor.preprocess,
                         file_content,
-                        file_name
+                        file_name,
+                        scan_profile,
                     ),
                     timeout=preprocessing_timeout
                 )
@@ -147,11 +183,26 @@ class IngestionService:
                 file_path=file_path,
                 file_name=file_name,
                 upload_date=upload_date,
-                status="processing"
+                status="processing",
+                content_sha256=None if existing_id else content_sha256,
+                # A failed detection is not stored, so extraction detects again
+                scan_profile=scan_profile if is_cacheable_profile(scan_profile) else None,
             )
             
             # Save to database
-            await DatabaseService.save_invoice(invoice, db=db)
+            try:
+                await DatabaseService.save_invoice(invoice, db=db)
+            except IntegrityError:
+                # A concurrent upload of the same content claimed the hash first
+                existing_id = None if invoice.content_sha256 is None else (
+                    await DatabaseService.find_invoice_id_by_content_hash(content_sha256, db=db)
+                )
+                if not existing_id:
+                    raise
+                if skip_duplicates:
+                    return await duplicate_of(existing_id)
+                invoice.content_sha256 = None
+                await DatabaseService.save_invoice(invoice, db=db)
             await progress_tracker.update(invoice_id, 50, "Ingestion complete")
             await progress_tracker.complete_step(invoice_id, ProcessingStep.INGESTION, "Invoice ingested successfully")
             
@@ -163,6 +214,7 @@ class IngestionService:
                 "file_size": upload_result["size"],
                 "page_count": pdf_info.get("page_count", 0),
                 "upload_date": upload_date,
+                "is_scanned": scan_profile.get("is_scanned", False),
                 "preprocessing": preprocessing_stats if (preprocessing_stats.get("preprocessing_applied") or preprocessing_stats.get("timeout")) else None,
                 "errors": []
             }
@@ -9,9 +9,16 @@ Provides optional preprocessing steps to optimize PDFs before sending to Azure D
 This can reduce costs (smaller files = fewer pages processed) and improve extraction accuracy.
 """
 
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List, Deque
+from collections import deque
 from io import BytesIO
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import logging
+import math
+import multiprocessing
+import os
+import threading
 
 try:
     import PyPDF2
@@ -32,6 +39,7 @@ except ImportError:
     PILLOW_AVAILABLE = False
 
 from src.config import settings
+from .scan_detector import detect_scanned_pages, is_scanned_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +54,9 @@ class PDFPreprocessor:
         target_dpi: Optional[int] = None,
         max_image_dpi: Optional[int] = None,
         enable_rotation_correction: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        page_chunk_size: Optional[int] = None,
+        max_page_pixels: Optional[int] = None,
     ):
         """
         Initialize PDF preprocessor
@@ -56,6 +67,9 @@ class PDFPreprocessor:
             target_dpi: Target DPI for image optimization (defaults to 300)
             max_image_dpi: Maximum DPI before downscaling (defaults to 600)
             enable_rotation_correction: Enable automatic page rotation correction
+            max_workers: Worker processes for page-parallel image optimization (0 = CPU count)
+            page_chunk_size: Pages rendered per worker task
+            max_page_pixels: Per-page pixel budget; pages above it render at a lower DPI
         """
         self.enable_compression = (
             enable_compression if enable_compression is not None
@@ -71,11 +85,21 @@ class PDFPreprocessor:
             enable_rotation_correction if enable_rotation_correction is not None
             else getattr(settings, "ENABLE_PDF_ROTATION_CORRECTION", False)
         )
+        self.max_workers = (
+            max_workers if max_workers is not None
+            else getattr(settings, "PDF_PREPROCESS_MAX_WORKERS", 0)
+        )
+        self.page_chunk_size = page_chunk_size or getattr(settings, "PDF_PREPROCESS_PAGE_CHUNK_SIZE", 4)
+        self.max_page_pixels = (
+            max_page_pixels if max_page_pixels is not None
+            else getattr(settings, "PDF_PREPROCESS_MAX_PAGE_PIXELS", 12_000_000)
+        )
     
     def preprocess(
         self,
         file_content: bytes,
-        file_name: str
+        file_name: str,
+        scan_profile: Optional[Dict[str, Any]] = None,
     ) -> Tuple[bytes, Dict[str, Any]]:
         """
         Preprocess PDF to optimize for extraction
@@ -83,6 +107,7 @@ class PDFPreprocessor:
         Args:
             file_content: Original PDF content as bytes
             file_name: Original file name (for logging)
+            scan_profile: Precomputed result of detect_scanned_pages (computed here if omitted)
             
         Returns:
             Tuple of (processed_pdf_bytes, preprocessing_stats)
@@ -92,6 +117,7 @@ class PDFPreprocessor:
             - processed_size: Processed file size in bytes
             - size_reduction: Percentage reduction
             - preprocessing_applied: List of preprocessing steps applied
+            - scan_profile: Scanned/text page map (only when preprocessing is enabled)
             - error: Error message if preprocessing failed (original file returned)
         """
         stats = {
@@ -112,7 +138,10 @@ class PDFPreprocessor:
             original_size = len(file_content)
             
             # Detect PDF type (text-based vs scanned)
-            is_scanned = self._is_scanned_pdf(file_content)
+            if scan_profile is None:
+                scan_profile = detect_scanned_pages(file_content)
+            stats["scan_profile"] = scan_profile
+            is_scanned = bool(scan_profile.get("is_scanned"))
             
             logger.info(
                 f"Preprocessing PDF: {file_name} "
@@ -160,29 +189,7 @@ class PDFPreprocessor:
         Returns:
             True if PDF appears to be scanned/image-based
         """
-        if not PYPDF2_AVAILABLE:
-            return False
-        
-        try:
-            pdf_file = BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Check first page for text content
-            if len(pdf_reader.pages) == 0:
-                return False
-            
-            first_page = pdf_reader.pages[0]
-            text = first_page.extract_text()
-            
-            # If very little text extracted, likely scanned
-            if text is None or len(text.strip()) < 50:
-                return True
-            
-            return False
-            
-        except Exception:
-            logger.debug("Could not determine if PDF is scanned, assuming text-based")
-            return False
+        return is_scanned_pdf(file_content)
     
     def _compress_pdf(self, file_content: bytes, file_name: str) -> bytes:
         """
@@ -224,6 +231,12 @@ class PDFPreprocessor:
         """
         Optimize scanned PDF images (resize, denoise, enhance contrast)
         
+        Pages are split into chunks of ``page_chunk_size`` and rendered in parallel
+        across worker processes. Finished chunks are written back to the output PDF
+        in page order as they arrive, so only a bounded number of rendered pages is
+        held in memory. Each page is rendered at the highest DPI that fits both
+        ``max_image_dpi`` and the per-page pixel budget.
+        
         Args:
             file_content: PDF content as bytes
             file_name: File name for logging
@@ -236,64 +249,82 @@ class PDFPreprocessor:
             return file_content
         
         try:
-            # Open PDF with PyMuPDF
             pdf_doc = fitz.open(stream=file_content, filetype="pdf")
+            page_count = len(pdf_doc)
+            chunk_size = max(1, self.page_chunk_size)
+            chunks = [
+                list(range(start, min(start + chunk_size, page_count)))
+                for start in range(0, page_count, chunk_size)
+            ]
+            pool_size = self._resolve_max_workers()
+            # The pool is sized by configuration; a document only limits how many
+            # of its chunks are in flight at once
+            workers = min(pool_size, len(chunks))
+            
             output_pdf = fitz.open()
+            render_args = (self.target_dpi, self.max_image_dpi, self.max_page_pixels)
             
-            for page_num in range(len(pdf_doc)):
-                page = pdf_doc[page_num]
-                
-                # Get page as image
-                zoom = self.target_dpi / 72.0  # PyMuPDF uses 72 DPI as base
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image
-                img_data = pix.tobytes("png")
-                img = Image.open(BytesIO(img_data))
-                
-                # Check if we need to downscale
-                current_dpi = pix.xres if hasattr(pix, 'xres') else self.target_dpi
-                if current_dpi > self.max_image_dpi:
-                    # Calculate scale factor
-                    scale_factor = self.max_image_dpi / current_dpi
-                    new_size = (int(img.width * scale_factor), int(img.height * scale_factor))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                    logger.debug(f"Downscaled page {page_num + 1} from {current_dpi} DPI to ~{self.max_image_dpi} DPI")
-                
-                # Convert to grayscale if color not needed (smaller file size)
-                if img.mode != 'L':
-                    img = img.convert('L')
-                
-                # Enhance contrast slightly (helps OCR)
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(1.1)  # 10% contrast increase
-                
-                # Apply gentle denoising
-                img = img.filter(ImageFilter.MedianFilter(size=3))
-                
-                # Convert back to PDF page
-                img_bytes = BytesIO()
-                img.save(img_bytes, format='PNG', optimize=True)
-                img_bytes.seek(0)
-                
-                # Insert optimized image as new page
-                img_rect = fitz.Rect(0, 0, img.width, img.height)
-                new_page = output_pdf.new_page(width=img.width, height=img.height)
-                new_page.insert_image(img_rect, stream=img_bytes.getvalue())
+            if workers > 1:
+                executor = _get_page_executor(pool_size)
+                try:
+                    self._optimize_chunks_parallel(executor, pdf_doc, chunks, workers, render_args, output_pdf)
+                except BrokenProcessPool:
+                    logger.warning(
+                        f"Page worker pool unavailable for {file_name}, optimizing serially"
+                    )
+                    _reset_page_executor(executor)
+                    output_pdf.close()
+                    output_pdf = fitz.open()
+                    workers = 1
             
-            # Get optimized PDF bytes
-            output_bytes = output_pdf.tobytes()
+            if workers <= 1:
+                for pages in chunks:
+                    rendered = _render_pages(pdf_doc, pages, *render_args)
+                    _write_rendered_pages(output_pdf, rendered)
+            
+            output_bytes = output_pdf.tobytes(garbage=3, deflate=True)
             output_pdf.close()
             pdf_doc.close()
             
-            logger.debug(f"Image optimization: {file_name} ({len(file_content)} -> {len(output_bytes)} bytes)")
+            logger.debug(
+                f"Image optimization: {file_name} ({len(file_content)} -> {len(output_bytes)} bytes, "
+                f"{page_count} pages, {len(chunks)} chunks, {workers} workers)"
+            )
             return output_bytes
             
         except Exception as e:
             logger.warning(f"Image optimization failed for {file_name}: {e}", exc_info=True)
             return file_content
     
+    def _optimize_chunks_parallel(
+        self,
+        executor: ProcessPoolExecutor,
+        pdf_doc,
+        chunks: List[List[int]],
+        workers: int,
+        render_args: Tuple[int, int, int],
+        output_pdf,
+    ) -> None:
+        """Render chunks on the pool, at most ``workers`` in flight, writing results in page order"""
+        pending: Deque[Future] = deque()
+        next_chunk = 0
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < workers:
+                # Each worker only receives the pages it renders, not the whole document
+                pages = chunks[next_chunk]
+                sub_doc = fitz.open()
+                sub_doc.insert_pdf(pdf_doc, from_page=pages[0], to_page=pages[-1])
+                pending.append(executor.submit(_optimize_page_chunk, sub_doc.tobytes(), *render_args))
+                sub_doc.close()
+                next_chunk += 1
+            _write_rendered_pages(output_pdf, pending.popleft().result())
+    
+    def _resolve_max_workers(self) -> int:
+        """Number of worker processes to use for page-parallel optimization"""
+        if self.max_workers and self.max_workers > 0:
+            return self.max_workers
+        return os.cpu_count() or 1
+    
     def _correct_rotation(self, file_content: bytes, file_name: str) -> bytes:
         """
         Correct page rotation (auto-rotate pages to correct orientation)
@@ -339,3 +370,119 @@ class PDFPreprocessor:
             logger.warning(f"Rotation correction failed for {file_name}: {e}")
             return file_content
 
+
+
+def _page_render_dpi(
+    width_pt: float,
+    height_pt: float,
+    target_dpi: int,
+    max_dpi: int,
+    max_pixels: int,
+) -> int:
+    """
+    Pick the render DPI for a single page
+    
+    Starts from ``target_dpi`` (capped at ``max_dpi``) and lowers it until the
+    rendered page fits within ``max_pixels``. Oversized pages (posters, long
+    receipts) therefore get a lower DPI instead of blowing up memory.
+    """
+    dpi = min(target_dpi, max_dpi)
+    if max_pixels and max_pixels > 0 and width_pt > 0 and height_pt > 0:
+        area_sq_in = (width_pt / 72.0) * (height_pt / 72.0)
+        budget_dpi = int(math.sqrt(max_pixels / area_sq_in))
+        dpi = min(dpi, budget_dpi)
+    return max(dpi, 1)
+
+
+def _render_pages(
+    pdf_doc,
+    page_numbers: List[int],
+    target_dpi: int,
+    max_dpi: int,
+    max_pixels: int,
+) -> List[Tuple[float, float, bytes]]:
+    """
+    Render and clean up pages of an open document
+    
+    Returns:
+        List of (page_width_pt, page_height_pt, png_bytes) in page order
+    """
+    rendered = []
+    for page_num in page_numbers:
+        page = pdf_doc[page_num]
+        rect = page.rect
+        dpi = _page_render_dpi(rect.width, rect.height, target_dpi, max_dpi, max_pixels)
+        
+        # Render straight to grayscale (smaller file size, nothing to convert afterwards)
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        
+        # Enhance contrast slightly (helps OCR)
+        img = ImageEnhance.Contrast(img).enhance(1.1)  # 10% contrast increase
+        
+        # Apply gentle denoising
+        img = img.filter(ImageFilter.MedianFilter(size=3))
+        
+        img_bytes = BytesIO()
+        img.save(img_bytes, format="PNG")
+        rendered.append((rect.width, rect.height, img_bytes.getvalue()))
+    return rendered
+
+
+def _optimize_page_chunk(
+    chunk_content: bytes,
+    target_dpi: int,
+    max_dpi: int,
+    max_pixels: int,
+) -> List[Tuple[float, float, bytes]]:
+    """Worker entry point: render every page of a chunk sub-document"""
+    chunk_doc = fitz.open(stream=chunk_content, filetype="pdf")
+    try:
+        return _render_pages(chunk_doc, list(range(len(chunk_doc))), target_dpi, max_dpi, max_pixels)
+    finally:
+        chunk_doc.close()
+
+
+def _write_rendered_pages(output_pdf, rendered: List[Tuple[float, float, bytes]]) -> None:
+    """Append rendered pages to the output PDF, keeping the original page size"""
+    for width_pt, height_pt, png_bytes in rendered:
+        new_page = output_pdf.new_page(width=width_pt, height=height_pt)
+        new_page.insert_image(new_page.rect, stream=png_bytes)
+
+
+_page_executors: Dict[int, ProcessPoolExecutor] = {}
+_page_executor_lock = threading.Lock()
+
+
+def _get_page_executor(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Shared process pool for page rendering
+    
+    Created lazily per configured size and reused across documents so worker
+    start-up is paid once. Pools are never replaced while healthy, so a caller
+    holding one cannot see it shut down underneath it. Uses the spawn start
+    method because preprocessing runs on threadpool threads.
+    """
+    with _page_executor_lock:
+        executor = _page_executors.get(max_workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _page_executors[max_workers] = executor
+        return executor
+
+
+def _reset_page_executor(broken: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Drop a crashed pool so the next call rebuilds it (all pools if none is given)
+    
+    Only the pool that broke is dropped; a replacement another caller already
+    created is left alone.
+    """
+    with _page_executor_lock:
+        for size, executor in list(_page_executors.items()):
+            if broken is None or executor is broken:
+                del _page_executors[size]
+                executor.shutdown(wait=False)
@@ -0,0 +1,207 @@
+"""Scanned-document detection shared by ingestion and extraction
+
+Classifies a PDF as scanned (image-only) or text-based by looking at a small
+sample of pages instead of the first page only:
+- PyMuPDF text layer: pages with almost no extractable text are scanned
+- Image coverage: pages mostly covered by images with only a thin text layer
+  (stamps, headers) are scanned too
+
+The result is a JSON-serializable profile with a per-page map. Ingestion stores
+it on the invoice record (``scan_profile``) so extraction never recomputes it.
+"""
+
+from typing import Any, Dict, List, Optional
+from io import BytesIO
+import logging
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+PAGE_SCANNED = "scanned"
+PAGE_TEXT = "text"
+
+# Backends whose profile reflects the document; "unavailable" / "error"
+# profiles are placeholders and must not be cached on the invoice
+DETECTION_METHODS = ("pymupdf", "pypdf2")
+
+
+def select_sample_pages(page_count: int, max_samples: int) -> List[int]:
+    """
+    Pick zero-based page indices to inspect
+
+    Always includes the first and last page, then spreads the remaining samples
+    evenly across the document.
+    """
+    if page_count <= 0:
+        return []
+    max_samples = max(1, max_samples)
+    if page_count <= max_samples:
+        return list(range(page_count))
+    if max_samples == 1:
+        return [0]
+    step = (page_count - 1) / (max_samples - 1)
+    return sorted({round(i * step) for i in range(max_samples)})
+
+
+def _classify_page(text_chars: int, image_coverage: float, min_text_chars: int, coverage_threshold: float) -> str:
+    """Classify a single page from its text length and image coverage"""
+    if text_chars < min_text_chars:
+        return PAGE_SCANNED
+    # Full-page image with only a thin text layer (e.g. a stamped header)
+    if image_coverage >= coverage_threshold and text_chars < min_text_chars * 4:
+        return PAGE_SCANNED
+    return PAGE_TEXT
+
+
+def _image_coverage(page) -> float:
+    """Fraction of the page area covered by images (clamped to 1.0)"""
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if page_area <= 0:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(covered / page_area, 1.0)
+
+
+def is_cacheable_profile(profile: Optional[Dict[str, Any]]) -> bool:
+    """Whether a profile came from an actual detection and may be stored on the invoice"""
+    return bool(profile) and profile.get("method") in DETECTION_METHODS
+
+
+def _empty_profile(method: str) -> Dict[str, Any]:
+    return {
+        "page_count": 0,
+        "sampled_pages": [],
+        "pages": {},
+        "scanned_ratio": 0.0,
+        "is_scanned": False,
+        "classification": PAGE_TEXT,
+        "method": method,
+    }
+
+
+def detect_scanned_pages(
+    file_content: bytes,
+    max_samples: Optional[int] = None,
+    min_text_chars: Optional[int] = None,
+    coverage_threshold: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Classify sampled pages of a PDF as scanned or text-based
+
+    Args:
+        file_content: PDF content as bytes
+        max_samples: Maximum pages to inspect (defaults to settings.SCAN_DETECTION_SAMPLE_PAGES)
+        min_text_chars: Pages with fewer text characters are scanned
+        coverage_threshold: Image coverage above which a thin text layer still counts as scanned
+
+    Returns:
+        Profile dict:
+            - page_count: Total pages in the document
+            - sampled_pages: 1-based page numbers that were inspected
+            - pages: {"<page_number>": "scanned" | "text"} for sampled pages
+            - scanned_ratio: Fraction of sampled pages that are scanned
+            - is_scanned: True when at least half of the sampled pages are scanned
+            - classification: "scanned", "text" or "mixed"
+            - method: Backend used ("pymupdf" or "pypdf2"), or "unavailable" / "error"
+              when the document could not be inspected
+    """
+    max_samples = max_samples or getattr(settings, "SCAN_DETECTION_SAMPLE_PAGES", 5)
+    min_text_chars = (
+        min_text_chars if min_text_chars is not None
+        else getattr(settings, "SCAN_DETECTION_MIN_TEXT_CHARS", 50)
+    )
+    coverage_threshold = (
+        coverage_threshold if coverage_threshold is not None
+        else getattr(settings, "SCAN_DETECTION_IMAGE_COVERAGE", 0.6)
+    )
+
+    try:
+        if PYMUPDF_AVAILABLE:
+            pages, page_count = _sample_with_pymupdf(file_content, max_samples, min_text_chars, coverage_threshold)
+            method = "pymupdf"
+        elif PYPDF2_AVAILABLE:
+            pages, page_count = _sample_with_pypdf2(file_content, max_samples, min_text_chars)
+            method = "pypdf2"
+        else:
+            return _empty_profile("unavailable")
+    except Exception:
+        logger.debug("Could not determine if PDF is scanned, assuming text-based")
+        return _empty_profile("error")
+
+    if not pages:
+        profile = _empty_profile(method)
+        profile["page_count"] = page_count
+        return profile
+
+    scanned = sum(1 for kind in pages.values() if kind == PAGE_SCANNED)
+    ratio = scanned / len(pages)
+    if scanned == 0:
+        classification = PAGE_TEXT
+    elif scanned == len(pages):
+        classification = PAGE_SCANNED
+    else:
+        classification = "mixed"
+
+    return {
+        "page_count": page_count,
+        "sampled_pages": [int(p) for p in pages],
+        "pages": pages,
+        "scanned_ratio": round(ratio, 3),
+        "is_scanned": ratio >= 0.5,
+        "classification": classification,
+        "method": method,
+    }
+
+
+def is_scanned_pdf(file_content: bytes) -> bool:
+    """Return True if the PDF is primarily scanned/image-based"""
+    return bool(detect_scanned_pages(file_content).get("is_scanned"))
+
+
+def _sample_with_pymupdf(
+    file_content: bytes,
+    max_samples: int,
+    min_text_chars: int,
+    coverage_threshold: float,
+):
+    pdf_doc = fitz.open(stream=file_content, filetype="pdf")
+    try:
+        page_count = len(pdf_doc)
+        pages: Dict[str, str] = {}
+        for index in select_sample_pages(page_count, max_samples):
+            page = pdf_doc[index]
+            text_chars = len(page.get_text("text").strip())
+            # Image coverage only matters when there is some text to second-guess
+            coverage = _image_coverage(page) if text_chars >= min_text_chars else 0.0
+            pages[str(index + 1)] = _classify_page(text_chars, coverage, min_text_chars, coverage_threshold)
+        return pages, page_count
+    finally:
+        pdf_doc.close()
+
+
+def _sample_with_pypdf2(file_content: bytes, max_samples: int, min_text_chars: int):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
+    page_count = len(pdf_reader.pages)
+    pages: Dict[str, str] = {}
+    for index in select_sample_pages(page_count, max_samples):
+        text = pdf_reader.pages[index].extract_text() or ""
+        pages[str(index + 1)] = _classify_page(len(text.strip()), 0.0, min_text_chars, 1.0)
+    return pages, page_count
@@ -1,16 +1,93 @@
 """Simplified async database setup"""
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 from src.config import settings
 
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def sqlite_pragmas(in_memory: bool = False) -> List[Tuple[str, Any]]:
+    """PRAGMA statements run on every new SQLite connection, in order"""
+    pragmas: List[Tuple[str, Any]] = []
+    if not in_memory:
+        # journal_mode and mmap only apply to file databases
+        pragmas.append(("journal_mode", settings.SQLITE_JOURNAL_MODE))
+    pragmas.extend([
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        ("busy_timeout", settings.SQLITE_BUSY_TIMEOUT_MS),
+        # Negative cache_size is in KiB rather than pages
+        ("cache_size", -abs(settings.SQLITE_CACHE_SIZE_KB)),
+        ("temp_store", "MEMORY"),
+    ])
+    if not in_memory:
+        pragmas.append(("mmap_size", settings.SQLITE_MMAP_SIZE_BYTES))
+    return pragmas
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Keyword arguments for create_async_engine, chosen per backend
+
+    SQLite gets a driver-level lock timeout; server databases (Azure SQL /
+    SQL Server, PostgreSQL) get a sized, recycled and pre-pinged pool.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return {"connect_args": {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def create_engine_for_url(database_url: str, echo: Optional[bool] = None, **overrides: Any) -> AsyncEngine:
+    """
+    Create an async engine configured for the URL's backend
+
+    Args:
+        database_url: SQLAlchemy URL (sqlite+aiosqlite, mssql+aioodbc, ...)
+        echo: Log SQL (defaults to settings.DEBUG)
+        **overrides: Extra create_async_engine arguments; win over the defaults
+
+    Returns:
+        AsyncEngine; SQLite connections have sqlite_pragmas() applied on connect
+    """
+    options = engine_options(database_url)
+    options.update(overrides)
+    new_engine = create_async_engine(
+        database_url,
+        echo=settings.DEBUG if echo is None else echo,
+        future=True,
+        **options
+    )
+
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        pragmas = sqlite_pragmas(in_memory=_is_memory_sqlite(url))
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas:
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    return new_engine
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True
-)
+engine = create_engine_for_url(settings.DATABASE_URL)
 
 # Create session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -30,4 +107,3 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
-
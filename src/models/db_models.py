@@ -1,6 +1,9 @@
 """Simplified SQLAlchemy ORM models"""
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, Date, Numeric, Text, JSON, Index
+from sqlalchemy import (
+    DDL, Column, String, Integer, Float, DateTime, Date, Numeric, Text, JSON, Index, PrimaryKeyConstraint,
+    UniqueConstraint, event, text,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 from decimal import Decimal
@@ -30,7 +33,7 @@ class Invoice(Base):
     reference_number = Column(String(100), nullable=True)
     
     # Vendor Information
-    vendor_name = Column(String, nullable=True)
+    vendor_name = Column(String(450), nullable=True)  # Bounded so SQL Server can index it
     vendor_id = Column(String, nullable=True)
     vendor_phone = Column(String, nullable=True)
     vendor_fax = Column(String, nullable=True)
@@ -111,7 +114,10 @@ class Invoice(Base):
     extraction_timestamp = Column(DateTime, nullable=True)
     review_version = Column(Integer, nullable=False, default=0)
     processing_state = Column(String(32), nullable=False, default="PENDING")
-    content_sha256 = Column(String(128), nullable=True)
+    lease_owner = Column(String(255), nullable=True)  # Extractor holding the PROCESSING claim
+    lease_expires_at = Column(DateTime, nullable=True)  # PROCESSING claim is reclaimable after this
+    content_sha256 = Column(String(128), nullable=True)  # Set on the first invoice ingested from this file content only
+    scan_profile = Column(JSON, nullable=True)  # Cached scanned/text page map from ingestion
     
     # Review
     review_status = Column(String(50), nullable=True)
@@ -141,7 +147,222 @@ class Invoice(Base):
     
     # Indexes
     __table_args__ = (
-        Index('ix_invoices_status', 'status'),
-        Index('ix_invoices_upload_date', 'upload_date'),
+        # Invoice listings: newest first by (upload_date, id), optionally filtered on the leading column
+        Index('ix_invoices_upload_date_id', 'upload_date', 'id'),
+        Index('ix_invoices_status_upload_date', 'status', 'upload_date', 'id'),
+        Index('ix_invoices_processing_state_upload_date', 'processing_state', 'upload_date', 'id'),
+        Index('ix_invoices_vendor_name_upload_date', 'vendor_name', 'upload_date', 'id'),
+        # Business-key lookups (same vendor invoice submitted twice)
+        Index('ix_invoices_vendor_name_invoice_number', 'vendor_name', 'invoice_number'),
+        # One canonical invoice per file content; later copies store NULL.
+        # Filtered so SQL Server allows many NULLs in the unique index.
+        Index(
+            'ux_invoices_content_sha256', 'content_sha256', unique=True,
+            sqlite_where=text('content_sha256 IS NOT NULL'),
+            mssql_where=text('content_sha256 IS NOT NULL'),
+            postgresql_where=text('content_sha256 IS NOT NULL'),
+        ),
+        Index('ix_invoices_processing_state_lease', 'processing_state', 'lease_expires_at'),
     )
 
+
+
+class BlobImportWatermark(Base):
+    """Incremental blob import position per container/prefix
+
+    Blobs modified before ``last_modified`` have been imported. ``etags`` holds
+    the etags already imported at or after that timestamp, so blobs sharing the
+    boundary timestamp are neither skipped nor imported twice.
+    """
+    __tablename__ = "blob_import_watermarks"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    container_name = Column(String(255), nullable=False)
+    prefix = Column(String(1024), nullable=False, default="")
+    last_modified = Column(DateTime, nullable=True)
+    etags = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('container_name', 'prefix', name='uq_blob_import_watermarks_container_prefix'),
+    )
+
+
+class ExtractionJob(Base):
+    """Durable extraction job claimed by worker processes
+
+    ``state`` moves QUEUED -> RUNNING -> SUCCEEDED/FAILED. A RUNNING job whose
+    ``lease_expires_at`` has passed belongs to a dead worker and is claimable
+    again; ``available_at`` delays retries after a failed attempt.
+    """
+    __tablename__ = "extraction_jobs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    invoice_id = Column(String(36), nullable=False)
+    state = Column(String(32), nullable=False, default="QUEUED")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_extraction_jobs_state_available_at', 'state', 'available_at'),
+        Index('ix_extraction_jobs_invoice_id', 'invoice_id'),
+        # At most one QUEUED / RUNNING job per invoice
+        Index(
+            'ux_extraction_jobs_active_invoice', 'invoice_id', unique=True,
+            sqlite_where=text("state IN ('QUEUED', 'RUNNING')"),
+            mssql_where=text("state IN ('QUEUED', 'RUNNING')"),
+            postgresql_where=text("state IN ('QUEUED', 'RUNNING')"),
+        ),
+    )
+
+
+class BatchRunRecord(Base):
+    """Durable record of a background batch run
+
+    ``status`` moves queued -> running -> completed / failed / cancelled /
+    interrupted. The owning process refreshes ``heartbeat_at`` while the run
+    executes; a queued or running row whose heartbeat is stale belongs to a
+    process that died and may be resumed.
+    """
+    __tablename__ = "batch_runs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(32), nullable=False, default="ids")
+    priority = Column(String(16), nullable=False, default="normal")
+    status = Column(String(32), nullable=False, default="queued")
+    total = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)  # Times the run was started or resumed
+    owner = Column(String(255), nullable=True)
+    lease_owner = Column(String(255), nullable=True)  # Invoice lease owner of the latest attempt
+    heartbeat_at = Column(DateTime, nullable=True)
+    summary = Column(JSON, nullable=True)  # Stage timings / elapsed time of the latest attempt
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_batch_runs_status_heartbeat_at', 'status', 'heartbeat_at'),
+        Index('ix_batch_runs_created_at', 'created_at'),
+    )
+
+
+class BatchRunItem(Base):
+    """Per-invoice checkpoint of a batch run
+
+    ``status`` is ``pending`` until the invoice finishes, then the batch entry
+    status (``success``, ``failed`` or ``error``). Resuming a run re-submits
+    only the pending items.
+    """
+    __tablename__ = "batch_run_items"
+    
+    batch_id = Column(String(36), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    invoice_id = Column(String(36), nullable=False)
+    status = Column(String(32), nullable=False, default="pending")
+    result = Column(JSON, nullable=True)  # Compact batch entry (extraction status, errors, confidence)
+    elapsed_seconds = Column(Float, nullable=True)
+    stage_timings = Column(JSON, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_batch_run_items_batch_id_status', 'batch_id', 'status'),
+    )
+
+
+class InvoiceReviewEvent(Base):
+    """Append-only HITL review history
+
+    One row per validation submitted for an invoice; rows are never updated.
+    ``review_version`` is the invoice's review_version after that validation.
+    """
+    __tablename__ = "invoice_review_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    invoice_id = Column(String(36), nullable=False)
+    status = Column(String(50), nullable=True)  # overall_validation_status: validated, needs_review, ...
+    reviewer = Column(String(255), nullable=True)
+    notes = Column(Text, nullable=True)
+    review_version = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_invoice_review_events_invoice_id_created_at', 'invoice_id', 'created_at'),
+    )
+
+
+class InvoiceSearchDocument(Base):
+    """Text indexed for invoice search, one row per invoice
+
+    Written by src/models/db_utils_search.py. The full-text index sits on
+    this table: an external-content FTS5 table kept in sync by triggers on
+    SQLite (below), a FULLTEXT index on SQL Server (created by migration).
+    Both address rows by ``id``, hence the integer key; SQLite may renumber
+    the implicit rowid of a table without one on VACUUM.
+    """
+    __tablename__ = "invoice_search_documents"
+    
+    id = Column(Integer, autoincrement=True)
+    invoice_id = Column(String(36), nullable=False)
+    vendor_name = Column(Text, nullable=True)
+    numbers = Column(Text, nullable=True)  # Invoice / PO / reference numbers and their fragments
+    line_descriptions = Column(Text, nullable=True)
+    document_text = Column(Text, nullable=True)  # Document Intelligence content (OCR text)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_invoice_search_documents'),
+        Index('ux_invoice_search_documents_invoice_id', 'invoice_id', unique=True),
+    )
+
+
+# SQLite full-text index over invoice_search_documents. External content:
+# the FTS5 table stores only the index and reads text from the documents
+# table; the triggers apply every insert / update / delete to it.
+# The migration 20260109_add_invoice_search carries a frozen copy of this DDL
+# (migrations do not import the models); test_invoice_search checks that the
+# two still match, so a change here needs a new migration.
+INVOICE_SEARCH_FTS_TABLE = "invoice_search_fts"
+INVOICE_SEARCH_FTS_COLUMNS = ("vendor_name", "numbers", "line_descriptions", "document_text")
+_fts_columns = ", ".join(INVOICE_SEARCH_FTS_COLUMNS)
+_fts_new = ", ".join(f"new.{name}" for name in INVOICE_SEARCH_FTS_COLUMNS)
+_fts_old = ", ".join(f"old.{name}" for name in INVOICE_SEARCH_FTS_COLUMNS)
+INVOICE_SEARCH_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE {INVOICE_SEARCH_FTS_TABLE} USING fts5({_fts_columns},"
+    f" content='invoice_search_documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER invoice_search_documents_ai AFTER INSERT ON invoice_search_documents BEGIN"
+    f" INSERT INTO {INVOICE_SEARCH_FTS_TABLE}(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+    f"CREATE TRIGGER invoice_search_documents_ad AFTER DELETE ON invoice_search_documents BEGIN"
+    f" INSERT INTO {INVOICE_SEARCH_FTS_TABLE}({INVOICE_SEARCH_FTS_TABLE}, rowid, {_fts_columns})"
+    f" VALUES ('delete', old.id, {_fts_old}); END",
+    f"CREATE TRIGGER invoice_search_documents_au AFTER UPDATE ON invoice_search_documents BEGIN"
+    f" INSERT INTO {INVOICE_SEARCH_FTS_TABLE}({INVOICE_SEARCH_FTS_TABLE}, rowid, {_fts_columns})"
+    f" VALUES ('delete', old.id, {_fts_old});"
+    f" INSERT INTO {INVOICE_SEARCH_FTS_TABLE}(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+)
+
+
+def _sqlite_has_fts5(ddl, target, bind, **kw) -> bool:
+    if bind.dialect.name != "sqlite":
+        return False
+    return bool(bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+
+for _statement in INVOICE_SEARCH_FTS_DDL:
+    event.listen(
+        InvoiceSearchDocument.__table__, "after_create", DDL(_statement).execute_if(callable_=_sqlite_has_fts5)
+    )
+event.listen(
+    InvoiceSearchDocument.__table__, "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {INVOICE_SEARCH_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
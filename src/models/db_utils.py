@@ -1,12 +1,25 @@
-"""Simplified utilities for converting between Pydantic and SQLAlchemy models"""
+"""Utilities for converting between Pydantic and SQLAlchemy models
 
-from typing import Optional
+Column lists are derived from the table and model definitions. Reads build
+models with ``model_construct`` (see db_to_pydantic_invoice); writes take
+validated models.
+"""
+
+from typing import Optional, get_args
 from datetime import datetime
 import json
 from decimal import Decimal
 import logging
 
-from .invoice import Invoice as InvoicePydantic, LineItem as LineItemPydantic, Address, InvoiceSubtype
+from sqlalchemy import JSON
+
+from .invoice import (
+    Invoice as InvoicePydantic,
+    LineItem as LineItemPydantic,
+    Address,
+    InvoiceExtensions,
+    InvoiceSubtype,
+)
 from .db_models import Invoice as InvoiceDB
 from .line_item_db_models import LineItem as LineItemDB
 from .decimal_wire import decimal_to_wire, wire_to_decimal
@@ -87,43 +100,143 @@ def line_items_to_json(line_items: list) -> Optional[dict]:
     ]
 
 
-def json_to_line_items(data: Optional[dict]) -> list:
-    """Convert JSON data to list of LineItem Pydantic models, parsing decimal strings"""
+def _construct_fast(model) -> bool:
+    """Whether _construct may set __dict__ directly instead of calling model_construct"""
+    return not (
+        model.__pydantic_post_init__
+        or model.__private_attributes__
+        or model.model_config.get("extra") == "allow"
+        or any(f.alias or f.validation_alias for f in model.model_fields.values())
+    )
+
+
+def _construct(model, values: dict):
+    """``model.model_construct(**values)`` for a dict holding every field of ``model``
+    
+    model_construct loops over the model's fields in Python to resolve aliases
+    and defaults, which costs more than validating a small model. With every
+    field present and no aliases there is nothing to resolve, so this builds
+    the same instance (fields_set = all fields) directly.
+    """
+    if len(values) != _FAST_CONSTRUCT[model]:
+        return model.model_construct(**values)
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _row_values(row, names) -> dict:
+    """Column values of a loaded ORM row; unloaded (expired / deferred) ones go through getattr"""
+    loaded = row.__dict__
+    return {name: loaded[name] if name in loaded else getattr(row, name) for name in names}
+
+
+def _copy_json(value):
+    """Shallow-copy a JSON dict / list so the model does not share it with the ORM row"""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _decimal_fields(model) -> frozenset:
+    return frozenset(
+        name for name, field in model.model_fields.items()
+        if field.annotation is Decimal or Decimal in get_args(field.annotation)
+    )
+
+
+# Fields copied straight across, derived from the table and the model so a new
+# column with a matching field needs no converter change. Both sides hold the
+# same Python types for these (checked by test_db_utils), which is what lets
+# the trusted read path skip validation.
+_LINE_ITEM_FIELDS = tuple(
+    name for name in LineItemPydantic.model_fields if name in LineItemDB.__table__.columns
+)
+_LINE_ITEM_DECIMALS = _decimal_fields(LineItemPydantic)
+
+_ADDRESS_FIELDS = ("vendor_address", "bill_to_address", "remit_to_address")
+# Invoice fields with their own conversion in both directions
+_CONVERTED_FIELDS = frozenset(_ADDRESS_FIELDS + ("line_items", "invoice_subtype", "extensions", "tax_breakdown"))
+_INVOICE_FIELDS = tuple(
+    name for name in InvoicePydantic.model_fields
+    if name in InvoiceDB.__table__.columns and name not in _CONVERTED_FIELDS
+)
+_INVOICE_JSON_FIELDS = frozenset(
+    name for name in _INVOICE_FIELDS if isinstance(InvoiceDB.__table__.columns[name].type, JSON)
+)
+# Values read as NULL (legacy rows, columns added later) that the model does not allow
+_READ_DEFAULTS = {
+    "review_version": lambda: 0,
+    "processing_state": lambda: "PENDING",
+    "currency": lambda: "CAD",
+    "extraction_confidence": lambda: 0.0,
+    "field_confidence": dict,
+}
+# Models _construct may build directly -> their field count (0: always use model_construct)
+_FAST_CONSTRUCT = {
+    model: len(model.model_fields) if _construct_fast(model) else 0
+    for model in (InvoicePydantic, LineItemPydantic, Address)
+}
+
+
+def _line_item_from_json(item: dict, index: int, build) -> LineItemPydantic:
+    values = {}
+    for name in _LINE_ITEM_FIELDS:
+        value = item.get(name)
+        values[name] = wire_to_decimal(value) if name in _LINE_ITEM_DECIMALS else value
+    if values["line_number"] is None:
+        values["line_number"] = index + 1
+    if values["description"] is None:
+        values["description"] = ""
+    if values["amount"] is None:
+        values["amount"] = Decimal("0")
+    if values["confidence"] is None:
+        values["confidence"] = 0.0
+    return build(values)
+
+
+def _construct_line_item(values: dict) -> LineItemPydantic:
+    return _construct(LineItemPydantic, values)
+
+
+def _validate_line_item(values: dict) -> LineItemPydantic:
+    return LineItemPydantic(**values)
+
+
+def json_to_line_items(data: Optional[dict], trusted: bool = False) -> list:
+    """Convert JSON data to list of LineItem Pydantic models, parsing decimal strings
+    
+    With ``trusted`` the models are built with ``model_construct`` (no
+    validation); use it only for JSON this module wrote.
+    """
     if not data:
         return []
     if isinstance(data, str):
         data = json.loads(data)
-    return [
-        LineItemPydantic(
-            line_number=item.get("line_number", i + 1),
-            description=item.get("description", ""),
-            quantity=wire_to_decimal(item.get("quantity")),
-            unit_price=wire_to_decimal(item.get("unit_price")),
-            amount=wire_to_decimal(item.get("amount")) or Decimal("0"),
-            tax_rate=wire_to_decimal(item.get("tax_rate")),
-            tax_amount=wire_to_decimal(item.get("tax_amount")),
-            gst_amount=wire_to_decimal(item.get("gst_amount")),
-            pst_amount=wire_to_decimal(item.get("pst_amount")),
-            qst_amount=wire_to_decimal(item.get("qst_amount")),
-            combined_tax=wire_to_decimal(item.get("combined_tax")),
-            confidence=item.get("confidence", 0.0),
-            unit_of_measure=item.get("unit_of_measure"),
-            project_code=item.get("project_code"),
-            region_code=item.get("region_code"),
-            airport_code=item.get("airport_code"),
-            cost_centre_code=item.get("cost_centre_code"),
-        )
-        for i, item in enumerate(data)
-    ]
+    build = _construct_line_item if trusted else _validate_line_item
+    return [_line_item_from_json(item, i, build) for i, item in enumerate(data)]
 
 
-def _get_line_items_from_db(invoice_db: InvoiceDB) -> list:
+def _line_item_from_row(item: LineItemDB, build) -> LineItemPydantic:
+    values = _row_values(item, _LINE_ITEM_FIELDS)
+    values["amount"] = values["amount"] or Decimal("0")
+    values["confidence"] = values["confidence"] or 0.0
+    return build(values)
+
+
+def _get_line_items_from_db(invoice_db: InvoiceDB, trusted: bool = False) -> list:
     """
     Get line items from database, checking table first, then falling back to JSON.
     
     This supports the migration period where line items may be in either location.
     Priority: line_items table > JSON column
     """
+    build = _construct_line_item if trusted else _validate_line_item
     # Try to get line items from table (relationship)
     # The relationship should be loaded via selectinload in DatabaseService.get_invoice
     try:
@@ -136,241 +249,116 @@ def _get_line_items_from_db(invoice_db: InvoiceDB) -> list:
                     items_list = list(relationship_items)
                     if items_list:  # Only return if we have items from table
                         # Convert from DB models to Pydantic models
-                        return [
-                            LineItemPydantic(
-                                line_number=item.line_number,
-                                description=item.description,
-                                quantity=item.quantity,
-                                unit_price=item.unit_price,
-                                amount=item.amount or Decimal("0"),
-                                confidence=item.confidence or 0.0,
-                                unit_of_measure=item.unit_of_measure,
-                                tax_rate=item.tax_rate,
-                                tax_amount=item.tax_amount,
-                                gst_amount=item.gst_amount,
-                                pst_amount=item.pst_amount,
-                                qst_amount=item.qst_amount,
-                                combined_tax=item.combined_tax,
-                                acceptance_percentage=item.acceptance_percentage,
-                                project_code=item.project_code,
-                                region_code=item.region_code,
-                                airport_code=item.airport_code,
-                                cost_centre_code=item.cost_centre_code,
-                            )
-                            for item in items_list
-                        ]
+                        return [_line_item_from_row(item, build) for item in items_list]
     except Exception as e:
         logger.debug(f"Could not load line items from relationship: {e}")
     
     # Fall back to JSON column (for backward compatibility during migration)
-    return json_to_line_items(invoice_db.line_items)
+    return json_to_line_items(invoice_db.line_items, trusted=trusted)
+
+
+def _subtype_to_db(invoice_pydantic: InvoicePydantic) -> Optional[str]:
+    """Convert invoice_subtype to string for DB storage, rejecting unknown values"""
+    if invoice_pydantic.invoice_subtype is None:
+        return None
+    if isinstance(invoice_pydantic.invoice_subtype, InvoiceSubtype):
+        # Standard case: Enum → string
+        return invoice_pydantic.invoice_subtype.value
+    if isinstance(invoice_pydantic.invoice_subtype, str):
+        # Legacy case: validate string is a valid subtype value
+        try:
+            InvoiceSubtype(invoice_pydantic.invoice_subtype)
+            return invoice_pydantic.invoice_subtype
+        except ValueError:
+            raise ValueError(
+                f"Invalid invoice_subtype: '{invoice_pydantic.invoice_subtype}'. "
+                f"Must be one of: {[e.value for e in InvoiceSubtype]}"
+            )
+    raise ValueError(
+        f"invoice_subtype must be InvoiceSubtype Enum or valid string, got {type(invoice_pydantic.invoice_subtype)}"
+    )
+
+
+def _subtype_from_db(invoice_db: InvoiceDB) -> Optional[InvoiceSubtype]:
+    """Convert invoice_subtype from DB string to Enum (None, with a warning, if unknown)"""
+    if not invoice_db.invoice_subtype:
+        return None
+    try:
+        return InvoiceSubtype(invoice_db.invoice_subtype)
+    except ValueError:
+        logger.warning(
+            f"Unknown invoice_subtype '{invoice_db.invoice_subtype}' for invoice {invoice_db.id}; "
+            f"setting to None. Valid values: {[e.value for e in InvoiceSubtype]}"
+        )
+        return None
 
 
 def pydantic_to_db_invoice(invoice_pydantic: InvoicePydantic) -> InvoiceDB:
-    """Convert Pydantic Invoice to SQLAlchemy Invoice (simplified)"""
+    """Convert Pydantic Invoice to SQLAlchemy Invoice
+    
+    Writes take a validated Invoice (built from API input, extraction or a
+    DB read) and re-check invoice_subtype; nothing here skips validation.
+    """
     if not invoice_pydantic.id:
         raise ValueError("Invoice.id (invoice_id) is required and is the primary key.")
 
-    # Convert invoice_subtype to string for DB storage
-    subtype_str = None
-    if invoice_pydantic.invoice_subtype is not None:
-        if isinstance(invoice_pydantic.invoice_subtype, InvoiceSubtype):
-            # Standard case: Enum → string
-            subtype_str = invoice_pydantic.invoice_subtype.value
-        elif isinstance(invoice_pydantic.invoice_subtype, str):
-            # Legacy case: validate string is a valid subtype value
-            try:
-                InvoiceSubtype(invoice_pydantic.invoice_subtype)
-                subtype_str = invoice_pydantic.invoice_subtype
-            except ValueError:
-                raise ValueError(
-                    f"Invalid invoice_subtype: '{invoice_pydantic.invoice_subtype}'. "
-                    f"Must be one of: {[e.value for e in InvoiceSubtype]}"
-                )
-        else:
-            raise ValueError(
-                f"invoice_subtype must be InvoiceSubtype Enum or valid string, got {type(invoice_pydantic.invoice_subtype)}"
-            )
+    values = {name: getattr(invoice_pydantic, name) for name in _INVOICE_FIELDS}
+    values["review_version"] = invoice_pydantic.review_version or 0
+    values["processing_state"] = invoice_pydantic.processing_state or "PENDING"
+    for name in _ADDRESS_FIELDS:
+        values[name] = address_to_dict(getattr(invoice_pydantic, name))
+    values["tax_breakdown"] = _sanitize_tax_breakdown(invoice_pydantic.tax_breakdown)
+    values["line_items"] = line_items_to_json(invoice_pydantic.line_items)
+    values["invoice_subtype"] = _subtype_to_db(invoice_pydantic)
+    values["extensions"] = invoice_pydantic.extensions.dict() if invoice_pydantic.extensions else None
+    return InvoiceDB(**values)
 
-    invoice_db = InvoiceDB(
-        id=invoice_pydantic.id,
-        file_path=invoice_pydantic.file_path,
-        file_name=invoice_pydantic.file_name,
-        upload_date=invoice_pydantic.upload_date,
-        status=invoice_pydantic.status,
-        review_version=invoice_pydantic.review_version or 0,
-        processing_state=invoice_pydantic.processing_state or "PENDING",
-        content_sha256=invoice_pydantic.content_sha256,
-        invoice_number=invoice_pydantic.invoice_number,
-        invoice_date=invoice_pydantic.invoice_date,
-        due_date=invoice_pydantic.due_date,
-        invoice_type=invoice_pydantic.invoice_type,
-        reference_number=invoice_pydantic.reference_number,
-        vendor_name=invoice_pydantic.vendor_name,
-        vendor_id=invoice_pydantic.vendor_id,
-        vendor_phone=invoice_pydantic.vendor_phone,
-        vendor_fax=invoice_pydantic.vendor_fax,
-        vendor_email=invoice_pydantic.vendor_email,
-        vendor_website=invoice_pydantic.vendor_website,
-        vendor_address=address_to_dict(invoice_pydantic.vendor_address),
-        gst_number=invoice_pydantic.gst_number,
-        qst_number=invoice_pydantic.qst_number,
-        pst_number=invoice_pydantic.pst_number,
-        business_number=invoice_pydantic.business_number,
-        customer_name=invoice_pydantic.customer_name,
-        customer_id=invoice_pydantic.customer_id,
-        customer_phone=invoice_pydantic.customer_phone,
-        customer_email=invoice_pydantic.customer_email,
-        customer_fax=invoice_pydantic.customer_fax,
-        entity=invoice_pydantic.entity,
-        bill_to_address=address_to_dict(invoice_pydantic.bill_to_address),
-        remit_to_address=address_to_dict(invoice_pydantic.remit_to_address),
-        remit_to_name=invoice_pydantic.remit_to_name,
-        contract_id=invoice_pydantic.contract_id,
-        standing_offer_number=invoice_pydantic.standing_offer_number,
-        po_number=invoice_pydantic.po_number,
-        period_start=invoice_pydantic.period_start,
-        period_end=invoice_pydantic.period_end,
-        shipping_date=invoice_pydantic.shipping_date,
-        delivery_date=invoice_pydantic.delivery_date,
-        subtotal=invoice_pydantic.subtotal,
-        discount_amount=invoice_pydantic.discount_amount,
-        shipping_amount=invoice_pydantic.shipping_amount,
-        handling_fee=invoice_pydantic.handling_fee,
-        deposit_amount=invoice_pydantic.deposit_amount,
-        # Canadian Tax Fields
-        gst_amount=invoice_pydantic.gst_amount,
-        gst_rate=invoice_pydantic.gst_rate,
-        hst_amount=invoice_pydantic.hst_amount,
-        hst_rate=invoice_pydantic.hst_rate,
-        qst_amount=invoice_pydantic.qst_amount,
-        qst_rate=invoice_pydantic.qst_rate,
-        pst_amount=invoice_pydantic.pst_amount,
-        pst_rate=invoice_pydantic.pst_rate,
-        tax_breakdown=_sanitize_tax_breakdown(invoice_pydantic.tax_breakdown),
-        tax_amount=invoice_pydantic.tax_amount,
-        total_amount=invoice_pydantic.total_amount,
-        currency=invoice_pydantic.currency,
-        acceptance_percentage=invoice_pydantic.acceptance_percentage,
-        tax_registration_number=invoice_pydantic.tax_registration_number,
-        payment_terms=invoice_pydantic.payment_terms,
-        payment_method=invoice_pydantic.payment_method,
-        payment_due_upon=invoice_pydantic.payment_due_upon,
-        line_items=line_items_to_json(invoice_pydantic.line_items),
-        invoice_subtype=subtype_str,
-        extensions=invoice_pydantic.extensions.dict() if invoice_pydantic.extensions else None,
-        extraction_confidence=invoice_pydantic.extraction_confidence,
-        field_confidence=invoice_pydantic.field_confidence,
-        extraction_timestamp=invoice_pydantic.extraction_timestamp,
-        review_status=invoice_pydantic.review_status,
-        reviewer=invoice_pydantic.reviewer,
-        review_timestamp=invoice_pydantic.review_timestamp,
-        review_notes=invoice_pydantic.review_notes,
-        bv_approver=invoice_pydantic.bv_approver,
-        bv_approval_date=invoice_pydantic.bv_approval_date,
-        bv_approval_notes=invoice_pydantic.bv_approval_notes,
-        fa_approver=invoice_pydantic.fa_approver,
-        fa_approval_date=invoice_pydantic.fa_approval_date,
-        fa_approval_notes=invoice_pydantic.fa_approval_notes,
-    )
-    return invoice_db
 
+def _trusted_address(data) -> Optional[Address]:
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = json.loads(data)
+    return _construct(Address, {name: data.get(name) for name in Address.model_fields})
 
-def db_to_pydantic_invoice(invoice_db: InvoiceDB) -> InvoicePydantic:
-    """Convert SQLAlchemy Invoice to Pydantic Invoice (simplified)"""
-    
-    # Convert invoice_subtype from DB string to Enum
-    subtype_enum = None
-    if invoice_db.invoice_subtype:
-        try:
-            subtype_enum = InvoiceSubtype(invoice_db.invoice_subtype)
-        except ValueError:
-            logger.warning(
-                f"Unknown invoice_subtype '{invoice_db.invoice_subtype}' for invoice {invoice_db.id}; "
-                f"setting to None. Valid values: {[e.value for e in InvoiceSubtype]}"
-            )
-            subtype_enum = None
+
+def _trusted_tax_breakdown(tb: Optional[dict]) -> Optional[dict]:
+    if tb is None:
+        return None
+    return {k: wire_to_decimal(v) for k, v in tb.items()}
+
+
+def db_to_pydantic_invoice(invoice_db: InvoiceDB, validate: bool = False) -> InvoicePydantic:
+    """Convert SQLAlchemy Invoice to Pydantic Invoice
     
-    invoice_pydantic = InvoicePydantic(
-        id=invoice_db.id,
-        file_path=invoice_db.file_path,
-        file_name=invoice_db.file_name,
-        upload_date=invoice_db.upload_date,
-        status=invoice_db.status,
-        review_version=invoice_db.review_version or 0,
-        processing_state=invoice_db.processing_state or "PENDING",
-        content_sha256=invoice_db.content_sha256,
-        invoice_number=invoice_db.invoice_number,
-        invoice_date=invoice_db.invoice_date,
-        due_date=invoice_db.due_date,
-        invoice_type=invoice_db.invoice_type,
-        reference_number=invoice_db.reference_number,
-        vendor_name=invoice_db.vendor_name,
-        vendor_id=invoice_db.vendor_id,
-        vendor_phone=invoice_db.vendor_phone,
-        vendor_fax=invoice_db.vendor_fax,
-        vendor_email=invoice_db.vendor_email,
-        vendor_website=invoice_db.vendor_website,
-        vendor_address=dict_to_address(invoice_db.vendor_address),
-        gst_number=invoice_db.gst_number,
-        qst_number=invoice_db.qst_number,
-        pst_number=invoice_db.pst_number,
-        business_number=invoice_db.business_number,
-        customer_name=invoice_db.customer_name,
-        customer_id=invoice_db.customer_id,
-        customer_phone=invoice_db.customer_phone,
-        customer_email=invoice_db.customer_email,
-        customer_fax=invoice_db.customer_fax,
-        entity=invoice_db.entity,
-        bill_to_address=dict_to_address(invoice_db.bill_to_address),
-        remit_to_address=dict_to_address(invoice_db.remit_to_address),
-        remit_to_name=invoice_db.remit_to_name,
-        contract_id=invoice_db.contract_id,
-        standing_offer_number=invoice_db.standing_offer_number,
-        period_start=invoice_db.period_start,
-        period_end=invoice_db.period_end,
-        shipping_date=invoice_db.shipping_date,
-        delivery_date=invoice_db.delivery_date,
-        subtotal=invoice_db.subtotal,
-        discount_amount=invoice_db.discount_amount,
-        shipping_amount=invoice_db.shipping_amount,
-        handling_fee=invoice_db.handling_fee,
-        deposit_amount=invoice_db.deposit_amount,
-        # Canadian Tax Fields
-        gst_amount=invoice_db.gst_amount,
-        gst_rate=invoice_db.gst_rate,
-        hst_amount=invoice_db.hst_amount,
-        hst_rate=invoice_db.hst_rate,
-        qst_amount=invoice_db.qst_amount,
-        qst_rate=invoice_db.qst_rate,
-        pst_amount=invoice_db.pst_amount,
-        pst_rate=invoice_db.pst_rate,
-        tax_breakdown=invoice_db.tax_breakdown,
-        tax_amount=invoice_db.tax_amount,
-        total_amount=invoice_db.total_amount,
-        currency=invoice_db.currency or "CAD",
-        acceptance_percentage=invoice_db.acceptance_percentage,
-        tax_registration_number=invoice_db.tax_registration_number,
-        payment_terms=invoice_db.payment_terms,
-        payment_method=invoice_db.payment_method,
-        payment_due_upon=invoice_db.payment_due_upon,
-        po_number=invoice_db.po_number,
-        line_items=_get_line_items_from_db(invoice_db),
-        extraction_confidence=invoice_db.extraction_confidence or 0.0,
-        extraction_timestamp=invoice_db.extraction_timestamp,
-        field_confidence=invoice_db.field_confidence or {},
-        invoice_subtype=subtype_enum,
-        extensions=invoice_db.extensions,
-        review_status=invoice_db.review_status,
-        reviewer=invoice_db.reviewer,
-        review_timestamp=invoice_db.review_timestamp,
-        review_notes=invoice_db.review_notes,
-        bv_approver=invoice_db.bv_approver,
-        bv_approval_date=invoice_db.bv_approval_date,
-        bv_approval_notes=invoice_db.bv_approval_notes,
-        fa_approver=invoice_db.fa_approver,
-        fa_approval_date=invoice_db.fa_approval_date,
-        fa_approval_notes=invoice_db.fa_approval_notes,
-    )
-    return invoice_pydantic
+    Rows come from a schema this module writes, whose column types match the
+    model field types, so by default the model, its addresses and line items
+    are built with ``model_construct`` and skip Pydantic validation (the
+    expensive part of listing invoices). Extensions are still validated: they
+    are nested, free-form JSON and rarely set. Pass ``validate=True`` for rows
+    of unknown provenance (imports, hand-edited data) to get full validation.
+    """
+    values = _row_values(invoice_db, _INVOICE_FIELDS)
+    for name, default in _READ_DEFAULTS.items():
+        if not values[name]:
+            values[name] = default()
+    for name in _INVOICE_JSON_FIELDS:
+        values[name] = _copy_json(values[name])
+    values["invoice_subtype"] = _subtype_from_db(invoice_db)
 
+    if validate:
+        for name in _ADDRESS_FIELDS:
+            values[name] = dict_to_address(getattr(invoice_db, name))
+        values["tax_breakdown"] = invoice_db.tax_breakdown
+        values["line_items"] = _get_line_items_from_db(invoice_db)
+        values["extensions"] = invoice_db.extensions
+        return InvoicePydantic(**values)
+
+    for name in _ADDRESS_FIELDS:
+        values[name] = _trusted_address(getattr(invoice_db, name))
+    values["tax_breakdown"] = _trusted_tax_breakdown(invoice_db.tax_breakdown)
+    values["line_items"] = _get_line_items_from_db(invoice_db, trusted=True)
+    values["extensions"] = (
+        InvoiceExtensions.model_validate(invoice_db.extensions) if invoice_db.extensions else None
+    )
+    return _construct(InvoicePydantic, values)
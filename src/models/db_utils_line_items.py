@@ -3,11 +3,16 @@ Helper functions for saving line items to the database table.
 
 This module provides functions to save line items to the line_items table
 instead of the JSON column, supporting the migration from JSON to table-based storage.
+
+Writes are set-based: new invoices get one executemany INSERT, and later
+saves diff the incoming lines against the stored rows by
+``(invoice_id, line_number)`` so only added, changed or removed lines are
+touched.
 """
 
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, update
 import logging
 import uuid
 
@@ -16,57 +21,139 @@ from .line_item_db_models import LineItem as LineItemDB
 
 logger = logging.getLogger(__name__)
 
+# Data columns copied between the Pydantic model and the table (everything but id / invoice_id)
+LINE_ITEM_COLUMNS = (
+    "line_number",
+    "description",
+    "quantity",
+    "unit_price",
+    "amount",
+    "confidence",
+    "unit_of_measure",
+    "tax_rate",
+    "tax_amount",
+    "gst_amount",
+    "pst_amount",
+    "qst_amount",
+    "combined_tax",
+    "acceptance_percentage",
+    "project_code",
+    "region_code",
+    "airport_code",
+    "cost_centre_code",
+)
+
+# Ids per DELETE ... IN (...) statement; stays under SQLite / SQL Server parameter limits
+_DELETE_CHUNK = 500
+
+
+def line_item_values(item: LineItemPydantic) -> Dict[str, Any]:
+    """Column values for one line item (fields missing on the model are stored as NULL)"""
+    values = {name: getattr(item, name, None) for name in LINE_ITEM_COLUMNS}
+    values["confidence"] = values["confidence"] or 0.0
+    return values
+
+
+async def insert_line_items(
+    session: AsyncSession,
+    invoice_id: str,
+    line_items: Optional[List[LineItemPydantic]],
+) -> int:
+    """
+    Insert line items with a single executemany INSERT.
+
+    Use for invoices that have no stored line items yet.
+
+    Returns:
+        Number of rows inserted
+    """
+    if not line_items:
+        return 0
+    rows = [
+        {"id": str(uuid.uuid4()), "invoice_id": invoice_id, **line_item_values(item)}
+        for item in line_items
+    ]
+    await session.execute(insert(LineItemDB), rows)
+    return len(rows)
+
 
 async def save_line_items_to_table(
     session: AsyncSession,
     invoice_id: str,
     line_items: Optional[List[LineItemPydantic]],
-) -> None:
+) -> Dict[str, int]:
     """
     Save line items to the line_items table.
-    
+
     This function:
-    1. Deletes existing line items for the invoice
-    2. Inserts new line items from the Pydantic model
-    
+    1. Loads the stored line items for the invoice (columns only, no ORM objects)
+    2. Bulk-inserts every line when nothing is stored yet
+    3. Otherwise matches lines on line_number and issues one executemany
+       INSERT for new lines, one UPDATE-by-primary-key batch for changed
+       lines and one DELETE for lines that are gone; unchanged rows are not
+       written
+
+    If line numbers are duplicated (in the input or in storage) lines cannot
+    be matched, so the invoice's line items are replaced wholesale.
+
     Args:
         session: Database session
         invoice_id: Invoice ID
         line_items: List of LineItem Pydantic models (None or empty list to clear)
+
+    Returns:
+        Counts of inserted, updated, deleted and unchanged lines
     """
-    # Delete existing line items for this invoice
-    await session.execute(
-        delete(LineItemDB).where(LineItemDB.invoice_id == invoice_id)
+    line_items = line_items or []
+    result = await session.execute(
+        select(LineItemDB.id, *(getattr(LineItemDB, name) for name in LINE_ITEM_COLUMNS))
+        .where(LineItemDB.invoice_id == invoice_id)
     )
-    
-    # Insert new line items
-    if line_items:
-        for item in line_items:
-            line_item_db = LineItemDB(
-                id=str(uuid.uuid4()),
-                invoice_id=invoice_id,
-                line_number=item.line_number,
-                description=item.description,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                amount=item.amount,
-                confidence=item.confidence or 0.0,
-                unit_of_measure=item.unit_of_measure,
-                tax_rate=item.tax_rate,
-                tax_amount=item.tax_amount,
-                gst_amount=item.gst_amount,
-                pst_amount=item.pst_amount,
-                qst_amount=item.qst_amount,
-                combined_tax=item.combined_tax,
-                acceptance_percentage=item.acceptance_percentage,
-                project_code=item.project_code,
-                region_code=item.region_code,
-                airport_code=item.airport_code,
-                cost_centre_code=item.cost_centre_code,
-            )
-            session.add(line_item_db)
-        
-        logger.debug(f"Saved {len(line_items)} line items to table for invoice {invoice_id}")
+    stored = result.mappings().all()
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    if not stored:
+        counts["inserted"] = await insert_line_items(session, invoice_id, line_items)
+        logger.debug(f"Inserted {counts['inserted']} line items for invoice {invoice_id}")
+        return counts
+
+    incoming = {item.line_number: item for item in line_items}
+    existing = {row["line_number"]: row for row in stored}
+    if len(incoming) != len(line_items) or len(existing) != len(stored):
+        await session.execute(delete(LineItemDB).where(LineItemDB.invoice_id == invoice_id))
+        counts["deleted"] = len(stored)
+        counts["inserted"] = await insert_line_items(session, invoice_id, line_items)
+        logger.debug(f"Replaced line items for invoice {invoice_id} (duplicate line numbers)")
+        return counts
+
+    to_insert = []
+    to_update = []
+    for line_number, item in incoming.items():
+        row = existing.get(line_number)
+        values = line_item_values(item)
+        if row is None:
+            to_insert.append(item)
+        elif any(row[name] != values[name] for name in LINE_ITEM_COLUMNS):
+            to_update.append({"id": row["id"], **values})
+        else:
+            counts["unchanged"] += 1
+    to_delete = [row["id"] for line_number, row in existing.items() if line_number not in incoming]
+
+    if to_update:
+        # ORM bulk UPDATE by primary key: one executemany statement
+        await session.execute(update(LineItemDB), to_update)
+    for start in range(0, len(to_delete), _DELETE_CHUNK):
+        await session.execute(
+            delete(LineItemDB).where(LineItemDB.id.in_(to_delete[start:start + _DELETE_CHUNK]))
+        )
+    counts["inserted"] = await insert_line_items(session, invoice_id, to_insert)
+    counts["updated"] = len(to_update)
+    counts["deleted"] = len(to_delete)
+    logger.debug(
+        f"Line items for invoice {invoice_id}: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+    )
+    return counts
 
 
 async def get_line_items_from_table(
@@ -0,0 +1,141 @@
+"""
+Helper functions for the invoice full-text search index.
+
+Each invoice has one row in invoice_search_documents holding the text that
+search matches: vendor name, invoice / PO / reference numbers, line item
+descriptions and the Document Intelligence content. The full-text index
+over that table (FTS5 on SQLite, FULLTEXT on SQL Server) is maintained by
+the database, so keeping search current is a matter of rewriting an
+invoice's row in the same transaction as the change to the invoice.
+
+Numbers are stored with every suffix (of 3+ characters) of their
+alphanumeric form, so a prefix query finds a fragment from anywhere in the
+number: "4001" matches INV-2024-001234 through the suffix "4001234".
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+import logging
+import re
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from .db_models import Invoice as InvoiceDB, InvoiceSearchDocument, INVOICE_SEARCH_FTS_TABLE
+from .line_item_db_models import LineItem as LineItemDB
+
+logger = logging.getLogger(__name__)
+
+# Invoice columns indexed as numbers (matched by fragment)
+NUMBER_COLUMNS = ("invoice_number", "po_number", "reference_number", "contract_id", "standing_offer_number")
+
+# Shortest number fragment indexed on its own
+_MIN_FRAGMENT = 3
+# Terms of a query beyond this are ignored
+MAX_QUERY_TERMS = 8
+
+# Marks "leave document_text as stored" (validation edits do not carry the DI text)
+KEEP_DOCUMENT_TEXT = object()
+
+
+def number_search_text(numbers: List[Optional[str]]) -> Optional[str]:
+    """Numbers plus the suffixes of their alphanumeric form, space separated"""
+    terms: List[str] = []
+    for number in numbers:
+        if not number:
+            continue
+        terms.append(number)
+        compact = re.sub(r"[\W_]+", "", number)
+        terms.extend(compact[start:] for start in range(len(compact) - _MIN_FRAGMENT + 1))
+    return " ".join(dict.fromkeys(terms)) or None
+
+
+def search_terms(query: str) -> List[str]:
+    """Words of a user query that can match something (have a letter or digit)"""
+    words = [word.replace('"', "") for word in query.split()]
+    return [word for word in words if re.search(r"\w", word)][:MAX_QUERY_TERMS]
+
+
+def fts5_match(terms: List[str]) -> str:
+    """FTS5 MATCH expression: every term, each as a quoted prefix phrase"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def mssql_contains(terms: List[str]) -> str:
+    """SQL Server CONTAINS expression: every term as a prefix term"""
+    return " AND ".join(f'"{term}*"' for term in terms)
+
+
+async def sqlite_fts_ready(session: AsyncSession) -> bool:
+    """Whether the FTS5 table exists (it is skipped on SQLite builds without FTS5)"""
+    result = await session.execute(text(f"PRAGMA table_info({INVOICE_SEARCH_FTS_TABLE})"))
+    return result.first() is not None
+
+
+async def build_search_document(session: AsyncSession, invoice_id: str) -> Optional[Dict[str, Any]]:
+    """Searchable text for an invoice from its stored row and line items (None if it does not exist)"""
+    result = await session.execute(
+        select(InvoiceDB.vendor_name, *(getattr(InvoiceDB, name) for name in NUMBER_COLUMNS))
+        .where(InvoiceDB.id == invoice_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    descriptions = (await session.execute(
+        select(LineItemDB.description)
+        .where(LineItemDB.invoice_id == invoice_id)
+        .order_by(LineItemDB.line_number)
+    )).scalars().all()
+    if not descriptions:
+        # Line items only in the legacy JSON column
+        items = (await session.execute(
+            select(InvoiceDB.line_items).where(InvoiceDB.id == invoice_id)
+        )).scalar()
+        if isinstance(items, str):
+            items = json.loads(items)
+        descriptions = [item.get("description") for item in items or [] if isinstance(item, dict)]
+
+    return {
+        "vendor_name": row.vendor_name,
+        "numbers": number_search_text([getattr(row, name) for name in NUMBER_COLUMNS]),
+        "line_descriptions": "\n".join(d for d in descriptions if d) or None,
+    }
+
+
+async def save_search_document(
+    session: AsyncSession,
+    invoice_id: str,
+    document_text: Any = KEEP_DOCUMENT_TEXT,
+) -> bool:
+    """
+    Rewrite an invoice's search document from its current row (no commit)
+
+    Args:
+        session: Session whose transaction also holds the invoice change
+        invoice_id: Invoice to index
+        document_text: Document Intelligence content; KEEP_DOCUMENT_TEXT
+            leaves the stored text as is
+
+    Returns:
+        False if the invoice does not exist (its document, if any, is removed)
+    """
+    values = await build_search_document(session, invoice_id)
+    if values is None:
+        await session.execute(delete(InvoiceSearchDocument).where(InvoiceSearchDocument.invoice_id == invoice_id))
+        return False
+
+    values["updated_at"] = datetime.utcnow()
+    if document_text is not KEEP_DOCUMENT_TEXT:
+        max_chars = getattr(settings, "SEARCH_DOCUMENT_TEXT_MAX_CHARS", 200000)
+        values["document_text"] = document_text[:max_chars] if document_text else None
+
+    result = await session.execute(
+        update(InvoiceSearchDocument).where(InvoiceSearchDocument.invoice_id == invoice_id).values(**values)
+    )
+    if not result.rowcount:
+        values.setdefault("document_text", None)
+        await session.execute(insert(InvoiceSearchDocument).values(invoice_id=invoice_id, **values))
+    return True
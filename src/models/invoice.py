@@ -115,6 +115,7 @@ class Invoice(BaseModel):
     review_version: int = 0
     processing_state: str = "PENDING"  # PENDING, PROCESSING, EXTRACTED, FAILED
     content_sha256: Optional[str] = None
+    scan_profile: Optional[Dict[str, Any]] = None  # Scanned/text page map computed at ingestion
     
     # Extracted Data - Header
     invoice_number: Optional[str] = None
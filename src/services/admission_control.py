@@ -0,0 +1,259 @@
+"""Admission control for new work when extraction is saturated
+
+Ingestion used to accept uploads as fast as clients sent them, whatever the
+state of the extraction backlog or the Document Intelligence / Azure OpenAI
+capacity behind it. The admission controller looks at
+
+* the extraction backlog (invoices PENDING or PROCESSING),
+* calls queued for the shared DI / LLM slots, and
+* the observed DI / LLM latency (smoothed time a slot is held),
+
+and classifies the load as ``ok``, ``busy`` or ``saturated``. While saturated,
+ingestion endpoints answer 429 with ``Retry-After``; clients that pass
+``defer=true`` are accepted instead, up to a larger deferred-backlog cap.
+Deferral is not recorded anywhere: upload endpoints never start extraction,
+so for them ``defer`` only skips the 429 (the invoice is PENDING like any
+other), while Azure imports ingest without extracting. Whoever later runs
+extraction (process-pending, the job queue) should pace itself on
+``GET /api/load``, which reports the same snapshot.
+"""
+
+from typing import Any, Callable, Dict, Optional
+from datetime import datetime
+import logging
+import math
+import time
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models.database import get_db
+from src.models.invoice import InvoiceState
+from src.services.priority_scheduler import shared_limiter
+
+logger = logging.getLogger(__name__)
+
+# Shared resources whose queueing and latency gate admission, with their latency setting
+_GATED_RESOURCES = {
+    "di": ("ADMISSION_MAX_DI_LATENCY_SECONDS", 120.0),
+    "llm": ("ADMISSION_MAX_LLM_LATENCY_SECONDS", 180.0),
+}
+# Per-invoice DI time assumed for Retry-After before any latency was observed
+_DEFAULT_DI_SECONDS = 10.0
+
+
+class AdmissionController:
+    """Load snapshot and admit / defer / reject decisions for new work"""
+
+    def __init__(
+        self,
+        max_backlog: Optional[int] = None,
+        max_deferred_backlog: Optional[int] = None,
+        busy_ratio: Optional[float] = None,
+        max_queued_calls: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+        backlog_counter: Optional[Callable[..., Any]] = None,
+    ):
+        """
+        Initialize the controller
+
+        Args:
+            max_backlog: Backlog (PENDING + PROCESSING invoices) at which new work is refused
+            max_deferred_backlog: Backlog at which even deferred uploads are refused
+            busy_ratio: Fraction of max_backlog reported as ``busy``
+            max_queued_calls: Calls waiting for a DI or LLM slot at which new work is refused
+            refresh_seconds: How long a load snapshot is reused
+            backlog_counter: Async ``(db) -> {state: count}`` (defaults to DatabaseService)
+        """
+        self.max_backlog = max_backlog or getattr(settings, "ADMISSION_MAX_BACKLOG", 500)
+        self.max_deferred_backlog = max(
+            self.max_backlog,
+            max_deferred_backlog or getattr(settings, "ADMISSION_MAX_DEFERRED_BACKLOG", 2000),
+        )
+        self.busy_ratio = busy_ratio or getattr(settings, "ADMISSION_BUSY_RATIO", 0.8)
+        self.max_queued_calls = max_queued_calls or getattr(settings, "ADMISSION_MAX_QUEUED_CALLS", 64)
+        self.refresh_seconds = (
+            refresh_seconds if refresh_seconds is not None
+            else getattr(settings, "ADMISSION_REFRESH_SECONDS", 2.0)
+        )
+        self._backlog_counter = backlog_counter
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_at = 0.0
+        # Work admitted since the snapshot was taken (not yet in its backlog count)
+        self._admitted_since = 0
+
+    async def _count_backlog(self, db: Optional[AsyncSession]) -> int:
+        if self._backlog_counter is not None:
+            counts = await self._backlog_counter(db)
+        else:
+            from src.services.db_service import DatabaseService
+            counts = await DatabaseService.count_invoices_by_state(db=db)
+        return counts.get(InvoiceState.PENDING.value, 0) + counts.get(InvoiceState.PROCESSING.value, 0)
+
+    async def load(self, db: Optional[AsyncSession] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Current load snapshot (cached for ``refresh_seconds``)"""
+        now = time.monotonic()
+        if refresh or self._snapshot is None or now - self._snapshot_at >= self.refresh_seconds:
+            try:
+                backlog = await self._count_backlog(db)
+            except Exception as e:
+                # Fail open: admission must not take ingestion down with the DB count
+                logger.warning(f"Backlog count failed, admitting on DI / LLM signals only: {e}")
+                backlog = 0
+            self._snapshot = self._build_snapshot(backlog)
+            self._snapshot_at = now
+            self._admitted_since = 0
+        return dict(self._snapshot, backlog=self._snapshot["backlog"] + self._admitted_since)
+
+    def _build_snapshot(self, backlog: int) -> Dict[str, Any]:
+        reasons = []
+        resources: Dict[str, Any] = {}
+        queued_calls = 0
+        for resource, (setting, default) in _GATED_RESOURCES.items():
+            limiter = shared_limiter(resource)
+            stats = limiter.stats()
+            max_latency = getattr(settings, setting, default)
+            queued_calls += stats["waiting"]
+            # A latency sample only says something while the resource is in use
+            in_use = stats["active"] or stats["waiting"]
+            if in_use and limiter.latency_seconds is not None and limiter.latency_seconds > max_latency:
+                reasons.append(f"{resource}_latency")
+            resources[resource] = dict(stats, max_latency_seconds=max_latency)
+
+        if backlog >= self.max_backlog:
+            reasons.append("backlog")
+        if queued_calls >= self.max_queued_calls:
+            reasons.append("queued_calls")
+
+        if reasons:
+            status = "saturated"
+        elif backlog >= self.max_backlog * self.busy_ratio or queued_calls:
+            status = "busy"
+        else:
+            status = "ok"
+
+        return {
+            "status": status,
+            "accepting": not reasons,
+            "reasons": reasons,
+            "backlog": backlog,
+            "max_backlog": self.max_backlog,
+            "max_deferred_backlog": self.max_deferred_backlog,
+            "queued_calls": queued_calls,
+            "resources": resources,
+            "retry_after_seconds": self._retry_after(backlog, reasons),
+            "checked_at": datetime.utcnow(),
+        }
+
+    def _retry_after(self, backlog: int, reasons) -> int:
+        if not reasons:
+            return 0
+        di = shared_limiter("di")
+        per_invoice = (di.latency_seconds or _DEFAULT_DI_SECONDS) / di.concurrency
+        # Time for the backlog to drain back below the busy threshold
+        excess = max(1.0, backlog - self.max_backlog * self.busy_ratio)
+        estimate = excess * per_invoice
+        for resource in ("di", "llm"):
+            if f"{resource}_latency" in reasons:
+                estimate = max(estimate, shared_limiter(resource).latency_seconds or 0.0)
+        low = getattr(settings, "ADMISSION_RETRY_AFTER_MIN_SECONDS", 5)
+        high = getattr(settings, "ADMISSION_RETRY_AFTER_MAX_SECONDS", 300)
+        return int(min(high, max(low, math.ceil(estimate))))
+
+    async def check(self, incoming: int = 1, defer: bool = False, db: Optional[AsyncSession] = None) -> Dict[str, Any]:
+        """
+        Decide whether ``incoming`` new invoices may be accepted
+
+        Returns the load snapshot plus ``admitted`` (bool) and ``deferred``
+        (accepted only because the caller passed ``defer``).
+        """
+        load = await self.load(db=db)
+        backlog_after = load["backlog"] + incoming
+        admitted = load["accepting"] and backlog_after <= self.max_backlog
+        deferred = False
+        if not admitted and defer and backlog_after <= self.max_deferred_backlog:
+            admitted = deferred = True
+        if admitted:
+            self._admitted_since += incoming
+        else:
+            logger.info(
+                f"Admission refused for {incoming} invoice(s): status={load['status']} "
+                f"backlog={load['backlog']} reasons={load['reasons']}"
+            )
+        retry_after = 0
+        if deferred or not admitted:
+            retry_after = load["retry_after_seconds"] or getattr(settings, "ADMISSION_RETRY_AFTER_MIN_SECONDS", 5)
+        return dict(load, admitted=admitted, deferred=deferred, retry_after_seconds=retry_after)
+
+    async def check_headroom(self, defer: bool = False, db: Optional[AsyncSession] = None) -> Dict[str, Any]:
+        """
+        Decide how many invoices an uncapped job (e.g. a full container import) may add
+
+        That is the room left below ``max_backlog`` or, when saturated and the
+        caller passed ``defer``, below ``max_deferred_backlog``. Returns the
+        ``check`` decision for that many, with the count in ``incoming``.
+        """
+        load = await self.load(db=db)
+        incoming = self.max_backlog - load["backlog"] if load["accepting"] else 0
+        if incoming <= 0 and defer:
+            incoming = self.max_deferred_backlog - load["backlog"]
+        incoming = max(1, incoming)
+        return dict(await self.check(incoming=incoming, defer=defer, db=db), incoming=incoming)
+
+
+admission_controller = AdmissionController()
+
+
+def enforce_admission(decision: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise 429 with ``Retry-After`` for a refused admission decision"""
+    if not decision["admitted"]:
+        retry_after = decision["retry_after_seconds"]
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "message": "Extraction is saturated; retry later or upload with defer=true",
+                "status": decision["status"],
+                "reasons": decision["reasons"],
+                "backlog": decision["backlog"],
+                "retry_after_seconds": retry_after,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+    return decision
+
+
+async def admit(
+    incoming: int = 1,
+    defer: bool = False,
+    db: Optional[AsyncSession] = None,
+) -> Dict[str, Any]:
+    """Admission decision for ``incoming`` invoices; raises 429 when refused"""
+    if not getattr(settings, "ADMISSION_CONTROL_ENABLED", True):
+        return {"admitted": True, "deferred": False, "status": "ok", "retry_after_seconds": 0}
+    return enforce_admission(await admission_controller.check(incoming=incoming, defer=defer, db=db))
+
+
+async def admit_headroom(defer: bool = False, db: Optional[AsyncSession] = None) -> Dict[str, Any]:
+    """
+    Admission decision for a job with no size limit; raises 429 when refused
+
+    ``incoming`` is how many invoices the job may add (the backlog headroom),
+    or 0 (no limit) when admission control is disabled.
+    """
+    if not getattr(settings, "ADMISSION_CONTROL_ENABLED", True):
+        return {"admitted": True, "deferred": False, "status": "ok", "retry_after_seconds": 0, "incoming": 0}
+    return enforce_admission(await admission_controller.check_headroom(defer=defer, db=db))
+
+
+async def admit_ingestion(
+    defer: bool = Query(False, description="Accept while saturated instead of answering 429"),
+    db: AsyncSession = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    FastAPI dependency gating endpoints that add one invoice to the backlog
+
+    Raises 429 with ``Retry-After`` when the backlog or DI / LLM capacity is
+    saturated, unless the client asked to be deferred.
+    """
+    return await admit(incoming=1, defer=defer, db=db)
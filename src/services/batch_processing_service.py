@@ -1,17 +1,22 @@
 """Batch processing service for multiple invoices"""
 
-import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable
 from datetime import datetime
+import asyncio
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.extraction.extraction_service import ExtractionService
+from src.config import settings
+from src.extraction.extraction_service import ExtractionService, ExtractionContext, new_lease_owner
 from src.services.db_service import DatabaseService
+from src.services.extraction_pipeline import ExtractionPipeline
 
 logger = logging.getLogger(__name__)
 
+# Invoice ids per bulk claim statement; stays under SQLite / SQL Server parameter limits
+_CLAIM_CHUNK = 500
+
 
 class BatchProcessingService:
     """Service for batch processing multiple invoices"""
@@ -19,80 +24,137 @@ class BatchProcessingService:
     def __init__(
         self,
         extraction_service: Optional[ExtractionService] = None,
-        max_concurrent: int = 5
+        max_concurrent: Optional[int] = None,
+        pipeline: Optional[ExtractionPipeline] = None,
     ):
         """
         Initialize batch processing service
         
         Args:
             extraction_service: ExtractionService instance
-            max_concurrent: Maximum number of concurrent extractions
+            max_concurrent: Maximum number of invoices in flight at once
+                (per-stage limits are PIPELINE_* settings)
+            pipeline: ExtractionPipeline instance (built from the above if omitted)
         """
-        self.extraction_service = extraction_service or ExtractionService()
-        self.max_concurrent = max_concurrent
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        if extraction_service is None:
+            from src.services.service_container import get_service_container
+            extraction_service = get_service_container().extraction_service
+        self.extraction_service = extraction_service
+        self.pipeline = pipeline or ExtractionPipeline(
+            extraction_service=self.extraction_service,
+            max_in_flight=max_concurrent,
+        )
+        self.max_concurrent = self.pipeline.max_in_flight
     
     async def process_batch(
         self,
         invoice_ids: List[str],
-        db: Optional[AsyncSession] = None
+        db: Optional[AsyncSession] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        lease_owner: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Process a batch of invoices concurrently
         
+        Invoices are claimed just in time: a chunk of ids is claimed in bulk
+        (one UPDATE ... RETURNING, returning their file info) only when the
+        pipeline has room for more, so invoices further down the batch stay
+        PENDING instead of holding leases they cannot use yet. Ids that cannot
+        be claimed are reported as conflicts, or as not found. If the batch is
+        cut short, the leases it still holds are handed back (PENDING).
+        
         Args:
             invoice_ids: List of invoice IDs to process
             db: Optional database session
+            on_result: Awaited with each invoice's entry as soon as it finishes
+            lease_owner: Owner to claim the invoices under (default a new one),
+                so the caller can release the leases if the batch is cut short
             
         Returns:
             {
                 "total": int,
                 "succeeded": int,
                 "failed": int,
-                "results": [{"invoice_id": str, "status": str, "result": dict}]
+                "elapsed_seconds": float,
+                "stage_timings": {stage: {"resource", "count", "seconds"}},
+                "results": [{"invoice_id": str, "status": str, "result": dict,
+                             "elapsed_seconds": float, "stage_timings": dict}]
             }
         """
         logger.info(f"Starting batch processing for {len(invoice_ids)} invoices")
         start_time = datetime.utcnow()
-        
-        # Create tasks for all invoices
-        tasks = [
-            self._process_single(invoice_id, db)
-            for invoice_id in invoice_ids
-        ]
-        
-        # Execute with concurrency limit
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Aggregate results
-        succeeded = 0
-        failed = 0
-        processed_results = []
-        
-        for invoice_id, result in zip(invoice_ids, results):
-            if isinstance(result, Exception):
-                logger.error(f"Batch processing error for {invoice_id}: {result}")
-                processed_results.append({
-                    "invoice_id": invoice_id,
-                    "status": "error",
-                    "error": str(result)
-                })
-                failed += 1
-            elif result.get("status") == "extracted":
-                processed_results.append({
-                    "invoice_id": invoice_id,
-                    "status": "success",
-                    "result": result
-                })
-                succeeded += 1
-            else:
-                processed_results.append({
-                    "invoice_id": invoice_id,
-                    "status": "failed",
-                    "result": result
-                })
-                failed += 1
-        
+        lease_owner = lease_owner or new_lease_owner()
+        # One in-flight window per claim; stays under the statement parameter limits
+        chunk_size = min(_CLAIM_CHUNK, self.pipeline.max_in_flight)
+        entries: Dict[int, Dict[str, Any]] = {}
+        positions: Dict[int, int] = {}
+        
+        async def emit(index: int, entry: Dict[str, Any]) -> None:
+            entries[index] = entry
+            if on_result is not None:
+                await on_result(entry)
+        
+        async def claimed_contexts() -> AsyncIterator[ExtractionContext]:
+            # Pulled by the pipeline only when an in-flight slot is free
+            for chunk_start in range(0, len(invoice_ids), chunk_size):
+                chunk = invoice_ids[chunk_start:chunk_start + chunk_size]
+                claimed = await DatabaseService.claim_batch_for_extraction(
+                    invoice_ids=chunk, lease_owner=lease_owner, db=db
+                )
+                claimed_by_id = {row["invoice_id"]: row for row in claimed}
+                unclaimed = [invoice_id for invoice_id in chunk if invoice_id not in claimed_by_id]
+                existing = set(claimed_by_id) | set(await DatabaseService.get_states(unclaimed, db=db) if unclaimed else {})
+                contexts = []
+                for index, invoice_id in enumerate(chunk, start=chunk_start):
+                    row = claimed_by_id.pop(invoice_id, None)
+                    if row is not None:
+                        ctx = ExtractionContext(
+                            invoice_id=invoice_id,
+                            file_identifier=row["file_path"],
+                            file_name=row["file_name"],
+                            upload_date=row["upload_date"],
+                            db=db,
+                            lease_owner=lease_owner,
+                            claimed=True,
+                        )
+                        positions[id(ctx)] = index
+                        contexts.append(ctx)
+                    elif invoice_id in existing:
+                        await emit(index, self._result_entry(invoice_id, {
+                            "invoice_id": invoice_id,
+                            "status": "conflict",
+                            "errors": ["Invoice is already processing"],
+                        }))
+                    else:
+                        await emit(index, self._result_entry(invoice_id, {
+                            "invoice_id": invoice_id,
+                            "status": "error",
+                            "errors": ["Invoice not found in database"],
+                        }))
+                for ctx in contexts:
+                    yield ctx
+        
+        async def on_extracted(ctx: ExtractionContext) -> None:
+            entry = self._result_entry(ctx.invoice_id, ctx.result)
+            entry["elapsed_seconds"] = ctx.elapsed_seconds
+            entry["stage_timings"] = dict(ctx.timings)
+            await emit(positions[id(ctx)], entry)
+        
+        # One heartbeat renews every lease in the batch, including invoices
+        # claimed but still queued behind the pipeline's in-flight limit
+        heartbeat = asyncio.create_task(self._keep_batch_leases(lease_owner)) if invoice_ids else None
+        try:
+            await self.pipeline.run(claimed_contexts(), on_result=on_extracted)
+        except BaseException:
+            await self._release_batch_leases(lease_owner, db=db)
+            raise
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+        
+        processed_results = [entries[index] for index in sorted(entries)]
+        succeeded = sum(1 for entry in processed_results if entry["status"] == "success")
+        failed = len(processed_results) - succeeded
         elapsed = (datetime.utcnow() - start_time).total_seconds()
         
         summary = {
@@ -100,6 +162,7 @@ class BatchProcessingService:
             "succeeded": succeeded,
             "failed": failed,
             "elapsed_seconds": elapsed,
+            "stage_timings": getattr(self.pipeline, "stats", {}),
             "results": processed_results
         }
         
@@ -109,107 +172,51 @@ class BatchProcessingService:
         
         return summary
     
-    async def _process_single(
-        self,
-        invoice_id: str,
-        db: Optional[AsyncSession] = None
-    ) -> Dict[str, Any]:
-        """Process a single invoice with semaphore control"""
-        async with self.semaphore:
-            logger.info(f"Processing invoice {invoice_id} in batch")
-            
-            # Get invoice metadata from database
-            invoice_db = await DatabaseService.get_invoice(invoice_id, db=db)
-            if not invoice_db:
-                return {
-                    "invoice_id": invoice_id,
-                    "status": "error",
-                    "errors": ["Invoice not found in database"]
-                }
-            
-            # Extract invoice
-            result = await self.extraction_service.extract_invoice(
-                invoice_id=invoice_id,
-                file_identifier=invoice_db.file_path,
-                file_name=invoice_db.file_name,
-                upload_date=invoice_db.upload_date,
-                db=db
-            )
-            
-            return result
+    @staticmethod
+    async def _release_batch_leases(lease_owner: str, db: Optional[AsyncSession] = None) -> None:
+        """Hand back the invoices a cut-short batch still holds (claimed but unstarted, or interrupted)"""
+        try:
+            # Shielded: this runs while the batch is being cancelled
+            await asyncio.shield(DatabaseService.release_owner_leases(lease_owner, db=db))
+        except Exception as e:
+            # The leases still expire and are reaped, just later
+            logger.warning(f"Could not release the leases of batch owner {lease_owner}: {e}")
     
-    async def process_pending_invoices(
-        self,
-        limit: Optional[int] = None,
-        db: Optional[AsyncSession] = None
-    ) -> Dict[str, Any]:
+    @staticmethod
+    async def _keep_batch_leases(lease_owner: str) -> None:
         """
-        Process all invoices with status 'uploaded' or 'processing'
+        Renew the batch's PROCESSING leases until the task is cancelled
         
-        Args:
-            limit: Maximum number of invoices to process (None for all)
-            db: Optional database session
-            
-        Returns:
-            Batch processing summary
+        Keeps running while no lease is held: claims are made as the batch
+        goes, so a later chunk may still need renewing.
         """
-        logger.info("Finding pending invoices for batch processing")
-        
-        # Get pending invoices
-        pending = await DatabaseService.list_invoices(
-            status_filter="uploaded",
-            limit=limit,
-            db=db
-        )
-        
-        if not pending:
-            logger.info("No pending invoices found")
+        interval = max(1.0, getattr(settings, "EXTRACTION_LEASE_RENEW_SECONDS", 60))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await DatabaseService.renew_owner_leases(lease_owner)
+            except Exception as e:
+                # Keep renewing: a dead heartbeat lets every lease in the batch expire
+                logger.warning(f"Lease renewal for batch owner {lease_owner} failed, retrying: {e}")
+    
+    @staticmethod
+    def _result_entry(invoice_id: str, result: Any) -> Dict[str, Any]:
+        """Summary entry for one invoice's extraction outcome"""
+        if isinstance(result, Exception):
+            logger.error(f"Batch processing error for {invoice_id}: {result}")
             return {
-                "total": 0,
-                "succeeded": 0,
-                "failed": 0,
-                "results": []
+                "invoice_id": invoice_id,
+                "status": "error",
+                "error": str(result)
             }
-        
-        invoice_ids = [inv["invoice_id"] for inv in pending]
-        logger.info(f"Found {len(invoice_ids)} pending invoices")
-        
-        return await self.process_batch(invoice_ids, db=db)
-    
-    async def reprocess_failed_invoices(
-        self,
-        limit: Optional[int] = None,
-        db: Optional[AsyncSession] = None
-    ) -> Dict[str, Any]:
-        """
-        Reprocess invoices that previously failed extraction
-        
-        Args:
-            limit: Maximum number of invoices to reprocess
-            db: Optional database session
-            
-        Returns:
-            Batch processing summary
-        """
-        logger.info("Finding failed invoices for reprocessing")
-        
-        # Get failed invoices
-        failed = await DatabaseService.list_invoices(
-            status_filter="error",
-            limit=limit,
-            db=db
-        )
-        
-        if not failed:
-            logger.info("No failed invoices found")
+        if result and result.get("status") == "extracted":
             return {
-                "total": 0,
-                "succeeded": 0,
-                "failed": 0,
-                "results": []
+                "invoice_id": invoice_id,
+                "status": "success",
+                "result": result
             }
-        
-        invoice_ids = [inv["invoice_id"] for inv in failed]
-        logger.info(f"Found {len(invoice_ids)} failed invoices for reprocessing")
-        
-        return await self.process_batch(invoice_ids, db=db)
+        return {
+            "invoice_id": invoice_id,
+            "status": "failed",
+            "result": result
+        }
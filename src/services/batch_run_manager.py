@@ -0,0 +1,381 @@
+"""Background batch runs with per-invoice result streaming
+
+Batch endpoints hand their invoice ids to ``batch_run_manager`` and return a
+batch id immediately. The run executes in the background through
+BatchProcessingService (the stage pipeline); every invoice result is appended
+to the run's event log as soon as it finishes, so clients can poll the summary
+or stream the events instead of holding one request open for the whole batch.
+
+Runs are also checkpointed through BatchRunStore: the run and one pending item
+per invoice are recorded before the batch starts, and each invoice's outcome
+is written as it finishes. A run cut short by a crash or deploy is marked
+``interrupted`` and ``resume`` re-submits only its pending items; finished
+runs stay queryable from the database. Each attempt claims its invoices under
+its own lease owner, recorded on the run: a run that stops early hands those
+leases back, and a resume releases whatever the previous attempt still holds,
+so its own invoices are not reported as conflicts. Live runs (for streaming) are kept in
+memory, most recent ``BATCH_RUN_RETENTION``.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from src.config import settings
+from src.services.batch_run_store import BatchRunStatus, BatchRunStore
+from src.services.db_service import DatabaseService
+from src.services.priority_scheduler import Priority, normalize_priority, priority_scope
+
+logger = logging.getLogger(__name__)
+
+# Extraction result keys carried into batch events (the full invoice stays in the DB)
+_RESULT_KEYS = ("status", "errors", "confidence", "low_confidence_triggered")
+
+
+def _compact_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    compact = {k: v for k, v in entry.items() if k != "result"}
+    result = entry.get("result") or {}
+    if result:
+        compact["extraction"] = {k: result[k] for k in _RESULT_KEYS if k in result}
+    return compact
+
+
+class BatchRunNotFound(LookupError):
+    """No batch run with the requested id"""
+
+
+class BatchRunConflict(RuntimeError):
+    """The batch run cannot be resumed (still running, here or in another process)"""
+
+
+class BatchRun:
+    """State and event log of one background batch"""
+
+    def __init__(self, batch_id: str, kind: str, invoice_ids: List[str], priority: Priority = Priority.NORMAL):
+        self.batch_id = batch_id
+        self.kind = kind
+        self.priority = priority
+        self.invoice_ids = list(invoice_ids)
+        self.status = BatchRunStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.results: List[Dict[str, Any]] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+        # Invoice lease owner of the current attempt
+        self.lease_owner: Optional[str] = None
+        # Item positions still to be checkpointed, per invoice id (ids may repeat)
+        self._positions: Dict[str, deque] = defaultdict(deque)
+        for position, invoice_id in enumerate(self.invoice_ids):
+            self._positions[invoice_id].append(position)
+
+    @property
+    def done(self) -> bool:
+        return self.status in BatchRunStatus.FINISHED
+
+    def restore(self, completed: List[Dict[str, Any]], pending: List[Any]) -> None:
+        """Load the results checkpointed by earlier attempts (resume)"""
+        self._positions = defaultdict(deque)
+        for position, invoice_id in pending:
+            self._positions[invoice_id].append(position)
+        for entry in completed:
+            self.results.append(entry)
+            self.events.append({"event": "result", "batch_id": self.batch_id, "index": len(self.results), **entry})
+
+    def take_position(self, invoice_id: str) -> Optional[int]:
+        positions = self._positions.get(invoice_id)
+        return positions.popleft() if positions else None
+
+    async def _publish(self, event: Dict[str, Any]) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def add_result(self, entry: Dict[str, Any]) -> None:
+        compact = _compact_entry(entry)
+        self.results.append(compact)
+        await self._publish({"event": "result", "batch_id": self.batch_id, "index": len(self.results), **compact})
+
+    async def finish(self, status: str, summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.summary = summary
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        await self._publish({"event": "summary", **self.to_dict(include_results=False)})
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        succeeded = sum(1 for r in self.results if r.get("status") == "success")
+        end = self.finished_at or datetime.utcnow()
+        data = {
+            "batch_id": self.batch_id,
+            "kind": self.kind,
+            "priority": self.priority.value,
+            "status": self.status,
+            "total": len(self.invoice_ids),
+            "completed": len(self.results),
+            "succeeded": succeeded,
+            "failed": len(self.results) - succeeded,
+            "pending": len(self.invoice_ids) - len(self.results),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": (end - self.started_at).total_seconds() if self.started_at else 0.0,
+            "stage_timings": (self.summary or {}).get("stage_timings", {}),
+            "error": self.error,
+        }
+        if include_results:
+            data["results"] = list(self.results)
+        return data
+
+    async def stream(self, start: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield events from ``start`` onwards, waiting for new ones until the run ends"""
+        index = start
+        while True:
+            async with self._changed:
+                while index >= len(self.events) and not self.done:
+                    await self._changed.wait()
+                pending = self.events[index:]
+            for event in pending:
+                index += 1
+                yield event
+                if event["event"] == "summary":
+                    return
+            if self.done and index >= len(self.events):
+                return
+
+
+class BatchRunManager:
+    """Starts, checkpoints and resumes background batch runs"""
+
+    def __init__(
+        self,
+        retention: Optional[int] = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        heartbeat_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            retention: Live runs kept in memory for status / streaming
+            session_factory: Builds the AsyncSession used for checkpoints (defaults to AsyncSessionLocal)
+            heartbeat_seconds: Interval at which running batches refresh their heartbeat
+        """
+        self.retention = max(1, retention or getattr(settings, "BATCH_RUN_RETENTION", 100))
+        self.heartbeat_seconds = heartbeat_seconds or getattr(settings, "BATCH_RUN_HEARTBEAT_SECONDS", 30)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._session_factory = session_factory
+        self._runs: "OrderedDict[str, BatchRun]" = OrderedDict()
+        self._shutting_down = False
+
+    async def _store(self, operation: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._session_factory is None:
+            return await operation(*args, **kwargs)
+        async with self._session_factory() as db:
+            return await operation(*args, db=db, **kwargs)
+
+    async def start(
+        self,
+        invoice_ids: List[str],
+        kind: str = "ids",
+        batch_service_factory: Optional[Callable[[], Any]] = None,
+        priority: Optional[str] = None,
+    ) -> BatchRun:
+        """
+        Record a batch and start it in the background
+
+        The run and its pending items are persisted before this returns, so
+        the batch id is resumable from the moment the client sees it.
+
+        Args:
+            invoice_ids: Invoices to extract
+            kind: What selected the invoices ("ids", "pending", "failed")
+            batch_service_factory: Builds the BatchProcessingService (tests inject fakes)
+            priority: Scheduling class for the batch's DI / LLM work (default normal)
+        """
+        run = BatchRun(str(uuid.uuid4()), kind, invoice_ids, normalize_priority(priority or Priority.NORMAL))
+        await self._store(BatchRunStore.create, run.batch_id, kind, run.priority.value, run.invoice_ids, self.owner)
+        self._launch(run, run.invoice_ids, batch_service_factory)
+        return run
+
+    async def resume(
+        self,
+        batch_id: str,
+        retry_failed: bool = False,
+        batch_service_factory: Optional[Callable[[], Any]] = None,
+    ) -> BatchRun:
+        """
+        Resume a finished or abandoned run with only the items not yet done
+
+        Items already checkpointed are kept (and replayed to stream
+        subscribers); with ``retry_failed`` the failed ones are re-submitted
+        as well.
+
+        Raises:
+            BatchRunNotFound: Unknown batch id
+            BatchRunConflict: The run is still running here or in another live process
+        """
+        live = self._runs.get(batch_id)
+        if live is not None and not live.done:
+            raise BatchRunConflict(f"Batch {batch_id} is still {live.status}")
+        claimed = await self._store(BatchRunStore.claim_for_resume, batch_id, self.owner, retry_failed=retry_failed)
+        if claimed is None:
+            record = await self._store(BatchRunStore.get_run, batch_id, include_items=False)
+            if record is None:
+                raise BatchRunNotFound(f"Batch {batch_id} not found")
+            raise BatchRunConflict(f"Batch {batch_id} is still {record['status']} (owner {record['owner']})")
+
+        record, completed, pending = claimed
+        if record.get("lease_owner"):
+            # Invoices the previous attempt left PROCESSING are ours to redo, not conflicts
+            await self._release_leases(batch_id, record["lease_owner"])
+        invoice_ids = [None] * record["total"]
+        for entry in completed:
+            invoice_ids[entry["position"]] = entry["invoice_id"]
+        for position, invoice_id in pending:
+            invoice_ids[position] = invoice_id
+        run = BatchRun(batch_id, record["kind"], invoice_ids, normalize_priority(record["priority"]))
+        run.created_at = record["created_at"]
+        run.restore(completed, pending)
+        logger.info(f"Resuming batch {batch_id}: {len(pending)} of {record['total']} invoice(s) left")
+        self._launch(run, [invoice_id for _, invoice_id in pending], batch_service_factory)
+        return run
+
+    async def resume_interrupted(self, batch_service_factory: Optional[Callable[[], Any]] = None) -> List[BatchRun]:
+        """Resume every run left interrupted (startup with BATCH_RUN_AUTO_RESUME)"""
+        runs = []
+        for record in await self._store(BatchRunStore.list_runs, status=BatchRunStatus.INTERRUPTED, limit=1000):
+            try:
+                runs.append(await self.resume(record["batch_id"], batch_service_factory=batch_service_factory))
+            except (BatchRunNotFound, BatchRunConflict) as e:
+                # Another replica got there first
+                logger.info(f"Not resuming batch {record['batch_id']}: {e}")
+        return runs
+
+    async def mark_interrupted(self) -> List[str]:
+        """Mark runs abandoned by a dead process interrupted (application startup)"""
+        return await self._store(BatchRunStore.mark_interrupted)
+
+    def _launch(self, run: BatchRun, invoice_ids: List[str], batch_service_factory: Optional[Callable[[], Any]]) -> None:
+        self._runs.pop(run.batch_id, None)
+        self._runs[run.batch_id] = run
+        self._prune()
+        # The task inherits the priority from the context it is created in
+        with priority_scope(run.priority):
+            run.task = asyncio.create_task(self._execute(run, invoice_ids, batch_service_factory))
+
+    async def _checkpoint(self, run: BatchRun, entry: Dict[str, Any]) -> None:
+        # Persist first: a result streamed to clients is never lost on resume
+        position = run.take_position(entry.get("invoice_id"))
+        if position is not None:
+            try:
+                # Shielded so a shutdown cancelling the batch still records the finished invoice
+                await asyncio.shield(
+                    self._store(BatchRunStore.checkpoint, run.batch_id, self.owner, position, _compact_entry(entry))
+                )
+            except Exception as e:
+                # The item stays pending and is simply redone on resume
+                logger.warning(f"Checkpoint failed for batch {run.batch_id} item {position}: {e}")
+        await run.add_result(entry)
+
+    async def _release_leases(self, batch_id: str, lease_owner: str) -> None:
+        try:
+            # Shielded like checkpoints: it runs while a shutdown is cancelling the batch
+            await asyncio.shield(self._store(DatabaseService.release_owner_leases, lease_owner))
+        except Exception as e:
+            # The leases still expire and are reaped, just later
+            logger.warning(f"Could not release the invoice leases of batch {batch_id}: {e}")
+
+    async def _heartbeat(self, run: BatchRun) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self._store(BatchRunStore.heartbeat, run.batch_id, self.owner)
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for batch {run.batch_id}: {e}")
+
+    async def _finish(self, run: BatchRun, status: str, summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        await run.finish(status, summary=summary, error=error)
+        persisted = None
+        if summary is not None:
+            persisted = {k: summary[k] for k in ("elapsed_seconds", "stage_timings") if k in summary}
+        try:
+            await self._store(BatchRunStore.finish, run.batch_id, self.owner, status, summary=persisted, error=error)
+        except Exception as e:
+            logger.warning(f"Could not record the end of batch {run.batch_id}: {e}")
+
+    async def _execute(
+        self,
+        run: BatchRun,
+        invoice_ids: List[str],
+        batch_service_factory: Optional[Callable[[], Any]],
+    ) -> None:
+        run.status = BatchRunStatus.RUNNING
+        run.started_at = datetime.utcnow()
+        run.lease_owner = f"{self.owner}:{uuid.uuid4().hex[:8]}"
+        heartbeat = None
+        try:
+            await self._store(BatchRunStore.mark_running, run.batch_id, self.owner, lease_owner=run.lease_owner)
+            heartbeat = asyncio.create_task(self._heartbeat(run))
+            if batch_service_factory is None:
+                from src.services.service_container import get_service_container
+                batch_service_factory = get_service_container().batch_processing_service
+            service = batch_service_factory()
+            # No request-scoped session here: the request returned long ago
+            summary = await service.process_batch(
+                invoice_ids,
+                db=None,
+                on_result=lambda entry: self._checkpoint(run, entry),
+                lease_owner=run.lease_owner,
+            )
+            await self._finish(run, BatchRunStatus.COMPLETED, summary=summary)
+        except asyncio.CancelledError:
+            await self._release_leases(run.batch_id, run.lease_owner)
+            if self._shutting_down:
+                # Deploy / restart: the run is resumable, not abandoned
+                await self._finish(run, BatchRunStatus.INTERRUPTED, error="Batch interrupted by shutdown")
+            else:
+                await self._finish(run, BatchRunStatus.CANCELLED, error="Batch cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Batch {run.batch_id} failed: {e}", exc_info=True)
+            await self._release_leases(run.batch_id, run.lease_owner)
+            await self._finish(run, BatchRunStatus.FAILED, error=str(e))
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+    def get(self, batch_id: str) -> Optional[BatchRun]:
+        """Live (in-memory) run, if this process started or resumed it"""
+        return self._runs.get(batch_id)
+
+    def list(self) -> List[BatchRun]:
+        return list(reversed(self._runs.values()))
+
+    def _prune(self) -> None:
+        # Drop the oldest finished runs beyond the retention limit
+        for batch_id in list(self._runs):
+            if len(self._runs) <= self.retention:
+                return
+            if self._runs[batch_id].done:
+                del self._runs[batch_id]
+
+    async def shutdown(self) -> None:
+        """Interrupt runs still in progress (application shutdown); they can be resumed"""
+        self._shutting_down = True
+        tasks = [run.task for run in self._runs.values() if run.task and not run.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+batch_run_manager = BatchRunManager()
@@ -0,0 +1,490 @@
+"""Durable checkpoints for background batch runs
+
+Every batch run is recorded in ``batch_runs`` with one ``batch_run_items``
+row per invoice. Items start ``pending`` and are checkpointed with their
+outcome as soon as the invoice finishes, so a batch interrupted by a crash or
+deploy can be resumed with only its pending items, and its results stay
+queryable after the process that ran it is gone.
+
+The process executing a run owns it and refreshes ``heartbeat_at``; updates
+are conditional on ownership (the same pattern as the extraction job queue),
+and a run whose heartbeat went stale may be claimed by another process.
+"""
+
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, and_, or_, func
+import logging
+
+from src.config import settings
+from src.models.database import AsyncSessionLocal
+from src.models.db_models import BatchRunRecord, BatchRunItem
+from src.models.line_item_db_models import LineItem  # noqa: F401  (mapper for Invoice.line_items)
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRunStatus:
+    """Batch run lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    INTERRUPTED = "interrupted"
+
+    ACTIVE = (QUEUED, RUNNING)
+    FINISHED = (COMPLETED, FAILED, CANCELLED, INTERRUPTED)
+
+
+PENDING_ITEM = "pending"
+# Item outcomes re-submitted by ``resume(retry_failed=True)``; a conflict is an
+# invoice another extractor held at the time, so it is retried too
+RETRYABLE_ITEMS = ("failed", "error", "conflict")
+
+
+def _run_to_dict(run: BatchRunRecord, counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    counts = counts or {}
+    completed = sum(count for status, count in counts.items() if status != PENDING_ITEM)
+    succeeded = counts.get("success", 0)
+    return {
+        "batch_id": run.id,
+        "kind": run.kind,
+        "priority": run.priority,
+        "status": run.status,
+        "total": run.total,
+        "completed": completed,
+        "succeeded": succeeded,
+        "failed": completed - succeeded,
+        "pending": counts.get(PENDING_ITEM, 0),
+        "attempts": run.attempts,
+        "owner": run.owner,
+        "lease_owner": run.lease_owner,
+        "heartbeat_at": run.heartbeat_at,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "elapsed_seconds": (run.summary or {}).get("elapsed_seconds", 0.0),
+        "stage_timings": (run.summary or {}).get("stage_timings", {}),
+        "error": run.error,
+    }
+
+
+def _item_to_dict(item: BatchRunItem) -> Dict[str, Any]:
+    data = dict(item.result or {})
+    data.update(
+        invoice_id=item.invoice_id,
+        position=item.position,
+        status=item.status,
+        elapsed_seconds=item.elapsed_seconds,
+        stage_timings=item.stage_timings or {},
+        finished_at=item.finished_at,
+    )
+    return data
+
+
+def _resumable(now: datetime, stale_seconds: float):
+    """Finished runs, and queued / running runs whose owner stopped heartbeating"""
+    return or_(
+        BatchRunRecord.status.in_(BatchRunStatus.FINISHED),
+        and_(
+            BatchRunRecord.status.in_(BatchRunStatus.ACTIVE),
+            or_(
+                BatchRunRecord.heartbeat_at.is_(None),
+                BatchRunRecord.heartbeat_at < now - timedelta(seconds=stale_seconds),
+            ),
+        ),
+    )
+
+
+def _stale_seconds(stale_seconds: Optional[float]) -> float:
+    return stale_seconds if stale_seconds is not None else getattr(settings, "BATCH_RUN_STALE_SECONDS", 120)
+
+
+class BatchRunStore:
+    """Async persistence of batch runs and their per-invoice checkpoints"""
+
+    @staticmethod
+    async def create(
+        batch_id: str,
+        kind: str,
+        priority: str,
+        invoice_ids: List[str],
+        owner: str,
+        db: Optional[AsyncSession] = None,
+    ) -> None:
+        """Record a new queued run with one pending item per invoice"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            session.add(
+                BatchRunRecord(
+                    id=batch_id,
+                    kind=kind,
+                    priority=priority,
+                    status=BatchRunStatus.QUEUED,
+                    total=len(invoice_ids),
+                    attempts=0,
+                    owner=owner,
+                    heartbeat_at=now,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+            await session.flush()
+            if invoice_ids:
+                await session.execute(
+                    insert(BatchRunItem),
+                    [
+                        {"batch_id": batch_id, "position": position, "invoice_id": invoice_id, "status": PENDING_ITEM}
+                        for position, invoice_id in enumerate(invoice_ids)
+                    ],
+                )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error recording batch run {batch_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def _update_owned(
+        batch_id: str,
+        owner: str,
+        values: Dict[str, Any],
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Update a run only while ``owner`` still owns it"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            values = dict(values, updated_at=now)
+            result = await session.execute(
+                update(BatchRunRecord)
+                .where(BatchRunRecord.id == batch_id, BatchRunRecord.owner == owner)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount == 0:
+                logger.warning(f"Batch {batch_id} is no longer owned by {owner}; update dropped")
+                return False
+            return True
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error updating batch run {batch_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def mark_running(
+        batch_id: str,
+        owner: str,
+        lease_owner: Optional[str] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Mark an owned run running, count the attempt and record its invoice lease owner"""
+        now = datetime.utcnow()
+        return await BatchRunStore._update_owned(
+            batch_id,
+            owner,
+            {
+                "status": BatchRunStatus.RUNNING,
+                "lease_owner": lease_owner,
+                "attempts": BatchRunRecord.attempts + 1,
+                "started_at": func.coalesce(BatchRunRecord.started_at, now),
+                "heartbeat_at": now,
+                "finished_at": None,
+                "error": None,
+            },
+            db=db,
+        )
+
+    @staticmethod
+    async def heartbeat(batch_id: str, owner: str, db: Optional[AsyncSession] = None) -> bool:
+        """Refresh the heartbeat of an owned run; False if another process took it over"""
+        return await BatchRunStore._update_owned(batch_id, owner, {"heartbeat_at": datetime.utcnow()}, db=db)
+
+    @staticmethod
+    async def checkpoint(
+        batch_id: str,
+        owner: str,
+        position: int,
+        entry: Dict[str, Any],
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """
+        Record one invoice's outcome (and refresh the run heartbeat)
+
+        ``entry`` is the compact batch entry; its status, timings and the rest
+        of the entry are stored on the item row.
+        """
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            owned = await session.execute(
+                update(BatchRunRecord)
+                .where(BatchRunRecord.id == batch_id, BatchRunRecord.owner == owner)
+                .values(heartbeat_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if owned.rowcount == 0:
+                await session.rollback()
+                logger.warning(f"Batch {batch_id} is no longer owned by {owner}; checkpoint dropped")
+                return False
+            result = {
+                k: v for k, v in entry.items()
+                if k not in ("invoice_id", "status", "elapsed_seconds", "stage_timings")
+            }
+            await session.execute(
+                update(BatchRunItem)
+                .where(BatchRunItem.batch_id == batch_id, BatchRunItem.position == position)
+                .values(
+                    status=entry.get("status") or "error",
+                    result=result,
+                    elapsed_seconds=entry.get("elapsed_seconds"),
+                    stage_timings=entry.get("stage_timings"),
+                    finished_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return True
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error checkpointing batch {batch_id} item {position}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def finish(
+        batch_id: str,
+        owner: str,
+        status: str,
+        summary: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Record the end of an attempt; the run keeps its owner for the record"""
+        now = datetime.utcnow()
+        return await BatchRunStore._update_owned(
+            batch_id,
+            owner,
+            {
+                "status": status,
+                "summary": summary,
+                "error": error,
+                "heartbeat_at": now,
+                "finished_at": now,
+            },
+            db=db,
+        )
+
+    @staticmethod
+    async def claim_for_resume(
+        batch_id: str,
+        owner: str,
+        retry_failed: bool = False,
+        stale_seconds: Optional[float] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]], List[Tuple[int, str]]]]:
+        """
+        Take ownership of a finished or abandoned run so it can be resumed
+
+        The claim is a conditional UPDATE, so two processes resuming the same
+        run cannot both win. With ``retry_failed`` the failed / error items are
+        reset to pending and re-submitted too.
+
+        Returns:
+            (run dict, completed item dicts, [(position, invoice_id), ...] still
+            to process), or None if the run is unknown or still owned by a live
+            process
+        """
+        stale_seconds = _stale_seconds(stale_seconds)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            result = await session.execute(
+                update(BatchRunRecord)
+                .where(BatchRunRecord.id == batch_id, _resumable(now, stale_seconds))
+                .values(
+                    status=BatchRunStatus.QUEUED,
+                    owner=owner,
+                    heartbeat_at=now,
+                    finished_at=None,
+                    error=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                await session.rollback()
+                return None
+            if retry_failed:
+                await session.execute(
+                    update(BatchRunItem)
+                    .where(BatchRunItem.batch_id == batch_id, BatchRunItem.status.in_(RETRYABLE_ITEMS))
+                    .values(status=PENDING_ITEM, result=None, elapsed_seconds=None, stage_timings=None, finished_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+
+            run = await session.get(BatchRunRecord, batch_id, populate_existing=True)
+            items = (
+                await session.execute(
+                    select(BatchRunItem).where(BatchRunItem.batch_id == batch_id).order_by(BatchRunItem.position)
+                )
+            ).scalars().all()
+            completed = [_item_to_dict(item) for item in items if item.status != PENDING_ITEM]
+            pending = [(item.position, item.invoice_id) for item in items if item.status == PENDING_ITEM]
+            counts: Dict[str, int] = {}
+            for item in items:
+                counts[item.status] = counts.get(item.status, 0) + 1
+            return _run_to_dict(run, counts), completed, pending
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error claiming batch run {batch_id} for resume: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def mark_interrupted(
+        stale_seconds: Optional[float] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> List[str]:
+        """
+        Mark queued / running runs whose heartbeat went stale as interrupted
+
+        Called at startup: those runs belonged to a process that crashed or
+        was redeployed. Returns the ids of the runs marked.
+        """
+        stale_seconds = _stale_seconds(stale_seconds)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            abandoned = and_(
+                BatchRunRecord.status.in_(BatchRunStatus.ACTIVE),
+                or_(
+                    BatchRunRecord.heartbeat_at.is_(None),
+                    BatchRunRecord.heartbeat_at < now - timedelta(seconds=stale_seconds),
+                ),
+            )
+            ids = list((await session.execute(select(BatchRunRecord.id).where(abandoned))).scalars().all())
+            if not ids:
+                return []
+            await session.execute(
+                update(BatchRunRecord)
+                .where(BatchRunRecord.id.in_(ids), abandoned)
+                .values(
+                    status=BatchRunStatus.INTERRUPTED,
+                    error="Batch owner stopped before the run finished",
+                    finished_at=now,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            logger.warning(f"Marked {len(ids)} abandoned batch run(s) interrupted: {ids}")
+            return ids
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error marking abandoned batch runs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def _item_counts(session: AsyncSession, batch_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {batch_id: {} for batch_id in batch_ids}
+        if not batch_ids:
+            return counts
+        result = await session.execute(
+            select(BatchRunItem.batch_id, BatchRunItem.status, func.count())
+            .where(BatchRunItem.batch_id.in_(batch_ids))
+            .group_by(BatchRunItem.batch_id, BatchRunItem.status)
+        )
+        for batch_id, status, count in result.all():
+            counts[batch_id][status] = count
+        return counts
+
+    @staticmethod
+    async def get_run(
+        batch_id: str,
+        include_items: bool = True,
+        item_status: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run summary with item counts and (optionally) its per-invoice results
+
+        Args:
+            item_status: Only include items in this status (e.g. "failed", "pending")
+            skip: Items to skip (in batch order)
+            limit: Maximum items to include (default all)
+        """
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            run = await session.get(BatchRunRecord, batch_id, populate_existing=True)
+            if run is None:
+                return None
+            counts = await BatchRunStore._item_counts(session, [batch_id])
+            data = _run_to_dict(run, counts[batch_id])
+            if include_items:
+                query = select(BatchRunItem).where(BatchRunItem.batch_id == batch_id)
+                if item_status:
+                    query = query.where(BatchRunItem.status == item_status)
+                query = query.order_by(BatchRunItem.position).offset(skip)
+                if limit is not None:
+                    query = query.limit(limit)
+                items = (await session.execute(query)).scalars().all()
+                data["results"] = [_item_to_dict(item) for item in items]
+            return data
+        except Exception as e:
+            logger.error(f"Error fetching batch run {batch_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def list_runs(
+        status: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50,
+        db: Optional[AsyncSession] = None,
+    ) -> List[Dict[str, Any]]:
+        """List runs newest first, with item counts but without per-invoice results"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            query = select(BatchRunRecord)
+            if status:
+                query = query.where(BatchRunRecord.status == status)
+            query = query.order_by(BatchRunRecord.created_at.desc()).offset(skip).limit(limit)
+            runs = (await session.execute(query)).scalars().all()
+            counts = await BatchRunStore._item_counts(session, [run.id for run in runs])
+            return [_run_to_dict(run, counts[run.id]) for run in runs]
+        except Exception as e:
+            logger.error(f"Error listing batch runs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
@@ -0,0 +1,468 @@
+"""Streaming import of invoices from Azure Blob Storage
+
+Runs a container import as a three-stage pipeline connected by bounded queues:
+
+    list (lazy pages) -> download + ingest (N workers) -> extract (M workers)
+
+Listing starts handing blobs to downloaders after the first page, downloads run
+with bounded concurrency, and extraction of earlier blobs overlaps ingestion of
+later ones. One set of long-lived clients (blob browser, ingestion and extraction
+services) is shared by every blob in the run.
+
+Incremental mode keeps a per-container/prefix watermark (last-modified time plus
+the etags imported at or after it) so scheduled imports only download and ingest
+new or changed blobs, and skips files whose content_sha256 is already ingested.
+A run capped by max_files imports the oldest new blobs first, so the watermark
+keeps moving while a backlog is worked off. Finding them means listing the
+whole container/prefix before the first download; only the max_files oldest
+blobs past the watermark are kept in memory.
+"""
+
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from src.config import settings
+from src.services.db_service import DatabaseService
+from src.services.priority_scheduler import Priority, priority_scope
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling a stage worker to exit
+_DONE = object()
+
+# Duplicates in these states were ingested but never extracted successfully
+_RETRY_EXTRACTION_STATES = ("PENDING", "FAILED")
+
+
+class BlobImportService:
+    """Imports blobs from a container through ingestion and extraction"""
+
+    def __init__(
+        self,
+        browser=None,
+        ingestion_service=None,
+        extraction_service=None,
+        download_concurrency: Optional[int] = None,
+        extraction_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        page_size: Optional[int] = None,
+        priority: Priority = Priority.BULK,
+    ):
+        """
+        Initialize blob import service
+
+        Clients are created lazily on first use so constructing the service
+        never requires Azure credentials.
+
+        Args:
+            browser: AzureBlobBrowser instance
+            ingestion_service: IngestionService instance (Azure-backed file handler)
+            extraction_service: ExtractionService instance
+            download_concurrency: Concurrent download+ingest workers
+            extraction_concurrency: Concurrent extraction workers
+            queue_size: Capacity of the queues between stages
+            page_size: Blobs requested per List Blobs page
+            priority: Scheduling class for the import's DI / LLM work
+        """
+        self._browser = browser
+        self._ingestion_service = ingestion_service
+        self._extraction_service = extraction_service
+        self.download_concurrency = max(
+            1, download_concurrency or getattr(settings, "BLOB_IMPORT_DOWNLOAD_CONCURRENCY", 8)
+        )
+        self.extraction_concurrency = max(
+            1, extraction_concurrency or getattr(settings, "BLOB_IMPORT_EXTRACTION_CONCURRENCY", 4)
+        )
+        self.queue_size = max(1, queue_size or getattr(settings, "BLOB_IMPORT_QUEUE_SIZE", 32))
+        self.page_size = page_size or getattr(settings, "BLOB_IMPORT_PAGE_SIZE", 500)
+        self.priority = priority
+
+    @property
+    def browser(self):
+        if self._browser is None:
+            from src.ingestion.azure_blob_utils import AzureBlobBrowser
+            self._browser = AzureBlobBrowser()
+        return self._browser
+
+    @property
+    def ingestion_service(self):
+        if self._ingestion_service is None:
+            from src.ingestion.ingestion_service import IngestionService
+            from src.services.service_container import get_service_container
+            services = get_service_container()
+            self._ingestion_service = IngestionService(
+                file_handler=services.azure_file_handler,
+                pdf_processor=services.pdf_processor,
+            )
+        return self._ingestion_service
+
+    @property
+    def extraction_service(self):
+        if self._extraction_service is None:
+            from src.services.service_container import get_service_container
+            # Shares the process-wide DI client and LLM / image caches
+            self._extraction_service = get_service_container().azure_extraction_service
+        return self._extraction_service
+
+    async def import_blobs(
+        self,
+        container_name: str,
+        prefix: Optional[str] = None,
+        file_extension: Optional[str] = "pdf",
+        max_files: Optional[int] = None,
+        run_extraction: bool = True,
+        blob_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        incremental: bool = False,
+        db: Optional[AsyncSession] = None,
+    ) -> Dict[str, Any]:
+        """
+        Import blobs from a container
+
+        Args:
+            container_name: Container name
+            prefix: Path prefix to filter
+            file_extension: Only import blobs with this extension (None = all)
+            max_files: Stop after this many matching blobs (None or 0 = no limit)
+            run_extraction: Run extraction after ingestion
+            blob_filter: Optional predicate on the listed blob dict; blobs it rejects are skipped
+            incremental: Only import blobs newer than the stored watermark, skip files
+                already ingested (same content_sha256) and advance the watermark afterwards.
+                With max_files the oldest new blobs are imported first, which lists
+                the full container/prefix before the first download.
+            db: Optional session for watermark reads/writes (per-blob work uses its own sessions)
+
+        Returns:
+            {
+                "total": int,
+                "successful": int,
+                "failed": int,
+                "skipped": int,
+                "truncated": bool,
+                "elapsed_seconds": float,
+                "results": [{"blob_name", "invoice_id", "status", ...}],
+                "errors": [{"blob_name", "error", ...}]
+            }
+        """
+        start = time.perf_counter()
+        suffix = f".{file_extension.lower()}" if file_extension else None
+        download_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        extract_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        duplicates: List[Dict[str, Any]] = []
+        listing = {"total": 0, "truncated": False, "skipped": 0, "resume_from": None}
+
+        watermark = None
+        already_imported: List[Dict[str, Any]] = []
+        if incremental:
+            watermark = await DatabaseService.get_import_watermark(container_name, prefix or "", db=db)
+            blob_filter = self._watermark_filter(watermark, blob_filter, already_imported, listing)
+
+        # A capped incremental run takes the oldest new blobs first, so everything
+        # it leaves for the next run is newer and the watermark can still advance.
+        # That needs the whole listing before the first download (blobs behind
+        # the watermark are filtered out as they are listed, and only the
+        # max_files + 1 oldest are kept); other runs stream blobs to the
+        # downloaders page by page.
+        oldest_first = incremental and bool(max_files)
+
+        async def matching_blobs():
+            pages = self.browser.iter_blob_pages(container_name, prefix=prefix, page_size=self.page_size)
+            while True:
+                page = await run_in_threadpool(next, pages, None)
+                if page is None:
+                    return
+                for blob in page:
+                    if suffix and not blob["name"].lower().endswith(suffix):
+                        continue
+                    if blob_filter is not None and not blob_filter(blob):
+                        continue
+                    yield blob
+
+        async def lister() -> None:
+            try:
+                if oldest_first:
+                    # One more than max_files tells where the next run resumes
+                    keep = max_files + 1
+                    candidates: List[Dict[str, Any]] = []
+                    async for blob in matching_blobs():
+                        candidates.append(blob)
+                        if len(candidates) >= keep + self.page_size:
+                            candidates = heapq.nsmallest(keep, candidates, key=_oldest_first)
+                    candidates = heapq.nsmallest(keep, candidates, key=_oldest_first)
+                    listing["truncated"] = len(candidates) > max_files
+                    if listing["truncated"]:
+                        listing["resume_from"] = _parse_last_modified(candidates[max_files].get("last_modified"))
+                    for blob in candidates[:max_files]:
+                        listing["total"] += 1
+                        await download_queue.put(blob)
+                    return
+                async for blob in matching_blobs():
+                    if max_files and listing["total"] >= max_files:
+                        listing["truncated"] = True
+                        return
+                    listing["total"] += 1
+                    await download_queue.put(blob)
+            finally:
+                for _ in range(self.download_concurrency):
+                    await download_queue.put(_DONE)
+
+        async def downloader() -> None:
+            while True:
+                blob = await download_queue.get()
+                if blob is _DONE:
+                    return
+                outcome = await self._download_and_ingest(container_name, blob, skip_duplicates=incremental)
+                if outcome.get("error"):
+                    errors.append(outcome)
+                elif outcome["status"] == "duplicate":
+                    if run_extraction and outcome.get("processing_state") in _RETRY_EXTRACTION_STATES:
+                        # Ingested by an earlier run whose extraction failed: retry it
+                        await extract_queue.put(outcome)
+                    else:
+                        duplicates.append(outcome)
+                elif run_extraction:
+                    await extract_queue.put(outcome)
+                else:
+                    results.append(outcome)
+
+        async def extractor() -> None:
+            while True:
+                item = await extract_queue.get()
+                if item is _DONE:
+                    return
+                outcome = await self._extract(item)
+                if outcome.get("error"):
+                    errors.append(outcome)
+                else:
+                    results.append(outcome)
+
+        extractors = [asyncio.create_task(extractor()) for _ in range(self.extraction_concurrency)] if run_extraction else []
+        downloaders = [asyncio.create_task(downloader()) for _ in range(self.download_concurrency)]
+        list_task = asyncio.create_task(lister())
+        try:
+            await list_task
+            await asyncio.gather(*downloaders)
+            for _ in extractors:
+                await extract_queue.put(_DONE)
+            await asyncio.gather(*extractors)
+        except BaseException:
+            for task in [list_task, *downloaders, *extractors]:
+                task.cancel()
+            raise
+
+        new_watermark = None
+        if incremental:
+            outcomes = [
+                *((item["blob"], True) for item in [*already_imported, *results, *duplicates]),
+                *((item["blob"], False) for item in errors),
+            ]
+            last_modified, etags = advance_watermark(
+                watermark["last_modified"] if watermark else None,
+                watermark["etags"] if watermark else [],
+                outcomes,
+                listing_complete=oldest_first or not listing["truncated"],
+                not_after=listing["resume_from"],
+            )
+            await DatabaseService.save_import_watermark(container_name, prefix or "", last_modified, etags, db=db)
+            new_watermark = {
+                "last_modified": last_modified.isoformat() if last_modified else None,
+                "etag_count": len(etags),
+            }
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Blob import from '{container_name}' (prefix={prefix!r}) complete: "
+            f"{len(results)}/{listing['total']} succeeded, "
+            f"{listing['skipped'] + len(duplicates)} skipped in {elapsed:.2f}s"
+        )
+        return {
+            "total": listing["total"],
+            "successful": len(results),
+            "failed": len(errors),
+            "skipped": listing["skipped"] + len(duplicates),
+            "truncated": listing["truncated"],
+            "elapsed_seconds": elapsed,
+            "watermark": new_watermark,
+            "results": results,
+            "duplicates": duplicates,
+            "errors": errors,
+        }
+
+    @staticmethod
+    def _watermark_filter(
+        watermark: Optional[Dict[str, Any]],
+        blob_filter: Optional[Callable[[Dict[str, Any]], bool]],
+        already_imported: List[Dict[str, Any]],
+        listing: Dict[str, Any],
+    ) -> Callable[[Dict[str, Any]], bool]:
+        """Wrap blob_filter so blobs at or behind the watermark are skipped"""
+        last_modified = watermark["last_modified"] if watermark else None
+        etags = set(watermark["etags"]) if watermark else set()
+
+        def accept(blob: Dict[str, Any]) -> bool:
+            if blob_filter is not None and not blob_filter(blob):
+                return False
+            blob_modified = _parse_last_modified(blob.get("last_modified"))
+            if last_modified and blob_modified and blob_modified < last_modified:
+                listing["skipped"] += 1
+                return False
+            if blob.get("etag") in etags:
+                # Imported by an earlier run; still counts towards the new watermark
+                already_imported.append({"blob": blob})
+                listing["skipped"] += 1
+                return False
+            return True
+
+        return accept
+
+    async def _download_and_ingest(
+        self,
+        container_name: str,
+        blob: Dict[str, Any],
+        skip_duplicates: bool = False,
+    ) -> Dict[str, Any]:
+        """Download one blob and ingest it; returns an outcome dict with ``error`` on failure"""
+        blob_name = blob["name"]
+        file_name = blob_name.split("/")[-1]
+        try:
+            file_content = await run_in_threadpool(self.browser.download_blob, container_name, blob_name)
+            ingest_result = await self.ingestion_service.ingest_invoice(
+                file_content=file_content,
+                file_name=file_name,
+                skip_duplicates=skip_duplicates,
+            )
+        except Exception as e:
+            logger.warning(f"Blob import failed for '{blob_name}': {e}")
+            return {"blob_name": blob_name, "blob": blob, "error": str(e)}
+
+        if ingest_result["status"] == "duplicate":
+            return {
+                "blob_name": blob_name,
+                "blob": blob,
+                "invoice_id": ingest_result["invoice_id"],
+                "status": "duplicate",
+                "processing_state": ingest_result.get("processing_state"),
+                "file_name": file_name,
+                "file_path": ingest_result.get("file_path"),
+                "upload_date": ingest_result.get("upload_date"),
+            }
+        if ingest_result["status"] != "uploaded":
+            return {
+                "blob_name": blob_name,
+                "blob": blob,
+                "error": "Ingestion failed",
+                "details": ingest_result.get("errors", []),
+            }
+        return {
+            "blob_name": blob_name,
+            "blob": blob,
+            "invoice_id": ingest_result["invoice_id"],
+            "status": "success",
+            "file_name": file_name,
+            "file_path": ingest_result["file_path"],
+            "upload_date": ingest_result["upload_date"],
+        }
+
+    async def _extract(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run extraction for an ingested blob
+
+        Extraction problems are reported, not raised: the outcome gets ``error``
+        so the blob counts as failed and an incremental import retries it.
+        """
+        try:
+            with priority_scope(self.priority):
+                extraction = await self.extraction_service.extract_invoice(
+                    invoice_id=item["invoice_id"],
+                    file_identifier=item["file_path"],
+                    file_name=item["file_name"],
+                    upload_date=item["upload_date"],
+                )
+            item["extraction_status"] = extraction.get("status")
+            if item["extraction_status"] == "error":
+                item["error"] = "Extraction failed"
+                item["details"] = extraction.get("errors", [])
+        except Exception as e:
+            logger.warning(f"Extraction failed for blob '{item['blob_name']}': {e}")
+            item["extraction_status"] = "error"
+            item["error"] = str(e)
+        return item
+
+
+def _parse_last_modified(value: Any) -> Optional[datetime]:
+    """Normalize a blob last-modified value (ISO string or datetime) to naive UTC"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _oldest_first(blob: Dict[str, Any]) -> Tuple[bool, datetime, str]:
+    """Sort key: by last-modified time (blobs without one last), then name"""
+    blob_modified = _parse_last_modified(blob.get("last_modified"))
+    return blob_modified is None, blob_modified or datetime.min, blob["name"]
+
+
+def advance_watermark(
+    last_modified: Optional[datetime],
+    etags: Iterable[str],
+    outcomes: Iterable[Tuple[Dict[str, Any], bool]],
+    listing_complete: bool,
+    not_after: Optional[datetime] = None,
+) -> Tuple[Optional[datetime], List[str]]:
+    """
+    Compute the next watermark after an import run
+
+    Args:
+        last_modified: Current watermark timestamp (None if never imported)
+        etags: Etags already imported at or after the current timestamp
+        outcomes: (blob, ok) for every listed blob at or after the watermark;
+            ok is False when the blob failed and must be retried
+        listing_complete: False when blobs older than ones in ``outcomes`` may
+            not have been listed (the run stopped early in name order)
+        not_after: Time of the oldest blob left for a later run; the
+            timestamp does not move past it
+
+    Returns:
+        (last_modified, etags) to store
+    """
+    known = set(etags)
+    seen = []
+    for blob, ok in outcomes:
+        blob_modified = _parse_last_modified(blob.get("last_modified"))
+        if blob_modified is not None:
+            seen.append((blob_modified, blob.get("etag"), ok))
+
+    if not listing_complete:
+        # Unlisted blobs may be older than anything seen, so the timestamp cannot
+        # move; remember what was imported so the next run skips it
+        known.update(etag for _, etag, ok in seen if ok and etag)
+        return last_modified, sorted(known)
+
+    if not seen:
+        return last_modified, sorted(known)
+
+    failed = [blob_modified for blob_modified, _, ok in seen if not ok]
+    if failed:
+        # Everything older than the oldest failure is done; retry from there
+        new_last_modified = min(failed)
+    else:
+        new_last_modified = max(blob_modified for blob_modified, _, _ in seen)
+    if not_after is not None and new_last_modified > not_after:
+        new_last_modified = not_after
+
+    if last_modified is not None and new_last_modified < last_modified:
+        new_last_modified = last_modified
+    new_etags = {etag for blob_modified, etag, ok in seen if ok and etag and blob_modified >= new_last_modified}
+    return new_last_modified, sorted(new_etags)
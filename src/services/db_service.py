@@ -1,14 +1,26 @@
 """Simplified async database service for invoice persistence"""
 
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Optional, List, Dict, Set, Tuple
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, and_, or_, column, literal_column, null, table
+import base64
+import json
 import logging
+import time
 
+from src.config import settings
 from src.models.database import AsyncSessionLocal, get_db
 from src.models.invoice import Invoice as InvoicePydantic
-from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_models import (
+    Invoice as InvoiceDB,
+    BlobImportWatermark,
+    InvoiceReviewEvent,
+    InvoiceSearchDocument,
+    INVOICE_SEARCH_FTS_COLUMNS,
+    INVOICE_SEARCH_FTS_TABLE,
+)
+from src.models.line_item_db_models import LineItem as LineItemDB
 from src.models.db_utils import (
     pydantic_to_db_invoice,
     db_to_pydantic_invoice,
@@ -17,11 +29,105 @@ from src.models.db_utils import (
     _sanitize_tax_breakdown,
 )
 from src.models.db_utils_line_items import save_line_items_to_table
+from src.models.db_utils_search import (
+    KEEP_DOCUMENT_TEXT,
+    fts5_match,
+    mssql_contains,
+    save_search_document,
+    search_terms,
+    sqlite_fts_ready,
+)
 from src.models.invoice import InvoiceState
 
 logger = logging.getLogger(__name__)
 
 
+class InvalidCursor(ValueError):
+    """Invoice list cursor that cannot be decoded"""
+
+
+def encode_invoice_cursor(upload_date: datetime, invoice_id: str) -> str:
+    """Opaque cursor for the invoice list position just after (upload_date, id)"""
+    raw = json.dumps([upload_date.isoformat(), invoice_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_invoice_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_invoice_cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        upload_date, invoice_id = json.loads(raw)
+        return datetime.fromisoformat(upload_date), str(invoice_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def _invoice_list_filters(
+    status: Optional[str] = None,
+    processing_state: Optional[str] = None,
+    vendor_name: Optional[str] = None,
+    upload_date_from: Optional[datetime] = None,
+    upload_date_to: Optional[datetime] = None,
+) -> list:
+    """WHERE clauses for invoice listings; each filter leads a (column, upload_date, id) index"""
+    clauses = []
+    if status:
+        clauses.append(InvoiceDB.status == status)
+    if processing_state:
+        clauses.append(InvoiceDB.processing_state == processing_state)
+    if vendor_name:
+        clauses.append(InvoiceDB.vendor_name == vendor_name)
+    if upload_date_from:
+        clauses.append(InvoiceDB.upload_date >= upload_date_from)
+    if upload_date_to:
+        clauses.append(InvoiceDB.upload_date < upload_date_to)
+    return clauses
+
+
+# Cached invoice counts: filter key -> (monotonic time, count)
+_count_cache: Dict[Tuple, Tuple[float, int]] = {}
+_COUNT_CACHE_MAX_KEYS = 256
+
+# bm25 weight per FTS column (INVOICE_SEARCH_FTS_COLUMNS order): a hit on a
+# number or the vendor outranks one in line descriptions or OCR text
+_SEARCH_COLUMN_WEIGHTS = (4.0, 8.0, 2.0, 1.0)
+# Search snippets: FTS5 tokens of context, highlight marker (markdown bold) and
+# the columns they are cut from, in order of preference. Vendor and number
+# hits need none: those values are in the result row already.
+_SEARCH_SNIPPET_TOKENS = 12
+_SNIPPET_MARK = "**"
+_SNIPPET_COLUMNS = ("document_text", "line_descriptions")
+
+
+# Database URLs whose FTS5 table is known to exist. Only a positive result is
+# cached: a database migrated after startup is picked up on the next search.
+_fts_ready: Set[str] = set()
+
+
+async def _sqlite_fts_ready_cached(session: AsyncSession) -> bool:
+    key = str(getattr(session.bind, "url", ""))
+    if key in _fts_ready:
+        return True
+    if await sqlite_fts_ready(session):
+        _fts_ready.add(key)
+        return True
+    return False
+
+
+def _like_pattern(term: str) -> str:
+    """Substring LIKE pattern for ``term``, with its wildcards matched literally (escape "\\")"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _with_search_snippet(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the per-column snippet_* values with the first one that highlights a hit"""
+    candidates = [row.pop(f"snippet_{name}", None) for name in _SNIPPET_COLUMNS]
+    if "snippet" not in row:
+        row["snippet"] = next((c for c in candidates if c and _SNIPPET_MARK in c), None)
+    return row
+
+
 class DatabaseService:
     """Simplified async service for database operations"""
     
@@ -126,18 +232,341 @@ class DatabaseService:
     @staticmethod
     async def claim_for_extraction(
         invoice_id: str,
+        lease_owner: Optional[str] = None,
+        lease_seconds: Optional[int] = None,
         db: Optional[AsyncSession] = None,
     ) -> bool:
         """
         Attempt to claim an invoice for extraction. Returns True if claimed, False otherwise.
-        Allowed transitions: PENDING/FAILED -> PROCESSING. """
-        return await DatabaseService.transition_state(
-            invoice_id=invoice_id,
-            from_states={InvoiceState.PENDING.value, InvoiceState.FAILED.value},
-            to_state=InvoiceState.PROCESSING.value,
-            error_on_invalid=False,
-            db=db,
-        )
+        Allowed transitions: PENDING/FAILED -> PROCESSING, or PROCESSING whose lease
+        expired (the previous owner died) -> PROCESSING under the new owner.
+        The claim holds a lease of ``lease_seconds`` that the owner must renew.
+        """
+        from sqlalchemy import update, or_, and_
+
+        lease_seconds = lease_seconds or getattr(settings, "EXTRACTION_LEASE_SECONDS", 300)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            stmt = (
+                update(InvoiceDB)
+                .where(
+                    InvoiceDB.id == invoice_id,
+                    or_(
+                        InvoiceDB.processing_state.in_([InvoiceState.PENDING.value, InvoiceState.FAILED.value]),
+                        and_(
+                            InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+                            InvoiceDB.lease_expires_at < now,
+                        ),
+                    ),
+                )
+                .values(
+                    processing_state=InvoiceState.PROCESSING.value,
+                    status=InvoiceState.PROCESSING.value,
+                    lease_owner=lease_owner,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            return result.rowcount == 1
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Claim for extraction failed for {invoice_id}: {e}", exc_info=True)
+            return False
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def renew_extraction_lease(
+        invoice_id: str,
+        lease_owner: Optional[str],
+        lease_seconds: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """
+        Heartbeat: extend the lease on a PROCESSING invoice.
+        Returns False once the invoice left PROCESSING or the lease was taken over;
+        database errors are raised so the heartbeat can retry instead of stopping.
+        """
+        from sqlalchemy import update
+
+        lease_seconds = lease_seconds or getattr(settings, "EXTRACTION_LEASE_SECONDS", 300)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                update(InvoiceDB)
+                .where(
+                    InvoiceDB.id == invoice_id,
+                    InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+                    InvoiceDB.lease_owner == lease_owner,
+                )
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount == 1
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"Could not renew extraction lease for {invoice_id}: {e}")
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def claim_batch_for_extraction(
+        limit: Optional[int] = None,
+        invoice_ids: Optional[List[str]] = None,
+        from_states: Optional[List[str]] = None,
+        lease_owner: Optional[str] = None,
+        lease_seconds: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Claim up to ``limit`` invoices for extraction in one statement.
+
+        Same eligibility as claim_for_extraction (``from_states``, default
+        PENDING / FAILED, or PROCESSING with an expired lease), oldest uploads
+        first. Uses UPDATE ... RETURNING (OUTPUT on SQL Server) where the
+        dialect supports it; otherwise selects the candidates, updates them and
+        reads back the rows this call stamped.
+
+        Args:
+            limit: Maximum invoices to claim (None for every eligible one)
+            invoice_ids: Only consider these invoices
+            from_states: Claimable processing states
+
+        Returns:
+            Claimed invoices: [{"invoice_id", "file_path", "file_name", "upload_date"}]
+        """
+        from sqlalchemy import update
+
+        lease_seconds = lease_seconds or getattr(settings, "EXTRACTION_LEASE_SECONDS", 300)
+        from_states = from_states or [InvoiceState.PENDING.value, InvoiceState.FAILED.value]
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            eligible = or_(
+                InvoiceDB.processing_state.in_(from_states),
+                and_(
+                    InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+                    InvoiceDB.lease_expires_at < now,
+                ),
+            )
+            candidates = select(InvoiceDB.id).where(eligible).order_by(InvoiceDB.upload_date, InvoiceDB.id)
+            if invoice_ids is not None:
+                candidates = candidates.where(InvoiceDB.id.in_(invoice_ids))
+            if limit is not None:
+                candidates = candidates.limit(limit)
+            claim = (
+                update(InvoiceDB)
+                .values(
+                    processing_state=InvoiceState.PROCESSING.value,
+                    status=InvoiceState.PROCESSING.value,
+                    lease_owner=lease_owner,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            columns = (InvoiceDB.id, InvoiceDB.file_path, InvoiceDB.file_name, InvoiceDB.upload_date)
+
+            if session.get_bind().dialect.update_returning:
+                # Eligibility is re-checked on the row being updated, so a
+                # concurrent claimer wins cleanly (this call claims fewer)
+                result = await session.execute(
+                    claim.where(InvoiceDB.id.in_(candidates.scalar_subquery()), eligible).returning(*columns)
+                )
+                rows = result.all()
+            else:
+                ids = list((await session.execute(candidates)).scalars().all())
+                rows = []
+                if ids:
+                    await session.execute(claim.where(InvoiceDB.id.in_(ids), eligible))
+                    result = await session.execute(
+                        select(*columns).where(
+                            InvoiceDB.id.in_(ids),
+                            InvoiceDB.lease_owner == lease_owner,
+                            InvoiceDB.updated_at == now,
+                        )
+                    )
+                    rows = result.all()
+            await session.commit()
+            rows = sorted(rows, key=lambda row: (row.upload_date or datetime.min, row.id))
+            return [
+                {
+                    "invoice_id": row.id,
+                    "file_path": row.file_path,
+                    "file_name": row.file_name,
+                    "upload_date": row.upload_date,
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Batch claim for extraction failed: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def renew_owner_leases(
+        lease_owner: str,
+        lease_seconds: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> int:
+        """
+        Heartbeat for a batch: extend every PROCESSING lease held by ``lease_owner``.
+        Returns how many leases were renewed; database errors are raised.
+        """
+        from sqlalchemy import update
+
+        lease_seconds = lease_seconds or getattr(settings, "EXTRACTION_LEASE_SECONDS", 300)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                update(InvoiceDB)
+                .where(
+                    InvoiceDB.lease_owner == lease_owner,
+                    InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+                )
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount or 0
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"Could not renew extraction leases for {lease_owner}: {e}")
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def release_owner_leases(
+        lease_owner: str,
+        invoice_ids: Optional[List[str]] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> int:
+        """
+        Hand back the PROCESSING leases held by ``lease_owner``: PENDING, lease cleared.
+
+        Used when a batch stops before finishing its invoices (shutdown,
+        cancel, resume after a crash) so they are claimable again at once
+        instead of after the lease expires.
+
+        Args:
+            invoice_ids: Only release these invoices (default: every lease of the owner)
+
+        Returns:
+            How many leases were released
+        """
+        from sqlalchemy import update
+
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            query = update(InvoiceDB).where(
+                InvoiceDB.lease_owner == lease_owner,
+                InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+            )
+            if invoice_ids is not None:
+                query = query.where(InvoiceDB.id.in_(invoice_ids))
+            result = await session.execute(
+                query.values(
+                    processing_state=InvoiceState.PENDING.value,
+                    status=InvoiceState.PENDING.value,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                ).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount:
+                logger.info(f"Released {result.rowcount} extraction lease(s) held by {lease_owner}")
+            return result.rowcount or 0
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error releasing extraction leases of {lease_owner}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def reap_expired_leases(
+        invoice_ids: Optional[List[str]] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> List[str]:
+        """
+        Requeue invoices stuck in PROCESSING: expired lease -> PENDING.
+
+        Rows claimed before leases existed (no ``lease_expires_at``) count as
+        expired once ``updated_at`` is older than one lease period.
+
+        Args:
+            invoice_ids: Only consider these invoices (default: all)
+
+        Returns:
+            Ids of the invoices that were requeued
+        """
+        from sqlalchemy import update, or_, and_
+
+        lease_seconds = getattr(settings, "EXTRACTION_LEASE_SECONDS", 300)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            expired = and_(
+                InvoiceDB.processing_state == InvoiceState.PROCESSING.value,
+                or_(
+                    InvoiceDB.lease_expires_at < now,
+                    and_(
+                        InvoiceDB.lease_expires_at.is_(None),
+                        InvoiceDB.updated_at < now - timedelta(seconds=lease_seconds),
+                    ),
+                ),
+            )
+            query = select(InvoiceDB.id).where(expired)
+            if invoice_ids is not None:
+                query = query.where(InvoiceDB.id.in_(invoice_ids))
+            stale = list((await session.execute(query)).scalars().all())
+            if not stale:
+                return []
+            result = await session.execute(
+                update(InvoiceDB)
+                .where(InvoiceDB.id.in_(stale), expired)
+                .values(
+                    processing_state=InvoiceState.PENDING.value,
+                    status=InvoiceState.PENDING.value,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount:
+                logger.warning(f"Requeued {result.rowcount} invoice(s) with expired extraction leases: {stale}")
+            return stale
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error reaping expired extraction leases: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
 
     @staticmethod
     async def reset_for_reextract(
@@ -146,8 +575,9 @@ class DatabaseService:
     ) -> bool:
         """
         Reset an invoice to PENDING so re-extraction can proceed.
-        Returns False if currently PROCESSING or otherwise not eligible.
+        Returns False if currently PROCESSING under a live lease or otherwise not eligible.
         """
+        await DatabaseService.reap_expired_leases(invoice_ids=[invoice_id], db=db)
         return await DatabaseService.transition_state(
             invoice_id=invoice_id,
             from_states={
@@ -167,10 +597,13 @@ class DatabaseService:
         invoice_id: str,
         patch: dict,
         expected_processing_state: str = "PROCESSING",
+        lease_owner: Optional[str] = None,
         db: Optional[AsyncSession] = None,
     ) -> bool:
         """
         Apply extraction result atomically if processing_state matches expected.
+        When ``lease_owner`` is given, the write is also fenced on the lease so a
+        worker whose lease was reaped cannot overwrite the new owner's result.
         """
         session = db or AsyncSessionLocal()
         should_close = db is None
@@ -179,12 +612,15 @@ class DatabaseService:
             patch["processing_state"] = InvoiceState.EXTRACTED.value
             patch["status"] = InvoiceState.EXTRACTED.value
             patch["updated_at"] = datetime.utcnow()
-            result = await session.execute(
-                select(InvoiceDB).where(
-                    InvoiceDB.id == invoice_id,
-                    InvoiceDB.processing_state == expected_processing_state,
-                )
+            patch["lease_owner"] = None
+            patch["lease_expires_at"] = None
+            query = select(InvoiceDB).where(
+                InvoiceDB.id == invoice_id,
+                InvoiceDB.processing_state == expected_processing_state,
             )
+            if lease_owner is not None:
+                query = query.where(InvoiceDB.lease_owner == lease_owner)
+            result = await session.execute(query)
             inv = result.scalar_one_or_none()
             if not inv:
                 return False
@@ -206,22 +642,49 @@ class DatabaseService:
     async def set_extraction_failed(
         invoice_id: str,
         error_summary: str,
+        expected_processing_state: str = "PROCESSING",
+        lease_owner: Optional[str] = None,
         db: Optional[AsyncSession] = None,
-    ) -> None:
+    ) -> bool:
+        """
+        Mark extraction FAILED if processing_state matches expected.
+        When ``lease_owner`` is given, the write is also fenced on the lease so a
+        worker whose lease was reaped cannot fail (and unlease) an invoice that
+        another owner has taken over or already finished.
+        """
+        from sqlalchemy import update
+
         session = db or AsyncSessionLocal()
         should_close = db is None
         try:
-            result = await session.execute(select(InvoiceDB).where(InvoiceDB.id == invoice_id))
-            inv = result.scalar_one_or_none()
-            if inv:
-                inv.processing_state = InvoiceState.FAILED.value
-                inv.status = InvoiceState.FAILED.value
-                inv.updated_at = datetime.utcnow()
-                inv.review_notes = error_summary
-                await session.commit()
+            query = update(InvoiceDB).where(
+                InvoiceDB.id == invoice_id,
+                InvoiceDB.processing_state == expected_processing_state,
+            )
+            if lease_owner is not None:
+                query = query.where(InvoiceDB.lease_owner == lease_owner)
+            result = await session.execute(
+                query.values(
+                    processing_state=InvoiceState.FAILED.value,
+                    status=InvoiceState.FAILED.value,
+                    updated_at=datetime.utcnow(),
+                    review_notes=error_summary,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                ).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if not result.rowcount:
+                logger.warning(
+                    f"Invoice {invoice_id} is no longer {expected_processing_state} under this lease; "
+                    f"failure not recorded"
+                )
+                return False
+            return True
         except Exception as e:
             await session.rollback()
             logger.error(f"Error marking extraction failed for {invoice_id}: {e}", exc_info=True)
+            return False
         finally:
             if should_close:
                 await session.close()
@@ -241,6 +704,164 @@ class DatabaseService:
             if should_close:
                 await session.close()
 
+    @staticmethod
+    async def get_states(invoice_ids: List[str], db: Optional[AsyncSession] = None) -> Dict[str, str]:
+        """processing_state by invoice id (ids that do not exist are left out)"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            if not invoice_ids:
+                return {}
+            result = await session.execute(
+                select(InvoiceDB.id, InvoiceDB.processing_state).where(InvoiceDB.id.in_(invoice_ids))
+            )
+            return dict(result.all())
+        except Exception as e:
+            logger.error(f"Error fetching states for {len(invoice_ids)} invoices: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def get_scan_profile(invoice_id: str, db: Optional[AsyncSession] = None) -> Optional[dict]:
+        """Return the cached scanned/text page map for an invoice (None if not computed yet)"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(select(InvoiceDB.scan_profile).where(InvoiceDB.id == invoice_id))
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error fetching scan profile for invoice {invoice_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def set_scan_profile(
+        invoice_id: str,
+        scan_profile: dict,
+        db: Optional[AsyncSession] = None,
+    ) -> None:
+        """Cache the scanned/text page map on the invoice record (best effort)"""
+        from sqlalchemy import update
+
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            await session.execute(
+                update(InvoiceDB).where(InvoiceDB.id == invoice_id).values(scan_profile=scan_profile)
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"Could not cache scan profile for {invoice_id}: {e}")
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def find_invoice_id_by_content_hash(
+        content_sha256: str,
+        db: Optional[AsyncSession] = None,
+    ) -> Optional[str]:
+        """Return the id of an existing invoice with the same file content, if any"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                select(InvoiceDB.id).where(InvoiceDB.content_sha256 == content_sha256).limit(1)
+            )
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error looking up invoice by content hash: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def get_import_watermark(
+        container_name: str,
+        prefix: str = "",
+        db: Optional[AsyncSession] = None,
+    ) -> Optional[dict]:
+        """Return {"last_modified", "etags"} for a container/prefix, or None if never imported"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                select(BlobImportWatermark).where(
+                    BlobImportWatermark.container_name == container_name,
+                    BlobImportWatermark.prefix == (prefix or ""),
+                )
+            )
+            row = result.scalar_one_or_none()
+            if row is None:
+                return None
+            return {
+                "last_modified": row.last_modified,
+                "etags": list(row.etags or []),
+                "updated_at": row.updated_at,
+            }
+        except Exception as e:
+            logger.error(f"Error fetching import watermark for {container_name}/{prefix}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def save_import_watermark(
+        container_name: str,
+        prefix: str,
+        last_modified: Optional[datetime],
+        etags: List[str],
+        db: Optional[AsyncSession] = None,
+    ) -> None:
+        """Create or replace the import watermark for a container/prefix"""
+        from sqlalchemy import insert, update
+        from sqlalchemy.exc import IntegrityError
+
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        replace = (
+            update(BlobImportWatermark)
+            .where(
+                BlobImportWatermark.container_name == container_name,
+                BlobImportWatermark.prefix == (prefix or ""),
+            )
+            .values(last_modified=last_modified, etags=sorted(set(etags)), updated_at=datetime.utcnow())
+        )
+        try:
+            result = await session.execute(replace)
+            if not result.rowcount:
+                try:
+                    await session.execute(
+                        insert(BlobImportWatermark).values(
+                            container_name=container_name,
+                            prefix=prefix or "",
+                            last_modified=last_modified,
+                            etags=sorted(set(etags)),
+                            updated_at=datetime.utcnow(),
+                        )
+                    )
+                    await session.commit()
+                    return
+                except IntegrityError:
+                    # A concurrent import created the row first; overwrite it
+                    await session.rollback()
+                    await session.execute(replace)
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error saving import watermark for {container_name}/{prefix}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
     @staticmethod
     async def transition_state(
         invoice_id: str,
@@ -301,11 +922,15 @@ class DatabaseService:
         patch: dict,
         expected_review_version: int,
         db: Optional[AsyncSession] = None,
+        review_event: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """
         Atomic optimistic-locking update using single-statement guarded UPDATE.
         Updates fields and increments review_version by 1 only if current review_version
         matches expected_review_version.
+        If review_event ({status, reviewer, notes}) is given it is appended to
+        invoice_review_events in the same transaction, so history is only
+        recorded for writes that won.
         Returns True if updated, False if stale write (caller must treat as 409 STALE_WRITE).
         """
         from sqlalchemy import update
@@ -354,6 +979,18 @@ class DatabaseService:
                     line_items_pydantic = json_to_line_items(line_items_json)
                     await save_line_items_to_table(session, invoice_id, line_items_pydantic)
                     logger.info(f"Saved {len(line_items_pydantic) if line_items_pydantic else 0} line items to table for invoice {invoice_id}")
+
+                # Reviewed values replace extracted ones in search
+                await save_search_document(session, invoice_id)
+
+                if review_event is not None:
+                    session.add(InvoiceReviewEvent(
+                        invoice_id=invoice_id,
+                        status=review_event.get("status"),
+                        reviewer=review_event.get("reviewer"),
+                        notes=review_event.get("notes"),
+                        review_version=expected_review_version + 1,
+                    ))
                 
                 # Flush before commit to ensure changes are written
                 await session.flush()
@@ -372,6 +1009,56 @@ class DatabaseService:
             if should_close:
                 await session.close()
     
+    @staticmethod
+    async def list_review_events(
+        invoice_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        newest_first: bool = False,
+        db: Optional[AsyncSession] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Page of an invoice's HITL review history from invoice_review_events.
+
+        Ordered by (created_at, id), oldest first unless newest_first. Served
+        by ix_invoice_review_events_invoice_id_created_at, so the cost depends
+        on the page size rather than on how long the history is.
+        """
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            order = (
+                (InvoiceReviewEvent.created_at.desc(), InvoiceReviewEvent.id.desc())
+                if newest_first
+                else (InvoiceReviewEvent.created_at, InvoiceReviewEvent.id)
+            )
+            result = await session.execute(
+                select(
+                    InvoiceReviewEvent.status,
+                    InvoiceReviewEvent.reviewer,
+                    InvoiceReviewEvent.notes,
+                    InvoiceReviewEvent.created_at,
+                    InvoiceReviewEvent.review_version,
+                )
+                .where(InvoiceReviewEvent.invoice_id == invoice_id)
+                .order_by(*order)
+                .offset(skip)
+                .limit(limit)
+            )
+            return [
+                {
+                    "status": row.status,
+                    "reviewer": row.reviewer,
+                    "notes": row.notes,
+                    "timestamp": row.created_at.isoformat() if row.created_at else None,
+                    "review_version": row.review_version,
+                }
+                for row in result.all()
+            ]
+        finally:
+            if should_close:
+                await session.close()
+
     @staticmethod
     async def get_invoice(
         invoice_id: str,
@@ -462,6 +1149,384 @@ class DatabaseService:
             if should_close:
                 await session.close()
     
+    # Columns returned by list_invoice_summaries (summary key -> InvoiceDB attribute)
+    SUMMARY_COLUMNS = {
+        "invoice_id": "id",
+        "invoice_number": "invoice_number",
+        "vendor_name": "vendor_name",
+        "total_amount": "total_amount",
+        "currency": "currency",
+        "invoice_date": "invoice_date",
+        "status": "status",
+        "review_status": "review_status",
+        "extraction_confidence": "extraction_confidence",
+        "upload_date": "upload_date",
+    }
+
+    @staticmethod
+    async def list_invoice_summaries(
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        db: Optional[AsyncSession] = None,
+        cursor: Optional[str] = None,
+        processing_state: Optional[str] = None,
+        vendor_name: Optional[str] = None,
+        upload_date_from: Optional[datetime] = None,
+        upload_date_to: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """
+        List invoice summaries without loading full invoices
+        
+        Selects only the summary columns plus a correlated line-item count, so
+        no ORM objects, line items or Pydantic models are built and the cost
+        per row does not grow with invoice size. Invoices whose line items
+        are still only in the legacy JSON column get their count from that
+        column (fetched for those rows only), matching db_to_pydantic_invoice.
+        
+        Rows are ordered newest first by (upload_date, id). A ``cursor`` from
+        encode_invoice_cursor resumes after that row with an index seek,
+        so deep pages cost the same as the first one.
+        
+        Args:
+            skip: Number of records to skip (offset paging; prefer cursor)
+            limit: Maximum number of records to return
+            status: Optional status filter
+            db: Async database session (optional)
+            cursor: Resume after this position (raises InvalidCursor if malformed)
+            processing_state: Optional processing state filter
+            vendor_name: Optional exact vendor name filter
+            upload_date_from: Optional inclusive lower bound on upload_date
+            upload_date_to: Optional exclusive upper bound on upload_date
+            
+        Returns:
+            List of dicts keyed like SUMMARY_COLUMNS plus line_item_count
+        """
+        after = decode_invoice_cursor(cursor) if cursor else None
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            line_item_count = (
+                select(func.count(LineItemDB.id))
+                .where(LineItemDB.invoice_id == InvoiceDB.id)
+                .correlate(InvoiceDB)
+                .scalar_subquery()
+                .label("line_item_count")
+            )
+            columns = [
+                getattr(InvoiceDB, attr).label(key)
+                for key, attr in DatabaseService.SUMMARY_COLUMNS.items()
+            ]
+            query = select(*columns, line_item_count).where(
+                *_invoice_list_filters(status, processing_state, vendor_name, upload_date_from, upload_date_to)
+            )
+            if after:
+                # Expanded row-value comparison (SQL Server has no (a, b) < (x, y));
+                # the redundant upload_date <= bound lets the planner seek to the cursor
+                query = query.where(
+                    InvoiceDB.upload_date <= after[0],
+                    or_(
+                        InvoiceDB.upload_date < after[0],
+                        and_(InvoiceDB.upload_date == after[0], InvoiceDB.id < after[1]),
+                    ),
+                )
+            query = query.order_by(InvoiceDB.upload_date.desc(), InvoiceDB.id.desc())
+            if skip:
+                query = query.offset(skip)
+            query = query.limit(limit)
+            
+            result = await session.execute(query)
+            summaries = [dict(row) for row in result.mappings().all()]
+            
+            legacy_ids = [summary["invoice_id"] for summary in summaries if not summary["line_item_count"]]
+            if legacy_ids:
+                legacy = await session.execute(
+                    select(InvoiceDB.id, InvoiceDB.line_items).where(InvoiceDB.id.in_(legacy_ids))
+                )
+                json_counts = {
+                    invoice_id: len(items) if isinstance(items, list) else 0
+                    for invoice_id, items in legacy.all()
+                }
+                for summary in summaries:
+                    if not summary["line_item_count"]:
+                        summary["line_item_count"] = json_counts.get(summary["invoice_id"], 0)
+            
+            return summaries
+            
+        except Exception as e:
+            logger.error(f"Error listing invoice summaries: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+    
+    @staticmethod
+    async def list_invoice_page(
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        include_total: bool = True,
+        db: Optional[AsyncSession] = None,
+        **filters: Any,
+    ) -> Dict[str, Any]:
+        """
+        One page of invoice summaries with the cursor for the next page
+        
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page (None for the first page)
+            skip: Offset, for clients that still page by offset
+            include_total: Also return the (cached) count of matching invoices
+            db: Async database session (optional)
+            **filters: status, processing_state, vendor_name, upload_date_from, upload_date_to
+            
+        Returns:
+            Dict with invoices, next_cursor (None on the last page), has_more
+            and total (None unless include_total)
+        """
+        rows = await DatabaseService.list_invoice_summaries(
+            skip=skip, limit=limit + 1, cursor=cursor, db=db, **filters
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_invoice_cursor(rows[-1]["upload_date"], rows[-1]["invoice_id"])
+        total = await DatabaseService.count_invoices(db=db, **filters) if include_total else None
+        return {"invoices": rows, "next_cursor": next_cursor, "has_more": has_more, "total": total}
+    
+    @staticmethod
+    async def count_invoices(
+        status: Optional[str] = None,
+        processing_state: Optional[str] = None,
+        vendor_name: Optional[str] = None,
+        upload_date_from: Optional[datetime] = None,
+        upload_date_to: Optional[datetime] = None,
+        use_cache: bool = True,
+        db: Optional[AsyncSession] = None,
+    ) -> int:
+        """
+        Count invoices matching the list filters
+        
+        Counts are cached per filter combination for
+        INVOICE_COUNT_CACHE_SECONDS, so paging through a list does not
+        re-count the table on every request; a total can be that stale.
+        """
+        filters = (status, processing_state, vendor_name, upload_date_from, upload_date_to)
+        ttl = getattr(settings, "INVOICE_COUNT_CACHE_SECONDS", 30)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        # Key on the database too, so sessions bound to different databases never share a count
+        key = (str(getattr(session.bind, "url", "")),) + filters
+        cached = _count_cache.get(key)
+        try:
+            if use_cache and ttl > 0 and cached and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            result = await session.execute(
+                select(func.count(InvoiceDB.id)).where(*_invoice_list_filters(*filters))
+            )
+            count = int(result.scalar() or 0)
+        except Exception as e:
+            logger.error(f"Error counting invoices: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+        
+        if len(_count_cache) >= _COUNT_CACHE_MAX_KEYS:
+            _count_cache.clear()
+        _count_cache[key] = (time.monotonic(), count)
+        return count
+
+    @staticmethod
+    async def index_invoice_for_search(
+        invoice_id: str,
+        document_text: Any = KEEP_DOCUMENT_TEXT,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """
+        Rewrite an invoice's full-text search document from its current row
+        
+        Args:
+            invoice_id: Invoice to index
+            document_text: Document Intelligence content (default: keep the stored text)
+            db: Async database session (optional)
+            
+        Returns:
+            False if the invoice does not exist
+        """
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            indexed = await save_search_document(session, invoice_id, document_text=document_text)
+            await session.commit()
+            return indexed
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error indexing invoice {invoice_id} for search: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+    
+    @staticmethod
+    async def search_invoices(
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        include_total: bool = True,
+        db: Optional[AsyncSession] = None,
+    ) -> Dict[str, Any]:
+        """
+        Full-text search over vendor names, invoice / PO numbers, line item
+        descriptions and Document Intelligence text
+        
+        Every word of ``query`` must match, as a word prefix (numbers also
+        match by fragment). Results are ranked by relevance: bm25 with
+        numbers and vendor weighted highest on SQLite (FTS5), CONTAINSTABLE
+        rank on SQL Server. Other backends, or SQLite without FTS5, fall back
+        to substring matching ordered newest first, with rank and snippet None.
+        
+        Args:
+            query: Search text
+            skip: Number of results to skip
+            limit: Maximum number of results to return
+            include_total: Also return the number of matching invoices
+            db: Async database session (optional)
+            
+        Returns:
+            Dict with invoices (SUMMARY_COLUMNS plus po_number, rank and
+            snippet), has_more and total (None unless include_total)
+        """
+        terms = search_terms(query)
+        if not terms:
+            return {"invoices": [], "has_more": False, "total": 0 if include_total else None}
+        
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            columns = [
+                getattr(InvoiceDB, attr).label(key)
+                for key, attr in DatabaseService.SUMMARY_COLUMNS.items()
+            ] + [InvoiceDB.po_number.label("po_number")]
+            dialect = session.get_bind().dialect.name
+            
+            if dialect == "sqlite" and await _sqlite_fts_ready_cached(session):
+                fts = table(INVOICE_SEARCH_FTS_TABLE, column("rowid"))
+                fts_ref = literal_column(INVOICE_SEARCH_FTS_TABLE)
+                matches = fts_ref.op("MATCH")(fts5_match(terms))
+                bm25 = func.bm25(fts_ref, *_SEARCH_COLUMN_WEIGHTS)
+                snippets = [
+                    func.snippet(
+                        fts_ref, INVOICE_SEARCH_FTS_COLUMNS.index(name), _SNIPPET_MARK, _SNIPPET_MARK, "...",
+                        _SEARCH_SNIPPET_TOKENS,
+                    ).label(f"snippet_{name}")
+                    for name in _SNIPPET_COLUMNS
+                ]
+                base = (
+                    select(fts.c.rowid)
+                    .select_from(fts)
+                    .join(InvoiceSearchDocument, InvoiceSearchDocument.id == fts.c.rowid)
+                    .join(InvoiceDB, InvoiceDB.id == InvoiceSearchDocument.invoice_id)
+                    .where(matches)
+                )
+                # bm25 is lower (more negative) for better matches; rank is reported higher-is-better
+                query_stmt = base.with_only_columns(*columns, (-bm25).label("rank"), *snippets).order_by(
+                    bm25, InvoiceDB.upload_date.desc(), InvoiceDB.id.desc()
+                )
+            elif dialect == "mssql":
+                ranked = func.containstable(
+                    literal_column(InvoiceSearchDocument.__tablename__),
+                    literal_column(f"({', '.join(INVOICE_SEARCH_FTS_COLUMNS)})"),
+                    mssql_contains(terms),
+                ).table_valued(column("KEY"), column("RANK")).alias("ranked")
+                base = (
+                    select(ranked.c.KEY)
+                    .select_from(ranked)
+                    .join(InvoiceSearchDocument, InvoiceSearchDocument.id == ranked.c.KEY)
+                    .join(InvoiceDB, InvoiceDB.id == InvoiceSearchDocument.invoice_id)
+                )
+                rank = ranked.c.RANK.label("rank")
+                query_stmt = base.with_only_columns(*columns, rank, null().label("snippet")).order_by(
+                    ranked.c.RANK.desc(), InvoiceDB.upload_date.desc(), InvoiceDB.id.desc()
+                )
+            else:
+                searchable = [getattr(InvoiceSearchDocument, name) for name in INVOICE_SEARCH_FTS_COLUMNS]
+                base = (
+                    select(InvoiceSearchDocument.id)
+                    .join(InvoiceDB, InvoiceDB.id == InvoiceSearchDocument.invoice_id)
+                    .where(*(
+                        or_(*(col.ilike(_like_pattern(term), escape="\\") for col in searchable))
+                        for term in terms
+                    ))
+                )
+                query_stmt = base.with_only_columns(*columns, null().label("rank"), null().label("snippet")).order_by(
+                    InvoiceDB.upload_date.desc(), InvoiceDB.id.desc()
+                )
+            
+            result = await session.execute(query_stmt.offset(skip).limit(limit + 1))
+            rows = [_with_search_snippet(dict(row)) for row in result.mappings().all()]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            total = None
+            if include_total:
+                total = int((await session.execute(
+                    select(func.count()).select_from(base.subquery())
+                )).scalar() or 0)
+            return {"invoices": rows, "has_more": has_more, "total": total}
+        except Exception as e:
+            logger.error(f"Error searching invoices for {query!r}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+    
+    @staticmethod
+    async def list_invoice_ids_by_state(
+        states: List[str],
+        limit: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> List[str]:
+        """Ids of invoices in the given processing states, oldest upload first"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            query = (
+                select(InvoiceDB.id)
+                .where(InvoiceDB.processing_state.in_(states))
+                .order_by(InvoiceDB.upload_date)
+            )
+            if limit:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            return list(result.scalars().all())
+        except Exception as e:
+            logger.error(f"Error listing invoice ids for states {states}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+    
+    @staticmethod
+    async def count_invoices_by_state(db: Optional[AsyncSession] = None) -> Dict[str, int]:
+        """Invoice counts per processing state (extraction backlog)"""
+        from sqlalchemy import func
+
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                select(InvoiceDB.processing_state, func.count()).group_by(InvoiceDB.processing_state)
+            )
+            return {state: count for state, count in result.all()}
+        except Exception as e:
+            logger.error(f"Error counting invoices by state: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+    
     @staticmethod
     async def update_invoice_status(
         invoice_id: str,
@@ -0,0 +1,268 @@
+"""Stage-pipelined extraction engine
+
+Runs many invoices through the ExtractionService stages with a bounded queue
+between consecutive stages:
+
+    claim -> download -> DI analyze -> map/validate -> persist -> LLM refine -> persist
+
+Every stage draws on a named resource (``download``, ``di``, ``map``, ``db``,
+``llm``) with its own concurrency limit and optional rate limit, so a slow
+resource (usually Document Intelligence) no longer holds a slot that the
+download, mapping and database stages could be using. Stages that share a
+resource (the two persist stages) share its limiter.
+
+``di`` and ``llm`` use the process-wide priority limiters, so a batch competes
+for those services with every other extraction at its priority class; the
+other resources are limited per run.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+import logging
+
+from src.config import settings
+from src.extraction.extraction_service import ExtractionContext
+from src.services.priority_scheduler import PriorityLimiter, priority_scope, shared_limiter
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling a stage worker to exit
+_DONE = object()
+
+_DEFAULT_CONCURRENCY = {
+    "download": ("PIPELINE_DOWNLOAD_CONCURRENCY", 8),
+    "di": ("PIPELINE_DI_CONCURRENCY", 4),
+    "map": ("PIPELINE_MAP_CONCURRENCY", 2),
+    "db": ("PIPELINE_DB_CONCURRENCY", 4),
+    "llm": ("PIPELINE_LLM_CONCURRENCY", 4),
+}
+
+
+class StageLimiter:
+    """Concurrency cap plus optional minimum spacing between starts (requests/second)"""
+
+    def __init__(self, concurrency: int, rate_per_second: float = 0.0):
+        self.concurrency = max(1, concurrency)
+        self.rate_per_second = max(0.0, rate_per_second or 0.0)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._rate_lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self) -> "StageLimiter":
+        await self._semaphore.acquire()
+        if self.rate_per_second:
+            try:
+                async with self._rate_lock:
+                    now = time.monotonic()
+                    wait = self._next_start - now
+                    self._next_start = max(now, self._next_start) + 1.0 / self.rate_per_second
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._semaphore.release()
+
+
+class ExtractionPipeline:
+    """Pipelined batch extraction over ExtractionService stages"""
+
+    def __init__(
+        self,
+        extraction_service=None,
+        concurrency: Optional[Dict[str, int]] = None,
+        rate_limits: Optional[Dict[str, float]] = None,
+        queue_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            extraction_service: ExtractionService instance (created lazily if omitted)
+            concurrency: Per-resource concurrency overrides, e.g. {"di": 8}
+            rate_limits: Per-resource starts per second, e.g. {"di": 15}; 0 = unlimited
+            queue_size: Capacity of each queue between stages
+            max_in_flight: Invoices claimed but not yet finished (bounds held leases)
+        """
+        self._extraction_service = extraction_service
+        concurrency = concurrency or {}
+        rate_limits = rate_limits or {}
+        # Explicit di / llm overrides get a private limiter instead of the shared one
+        self._private = {
+            resource for resource in ("di", "llm")
+            if resource in concurrency or resource in rate_limits
+        }
+        self.concurrency = {
+            resource: max(1, concurrency.get(resource) or getattr(settings, name, default))
+            for resource, (name, default) in _DEFAULT_CONCURRENCY.items()
+        }
+        self.rate_limits = {
+            resource: rate_limits.get(resource, getattr(settings, f"PIPELINE_{resource.upper()}_RATE_LIMIT", 0.0))
+            for resource in _DEFAULT_CONCURRENCY
+        }
+        self.queue_size = max(1, queue_size or getattr(settings, "PIPELINE_QUEUE_SIZE", 16))
+        self.max_in_flight = max(1, max_in_flight or getattr(settings, "PIPELINE_MAX_IN_FLIGHT", 32))
+
+    @property
+    def extraction_service(self):
+        if self._extraction_service is None:
+            from src.services.service_container import get_service_container
+            self._extraction_service = get_service_container().extraction_service
+        return self._extraction_service
+
+    def _stages(self):
+        service = self.extraction_service
+        return [("db", service.claim_extraction), *service.extraction_stages()]
+
+    async def run(
+        self,
+        contexts: Union[Iterable[ExtractionContext], AsyncIterable[ExtractionContext]],
+        on_result: Optional[Callable[[ExtractionContext], Awaitable[None]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract every context and return the results in input order
+
+        Each result has the same shape as ``ExtractionService.extract_invoice``.
+        Per-invoice stage timings land in ``ctx.timings`` / ``ctx.elapsed_seconds``;
+        per-stage counts and busy time from the last run are kept in ``self.stats``.
+
+        Args:
+            contexts: Invoices to extract. The next context is only taken once
+                an in-flight slot is free, so an async iterable can claim its
+                invoices just in time.
+            on_result: Awaited with each context as soon as it finishes (streaming)
+        """
+        source = _as_async_iterator(contexts)
+        # Contexts taken from the source, in order
+        fed: List[ExtractionContext] = []
+        service = self.extraction_service
+        stages = self._stages()
+        limiters = {resource: self._limiter(resource) for resource in self.concurrency}
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        labels = [_stage_label(stage, resource) for resource, stage in stages]
+        self.stats = {
+            label: {"resource": resource, "count": 0, "seconds": 0.0}
+            for label, (resource, _) in zip(labels, stages)
+        }
+        entered: Dict[int, float] = {}
+
+        async def finish(ctx: ExtractionContext) -> None:
+            service.release_extraction(ctx)
+            ctx.elapsed_seconds = time.perf_counter() - entered.pop(id(ctx), time.perf_counter())
+            in_flight.release()
+            if on_result is not None:
+                try:
+                    await on_result(ctx)
+                except Exception as e:
+                    logger.warning(f"Result callback failed for invoice {ctx.invoice_id}: {e}")
+
+        async def feeder() -> None:
+            try:
+                while True:
+                    await in_flight.acquire()
+                    try:
+                        ctx = await source.__anext__()
+                    except StopAsyncIteration:
+                        in_flight.release()
+                        return
+                    fed.append(ctx)
+                    entered[id(ctx)] = time.perf_counter()
+                    await queues[0].put(ctx)
+            finally:
+                for _ in range(self._workers(stages[0][0])):
+                    await queues[0].put(_DONE)
+
+        async def worker(index: int) -> None:
+            resource, stage = stages[index]
+            label = labels[index]
+            stat = self.stats[label]
+            while True:
+                ctx = await queues[index].get()
+                if ctx is _DONE:
+                    return
+                try:
+                    with priority_scope(ctx.priority):
+                        async with limiters[resource]:
+                            started = time.perf_counter()
+                            try:
+                                await stage(ctx)
+                            finally:
+                                seconds = time.perf_counter() - started
+                                observe = getattr(limiters[resource], "observe", None)
+                                if observe is not None:
+                                    observe(seconds)
+                                ctx.timings[label] = seconds
+                                stat["seconds"] += seconds
+                                stat["count"] += 1
+                except Exception as e:
+                    await service.fail_extraction(ctx, e)
+                if ctx.result is not None or index + 1 == len(stages):
+                    await finish(ctx)
+                else:
+                    await queues[index + 1].put(ctx)
+
+        workers = [
+            [asyncio.create_task(worker(index)) for _ in range(self._workers(resource))]
+            for index, (resource, _) in enumerate(stages)
+        ]
+        feed_task = asyncio.create_task(feeder())
+        start = time.perf_counter()
+        try:
+            await feed_task
+            for index, stage_workers in enumerate(workers):
+                await asyncio.gather(*stage_workers)
+                if index + 1 < len(stages):
+                    for _ in workers[index + 1]:
+                        await queues[index + 1].put(_DONE)
+        except BaseException:
+            for task in [feed_task, *(t for stage_workers in workers for t in stage_workers)]:
+                task.cancel()
+            for ctx in fed:
+                service.release_extraction(ctx)
+            raise
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Pipelined extraction of {len(fed)} invoices finished in {elapsed:.2f}s; "
+            + ", ".join(f"{name}={s['seconds']:.2f}s/{s['count']}" for name, s in self.stats.items())
+            + f"; {sum(ctx.uow.commits for ctx in fed)} db commits"
+        )
+        return [
+            ctx.result or {"invoice_id": ctx.invoice_id, "status": "error", "errors": ctx.errors or ["Not processed"]}
+            for ctx in fed
+        ]
+
+    def _limiter(self, resource: str):
+        if resource in self._private:
+            return PriorityLimiter(self.concurrency[resource], self.rate_limits[resource])
+        return shared_limiter(resource) or StageLimiter(self.concurrency[resource], self.rate_limits[resource])
+
+    def _workers(self, resource: str) -> int:
+        return self.concurrency[resource]
+
+
+async def _iterate(contexts: Iterable[ExtractionContext]) -> AsyncIterator[ExtractionContext]:
+    for ctx in contexts:
+        yield ctx
+
+
+def _as_async_iterator(
+    contexts: Union[Iterable[ExtractionContext], AsyncIterable[ExtractionContext]],
+) -> AsyncIterator[ExtractionContext]:
+    if isinstance(contexts, AsyncIterable):
+        return contexts.__aiter__()
+    return _iterate(contexts)
+
+
+def _stage_label(stage: Callable, resource: str) -> str:
+    """Short stage name for timings: _stage_download -> download, claim_extraction -> claim"""
+    name = getattr(stage, "__name__", resource)
+    if name.startswith("_stage_"):
+        return name[len("_stage_"):]
+    return name.lstrip("_").split("_")[0]
@@ -0,0 +1,424 @@
+"""Durable, database-backed extraction job queue
+
+Jobs live in the ``extraction_jobs`` table so they survive API and worker
+restarts. Workers claim jobs with a conditional UPDATE (the same pattern as
+``DatabaseService.claim_for_extraction``), hold a time-limited lease while
+processing, and either complete the job or record the failure. A failed
+attempt is retried after an exponential backoff until ``max_attempts``; a job
+whose worker died is claimable again once its lease expires.
+"""
+
+from typing import Optional, List, Dict, Any, Set, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.exc import IntegrityError
+import logging
+
+from src.config import settings
+from src.models.database import AsyncSessionLocal
+from src.models.db_models import ExtractionJob, Invoice as InvoiceDB
+
+logger = logging.getLogger(__name__)
+
+
+class JobState:
+    """Extraction job lifecycle states"""
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+    ACTIVE = (QUEUED, RUNNING)
+
+
+def _job_to_dict(job: ExtractionJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "invoice_id": job.invoice_id,
+        "state": job.state,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "available_at": job.available_at,
+        "lease_owner": job.lease_owner,
+        "lease_expires_at": job.lease_expires_at,
+        "last_error": job.last_error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _claimable(now: datetime):
+    """QUEUED jobs that are due, and RUNNING jobs whose lease expired (dead worker)"""
+    return and_(
+        ExtractionJob.available_at <= now,
+        ExtractionJob.attempts < ExtractionJob.max_attempts,
+        or_(
+            ExtractionJob.state == JobState.QUEUED,
+            and_(
+                ExtractionJob.state == JobState.RUNNING,
+                ExtractionJob.lease_expires_at < now,
+            ),
+        ),
+    )
+
+
+class ExtractionJobQueue:
+    """Async operations on the extraction job queue"""
+
+    @staticmethod
+    async def enqueue(
+        invoice_ids: List[str],
+        max_attempts: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> Dict[str, Any]:
+        """
+        Queue extraction for invoices
+
+        An invoice that already has a QUEUED or RUNNING job keeps that job
+        instead of getting a second one; a unique index on active jobs per
+        invoice enforces this against concurrent enqueues.
+
+        Returns:
+            {
+                "jobs": [{"invoice_id": str, "job_id": str, "created": bool}],
+                "not_found": [invoice_id, ...]
+            }
+        """
+        max_attempts = max(1, max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 3))
+        unique_ids = list(dict.fromkeys(invoice_ids))
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            try:
+                jobs, known = await ExtractionJobQueue._enqueue_once(session, unique_ids, max_attempts)
+            except IntegrityError:
+                # A concurrent enqueue created an active job for one of the invoices
+                # first (unique per invoice while QUEUED/RUNNING); this pass reuses it
+                await session.rollback()
+                jobs, known = await ExtractionJobQueue._enqueue_once(session, unique_ids, max_attempts)
+            return {
+                "jobs": jobs,
+                "not_found": [invoice_id for invoice_id in unique_ids if invoice_id not in known],
+            }
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error enqueuing extraction jobs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def _enqueue_once(
+        session: AsyncSession,
+        unique_ids: List[str],
+        max_attempts: int,
+    ) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        """Create the missing active jobs and commit; returns (jobs, ids of known invoices)"""
+        known = set(
+            (await session.execute(select(InvoiceDB.id).where(InvoiceDB.id.in_(unique_ids)))).scalars()
+        )
+        active = {
+            row.invoice_id: row.id
+            for row in (
+                await session.execute(
+                    select(ExtractionJob.invoice_id, ExtractionJob.id).where(
+                        ExtractionJob.invoice_id.in_(list(known)),
+                        ExtractionJob.state.in_(JobState.ACTIVE),
+                    )
+                )
+            )
+        }
+        now = datetime.utcnow()
+        jobs = []
+        for invoice_id in unique_ids:
+            if invoice_id not in known:
+                continue
+            if invoice_id in active:
+                jobs.append({"invoice_id": invoice_id, "job_id": active[invoice_id], "created": False})
+                continue
+            job = ExtractionJob(
+                invoice_id=invoice_id,
+                state=JobState.QUEUED,
+                attempts=0,
+                max_attempts=max_attempts,
+                available_at=now,
+                created_at=now,
+                updated_at=now,
+            )
+            session.add(job)
+            await session.flush()
+            jobs.append({"invoice_id": invoice_id, "job_id": job.id, "created": True})
+        await session.commit()
+        return jobs, known
+
+    @staticmethod
+    async def claim_next(
+        worker_id: str,
+        lease_seconds: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest due job for a worker
+
+        Candidates are read first, then each is claimed with a conditional
+        UPDATE that only succeeds if the job is still claimable, so two
+        workers racing for the same row cannot both win.
+
+        Returns:
+            Claimed job dict, or None if nothing is due
+        """
+        lease_seconds = lease_seconds or getattr(settings, "JOB_LEASE_SECONDS", 300)
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            candidates = (
+                await session.execute(
+                    select(ExtractionJob.id)
+                    .where(_claimable(now))
+                    .order_by(ExtractionJob.available_at, ExtractionJob.created_at)
+                    .limit(5)
+                )
+            ).scalars().all()
+            for job_id in candidates:
+                result = await session.execute(
+                    update(ExtractionJob)
+                    .where(ExtractionJob.id == job_id, _claimable(now))
+                    .values(
+                        state=JobState.RUNNING,
+                        attempts=ExtractionJob.attempts + 1,
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=lease_seconds),
+                        started_at=now,
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    job = await session.get(ExtractionJob, job_id, populate_existing=True)
+                    return _job_to_dict(job)
+            return None
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error claiming extraction job for worker {worker_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def _update_owned(
+        job_id: str,
+        worker_id: str,
+        values: Dict[str, Any],
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Update a RUNNING job only while ``worker_id`` still holds its lease"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            values = dict(values, updated_at=datetime.utcnow())
+            result = await session.execute(
+                update(ExtractionJob)
+                .where(
+                    ExtractionJob.id == job_id,
+                    ExtractionJob.state == JobState.RUNNING,
+                    ExtractionJob.lease_owner == worker_id,
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount == 0:
+                logger.warning(f"Job {job_id} is no longer leased by {worker_id}; update dropped")
+                return False
+            return True
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error updating extraction job {job_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def renew_lease(
+        job_id: str,
+        worker_id: str,
+        lease_seconds: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Extend the lease on a running job; False if the worker lost it"""
+        lease_seconds = lease_seconds or getattr(settings, "JOB_LEASE_SECONDS", 300)
+        return await ExtractionJobQueue._update_owned(
+            job_id,
+            worker_id,
+            {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            db=db,
+        )
+
+    @staticmethod
+    async def complete(
+        job_id: str,
+        worker_id: str,
+        result: Optional[Dict[str, Any]] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Mark a job SUCCEEDED"""
+        now = datetime.utcnow()
+        return await ExtractionJobQueue._update_owned(
+            job_id,
+            worker_id,
+            {
+                "state": JobState.SUCCEEDED,
+                "result": result,
+                "last_error": None,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "finished_at": now,
+            },
+            db=db,
+        )
+
+    @staticmethod
+    async def fail(
+        job_id: str,
+        worker_id: str,
+        error: str,
+        attempts: int,
+        max_attempts: int,
+        retry: bool = True,
+        result: Optional[Dict[str, Any]] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> str:
+        """
+        Record a failed attempt
+
+        The job is re-queued with exponential backoff while attempts remain
+        (and ``retry`` is set); otherwise it is marked FAILED.
+
+        Returns:
+            The job's new state
+        """
+        now = datetime.utcnow()
+        if retry and attempts < max_attempts:
+            backoff = getattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 30) * (2 ** max(0, attempts - 1))
+            state = JobState.QUEUED
+            values = {"available_at": now + timedelta(seconds=backoff)}
+        else:
+            state = JobState.FAILED
+            values = {"finished_at": now}
+        values.update(
+            state=state,
+            last_error=error,
+            result=result,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        await ExtractionJobQueue._update_owned(job_id, worker_id, values, db=db)
+        return state
+
+    @staticmethod
+    async def fail_expired(db: Optional[AsyncSession] = None) -> int:
+        """
+        Mark RUNNING jobs FAILED when their lease expired on the last attempt
+
+        Jobs with attempts left are simply re-claimed; this only closes out the
+        ones that would otherwise stay RUNNING forever.
+        """
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            now = datetime.utcnow()
+            result = await session.execute(
+                update(ExtractionJob)
+                .where(
+                    ExtractionJob.state == JobState.RUNNING,
+                    ExtractionJob.lease_expires_at < now,
+                    ExtractionJob.attempts >= ExtractionJob.max_attempts,
+                )
+                .values(
+                    state=JobState.FAILED,
+                    last_error="Worker lease expired on final attempt",
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    finished_at=now,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount or 0
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error failing expired extraction jobs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def get_job(job_id: str, db: Optional[AsyncSession] = None) -> Optional[Dict[str, Any]]:
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            job = await session.get(ExtractionJob, job_id, populate_existing=True)
+            return _job_to_dict(job) if job else None
+        except Exception as e:
+            logger.error(f"Error fetching extraction job {job_id}: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def list_jobs(
+        state: Optional[str] = None,
+        invoice_id: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        db: Optional[AsyncSession] = None,
+    ) -> List[Dict[str, Any]]:
+        """List jobs, newest first"""
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            query = select(ExtractionJob)
+            if state:
+                query = query.where(ExtractionJob.state == state.upper())
+            if invoice_id:
+                query = query.where(ExtractionJob.invoice_id == invoice_id)
+            query = query.order_by(ExtractionJob.created_at.desc()).offset(skip).limit(limit)
+            result = await session.execute(query)
+            return [_job_to_dict(job) for job in result.scalars().all()]
+        except Exception as e:
+            logger.error(f"Error listing extraction jobs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
+
+    @staticmethod
+    async def count_by_state(db: Optional[AsyncSession] = None) -> Dict[str, int]:
+        """Job counts per state (queue depth)"""
+        from sqlalchemy import func
+
+        session = db or AsyncSessionLocal()
+        should_close = db is None
+        try:
+            result = await session.execute(
+                select(ExtractionJob.state, func.count()).group_by(ExtractionJob.state)
+            )
+            return {state: count for state, count in result.all()}
+        except Exception as e:
+            logger.error(f"Error counting extraction jobs: {e}", exc_info=True)
+            raise
+        finally:
+            if should_close:
+                await session.close()
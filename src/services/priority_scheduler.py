@@ -0,0 +1,262 @@
+"""Priority classes and weighted fair queuing for shared extraction capacity
+
+Document Intelligence and Azure OpenAI capacity is shared by everything that
+extracts in this process: HITL re-extracts, batch runs and blob imports. Work
+is tagged with a priority class (``interactive``, ``normal``, ``bulk``) held
+in a context variable, and the process-wide ``di`` / ``llm`` limiters hand out
+slots by weighted fair queuing across the classes. A reviewer's re-extract
+takes the next free slot ahead of a queued overnight import, while bulk work
+still gets every slot nobody else is waiting for.
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from enum import Enum
+from typing import Any, Deque, Dict, Iterator, Optional, Union
+import asyncio
+import contextvars
+import logging
+import time
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(str, Enum):
+    """Extraction priority classes"""
+    INTERACTIVE = "interactive"
+    NORMAL = "normal"
+    BULK = "bulk"
+
+
+_DEFAULT_WEIGHTS = {
+    Priority.INTERACTIVE: ("PRIORITY_WEIGHT_INTERACTIVE", 16.0),
+    Priority.NORMAL: ("PRIORITY_WEIGHT_NORMAL", 4.0),
+    Priority.BULK: ("PRIORITY_WEIGHT_BULK", 1.0),
+}
+
+# Weight of the newest sample in the smoothed slot latency
+_LATENCY_SMOOTHING = 0.2
+
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "extraction_priority", default=Priority.NORMAL
+)
+
+
+def normalize_priority(value: Union[str, Priority, None]) -> Priority:
+    """Priority from a request value; None means the current priority"""
+    if value is None:
+        return current_priority()
+    try:
+        return Priority(value)
+    except ValueError:
+        raise ValueError(f"Unknown priority '{value}'. Must be one of: {', '.join(p.value for p in Priority)}")
+
+
+def current_priority() -> Priority:
+    """Priority class of the extraction work running in this context"""
+    return _current_priority.get()
+
+
+@contextmanager
+def priority_scope(priority: Union[str, Priority]) -> Iterator[Priority]:
+    """Run the enclosed work (and tasks created inside it) at ``priority``"""
+    token = _current_priority.set(normalize_priority(priority))
+    try:
+        yield _current_priority.get()
+    finally:
+        _current_priority.reset(token)
+
+
+class PriorityLimiter:
+    """
+    Concurrency cap shared across priority classes by weighted fair queuing
+
+    Each class waits in its own FIFO. When a slot frees, it goes to the waiting
+    class with the smallest virtual time; serving a class advances its virtual
+    time by ``1 / weight``, so under contention classes get slots in
+    proportion to their weights. A class that was idle restarts at the current
+    virtual clock instead of cashing in credit for the time it was idle.
+
+    ``reserved`` slots are only handed to interactive work, bounding its wait
+    even when bulk work could otherwise occupy every slot.
+
+    Used as ``async with limiter:`` (priority from the context) or
+    ``async with limiter.slot(priority):``.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        rate_per_second: float = 0.0,
+        weights: Optional[Dict[Priority, float]] = None,
+        reserved: int = 0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.rate_per_second = max(0.0, rate_per_second or 0.0)
+        weights = weights or {}
+        self.weights = {
+            priority: max(0.01, float(weights.get(priority) or getattr(settings, name, default)))
+            for priority, (name, default) in _DEFAULT_WEIGHTS.items()
+        }
+        self.reserved = max(0, min(reserved, self.concurrency - 1))
+        self._active = 0
+        self._waiters: Dict[Priority, Deque[asyncio.Future]] = {p: deque() for p in Priority}
+        self._vtime: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._clock = 0.0
+        self._next_start = 0.0
+        self._granted: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._wait_seconds: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        # Smoothed time a slot is held (the service's observed latency)
+        self.latency_seconds: Optional[float] = None
+
+    def _has_room(self, priority: Priority) -> bool:
+        limit = self.concurrency if priority == Priority.INTERACTIVE else self.concurrency - self.reserved
+        return self._active < limit
+
+    def _grant(self, priority: Priority) -> None:
+        self._active += 1
+        self._granted[priority] += 1
+        start = max(self._vtime[priority], self._clock)
+        self._clock = start
+        self._vtime[priority] = start + 1.0 / self.weights[priority]
+
+    def _dispatch(self) -> None:
+        while True:
+            candidates = [
+                p for p, queue in self._waiters.items()
+                if queue and self._has_room(p)
+            ]
+            if not candidates:
+                return
+            # Smallest virtual time first; ties go to the higher class (enum order)
+            priority = min(candidates, key=lambda p: (max(self._vtime[p], self._clock), list(Priority).index(p)))
+            waiter = self._waiters[priority].popleft()
+            if waiter.done():
+                continue
+            self._grant(priority)
+            waiter.set_result(None)
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        priority = normalize_priority(priority)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self._dispatch()
+        if not waiter.done():
+            started = time.monotonic()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as we were cancelled: hand the slot on
+                    self.release()
+                else:
+                    try:
+                        self._waiters[priority].remove(waiter)
+                    except ValueError:
+                        pass
+                raise
+            self._wait_seconds[priority] += time.monotonic() - started
+        if self.rate_per_second:
+            try:
+                await self._space_start()
+            except BaseException:
+                self.release()
+                raise
+
+    async def _space_start(self) -> None:
+        now = time.monotonic()
+        wait = self._next_start - now
+        self._next_start = max(now, self._next_start) + 1.0 / self.rate_per_second
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def observe(self, seconds: float) -> None:
+        """Record how long one call held a slot (exponentially weighted average)"""
+        if self.latency_seconds is None:
+            self.latency_seconds = seconds
+        else:
+            self.latency_seconds += _LATENCY_SMOOTHING * (seconds - self.latency_seconds)
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None):
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield self
+        finally:
+            self.observe(time.monotonic() - started)
+            self.release()
+
+    async def __aenter__(self) -> "PriorityLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "reserved_interactive": self.reserved,
+            "waiting": self.waiting(),
+            "latency_seconds": round(self.latency_seconds, 3) if self.latency_seconds is not None else None,
+            "classes": {
+                p.value: {
+                    "weight": self.weights[p],
+                    "waiting": len(self._waiters[p]),
+                    "granted": self._granted[p],
+                    "wait_seconds": round(self._wait_seconds[p], 3),
+                }
+                for p in Priority
+            },
+        }
+
+
+# Process-wide limiters for the external services every extraction path shares
+_SHARED_RESOURCES = {
+    "di": ("PIPELINE_DI_CONCURRENCY", 4, "PIPELINE_DI_RATE_LIMIT"),
+    "llm": ("PIPELINE_LLM_CONCURRENCY", 4, "PIPELINE_LLM_RATE_LIMIT"),
+}
+_shared_limiters: Dict[str, PriorityLimiter] = {}
+
+
+def shared_limiter(resource: str) -> Optional[PriorityLimiter]:
+    """Process-wide limiter for ``resource`` ("di", "llm"); None for per-run resources"""
+    if resource not in _SHARED_RESOURCES:
+        return None
+    limiter = _shared_limiters.get(resource)
+    if limiter is None:
+        concurrency_name, default, rate_name = _SHARED_RESOURCES[resource]
+        limiter = PriorityLimiter(
+            getattr(settings, concurrency_name, default),
+            rate_per_second=getattr(settings, rate_name, 0.0),
+            reserved=getattr(settings, "PRIORITY_INTERACTIVE_RESERVED_SLOTS", 0),
+        )
+        _shared_limiters[resource] = limiter
+    return limiter
+
+
+@asynccontextmanager
+async def resource_slot(resource: str, priority: Optional[Priority] = None):
+    """Hold a slot of the shared ``resource`` limiter (no-op for per-run resources)"""
+    limiter = shared_limiter(resource)
+    if limiter is None:
+        yield None
+        return
+    async with limiter.slot(priority):
+        yield limiter
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    """Per-resource, per-class scheduling stats for the shared limiters"""
+    return {resource: shared_limiter(resource).stats() for resource in _SHARED_RESOURCES}
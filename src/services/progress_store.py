@@ -0,0 +1,286 @@
+"""Bounded storage backends for invoice progress
+
+ProgressTracker keeps one small JSON document per invoice. Two backends:
+
+* ``MemoryProgressStore`` - per-process, LRU-bounded with a TTL. Mutations
+  run synchronously on the event loop, so each invoice's read-modify-write
+  is atomic without any lock.
+* ``SQLiteProgressStore`` - a SQLite file in WAL mode shared by every
+  uvicorn worker on the host. Each mutation is one ``BEGIN IMMEDIATE``
+  transaction, so concurrent writers in different processes cannot lose
+  updates; readers never block writers. A per-row ``version`` lets
+  subscribers in other processes pick up changes.
+
+Both evict entries older than ``ttl_seconds`` and the least recently used
+entries beyond ``max_entries`` (for SQLite, least recently written: reads do
+not write). Mutations take a function that receives the
+current state (or None) and returns the state to store, or None to leave
+the entry unchanged.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+ProgressState = Dict[str, Any]
+Mutation = Callable[[Optional[ProgressState]], Optional[ProgressState]]
+
+
+def _next_version(previous: int) -> int:
+    # Microsecond clock, so a re-created entry (after clear or eviction) still
+    # gets a version newer than any a subscriber has seen
+    return max(previous + 1, time.time_ns() // 1000)
+
+# Writes between full sweeps for expired entries
+_SWEEP_EVERY = 256
+
+
+class MemoryProgressStore:
+    """In-process progress store with TTL and LRU eviction"""
+
+    shared = False
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(1, max_entries or getattr(settings, "PROGRESS_STORE_MAX_ENTRIES", 10000))
+        self.ttl_seconds = ttl_seconds or getattr(settings, "PROGRESS_STORE_TTL_SECONDS", 21600)
+        # invoice_id -> (state, updated_at, version); order is least -> most recently used
+        self._entries: "OrderedDict[str, Tuple[ProgressState, float, int]]" = OrderedDict()
+        self._writes = 0
+        self.evictions = 0
+
+    def _live(self, invoice_id: str) -> Optional[Tuple[ProgressState, float, int]]:
+        entry = self._entries.get(invoice_id)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl_seconds:
+            del self._entries[invoice_id]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(invoice_id)
+        return entry
+
+    def _sweep(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [invoice_id for invoice_id, (_, updated_at, _) in self._entries.items() if updated_at < cutoff]
+        for invoice_id in expired:
+            del self._entries[invoice_id]
+        self.evictions += len(expired)
+
+    async def get(self, invoice_id: str) -> Optional[Tuple[ProgressState, int]]:
+        entry = self._live(invoice_id)
+        return (entry[0], entry[2]) if entry else None
+
+    async def mutate(self, invoice_id: str, fn: Mutation) -> Optional[Tuple[ProgressState, int]]:
+        # No await between read and write: atomic on the event loop
+        entry = self._live(invoice_id)
+        state = fn(entry[0] if entry else None)
+        if state is None:
+            return None
+        version = _next_version(entry[2] if entry else 0)
+        self._entries[invoice_id] = (state, time.time(), version)
+        self._entries.move_to_end(invoice_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._writes += 1
+        if self._writes % _SWEEP_EVERY == 0:
+            self._sweep()
+        return state, version
+
+    async def delete(self, invoice_id: str) -> None:
+        self._entries.pop(invoice_id, None)
+
+    async def changed_since(self, versions: Dict[str, int]) -> List[Tuple[ProgressState, int]]:
+        changed = []
+        for invoice_id, seen in versions.items():
+            entry = self._live(invoice_id)
+            if entry and entry[2] > seen:
+                changed.append((entry[0], entry[2]))
+        return changed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteProgressStore:
+    """Progress store in a SQLite file shared by worker processes"""
+
+    shared = True
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = path or getattr(settings, "PROGRESS_STORE_PATH", "./storage/progress.sqlite3")
+        self.max_entries = max(1, max_entries or getattr(settings, "PROGRESS_STORE_MAX_ENTRIES", 10000))
+        self.ttl_seconds = ttl_seconds or getattr(settings, "PROGRESS_STORE_TTL_SECONDS", 21600)
+        self.evictions = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS invoice_progress ("
+            " invoice_id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_invoice_progress_updated_at ON invoice_progress (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connection for the calling thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get_sync(self, invoice_id: str) -> Optional[Tuple[ProgressState, int]]:
+        row = self._conn().execute(
+            "SELECT state, version FROM invoice_progress WHERE invoice_id = ? AND updated_at >= ?",
+            (invoice_id, time.time() - self.ttl_seconds),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _mutate_sync(self, invoice_id: str, fn: Mutation) -> Optional[Tuple[ProgressState, int]]:
+        conn = self._conn()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front: read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, version, updated_at FROM invoice_progress WHERE invoice_id = ?",
+                (invoice_id,),
+            ).fetchone()
+            live = row is not None and now - row[2] <= self.ttl_seconds
+            state = fn(json.loads(row[0]) if live else None)
+            if state is None:
+                conn.execute("ROLLBACK")
+                return None
+            version = _next_version(row[1] if row else 0)
+            conn.execute(
+                "INSERT INTO invoice_progress (invoice_id, state, version, updated_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(invoice_id) DO UPDATE SET"
+                " state = excluded.state, version = excluded.version, updated_at = excluded.updated_at",
+                (invoice_id, json.dumps(state, default=str), version, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % _SWEEP_EVERY == 0:
+            self._evict_sync()
+        return state, version
+
+    def _evict_sync(self) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "DELETE FROM invoice_progress WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            overflow = conn.execute(
+                "DELETE FROM invoice_progress WHERE invoice_id IN ("
+                " SELECT invoice_id FROM invoice_progress ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.evictions += max(0, expired) + max(0, overflow)
+
+    def _changed_since_sync(self, versions: Dict[str, int]) -> List[Tuple[ProgressState, int]]:
+        if not versions:
+            return []
+        ids = list(versions)
+        changed = []
+        cutoff = time.time() - self.ttl_seconds
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self._conn().execute(
+                f"SELECT invoice_id, state, version FROM invoice_progress"
+                f" WHERE updated_at >= ? AND invoice_id IN ({','.join('?' * len(chunk))})",
+                (cutoff, *chunk),
+            ).fetchall()
+            changed.extend((json.loads(state), version) for invoice_id, state, version in rows if version > versions[invoice_id])
+        return changed
+
+    def _delete_sync(self, invoice_id: str) -> None:
+        self._conn().execute("DELETE FROM invoice_progress WHERE invoice_id = ?", (invoice_id,))
+
+    async def get(self, invoice_id: str) -> Optional[Tuple[ProgressState, int]]:
+        return await run_in_threadpool(self._get_sync, invoice_id)
+
+    async def mutate(self, invoice_id: str, fn: Mutation) -> Optional[Tuple[ProgressState, int]]:
+        return await run_in_threadpool(self._mutate_sync, invoice_id, fn)
+
+    async def delete(self, invoice_id: str) -> None:
+        await run_in_threadpool(self._delete_sync, invoice_id)
+
+    async def changed_since(self, versions: Dict[str, int]) -> List[Tuple[ProgressState, int]]:
+        return await run_in_threadpool(self._changed_since_sync, versions)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._conn().execute("SELECT COUNT(*) FROM invoice_progress").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.debug(f"Closing progress store connection failed: {e}")
+        self._local = threading.local()
+
+
+def create_progress_store() -> Any:
+    """Progress store selected by ``PROGRESS_STORE_BACKEND`` (memory or sqlite)"""
+    backend = getattr(settings, "PROGRESS_STORE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteProgressStore()
+    if backend != "memory":
+        logger.warning(f"Unknown PROGRESS_STORE_BACKEND {backend!r}; using memory")
+    return MemoryProgressStore()
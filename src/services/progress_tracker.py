@@ -6,15 +6,25 @@ Tracks progress for:
 - Extraction
 - LLM Evaluation
 
-Uses in-memory storage (thread-safe) for real-time progress tracking.
+Progress lives in a bounded store (TTL + LRU eviction, see progress_store):
+in memory by default, or a SQLite file shared by all uvicorn workers with
+``PROGRESS_STORE_BACKEND=sqlite``. Every change is also pushed to
+subscribers (see ``subscribe``), so clients can stream progress for many
+invoices instead of polling each one; with a shared store, changes written
+by other worker processes reach local subscribers too.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterable, Optional, Set
+from collections import OrderedDict
 from datetime import datetime
 from enum import Enum
 import asyncio
+import copy
 import logging
 
+from src.config import settings
+from src.services.progress_store import create_progress_store
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,19 +37,201 @@ class ProcessingStep(str, Enum):
     COMPLETE = "complete"
 
 
+# Progress states after which an invoice sends no further updates
+TERMINAL_STATUSES = ("complete", "error")
+
+
+class ProgressSubscription:
+    """
+    Live progress feed for a set of invoice ids
+    
+    Updates are conflated per invoice: a subscriber that falls behind gets
+    the latest state of each invoice rather than an ever-growing backlog.
+    Invoice ids can be added and removed while the subscription is open, so
+    one connection can follow many invoices.
+    """
+    
+    def __init__(self, tracker: "ProgressTracker", invoice_ids: Iterable[str] = ()):
+        self._tracker = tracker
+        self.invoice_ids: Set[str] = set()
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._latest_status: Dict[str, str] = {}
+        self.closed = False
+        self._initial_ids = list(invoice_ids)
+    
+    def offer(self, snapshot: Dict[str, Any]) -> None:
+        """Queue an invoice snapshot, replacing any undelivered one for that invoice"""
+        invoice_id = snapshot["invoice_id"]
+        self._pending.pop(invoice_id, None)
+        self._pending[invoice_id] = snapshot
+        self._ready.set()
+    
+    async def add(self, invoice_ids: Iterable[str]) -> None:
+        """Follow more invoices; their current progress (if any) is sent right away"""
+        await self._tracker._register(self, invoice_ids)
+    
+    async def remove(self, invoice_ids: Iterable[str]) -> None:
+        """Stop following invoices"""
+        await self._tracker._unregister(self, invoice_ids)
+        for invoice_id in invoice_ids:
+            self._pending.pop(invoice_id, None)
+            self._latest_status.pop(invoice_id, None)
+    
+    @property
+    def all_done(self) -> bool:
+        """Every followed invoice has completed or failed"""
+        return bool(self.invoice_ids) and all(
+            self._latest_status.get(invoice_id) in TERMINAL_STATUSES for invoice_id in self.invoice_ids
+        )
+    
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next progress snapshot, or None after ``timeout`` seconds without one
+        (callers use that for keep-alives)
+        """
+        while not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        _, snapshot = self._pending.popitem(last=False)
+        self._latest_status[snapshot["invoice_id"]] = snapshot.get("status")
+        return snapshot
+    
+    async def close(self) -> None:
+        """Detach from the tracker"""
+        if not self.closed:
+            self.closed = True
+            await self._tracker._unregister(self, list(self.invoice_ids))
+    
+    async def __aenter__(self) -> "ProgressSubscription":
+        await self.add(self._initial_ids)
+        return self
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
 class ProgressTracker:
-    """Thread-safe progress tracker for invoice processing"""
+    """Progress tracker for invoice processing (one per process, shared store optional)"""
     
     _instance = None
-    _lock = asyncio.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._progress: Dict[str, Dict[str, Any]] = {}
-            cls._instance._lock = asyncio.Lock()
+            cls._instance._store = None
+            cls._instance._subscribers: Dict[str, Set[ProgressSubscription]] = {}
+            cls._instance._versions: Dict[str, int] = {}
+            cls._instance._watcher: Optional[asyncio.Task] = None
         return cls._instance
     
+    @property
+    def store(self):
+        """Backing progress store (created from settings on first use)"""
+        if self._store is None:
+            self._store = create_progress_store()
+        return self._store
+    
+    def use_store(self, store) -> None:
+        """Swap the backing store (tests, or configuring a backend at startup)"""
+        if self._store is not None and self._store is not store:
+            self._store.close()
+        self._store = store
+        self._versions.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Store size / eviction counters and open subscriptions"""
+        return dict(self.store.stats(), subscriptions=self.subscriber_count())
+    
+    async def aclose(self) -> None:
+        """Stop the cross-process watcher and close the store (application shutdown)"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        self._versions.clear()
+    
+    def _publish(self, state: Dict[str, Any], version: int) -> None:
+        """Push a new invoice state to its subscribers"""
+        invoice_id = state["invoice_id"]
+        subscribers = self._subscribers.get(invoice_id)
+        # Versions are only tracked for followed invoices (they dedupe the shared-store relay)
+        if not subscribers or version <= self._versions.get(invoice_id, 0):
+            return
+        self._versions[invoice_id] = version
+        snapshot = copy.deepcopy(state)
+        for subscription in subscribers:
+            subscription.offer(snapshot)
+    
+    async def _mutate(
+        self,
+        invoice_id: str,
+        fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]],
+    ) -> None:
+        """Apply one atomic change to an invoice's progress and publish it"""
+        changed = await self.store.mutate(invoice_id, fn)
+        if changed is not None:
+            self._publish(*changed)
+    
+    def subscribe(self, invoice_ids: Iterable[str] = ()) -> ProgressSubscription:
+        """
+        Subscribe to progress updates for invoices
+        
+        Use as ``async with progress_tracker.subscribe([...]) as feed`` and
+        read snapshots with ``await feed.get()``; the current progress of
+        each invoice is delivered first.
+        """
+        return ProgressSubscription(self, invoice_ids)
+    
+    async def _register(self, subscription: ProgressSubscription, invoice_ids: Iterable[str]) -> None:
+        for invoice_id in list(invoice_ids):
+            subscription.invoice_ids.add(invoice_id)
+            self._subscribers.setdefault(invoice_id, set()).add(subscription)
+            current = await self.store.get(invoice_id)
+            if current is not None:
+                state, version = current
+                self._versions[invoice_id] = max(version, self._versions.get(invoice_id, 0))
+                subscription.offer(copy.deepcopy(state))
+        if self.store.shared and self._subscribers and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.create_task(self._watch_shared_store())
+    
+    async def _unregister(self, subscription: ProgressSubscription, invoice_ids: Iterable[str]) -> None:
+        for invoice_id in list(invoice_ids):
+            subscription.invoice_ids.discard(invoice_id)
+            subscribers = self._subscribers.get(invoice_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[invoice_id]
+                    self._versions.pop(invoice_id, None)
+    
+    async def _watch_shared_store(self) -> None:
+        """Relay changes written by other worker processes while anyone is subscribed"""
+        interval = getattr(settings, "PROGRESS_STORE_POLL_SECONDS", 0.5)
+        try:
+            while self._subscribers:
+                await asyncio.sleep(interval)
+                versions = {invoice_id: self._versions.get(invoice_id, 0) for invoice_id in self._subscribers}
+                try:
+                    changed = await self.store.changed_since(versions)
+                except Exception as e:
+                    logger.warning(f"Progress store poll failed: {e}")
+                    continue
+                for state, version in changed:
+                    self._publish(state, version)
+        finally:
+            if self._watcher is asyncio.current_task():
+                self._watcher = None
+    
+    def subscriber_count(self) -> int:
+        """Open subscriptions (for diagnostics)"""
+        return len({sub for subs in self._subscribers.values() for sub in subs})
+    
     async def start(self, invoice_id: str, step: ProcessingStep, message: str = "") -> None:
         """
         Start tracking progress for an invoice at a specific step
@@ -49,30 +241,39 @@ class ProgressTracker:
             step: Processing step
             message: Optional status message
         """
-        async with self._lock:
-            if invoice_id not in self._progress:
-                self._progress[invoice_id] = {
+        def apply(progress: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            now = datetime.utcnow().isoformat()
+            if progress is None:
+                progress = {
                     "invoice_id": invoice_id,
                     "current_step": step.value,
                     "progress_percentage": 0,
                     "status": "running",
                     "message": message,
-                    "started_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat(),
+                    "started_at": now,
+                    "updated_at": now,
                     "steps": {}
                 }
             else:
-                self._progress[invoice_id]["current_step"] = step.value
-                self._progress[invoice_id]["message"] = message
-                self._progress[invoice_id]["updated_at"] = datetime.utcnow().isoformat()
+                progress["current_step"] = step.value
+                progress["message"] = message
+                progress["updated_at"] = now
+                # A finished invoice being processed again (e.g. re-extraction) is running again
+                if progress["status"] in TERMINAL_STATUSES:
+                    progress["status"] = "running"
+                    progress.pop("completed_at", None)
             
-            # Initialize step tracking
-            if step.value not in self._progress[invoice_id]["steps"]:
-                self._progress[invoice_id]["steps"][step.value] = {
+            # Initialize step tracking (restarting a step that finished earlier)
+            step_state = progress["steps"].get(step.value)
+            if step_state is None or step_state["status"] != "running":
+                progress["steps"][step.value] = {
                     "status": "running",
                     "progress": 0,
-                    "started_at": datetime.utcnow().isoformat()
+                    "started_at": now
                 }
+            return progress
+        
+        await self._mutate(invoice_id, apply)
     
     async def update(
         self,
@@ -90,25 +291,28 @@ class ProgressTracker:
             message: Optional status message
             step: Optional step (if updating different step)
         """
-        async with self._lock:
-            if invoice_id not in self._progress:
+        def apply(progress: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if progress is None:
                 logger.warning(f"Progress update for unknown invoice_id: {invoice_id}")
-                return
-            
-            self._progress[invoice_id]["progress_percentage"] = max(0, min(100, progress_percentage))
-            self._progress[invoice_id]["updated_at"] = datetime.utcnow().isoformat()
+                return None
+            now = datetime.utcnow().isoformat()
+            progress["progress_percentage"] = max(0, min(100, progress_percentage))
+            progress["updated_at"] = now
             
             if message:
-                self._progress[invoice_id]["message"] = message
+                progress["message"] = message
             
             if step:
-                self._progress[invoice_id]["current_step"] = step.value
+                progress["current_step"] = step.value
             
             # Update step progress
-            current_step = step.value if step else self._progress[invoice_id]["current_step"]
-            if current_step in self._progress[invoice_id]["steps"]:
-                self._progress[invoice_id]["steps"][current_step]["progress"] = progress_percentage
-                self._progress[invoice_id]["steps"][current_step]["updated_at"] = datetime.utcnow().isoformat()
+            current_step = step.value if step else progress["current_step"]
+            if current_step in progress["steps"]:
+                progress["steps"][current_step]["progress"] = progress_percentage
+                progress["steps"][current_step]["updated_at"] = now
+            return progress
+        
+        await self._mutate(invoice_id, apply)
     
     async def complete_step(
         self,
@@ -124,20 +328,23 @@ class ProgressTracker:
             step: Completed step
             message: Optional completion message
         """
-        async with self._lock:
-            if invoice_id not in self._progress:
+        def apply(progress: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if progress is None:
                 logger.warning(f"Step completion for unknown invoice_id: {invoice_id}")
-                return
-            
-            if step.value in self._progress[invoice_id]["steps"]:
-                self._progress[invoice_id]["steps"][step.value]["status"] = "complete"
-                self._progress[invoice_id]["steps"][step.value]["progress"] = 100
-                self._progress[invoice_id]["steps"][step.value]["completed_at"] = datetime.utcnow().isoformat()
+                return None
+            now = datetime.utcnow().isoformat()
+            if step.value in progress["steps"]:
+                progress["steps"][step.value]["status"] = "complete"
+                progress["steps"][step.value]["progress"] = 100
+                progress["steps"][step.value]["completed_at"] = now
             
             if message:
-                self._progress[invoice_id]["message"] = message
+                progress["message"] = message
             
-            self._progress[invoice_id]["updated_at"] = datetime.utcnow().isoformat()
+            progress["updated_at"] = now
+            return progress
+        
+        await self._mutate(invoice_id, apply)
     
     async def complete(self, invoice_id: str, message: str = "Processing complete") -> None:
         """
@@ -147,17 +354,20 @@ class ProgressTracker:
             invoice_id: Invoice ID
             message: Completion message
         """
-        async with self._lock:
-            if invoice_id not in self._progress:
+        def apply(progress: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if progress is None:
                 logger.warning(f"Completion for unknown invoice_id: {invoice_id}")
-                return
-            
-            self._progress[invoice_id]["status"] = "complete"
-            self._progress[invoice_id]["current_step"] = ProcessingStep.COMPLETE.value
-            self._progress[invoice_id]["progress_percentage"] = 100
-            self._progress[invoice_id]["message"] = message
-            self._progress[invoice_id]["updated_at"] = datetime.utcnow().isoformat()
-            self._progress[invoice_id]["completed_at"] = datetime.utcnow().isoformat()
+                return None
+            now = datetime.utcnow().isoformat()
+            progress["status"] = "complete"
+            progress["current_step"] = ProcessingStep.COMPLETE.value
+            progress["progress_percentage"] = 100
+            progress["message"] = message
+            progress["updated_at"] = now
+            progress["completed_at"] = now
+            return progress
+        
+        await self._mutate(invoice_id, apply)
     
     async def error(self, invoice_id: str, error_message: str, step: Optional[ProcessingStep] = None) -> None:
         """
@@ -168,18 +378,20 @@ class ProgressTracker:
             error_message: Error message
             step: Optional step where error occurred
         """
-        async with self._lock:
-            if invoice_id not in self._progress:
+        def apply(progress: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if progress is None:
                 logger.warning(f"Error for unknown invoice_id: {invoice_id}")
-                return
-            
-            self._progress[invoice_id]["status"] = "error"
-            self._progress[invoice_id]["message"] = error_message
-            self._progress[invoice_id]["updated_at"] = datetime.utcnow().isoformat()
+                return None
+            progress["status"] = "error"
+            progress["message"] = error_message
+            progress["updated_at"] = datetime.utcnow().isoformat()
             
-            if step and step.value in self._progress[invoice_id]["steps"]:
-                self._progress[invoice_id]["steps"][step.value]["status"] = "error"
-                self._progress[invoice_id]["steps"][step.value]["error"] = error_message
+            if step and step.value in progress["steps"]:
+                progress["steps"][step.value]["status"] = "error"
+                progress["steps"][step.value]["error"] = error_message
+            return progress
+        
+        await self._mutate(invoice_id, apply)
     
     async def get(self, invoice_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -189,10 +401,10 @@ class ProgressTracker:
             invoice_id: Invoice ID
             
         Returns:
-            Progress dictionary or None if not found
+            Progress dictionary or None if not found (or evicted)
         """
-        async with self._lock:
-            return self._progress.get(invoice_id)
+        current = await self.store.get(invoice_id)
+        return copy.deepcopy(current[0]) if current else None
     
     async def clear(self, invoice_id: str) -> None:
         """
@@ -201,11 +413,9 @@ class ProgressTracker:
         Args:
             invoice_id: Invoice ID
         """
-        async with self._lock:
-            if invoice_id in self._progress:
-                del self._progress[invoice_id]
+        await self.store.delete(invoice_id)
+        self._versions.pop(invoice_id, None)
 
 
 # Global instance
 progress_tracker = ProgressTracker()
-
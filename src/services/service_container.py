@@ -0,0 +1,141 @@
+"""Application-scoped service container
+
+Routes used to build their services per request, so every call created a new
+Document Intelligence client, FieldExtractor, ValidationService and empty LLM /
+image caches. The container builds each of these once per process and hands
+the same instances to every request through FastAPI dependencies, so clients
+and caches stay warm.
+
+The FastAPI lifespan creates and warms the container on startup and closes it
+on shutdown. Code running outside the app (tests, scripts) gets the same
+process-wide container lazily from ``get_service_container()``.
+"""
+
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Lazily built, process-wide service instances"""
+
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        # Sync dependencies run in the threadpool; build each service only once
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    @property
+    def file_handler(self):
+        from src.ingestion.file_handler import FileHandler
+        return self._get("file_handler", FileHandler)
+
+    @property
+    def azure_file_handler(self):
+        from src.ingestion.file_handler import FileHandler
+        return self._get("azure_file_handler", lambda: FileHandler(use_azure=True))
+
+    @property
+    def pdf_processor(self):
+        from src.ingestion.pdf_processor import PDFProcessor
+        return self._get("pdf_processor", PDFProcessor)
+
+    @property
+    def field_extractor(self):
+        from src.extraction.field_extractor import FieldExtractor
+        return self._get("field_extractor", FieldExtractor)
+
+    @property
+    def extraction_service(self):
+        """Extraction over local storage (owns the shared DI client and caches)"""
+        from src.extraction.extraction_service import ExtractionService
+        return self._get(
+            "extraction_service",
+            lambda: ExtractionService(file_handler=self.file_handler, field_extractor=self.field_extractor),
+        )
+
+    @property
+    def azure_extraction_service(self):
+        """Extraction over blob storage, sharing the DI client and caches above"""
+        from src.extraction.extraction_service import ExtractionService
+
+        def build():
+            shared = self.extraction_service
+            return ExtractionService(
+                doc_intelligence_client=shared.doc_intelligence_client,
+                file_handler=self.azure_file_handler,
+                field_extractor=self.field_extractor,
+                llm_cache=shared._llm_cache,
+                image_cache=shared._image_cache,
+            )
+        return self._get("azure_extraction_service", build)
+
+    @property
+    def blob_import_service(self):
+        from src.services.blob_import_service import BlobImportService
+        # Its blob clients and extraction service are attached on first use
+        return self._get("blob_import_service", BlobImportService)
+
+    def batch_processing_service(self):
+        """New batch service (per-run pipeline stats) over the shared extraction service"""
+        from src.services.batch_processing_service import BatchProcessingService
+        return BatchProcessingService(extraction_service=self.extraction_service)
+
+    def warm(self) -> None:
+        """Build the extraction stack up front so the first request does not pay for it"""
+        try:
+            self.extraction_service
+        except Exception as e:
+            logger.warning(f"Service warm-up failed (services will be built on first use): {e}")
+
+    async def close(self) -> None:
+        """Release clients held by the container"""
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        for instance in instances:
+            aclose = getattr(instance, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.warning(f"Closing {type(instance).__name__} failed: {e}")
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+
+def get_service_container() -> ServiceContainer:
+    """Process-wide service container (created on first use)"""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer()
+    return _container
+
+
+async def close_service_container() -> None:
+    """Close and drop the process-wide container"""
+    global _container
+    with _container_lock:
+        container, _container = _container, None
+    if container is not None:
+        await container.close()
+
+
+def get_services() -> ServiceContainer:
+    """FastAPI dependency for the shared service container"""
+    return get_service_container()
@@ -0,0 +1,152 @@
+"""Unit of work: batch one pipeline pass's database writes into few transactions
+
+``DatabaseService`` methods open their own session and commit when called
+without ``db``, so one extraction used to pay a connection checkout, round
+trips and a commit (an fsync on SQLite) for the claim, the first result, the
+scan-profile cache, the post-LLM result and any failure write.
+
+A ``UnitOfWork`` queues writes that do not need to be visible yet
+(``defer``) and runs them, together with the write that does (``run``) or at
+an explicit ``commit``, on one connection in one transaction. Sessions handed
+to ``DatabaseService`` are joined with ``join_transaction_mode="rollback_only"``:
+their ``commit()`` leaves the outer transaction open and their ``rollback()``
+rolls all of it back, so a batch commits or fails as a whole. No connection is
+held between commits, so a pass can wait on DI / LLM without pinning a pooled
+connection or SQLite's write lock.
+
+With a caller-owned session (``db``) writes run on it directly and commit as
+they always did.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from collections import Counter
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.models import database
+
+logger = logging.getLogger(__name__)
+
+# A database write: called with the session to use, e.g.
+# ``lambda s: DatabaseService.set_scan_profile(invoice_id, profile, db=s)``
+DbWrite = Callable[[AsyncSession], Awaitable[Any]]
+
+# Process-wide totals over finished units of work (see unit_of_work_stats)
+_stats: Dict[str, Any] = {"units": 0, "writes": 0, "commits": 0, "commits_per_unit": Counter()}
+
+
+class UnitOfWork:
+    """Queued database writes for one invoice, committed in as few transactions as possible"""
+
+    def __init__(
+        self,
+        invoice_id: Optional[str] = None,
+        db: Optional[AsyncSession] = None,
+        engine: Optional[AsyncEngine] = None,
+    ):
+        """
+        Args:
+            invoice_id: Invoice the writes belong to (logging / metrics)
+            db: Caller-owned session; writes run on it and commit individually
+            engine: Engine for batched transactions (default: the application engine)
+        """
+        self.invoice_id = invoice_id
+        self.db = db
+        self._engine = engine
+        self._pending: List[DbWrite] = []
+        self.writes = 0
+        self.commits = 0
+        self._finished = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def defer(self, write: DbWrite) -> None:
+        """Queue a write for the next commit"""
+        self._pending.append(write)
+
+    def discard(self) -> int:
+        """Drop queued writes (e.g. before recording a failure); returns how many were dropped"""
+        dropped = len(self._pending)
+        self._pending = []
+        return dropped
+
+    async def run(self, write: DbWrite) -> Any:
+        """Run ``write`` now, in one transaction with any queued writes, and return its result"""
+        results = await self._execute([*self._pending, write])
+        return results[-1]
+
+    async def commit(self) -> None:
+        """Run queued writes in one transaction (no-op when nothing is queued)"""
+        if self._pending:
+            await self._execute(self._pending)
+
+    async def _execute(self, writes: List[DbWrite]) -> List[Any]:
+        self._pending = []
+        if self.db is not None:
+            results = [await write(self.db) for write in writes]
+            self.writes += len(writes)
+            self.commits += len(writes)
+            return results
+
+        engine = self._engine or database.engine
+        results = []
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            session = AsyncSession(bind=conn, join_transaction_mode="rollback_only", expire_on_commit=False)
+            try:
+                for index, write in enumerate(writes):
+                    results.append(await write(session))
+                    if not transaction.is_active:
+                        # The write rolled back and reported failure through its
+                        # return value. On its own that is its result; in a batch
+                        # the other writes were lost with it.
+                        if len(writes) > 1:
+                            raise RuntimeError(
+                                f"Write {index + 1} of {len(writes)} rolled back the unit of work"
+                                f" for invoice {self.invoice_id}"
+                            )
+                        break
+                else:
+                    await transaction.commit()
+                    self.commits += 1
+            except Exception:
+                if transaction.is_active:
+                    await transaction.rollback()
+                raise
+            finally:
+                self.writes += len(writes)
+                await session.close()
+        return results
+
+    def finish(self) -> None:
+        """Record this unit's write / commit counts in the process-wide stats (idempotent)"""
+        if self._finished:
+            return
+        self._finished = True
+        if self._pending:
+            logger.warning(f"Dropping {len(self._pending)} uncommitted write(s) for invoice {self.invoice_id}")
+            self._pending = []
+        _stats["units"] += 1
+        _stats["writes"] += self.writes
+        _stats["commits"] += self.commits
+        _stats["commits_per_unit"][self.commits] += 1
+        logger.debug(f"Invoice {self.invoice_id}: {self.writes} write(s) in {self.commits} commit(s)")
+
+
+def unit_of_work_stats() -> Dict[str, Any]:
+    """Finished units of work: totals and how many invoices took N commits"""
+    units = _stats["units"]
+    return {
+        "units": units,
+        "writes": _stats["writes"],
+        "commits": _stats["commits"],
+        "commits_per_unit": round(_stats["commits"] / units, 2) if units else None,
+        "commit_histogram": dict(sorted(_stats["commits_per_unit"].items())),
+    }
+
+
+def reset_unit_of_work_stats() -> None:
+    _stats.update(units=0, writes=0, commits=0, commits_per_unit=Counter())
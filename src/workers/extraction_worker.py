@@ -0,0 +1,202 @@
+"""Extraction worker: drains the durable extraction job queue
+
+Run one or more of these next to the API; throughput scales with the number
+of worker processes, independently of the HTTP server:
+
+    python -m src.workers.extraction_worker --concurrency 4
+"""
+
+from typing import Optional, Dict, Any
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.services.db_service import DatabaseService
+from src.services.job_queue import ExtractionJobQueue, JobState
+
+logger = logging.getLogger(__name__)
+
+# Extraction result keys kept on the job row (the invoice itself is in the invoices table)
+_RESULT_KEYS = ("status", "errors", "confidence", "low_confidence_fields", "low_confidence_triggered")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ExtractionWorker:
+    """Claims extraction jobs and runs them through ExtractionService"""
+
+    def __init__(
+        self,
+        extraction_service=None,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            extraction_service: ExtractionService instance (the service container's if omitted)
+            worker_id: Lease owner id (defaults to host:pid:random)
+            concurrency: Jobs processed concurrently by this process
+            lease_seconds: Job lease length; renewed while a job runs
+            poll_interval: Sleep between polls when the queue is empty
+        """
+        self._extraction_service = extraction_service
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = max(1, concurrency or getattr(settings, "JOB_WORKER_CONCURRENCY", 2))
+        self.lease_seconds = lease_seconds or getattr(settings, "JOB_LEASE_SECONDS", 300)
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(
+            settings, "JOB_POLL_INTERVAL_SECONDS", 2.0
+        )
+
+    @property
+    def extraction_service(self):
+        if self._extraction_service is None:
+            # The process-wide instance: warm caches and shared AOAI / DI clients
+            from src.services.service_container import get_service_container
+            self._extraction_service = get_service_container().extraction_service
+        return self._extraction_service
+
+    async def run_once(self, db: Optional[AsyncSession] = None) -> bool:
+        """Claim and process one job. Returns False when nothing was due."""
+        job = await ExtractionJobQueue.claim_next(self.worker_id, lease_seconds=self.lease_seconds, db=db)
+        if job is None:
+            return False
+        await self.process_job(job, db=db)
+        return True
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """Process jobs until ``stop_event`` is set"""
+        stop_event = stop_event or asyncio.Event()
+        logger.info(f"Extraction worker {self.worker_id} started (concurrency={self.concurrency})")
+
+        async def loop() -> None:
+            while not stop_event.is_set():
+                try:
+                    worked = await self.run_once()
+                except Exception as e:
+                    logger.error(f"Worker {self.worker_id} poll failed: {e}", exc_info=True)
+                    worked = False
+                if not worked:
+                    await self.reap()
+                    try:
+                        await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+        await asyncio.gather(*(loop() for _ in range(self.concurrency)))
+        logger.info(f"Extraction worker {self.worker_id} stopped")
+
+    async def reap(self, db: Optional[AsyncSession] = None) -> None:
+        """Recover work abandoned by dead workers (expired job and invoice leases)"""
+        try:
+            await ExtractionJobQueue.fail_expired(db=db)
+            await DatabaseService.reap_expired_leases(db=db)
+        except Exception as e:
+            logger.warning(f"Worker {self.worker_id} reaper pass failed: {e}")
+
+    async def _keep_lease(self, job_id: str) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await ExtractionJobQueue.renew_lease(job_id, self.worker_id, self.lease_seconds):
+                return
+
+    async def process_job(self, job: Dict[str, Any], db: Optional[AsyncSession] = None) -> str:
+        """
+        Run extraction for a claimed job and record the outcome
+
+        Returns:
+            The job's final state for this attempt
+        """
+        job_id = job["job_id"]
+        invoice_id = job["invoice_id"]
+        heartbeat = asyncio.create_task(self._keep_lease(job_id))
+        try:
+            invoice = await DatabaseService.get_invoice(invoice_id, db=db)
+            if not invoice:
+                return await ExtractionJobQueue.fail(
+                    job_id, self.worker_id, "Invoice not found in database",
+                    job["attempts"], job["max_attempts"], retry=False, db=db,
+                )
+
+            result = await self.extraction_service.extract_invoice(
+                invoice_id=invoice_id,
+                file_identifier=invoice.file_path,
+                file_name=invoice.file_name,
+                upload_date=invoice.upload_date,
+                db=db,
+            )
+            summary = {key: result[key] for key in _RESULT_KEYS if key in result}
+            if result.get("status") == "extracted":
+                await ExtractionJobQueue.complete(job_id, self.worker_id, summary, db=db)
+                return JobState.SUCCEEDED
+
+            error = "; ".join(str(e) for e in result.get("errors") or []) or f"status={result.get('status')}"
+            state = await ExtractionJobQueue.fail(
+                job_id, self.worker_id, error, job["attempts"], job["max_attempts"], result=summary, db=db,
+            )
+            logger.warning(f"Job {job_id} for invoice {invoice_id} failed ({state}): {error}")
+            return state
+        except Exception as e:
+            logger.error(f"Job {job_id} for invoice {invoice_id} raised: {e}", exc_info=True)
+            return await ExtractionJobQueue.fail(
+                job_id, self.worker_id, str(e), job["attempts"], job["max_attempts"], db=db,
+            )
+        finally:
+            heartbeat.cancel()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: rely on KeyboardInterrupt
+
+    from src.services.service_container import close_service_container, get_service_container
+
+    # Same shared services as the API process: warm caches, one set of clients
+    get_service_container().warm()
+    worker = ExtractionWorker(
+        worker_id=args.worker_id,
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+    )
+    try:
+        await worker.run(stop_event)
+    finally:
+        await close_service_container()
+
+
+def main() -> None:
+    from src.logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Process queued invoice extraction jobs")
+    parser.add_argument("--worker-id", default=None, help="Lease owner id (default: host:pid:random)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent jobs in this process")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between polls when idle")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -125,21 +125,21 @@ def format_confidence(confidence: float) -> str:
         return "N/A"
 
 
-def load_invoice_list(status_filter: Optional[str] = None) -> list:
-    """Load list of invoices from API"""
+def load_invoice_list(status_filter: Optional[str] = None, search: Optional[str] = None) -> list:
+    """Load list of invoices from API (newest first, or best match first when searching)"""
     try:
-        params = {"limit": 100}
-        if status_filter:
-            params["status"] = status_filter
-        
-        response = requests.get(f"{API_BASE_URL}/api/hitl/invoices", params=params)
+        if search:
+            # Ranked server-side full-text search; the status filter does not apply
+            response = requests.get(
+                f"{API_BASE_URL}/api/hitl/invoices/search", params={"q": search, "limit": 50}
+            )
+        else:
+            params = {"limit": 100, "include_total": "false"}
+            if status_filter:
+                params["status"] = status_filter
+            response = requests.get(f"{API_BASE_URL}/api/hitl/invoices", params=params)
         if response.status_code == 200:
-            data = response.json()
-            invoices = data.get("invoices", [])
-            # Sort newest first by upload_date if present
-            def sort_key(inv):
-                return inv.get("upload_date") or ""
-            return sorted(invoices, key=sort_key, reverse=True)
+            return response.json().get("invoices", [])
         else:
             st.error(f"Error loading invoices: {response.status_code}")
             return []
@@ -216,6 +216,17 @@ def check_db_health() -> bool:
         return False
 
 
+def get_api_load() -> Optional[dict]:
+    """Current extraction load (ok / busy / saturated) from the API."""
+    try:
+        resp = requests.get(f"{API_BASE_URL}/api/load", timeout=5)
+        if resp.status_code == 200:
+            return resp.json()
+    except Exception:
+        pass
+    return None
+
+
 def check_api_health() -> bool:
     """Ping API health endpoint."""
     try:
@@ -411,6 +422,12 @@ def main():
             
             with tab_upload:
                 st.markdown("Upload a PDF invoice from your computer")
+                load = get_api_load()
+                if load and load.get("status") != "ok":
+                    st.caption(
+                        f"Extraction load: {load['status']} "
+                        f"({load.get('backlog', 0)} invoices waiting)"
+                    )
                 upload_file = st.file_uploader("Choose PDF file", type=["pdf"], label_visibility="collapsed")
                 if upload_file is not None:
                     st.caption(f"{upload_file.name}")
@@ -463,6 +480,9 @@ def main():
                                     except Exception as extract_err:
                                         st.error(f"Extraction error: {extract_err}")
                                         st.info(f"Invoice uploaded with ID: {invoice_id}. You can try re-extracting manually.")
+                                elif resp.status_code == 429:
+                                    retry_after = resp.headers.get("Retry-After", "a few")
+                                    st.warning(f"Extraction is at capacity right now. Please retry in {retry_after} seconds.")
                                 else:
                                     try:
                                         err_json = resp.json()
@@ -526,6 +546,13 @@ def main():
             if st.button("Refresh", help="Refresh list"):
                 st.cache_data.clear()
                 st.rerun()
+        search_text = st.text_input(
+            "Search invoices",
+            value="",
+            placeholder="Vendor, invoice / PO number, line item or document text",
+            help="Every word must match (as a word prefix); numbers also match by fragment. Ignores the status filter.",
+            label_visibility="collapsed",
+        )
         
         st.markdown("---")
         
@@ -567,10 +594,13 @@ def main():
 
     # Load invoice list
     filter_status = None if status_filter == "All" else status_filter
-    invoices = load_invoice_list(filter_status)
+    invoices = load_invoice_list(filter_status, search=search_text.strip() or None)
     
     if not invoices:
-        st.info("No invoices found. Upload invoices using the API or demo scripts.")
+        if search_text.strip():
+            st.info(f"No invoices match \"{search_text.strip()}\".")
+        else:
+            st.info("No invoices found. Upload invoices using the API or demo scripts.")
         return
     
     # Invoice selector with null default; prefer auto-selection of most recent/newly ingested invoice
@@ -603,6 +633,9 @@ def main():
     
     selected_invoice_id = invoice_options[selected_invoice_label]
     st.session_state["selected_invoice_id"] = selected_invoice_id
+    snippet = next((inv.get("snippet") for inv in invoices if inv["invoice_id"] == selected_invoice_id), None)
+    if snippet:
+        st.caption(f"Search match: {snippet}")
     
     # Load invoice details
     with st.spinner("Loading invoice..."):
@@ -81,3 +81,98 @@ class TestAPIRoutes:
         _, kwargs = mock_staging_service.call_args
         assert kwargs["erp_format"] == ERPPayloadFormat.DYNAMICS_GP
 
+
+    @pytest.mark.asyncio
+    async def test_hitl_invoice_list_uses_summary_projection(self, db_session, test_client, sample_invoice):
+        from src.services.db_service import DatabaseService
+
+        await DatabaseService.save_invoice(sample_invoice, db=db_session)
+
+        with patch.object(DatabaseService, "list_invoices", side_effect=AssertionError("full invoices loaded")):
+            response = test_client.get("/api/hitl/invoices")
+
+        assert response.status_code == 200
+        [summary] = response.json()["invoices"]
+        assert summary["invoice_id"] == sample_invoice.id
+        assert summary["total_amount"] == float(sample_invoice.total_amount)
+        assert summary["line_item_count"] == len(sample_invoice.line_items)
+        assert summary["upload_date"] == sample_invoice.upload_date.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_hitl_invoice_list_pages_with_cursor(self, db_session, test_client, sample_invoice):
+        from datetime import datetime
+        from src.services.db_service import DatabaseService
+
+        for n in range(3):
+            invoice = sample_invoice.model_copy()
+            invoice.id = f"route-page-{n}"
+            invoice.upload_date = datetime(2026, 3, n + 1)
+            await DatabaseService.save_invoice(invoice, db=db_session)
+
+        first = test_client.get("/api/hitl/invoices", params={"limit": 2}).json()
+        second = test_client.get("/api/hitl/invoices", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        bad = test_client.get("/api/hitl/invoices", params={"cursor": "%%%"})
+
+        assert [inv["invoice_id"] for inv in first["invoices"]] == ["route-page-2", "route-page-1"]
+        assert first["total"] == 3 and first["has_more"] is True
+        assert [inv["invoice_id"] for inv in second["invoices"]] == ["route-page-0"]
+        assert second["has_more"] is False and second["next_cursor"] is None
+        assert bad.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_hitl_invoice_history_reads_review_events(self, db_session, test_client, sample_invoice):
+        from src.services.db_service import DatabaseService
+
+        await DatabaseService.save_invoice(sample_invoice, db=db_session)
+        for version in range(3):
+            await DatabaseService.update_with_review_version(
+                sample_invoice.id, {}, version, db=db_session,
+                review_event={"status": "needs_review", "reviewer": "alice", "notes": f"pass {version}"},
+            )
+
+        page = test_client.get(f"/api/hitl/invoice/{sample_invoice.id}/history", params={"limit": 2})
+        newest = test_client.get(f"/api/hitl/invoice/{sample_invoice.id}/history", params={"order": "desc", "limit": 1})
+        missing = test_client.get("/api/hitl/invoice/no-such-invoice/history")
+
+        assert [entry["notes"] for entry in page.json()] == ["pass 0", "pass 1"]
+        assert [entry["review_version"] for entry in newest.json()] == [3]
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_hitl_invoice_pdf(self, db_session, test_client, sample_invoice):
+        from src.services.db_service import DatabaseService
+
+        await DatabaseService.save_invoice(sample_invoice, db=db_session)
+        services = MagicMock()
+        services.file_handler.download_file.return_value = b"%PDF-1.4 stored"
+
+        with patch("api.routes.hitl.get_service_container", return_value=services):
+            response = test_client.get(f"/api/hitl/invoice/{sample_invoice.id}/pdf")
+            missing = test_client.get("/api/hitl/invoice/no-such-invoice/pdf")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.content == b"%PDF-1.4 stored"
+        services.file_handler.download_file.assert_called_once_with(sample_invoice.file_path)
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_hitl_invoice_search(self, db_session, test_client, sample_invoice):
+        from src.services.db_service import DatabaseService
+
+        await DatabaseService.save_invoice(sample_invoice, db=db_session)
+        await DatabaseService.index_invoice_for_search(sample_invoice.id, document_text="Net 30 remittance", db=db_session)
+
+        found = test_client.get("/api/hitl/invoices/search", params={"q": "remit"}).json()
+        by_number = test_client.get("/api/hitl/invoices/search", params={"q": "2345"}).json()
+        none = test_client.get("/api/hitl/invoices/search", params={"q": "nothing"}).json()
+        empty = test_client.get("/api/hitl/invoices/search", params={"q": ""})
+
+        [hit] = found["invoices"]
+        assert hit["invoice_id"] == sample_invoice.id
+        assert hit["total_amount"] == float(sample_invoice.total_amount)
+        assert hit["snippet"] == "Net 30 **remittance**"
+        assert found["total"] == 1 and found["has_more"] is False
+        assert [inv["invoice_id"] for inv in by_number["invoices"]] == [sample_invoice.id]
+        assert none["invoices"] == [] and none["total"] == 0
+        assert empty.status_code == 422
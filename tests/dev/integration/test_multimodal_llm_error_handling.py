@@ -306,10 +306,10 @@ class TestMultimodalLLMErrorHandling:
                 
                 # Force PDF to be detected as scanned
                 from starlette.concurrency import run_in_threadpool
-                original_is_scanned = extraction_service._is_scanned_pdf
+                original_detect = extraction_service._detect_scan_profile
                 def mock_is_scanned(file_content):
-                    return True  # Force scanned detection
-                extraction_service._is_scanned_pdf = mock_is_scanned
+                    return {"is_scanned": True}  # Force scanned detection
+                extraction_service._detect_scan_profile = mock_is_scanned
                 
                 try:
                     # Run extraction
@@ -332,7 +332,7 @@ class TestMultimodalLLMErrorHandling:
                     extracted_invoice = await DatabaseService.get_invoice(invoice_id, db=db_session)
                     assert extracted_invoice is not None
                 finally:
-                    extraction_service._is_scanned_pdf = original_is_scanned
+                    extraction_service._detect_scan_profile = original_detect
         finally:
             pass
     
@@ -392,10 +392,10 @@ class TestMultimodalLLMErrorHandling:
                 mock_client_class.return_value = mock_client
                 
                 # Force PDF to be detected as scanned
-                original_is_scanned = extraction_service._is_scanned_pdf
+                original_detect = extraction_service._detect_scan_profile
                 def mock_is_scanned(file_content):
-                    return True
-                extraction_service._is_scanned_pdf = mock_is_scanned
+                    return {"is_scanned": True}
+                extraction_service._detect_scan_profile = mock_is_scanned
                 
                 try:
                     # Run extraction
@@ -414,7 +414,7 @@ class TestMultimodalLLMErrorHandling:
                     extracted_invoice = await DatabaseService.get_invoice(invoice_id, db=db_session)
                     assert extracted_invoice is not None
                 finally:
-                    extraction_service._is_scanned_pdf = original_is_scanned
+                    extraction_service._detect_scan_profile = original_detect
         finally:
             pass
     
@@ -464,10 +464,10 @@ class TestMultimodalLLMErrorHandling:
         
         try:
             # Force PDF to be detected as scanned
-            original_is_scanned = extraction_service._is_scanned_pdf
+            original_detect = extraction_service._detect_scan_profile
             def mock_is_scanned(file_content):
-                return True
-            extraction_service._is_scanned_pdf = mock_is_scanned
+                return {"is_scanned": True}
+            extraction_service._detect_scan_profile = mock_is_scanned
             
             try:
                 # Run extraction
@@ -486,7 +486,7 @@ class TestMultimodalLLMErrorHandling:
                 extracted_invoice = await DatabaseService.get_invoice(invoice_id, db=db_session)
                 assert extracted_invoice is not None
             finally:
-                extraction_service._is_scanned_pdf = original_is_scanned
+                extraction_service._detect_scan_profile = original_detect
         finally:
             extraction_service._render_multimodal_images = original_render
     
@@ -542,10 +542,10 @@ class TestMultimodalLLMErrorHandling:
                 mock_client_class.return_value = mock_client
                 
                 # Force PDF to be detected as scanned
-                original_is_scanned = extraction_service._is_scanned_pdf
+                original_detect = extraction_service._detect_scan_profile
                 def mock_is_scanned(file_content):
-                    return True
-                extraction_service._is_scanned_pdf = mock_is_scanned
+                    return {"is_scanned": True}
+                extraction_service._detect_scan_profile = mock_is_scanned
                 
                 try:
                     # Run extraction
@@ -564,7 +564,7 @@ class TestMultimodalLLMErrorHandling:
                     extracted_invoice = await DatabaseService.get_invoice(invoice_id, db=db_session)
                     assert extracted_invoice is not None
                 finally:
-                    extraction_service._is_scanned_pdf = original_is_scanned
+                    extraction_service._detect_scan_profile = original_detect
         finally:
             pass
     
@@ -617,10 +617,10 @@ class TestMultimodalLLMErrorHandling:
                 mock_client_class.return_value = mock_client
                 
                 # Force PDF to be detected as scanned
-                original_is_scanned = extraction_service._is_scanned_pdf
+                original_detect = extraction_service._detect_scan_profile
                 def mock_is_scanned(file_content):
-                    return True
-                extraction_service._is_scanned_pdf = mock_is_scanned
+                    return {"is_scanned": True}
+                extraction_service._detect_scan_profile = mock_is_scanned
                 
                 try:
                     # Run extraction with shorter timeout
@@ -637,7 +637,7 @@ class TestMultimodalLLMErrorHandling:
                     assert result["status"] in ["extracted", "error"], \
                         f"Extraction should handle timeout gracefully: {result.get('status')}"
                 finally:
-                    extraction_service._is_scanned_pdf = original_is_scanned
+                    extraction_service._detect_scan_profile = original_detect
         finally:
             pass
     
@@ -719,10 +719,10 @@ class TestMultimodalLLMErrorHandling:
                 mock_client_class.return_value = mock_client
                 
                 # Force PDF to be detected as scanned
-                original_is_scanned = extraction_service._is_scanned_pdf
+                original_detect = extraction_service._detect_scan_profile
                 def mock_is_scanned(file_content):
-                    return True
-                extraction_service._is_scanned_pdf = mock_is_scanned
+                    return {"is_scanned": True}
+                extraction_service._detect_scan_profile = mock_is_scanned
                 
                 try:
                     # Run extraction
@@ -741,7 +741,7 @@ class TestMultimodalLLMErrorHandling:
                     extracted_invoice = await DatabaseService.get_invoice(invoice_id, db=db_session)
                     assert extracted_invoice is not None
                 finally:
-                    extraction_service._is_scanned_pdf = original_is_scanned
+                    extraction_service._detect_scan_profile = original_detect
         finally:
             pass
     
@@ -791,10 +791,10 @@ class TestMultimodalLLMErrorHandling:
         
         try:
             # Force PDF to be detected as scanned
-            original_is_scanned = extraction_service._is_scanned_pdf
+            original_detect = extraction_service._detect_scan_profile
             def mock_is_scanned(file_content):
-                return True
-            extraction_service._is_scanned_pdf = mock_is_scanned
+                return {"is_scanned": True}
+            extraction_service._detect_scan_profile = mock_is_scanned
             
             try:
                 # Run extraction
@@ -811,7 +811,7 @@ class TestMultimodalLLMErrorHandling:
                 assert result["status"] in ["extracted", "error"], \
                     f"Extraction should handle image rendering exception: {result.get('status')}"
             finally:
-                extraction_service._is_scanned_pdf = original_is_scanned
+                extraction_service._detect_scan_profile = original_detect
         finally:
             extraction_service._render_multimodal_images = original_render
 
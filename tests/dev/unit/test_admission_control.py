@@ -0,0 +1,151 @@
+"""Unit tests for ingestion admission control"""
+
+import pytest
+from fastapi import HTTPException
+
+from src.services import admission_control
+from src.services.admission_control import AdmissionController, enforce_admission
+from src.services.priority_scheduler import PriorityLimiter
+
+
+def _counter(pending=0, processing=0, calls=None):
+    async def count(db):
+        if calls is not None:
+            calls.append(db)
+        return {"PENDING": pending, "PROCESSING": processing, "EXTRACTED": 999}
+    return count
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    """Private di / llm limiters so tests do not touch the process-wide ones"""
+    fakes = {"di": PriorityLimiter(4), "llm": PriorityLimiter(4)}
+    monkeypatch.setattr(admission_control, "shared_limiter", lambda resource: fakes.get(resource))
+    return fakes
+
+
+@pytest.mark.unit
+class TestAdmissionController:
+    @pytest.mark.asyncio
+    async def test_admits_when_backlog_is_low(self, limiters):
+        controller = AdmissionController(max_backlog=10, backlog_counter=_counter(pending=2))
+
+        decision = await controller.check()
+
+        assert decision["status"] == "ok"
+        assert decision["admitted"] is True
+        assert decision["deferred"] is False
+        assert decision["retry_after_seconds"] == 0
+
+    @pytest.mark.asyncio
+    async def test_saturated_backlog_is_refused_or_deferred(self, limiters):
+        controller = AdmissionController(
+            max_backlog=10, max_deferred_backlog=20, backlog_counter=_counter(pending=8, processing=2)
+        )
+
+        refused = await controller.check()
+        deferred = await controller.check(defer=True)
+        over_cap = await controller.check(incoming=15, defer=True)
+
+        assert refused["status"] == "saturated"
+        assert refused["reasons"] == ["backlog"]
+        assert refused["admitted"] is False
+        assert refused["retry_after_seconds"] >= 5
+        assert deferred["admitted"] is True and deferred["deferred"] is True
+        assert over_cap["admitted"] is False
+
+    @pytest.mark.asyncio
+    async def test_admitted_work_counts_until_next_refresh(self, limiters):
+        calls = []
+        controller = AdmissionController(max_backlog=3, refresh_seconds=60, backlog_counter=_counter(pending=1, calls=calls))
+
+        assert (await controller.check())["admitted"] is True
+        assert (await controller.check())["admitted"] is True
+        assert (await controller.check())["admitted"] is False
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_uncapped_work_gets_the_remaining_headroom(self, limiters):
+        controller = AdmissionController(
+            max_backlog=10, max_deferred_backlog=20, refresh_seconds=60, backlog_counter=_counter(pending=9)
+        )
+
+        first = await controller.check_headroom()
+        full = await controller.check_headroom()
+        deferred = await controller.check_headroom(defer=True)
+
+        assert (first["admitted"], first["incoming"]) == (True, 1)
+        assert full["admitted"] is False
+        assert (deferred["admitted"], deferred["deferred"], deferred["incoming"]) == (True, True, 10)
+
+    @pytest.mark.asyncio
+    async def test_high_latency_on_busy_resource_saturates(self, limiters):
+        controller = AdmissionController(max_backlog=100, backlog_counter=_counter())
+        di = limiters["di"]
+        di.observe(500.0)
+
+        # Idle resource: the old latency sample is ignored
+        assert (await controller.load(refresh=True))["status"] == "ok"
+
+        await di.acquire()
+        load = await controller.load(refresh=True)
+        di.release()
+
+        assert load["status"] == "saturated"
+        assert load["reasons"] == ["di_latency"]
+        assert load["retry_after_seconds"] == 300
+
+    @pytest.mark.asyncio
+    async def test_backlog_count_failure_fails_open(self, limiters):
+        async def broken(db):
+            raise RuntimeError("db down")
+
+        controller = AdmissionController(backlog_counter=broken)
+
+        assert (await controller.check())["admitted"] is True
+
+    def test_refused_decision_raises_429_with_retry_after(self):
+        with pytest.raises(HTTPException) as exc_info:
+            enforce_admission({
+                "admitted": False, "retry_after_seconds": 42, "status": "saturated",
+                "reasons": ["backlog"], "backlog": 600,
+            })
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "42"
+
+
+@pytest.mark.unit
+class TestAdmissionRoutes:
+    def test_upload_is_refused_and_load_reports_saturation(self, test_client, limiters, monkeypatch):
+        saturated = AdmissionController(max_backlog=1, backlog_counter=_counter(pending=5))
+        monkeypatch.setattr(admission_control, "admission_controller", saturated)
+        files = {"file": ("invoice.pdf", b"%PDF-1.4 test", "application/pdf")}
+
+        refused = test_client.post("/api/ingestion/upload", files=files)
+        load = test_client.get("/api/load")
+
+        assert refused.status_code == 429
+        assert int(refused.headers["Retry-After"]) >= 5
+        assert load.status_code == 200
+        assert load.json()["status"] == "saturated"
+        assert "Retry-After" in load.headers
+
+    def test_uncapped_import_is_limited_to_the_headroom(self, test_client, limiters, monkeypatch):
+        calls = []
+
+        class FakeImportService:
+            async def import_blobs(self, **kwargs):
+                calls.append(kwargs)
+                return {
+                    "total": 0, "successful": 0, "failed": 0, "skipped": 0, "truncated": True,
+                    "watermark": None, "elapsed_seconds": 0.0, "results": [], "errors": [],
+                }
+
+        monkeypatch.setattr(admission_control, "admission_controller", AdmissionController(max_backlog=10, backlog_counter=_counter(pending=7)))
+        monkeypatch.setattr("api.routes.azure_import._get_blob_import_service", lambda: FakeImportService())
+
+        response = test_client.post("/api/azure-import/process-batch", params={"container_name": "invoices", "max_files": 0})
+
+        assert response.status_code == 200
+        assert calls[0]["max_files"] == 3
@@ -0,0 +1,151 @@
+"""Unit tests for BatchProcessingService bulk claiming"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from src.models.db_models import Invoice as InvoiceDB
+from src.services.batch_processing_service import BatchProcessingService
+from src.services.db_service import DatabaseService
+from src.services.extraction_pipeline import ExtractionPipeline
+
+
+class ClaimCheckingService:
+    """Stage API stand-in that records the contexts it was handed"""
+
+    def __init__(self):
+        self.contexts = []
+
+    async def claim_extraction(self, ctx):
+        assert ctx.claimed and ctx.lease_owner
+        self.contexts.append(ctx)
+        return True
+
+    def extraction_stages(self):
+        async def finalize(ctx):
+            ctx.result = {"invoice_id": ctx.invoice_id, "status": "extracted", "errors": []}
+        return [("db", finalize)]
+
+    def release_extraction(self, ctx):
+        pass
+
+    async def fail_extraction(self, ctx, exc):
+        ctx.result = {"invoice_id": ctx.invoice_id, "status": "error", "errors": [str(exc)]}
+        return ctx.result
+
+
+class BlockingService(ClaimCheckingService):
+    """Stage API stand-in whose extraction never finishes"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Event()
+
+    def extraction_stages(self):
+        async def download(ctx):
+            self.started.set()
+            await asyncio.Event().wait()
+        return [("download", download)]
+
+
+def _service():
+    fake = ClaimCheckingService()
+    return fake, BatchProcessingService(extraction_service=fake, pipeline=ExtractionPipeline(extraction_service=fake))
+
+
+@pytest.fixture
+async def invoices(db_session):
+    for invoice_id, state in (("b-pending", "PENDING"), ("b-failed", "FAILED"), ("b-done", "EXTRACTED")):
+        db_session.add(InvoiceDB(id=invoice_id, file_path=f"raw/{invoice_id}.pdf", file_name=f"{invoice_id}.pdf", processing_state=state))
+    await db_session.commit()
+
+
+@pytest.mark.unit
+class TestBatchProcessingService:
+    @pytest.mark.asyncio
+    async def test_process_batch_claims_in_bulk(self, db_session, invoices, monkeypatch):
+        calls = []
+        claim = DatabaseService.claim_batch_for_extraction
+
+        async def counting_claim(*args, **kwargs):
+            calls.append(kwargs.get("invoice_ids"))
+            return await claim(*args, **kwargs)
+
+        monkeypatch.setattr(DatabaseService, "claim_batch_for_extraction", counting_claim)
+        fake, service = _service()
+
+        summary = await service.process_batch(["b-pending", "missing", "b-done", "b-failed"], db=db_session)
+
+        assert calls == [["b-pending", "missing", "b-done", "b-failed"]]
+        assert [r["status"] for r in summary["results"]] == ["success", "failed", "failed", "success"]
+        assert summary["results"][1]["result"]["errors"] == ["Invoice not found in database"]
+        assert summary["results"][2]["result"]["status"] == "conflict"
+        assert {ctx.file_identifier for ctx in fake.contexts} == {"raw/b-pending.pdf", "raw/b-failed.pdf"}
+        assert len({ctx.lease_owner for ctx in fake.contexts}) == 1
+
+    @pytest.mark.asyncio
+    async def test_invoices_are_claimed_as_the_pipeline_has_room(self, db_session, monkeypatch):
+        for index in range(5):
+            db_session.add(InvoiceDB(id=f"j-{index}", file_path=f"raw/j-{index}.pdf", file_name=f"j-{index}.pdf", processing_state="PENDING"))
+        await db_session.commit()
+        calls = []
+        claim = DatabaseService.claim_batch_for_extraction
+
+        async def counting_claim(*args, **kwargs):
+            calls.append(kwargs.get("invoice_ids"))
+            return await claim(*args, **kwargs)
+
+        monkeypatch.setattr(DatabaseService, "claim_batch_for_extraction", counting_claim)
+        fake = ClaimCheckingService()
+        service = BatchProcessingService(extraction_service=fake, pipeline=ExtractionPipeline(extraction_service=fake, max_in_flight=2))
+        states_at_first_result = {}
+
+        async def on_result(entry):
+            if "j-4" not in states_at_first_result:
+                states_at_first_result["j-4"] = None
+                states_at_first_result.update(await DatabaseService.get_states(["j-4"], db=db_session))
+
+        summary = await service.process_batch([f"j-{index}" for index in range(5)], db=db_session, on_result=on_result)
+
+        assert calls == [["j-0", "j-1"], ["j-2", "j-3"], ["j-4"]]
+        assert states_at_first_result == {"j-4": "PENDING"}
+        assert [r["status"] for r in summary["results"]] == ["success"] * 5
+
+    @pytest.mark.asyncio
+    async def test_cancelled_batch_hands_back_its_claims(self, db_session):
+        for index in range(4):
+            db_session.add(InvoiceDB(id=f"c-{index}", file_path=f"raw/c-{index}.pdf", file_name=f"c-{index}.pdf", processing_state="PENDING"))
+        await db_session.commit()
+        fake = BlockingService()
+        service = BatchProcessingService(extraction_service=fake, pipeline=ExtractionPipeline(extraction_service=fake, max_in_flight=3))
+
+        task = asyncio.create_task(service.process_batch([f"c-{index}" for index in range(4)], db=db_session))
+        await asyncio.wait_for(fake.started.wait(), 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        result = await db_session.execute(select(InvoiceDB.id, InvoiceDB.processing_state, InvoiceDB.lease_owner).order_by(InvoiceDB.id))
+        assert [tuple(row) for row in result.all()] == [(f"c-{index}", "PENDING", None) for index in range(4)]
+
+    @pytest.mark.asyncio
+    async def test_lease_heartbeat_survives_database_errors(self, monkeypatch):
+        calls = []
+        renewed = asyncio.Event()
+        sleep = asyncio.sleep
+
+        async def flaky_renew(lease_owner):
+            calls.append(lease_owner)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            renewed.set()
+            return 1
+
+        monkeypatch.setattr(DatabaseService, "renew_owner_leases", flaky_renew)
+        monkeypatch.setattr(asyncio, "sleep", lambda seconds: sleep(0))
+        heartbeat = asyncio.create_task(BatchProcessingService._keep_batch_leases("batch-owner"))
+        await asyncio.wait_for(renewed.wait(), 1)
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+
+        assert calls[:2] == ["batch-owner", "batch-owner"]
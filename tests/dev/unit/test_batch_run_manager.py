@@ -0,0 +1,334 @@
+"""Unit tests for background batch runs and result streaming"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.db_models import BatchRunRecord, Invoice as InvoiceDB
+from src.services.batch_run_manager import BatchRunConflict, BatchRunManager, BatchRunNotFound
+from src.services.batch_run_store import BatchRunStore
+from src.services.db_service import DatabaseService
+
+
+class FakeBatchService:
+    """Emits one entry per invoice, optionally waiting on a gate between them"""
+
+    def __init__(self, gate=None, raises=None, failing=(), seen=None):
+        self.gate = gate
+        self.raises = raises
+        self.failing = set(failing)
+        self.seen = seen
+
+    async def process_batch(self, invoice_ids, db=None, on_result=None, lease_owner=None):
+        if self.raises:
+            raise self.raises
+        if self.seen is not None:
+            self.seen.append(list(invoice_ids))
+        results = []
+        for invoice_id in invoice_ids:
+            if self.gate is not None:
+                await self.gate.wait()
+                self.gate.clear()
+            entry = {
+                "invoice_id": invoice_id,
+                "status": "failed" if invoice_id in self.failing else "success",
+                "result": {"invoice_id": invoice_id, "status": "extracted", "errors": [], "invoice": {"big": "payload"}},
+                "elapsed_seconds": 0.01,
+                "stage_timings": {"download": 0.001, "analyze": 0.005},
+            }
+            results.append(entry)
+            await on_result(entry)
+        return {
+            "total": len(invoice_ids),
+            "succeeded": sum(1 for r in results if r["status"] == "success"),
+            "failed": sum(1 for r in results if r["status"] != "success"),
+            "stage_timings": {"analyze": {"resource": "di", "count": len(results), "seconds": 0.01}},
+            "results": results,
+        }
+
+
+class ClaimingBatchService:
+    """Claims its invoices under the run's lease owner, then waits (or finishes at once)"""
+
+    def __init__(self, session_factory, hold=False):
+        self.session_factory = session_factory
+        self.hold = hold
+        self.claimed = asyncio.Event()
+        self.claimed_ids = []
+
+    async def process_batch(self, invoice_ids, db=None, on_result=None, lease_owner=None):
+        async with self.session_factory() as session:
+            rows = await DatabaseService.claim_batch_for_extraction(
+                invoice_ids=invoice_ids, lease_owner=lease_owner, db=session
+            )
+        self.claimed_ids = sorted(row["invoice_id"] for row in rows)
+        self.claimed.set()
+        if self.hold:
+            await asyncio.Event().wait()
+        return {"total": len(invoice_ids), "succeeded": 0, "failed": 0, "results": []}
+
+
+async def _leases(session_factory, invoice_ids):
+    async with session_factory() as db:
+        rows = await db.execute(
+            select(InvoiceDB.id, InvoiceDB.processing_state, InvoiceDB.lease_owner).where(InvoiceDB.id.in_(invoice_ids))
+        )
+        return {invoice_id: (state, owner) for invoice_id, state, owner in rows.all()}
+
+
+async def _release(run, gate):
+    """Let one invoice through the gate and return its result event"""
+    stream = run.stream(start=len(run.events))
+    gate.set()
+    return await stream.__anext__()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def manager(session_factory):
+    return BatchRunManager(session_factory=session_factory)
+
+
+@pytest.mark.unit
+class TestBatchRunManager:
+    @pytest.mark.asyncio
+    async def test_start_returns_immediately_and_summary_completes(self, manager):
+        gate = asyncio.Event()
+
+        run = await manager.start(["inv-1", "inv-2"], batch_service_factory=lambda: FakeBatchService(gate=gate))
+        assert run.status == "queued"
+        assert manager.get(run.batch_id) is run
+
+        first = await asyncio.wait_for(_release(run, gate), 1)
+        await asyncio.wait_for(_release(run, gate), 1)
+        assert first["invoice_id"] == "inv-1"
+        await asyncio.wait_for(run.task, 1)
+
+        summary = run.to_dict()
+        assert summary["status"] == "completed"
+        assert summary["completed"] == summary["succeeded"] == 2
+        assert summary["stage_timings"]["analyze"]["count"] == 2
+        # The full invoice payload is not kept in the batch run
+        assert "result" not in summary["results"][0]
+        assert summary["results"][0]["extraction"]["status"] == "extracted"
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_results_as_they_complete(self, manager):
+        gate = asyncio.Event()
+        run = await manager.start(["inv-1", "inv-2"], batch_service_factory=lambda: FakeBatchService(gate=gate))
+        stream = run.stream()
+
+        gate.set()
+        first = await asyncio.wait_for(stream.__anext__(), 1)
+        assert first["event"] == "result"
+        assert first["invoice_id"] == "inv-1"
+        assert first["stage_timings"] == {"download": 0.001, "analyze": 0.005}
+        assert first["elapsed_seconds"] == 0.01
+        assert run.status == "running"
+
+        gate.set()
+        rest = [event async for event in stream]
+        assert [e["event"] for e in rest] == ["result", "summary"]
+        assert rest[-1]["status"] == "completed"
+
+        # Late subscribers get the whole batch replayed
+        replay = [event async for event in run.stream()]
+        assert [e.get("invoice_id") for e in replay[:2]] == ["inv-1", "inv-2"]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_ends_stream(self, manager):
+        run = await manager.start(["inv-1"], batch_service_factory=lambda: FakeBatchService(raises=RuntimeError("db down")))
+
+        events = [event async for event in run.stream()]
+
+        assert events[-1]["event"] == "summary"
+        assert events[-1]["status"] == "failed"
+        assert events[-1]["error"] == "db down"
+
+    @pytest.mark.asyncio
+    async def test_retention_drops_oldest_finished_runs(self, session_factory):
+        manager = BatchRunManager(retention=2, session_factory=session_factory)
+        runs = []
+        for _ in range(3):
+            run = await manager.start(["inv-1"], batch_service_factory=FakeBatchService)
+            await run.task
+            runs.append(run)
+
+        assert manager.get(runs[0].batch_id) is None
+        assert [r.batch_id for r in manager.list()] == [runs[2].batch_id, runs[1].batch_id]
+
+
+@pytest.mark.unit
+class TestBatchRunCheckpoints:
+    @pytest.mark.asyncio
+    async def test_results_are_checkpointed_and_queryable(self, manager, session_factory):
+        run = await manager.start(
+            ["inv-1", "inv-2"], kind="pending", priority="bulk",
+            batch_service_factory=lambda: FakeBatchService(failing={"inv-2"}),
+        )
+        await run.task
+
+        # A fresh manager (another process) sees the finished run through the store
+        async with session_factory() as db:
+            record = await BatchRunStore.get_run(run.batch_id, db=db)
+            failed_only = await BatchRunStore.get_run(run.batch_id, item_status="failed", db=db)
+            listed = await BatchRunStore.list_runs(db=db)
+
+        assert record["status"] == "completed"
+        assert record["kind"] == "pending" and record["priority"] == "bulk"
+        assert (record["total"], record["succeeded"], record["failed"], record["pending"]) == (2, 1, 1, 0)
+        assert record["stage_timings"]["analyze"]["count"] == 2
+        assert [r["status"] for r in record["results"]] == ["success", "failed"]
+        assert record["results"][0]["extraction"]["status"] == "extracted"
+        assert record["results"][0]["stage_timings"] == {"download": 0.001, "analyze": 0.005}
+        assert [r["invoice_id"] for r in failed_only["results"]] == ["inv-2"]
+        assert listed[0]["batch_id"] == run.batch_id and "results" not in listed[0]
+
+    @pytest.mark.asyncio
+    async def test_resume_after_shutdown_skips_completed_items(self, session_factory):
+        gate = asyncio.Event()
+        first = BatchRunManager(session_factory=session_factory)
+        run = await first.start(["inv-1", "inv-2", "inv-3"], batch_service_factory=lambda: FakeBatchService(gate=gate))
+        await asyncio.wait_for(_release(run, gate), 1)
+
+        await first.shutdown()
+        assert run.status == "interrupted"
+
+        seen = []
+        second = BatchRunManager(session_factory=session_factory)
+        resumed = await second.resume(run.batch_id, batch_service_factory=lambda: FakeBatchService(seen=seen))
+        await resumed.task
+
+        assert seen == [["inv-2", "inv-3"]]
+        summary = resumed.to_dict()
+        assert summary["status"] == "completed"
+        assert [r["invoice_id"] for r in summary["results"]] == ["inv-1", "inv-2", "inv-3"]
+        async with session_factory() as db:
+            record = await BatchRunStore.get_run(run.batch_id, db=db)
+        assert (record["completed"], record["pending"], record["attempts"]) == (3, 0, 2)
+
+    @pytest.mark.asyncio
+    async def test_resume_can_retry_failed_items(self, manager):
+        run = await manager.start(["inv-1", "inv-2"], batch_service_factory=lambda: FakeBatchService(failing={"inv-2"}))
+        await run.task
+
+        seen = []
+        skipped = await manager.resume(run.batch_id, batch_service_factory=lambda: FakeBatchService(seen=seen))
+        await skipped.task
+        retried = await manager.resume(run.batch_id, retry_failed=True, batch_service_factory=lambda: FakeBatchService(seen=seen))
+        await retried.task
+
+        assert seen == [[], ["inv-2"]]
+        assert retried.to_dict()["succeeded"] == 2
+
+    @pytest.mark.asyncio
+    async def test_live_or_unknown_runs_cannot_be_resumed(self, manager, session_factory):
+        gate = asyncio.Event()
+        run = await manager.start(["inv-1"], batch_service_factory=lambda: FakeBatchService(gate=gate))
+
+        with pytest.raises(BatchRunConflict):
+            await manager.resume(run.batch_id)
+        # Another process cannot take over while the heartbeat is fresh
+        with pytest.raises(BatchRunConflict):
+            await BatchRunManager(session_factory=session_factory).resume(run.batch_id)
+        with pytest.raises(BatchRunNotFound):
+            await manager.resume("no-such-batch")
+
+        gate.set()
+        await run.task
+
+    @pytest.mark.asyncio
+    async def test_stale_runs_are_marked_interrupted(self, manager, session_factory):
+        gate = asyncio.Event()
+        run = await manager.start(["inv-1"], batch_service_factory=lambda: FakeBatchService(gate=gate))
+        await asyncio.sleep(0.05)
+        # Simulate a crashed owner: the heartbeat stops being refreshed
+        async with session_factory() as db:
+            await db.execute(
+                update(BatchRunRecord)
+                .where(BatchRunRecord.id == run.batch_id)
+                .values(heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+            )
+            await db.commit()
+
+        restarted = BatchRunManager(session_factory=session_factory)
+        assert await restarted.mark_interrupted() == [run.batch_id]
+
+        run.task.cancel()
+        await asyncio.gather(run.task, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_shutdown_releases_the_run_invoice_leases(self, manager, session_factory, db_session):
+        for invoice_id in ("inv-1", "inv-2"):
+            db_session.add(InvoiceDB(id=invoice_id, file_path=f"raw/{invoice_id}.pdf", file_name=f"{invoice_id}.pdf", processing_state="PENDING"))
+        await db_session.commit()
+        service = ClaimingBatchService(session_factory, hold=True)
+        run = await manager.start(["inv-1", "inv-2"], batch_service_factory=lambda: service)
+        await asyncio.wait_for(service.claimed.wait(), 1)
+        assert service.claimed_ids == ["inv-1", "inv-2"]
+        async with session_factory() as db:
+            assert (await BatchRunStore.get_run(run.batch_id, include_items=False, db=db))["lease_owner"] == run.lease_owner
+
+        await manager.shutdown()
+
+        assert run.status == "interrupted"
+        assert await _leases(session_factory, ["inv-1", "inv-2"]) == {"inv-1": ("PENDING", None), "inv-2": ("PENDING", None)}
+
+    @pytest.mark.asyncio
+    async def test_resume_reclaims_leases_of_the_crashed_attempt(self, session_factory, db_session):
+        # A crashed attempt: the run went stale while its invoices kept live leases
+        await BatchRunStore.create("batch-1", "ids", "normal", ["inv-1", "inv-2"], owner="dead-host:1", db=db_session)
+        await BatchRunStore.mark_running("batch-1", "dead-host:1", lease_owner="dead-host:1:lease", db=db_session)
+        for invoice_id in ("inv-1", "inv-2"):
+            db_session.add(InvoiceDB(
+                id=invoice_id, file_path=f"raw/{invoice_id}.pdf", file_name=f"{invoice_id}.pdf",
+                processing_state="PROCESSING", lease_owner="dead-host:1:lease",
+                lease_expires_at=datetime.utcnow() + timedelta(minutes=5),
+            ))
+        await db_session.execute(
+            update(BatchRunRecord).where(BatchRunRecord.id == "batch-1").values(heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        await db_session.commit()
+
+        service = ClaimingBatchService(session_factory)
+        resumed = await BatchRunManager(session_factory=session_factory).resume("batch-1", batch_service_factory=lambda: service)
+        await resumed.task
+
+        assert service.claimed_ids == ["inv-1", "inv-2"]
+        leases = await _leases(session_factory, ["inv-1", "inv-2"])
+        assert {owner for _, owner in leases.values()} == {resumed.lease_owner}
+
+
+@pytest.mark.unit
+class TestBatchRoutes:
+    @pytest.mark.asyncio
+    async def test_finished_run_is_queryable_and_replayed(self, test_client, db_session):
+        await BatchRunStore.create("batch-1", "failed", "bulk", ["inv-1", "inv-2"], owner="old-host:1", db=db_session)
+        await BatchRunStore.checkpoint(
+            "batch-1", "old-host:1", 0, {"invoice_id": "inv-1", "status": "success", "elapsed_seconds": 1.5}, db=db_session
+        )
+        await BatchRunStore.finish("batch-1", "old-host:1", "interrupted", error="Batch interrupted by shutdown", db=db_session)
+
+        summary = test_client.get("/api/batch/batch-1")
+        pending = test_client.get("/api/batch/batch-1", params={"item_status": "pending"})
+        listed = test_client.get("/api/batch", params={"status": "interrupted"})
+        stream = test_client.get("/api/batch/batch-1/stream")
+        missing = test_client.get("/api/batch/no-such-batch")
+
+        assert summary.status_code == 200
+        body = summary.json()
+        assert (body["status"], body["completed"], body["pending"]) == ("interrupted", 1, 1)
+        assert [r["invoice_id"] for r in pending.json()["results"]] == ["inv-2"]
+        assert [b["batch_id"] for b in listed.json()["batches"]] == ["batch-1"]
+        events = [json.loads(line) for line in stream.text.splitlines()]
+        assert [e["event"] for e in events] == ["result", "summary"]
+        assert events[-1]["pending"] == 1
+        assert missing.status_code == 404
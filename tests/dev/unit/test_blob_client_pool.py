@@ -0,0 +1,64 @@
+"""Unit tests for the pooled blob client registry"""
+
+import base64
+
+import pytest
+
+from src.ingestion import blob_client_pool
+from src.ingestion.blob_client_pool import (
+    close_blob_clients,
+    get_blob_service_client,
+    get_http_session,
+    parse_blob_url,
+)
+
+CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=https;AccountName=acct;"
+    f"AccountKey={base64.b64encode(b'not-a-real-key').decode()};EndpointSuffix=core.windows.net"
+)
+
+
+@pytest.fixture
+def storage_settings(monkeypatch):
+    monkeypatch.setattr(blob_client_pool.settings, "AZURE_STORAGE_CONNECTION_STRING", CONNECTION_STRING)
+    monkeypatch.setattr(blob_client_pool.settings, "AZURE_STORAGE_ACCOUNT_NAME", None)
+    close_blob_clients()
+    yield
+    close_blob_clients()
+
+
+@pytest.mark.unit
+class TestParseBlobUrl:
+    def test_account_container_and_blob(self):
+        assert parse_blob_url("https://acct.blob.core.windows.net/raw/2025/01/inv%201.pdf") == (
+            "acct", "raw", "2025/01/inv 1.pdf"
+        )
+
+    def test_custom_domain_has_no_account(self):
+        assert parse_blob_url("https://files.example.com/raw/inv.pdf") == (None, "raw", "inv.pdf")
+
+    def test_missing_blob_name(self):
+        with pytest.raises(ValueError):
+            parse_blob_url("https://acct.blob.core.windows.net/raw")
+
+
+@pytest.mark.unit
+class TestClientRegistry:
+    def test_client_is_reused(self, storage_settings):
+        pytest.importorskip("azure.storage.blob")
+        first = get_blob_service_client()
+        assert get_blob_service_client() is first
+        assert get_blob_service_client("acct") is first
+
+    def test_foreign_account_is_anonymous(self, storage_settings):
+        assert blob_client_pool._resolve_auth("other") == ("other", "anonymous")
+        assert blob_client_pool._resolve_auth(None) == ("acct", "connection_string")
+
+    def test_unconfigured_raises(self, monkeypatch):
+        monkeypatch.setattr(blob_client_pool.settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+        monkeypatch.setattr(blob_client_pool.settings, "AZURE_STORAGE_ACCOUNT_NAME", None)
+        with pytest.raises(ValueError):
+            blob_client_pool._resolve_auth(None)
+
+    def test_http_session_is_shared(self, storage_settings):
+        assert get_http_session() is get_http_session()
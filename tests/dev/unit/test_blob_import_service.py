@@ -0,0 +1,295 @@
+"""Unit tests for the streaming BlobImportService"""
+
+import asyncio
+import heapq
+from datetime import datetime
+
+import pytest
+
+from src.services.blob_import_service import BlobImportService, advance_watermark
+
+
+class FakeBrowser:
+    """Serves blobs in pages and records how many pages were requested"""
+
+    def __init__(self, names, page_size=3, fail_on=(), modified=None):
+        self.names = names
+        self.modified = modified or {}
+        self.page_size = page_size
+        self.fail_on = set(fail_on)
+        self.pages_listed = 0
+        self.downloads = []
+
+    def iter_blob_pages(self, container_name, prefix=None, page_size=500):
+        for start in range(0, len(self.names), self.page_size):
+            self.pages_listed += 1
+            yield [
+                {"name": name, "last_modified": self.modified.get(name), "etag": f"etag-{name}"}
+                for name in self.names[start:start + self.page_size]
+            ]
+
+    def download_blob(self, container_name, blob_name):
+        if blob_name in self.fail_on:
+            raise RuntimeError("download failed")
+        self.downloads.append(blob_name)
+        return b"%PDF-" + blob_name.encode()
+
+
+class FakeIngestion:
+    def __init__(self, known_content=(), known_state="EXTRACTED"):
+        self.active = 0
+        self.max_active = 0
+        self.known_content = set(known_content)
+        self.known_state = known_state
+        self.ingested = []
+
+    async def ingest_invoice(self, file_content, file_name, db=None, skip_duplicates=False):
+        if skip_duplicates and file_content in self.known_content:
+            return {
+                "status": "duplicate",
+                "invoice_id": "existing",
+                "processing_state": self.known_state,
+                "file_path": "stored/existing.pdf",
+                "upload_date": datetime.utcnow(),
+                "errors": [],
+            }
+        self.ingested.append(file_name)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return {
+            "status": "uploaded",
+            "invoice_id": f"inv-{file_name}",
+            "file_path": f"stored/{file_name}",
+            "upload_date": datetime.utcnow(),
+        }
+
+
+class FakeExtraction:
+    def __init__(self, raise_for=(), error_for=()):
+        self.extracted = []
+        self.raise_for = set(raise_for)
+        self.error_for = set(error_for)
+
+    async def extract_invoice(self, invoice_id, file_identifier, file_name, upload_date, db=None):
+        await asyncio.sleep(0.01)
+        self.extracted.append(invoice_id)
+        if invoice_id in self.raise_for:
+            raise RuntimeError("DI unavailable")
+        if invoice_id in self.error_for:
+            return {"invoice_id": invoice_id, "status": "error", "errors": ["No fields"]}
+        return {"invoice_id": invoice_id, "status": "extracted"}
+
+
+def _service(browser, **kwargs):
+    return BlobImportService(
+        browser=browser,
+        ingestion_service=kwargs.pop("ingestion", FakeIngestion()),
+        extraction_service=kwargs.pop("extraction", FakeExtraction()),
+        **kwargs,
+    )
+
+
+@pytest.mark.unit
+class TestBlobImportService:
+    @pytest.mark.asyncio
+    async def test_imports_and_extracts_matching_blobs(self):
+        browser = FakeBrowser(["a.pdf", "b.txt", "c.pdf", "d.PDF"])
+        extraction = FakeExtraction()
+        service = _service(browser, extraction=extraction)
+
+        summary = await service.import_blobs("invoices", file_extension="pdf")
+
+        assert summary["total"] == 3
+        assert summary["successful"] == 3
+        assert summary["failed"] == 0
+        assert sorted(extraction.extracted) == ["inv-a.pdf", "inv-c.pdf", "inv-d.PDF"]
+        assert all(r["extraction_status"] == "extracted" for r in summary["results"])
+
+    @pytest.mark.asyncio
+    async def test_max_files_stops_listing_early(self):
+        browser = FakeBrowser([f"{i}.pdf" for i in range(30)], page_size=3)
+        service = _service(browser, queue_size=1)
+
+        summary = await service.import_blobs("invoices", max_files=4, run_extraction=False)
+
+        assert summary["total"] == 4
+        assert summary["truncated"] is True
+        # Only the pages needed to find 4 blobs were requested
+        assert browser.pages_listed == 2
+
+    @pytest.mark.asyncio
+    async def test_download_concurrency_is_bounded(self):
+        browser = FakeBrowser([f"{i}.pdf" for i in range(20)])
+        ingestion = FakeIngestion()
+        service = _service(browser, ingestion=ingestion, download_concurrency=3)
+
+        summary = await service.import_blobs("invoices")
+
+        assert summary["successful"] == 20
+        assert 1 < ingestion.max_active <= 3
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_per_blob(self):
+        browser = FakeBrowser(["a.pdf", "bad.pdf", "c.pdf"], fail_on={"bad.pdf"})
+        service = _service(browser)
+
+        summary = await service.import_blobs("invoices")
+
+        assert summary["successful"] == 2
+        assert summary["failed"] == 1
+        assert summary["errors"][0]["blob_name"] == "bad.pdf"
+        assert "download failed" in summary["errors"][0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_extraction_failures_are_reported_as_errors(self):
+        browser = FakeBrowser(["a.pdf", "b.pdf", "c.pdf"])
+        extraction = FakeExtraction(raise_for={"inv-b.pdf"}, error_for={"inv-c.pdf"})
+        service = _service(browser, extraction=extraction)
+
+        summary = await service.import_blobs("invoices")
+
+        assert summary["successful"] == 1
+        assert summary["failed"] == 2
+        errors = {e["blob_name"]: e for e in summary["errors"]}
+        assert errors["b.pdf"]["error"] == "DI unavailable"
+        assert errors["c.pdf"]["details"] == ["No fields"]
+        assert {e["extraction_status"] for e in errors.values()} == {"error"}
+
+
+T0 = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _blob(name, minutes, etag=None):
+    return {"name": name, "last_modified": T0.replace(minute=minutes).isoformat(), "etag": etag or f"etag-{name}"}
+
+
+@pytest.mark.unit
+class TestAdvanceWatermark:
+    def test_full_run_moves_to_newest_blob(self):
+        outcomes = [(_blob("a", 1), True), (_blob("b", 5), True), (_blob("c", 5), True)]
+        last_modified, etags = advance_watermark(None, [], outcomes, listing_complete=True)
+        assert last_modified == T0.replace(minute=5)
+        assert etags == ["etag-b", "etag-c"]
+
+    def test_failure_holds_watermark_at_oldest_failure(self):
+        outcomes = [(_blob("a", 1), True), (_blob("b", 3), False), (_blob("c", 5), True)]
+        last_modified, etags = advance_watermark(None, [], outcomes, listing_complete=True)
+        assert last_modified == T0.replace(minute=3)
+        # c is remembered so only b is retried
+        assert etags == ["etag-c"]
+
+    def test_truncated_listing_keeps_timestamp(self):
+        outcomes = [(_blob("b", 5), True)]
+        last_modified, etags = advance_watermark(T0, ["etag-a"], outcomes, listing_complete=False)
+        assert last_modified == T0
+        assert etags == ["etag-a", "etag-b"]
+
+    def test_stops_at_oldest_blob_left_for_later(self):
+        outcomes = [(_blob("a", 1), True), (_blob("z", 9), True)]
+        last_modified, etags = advance_watermark(
+            None, [], outcomes, listing_complete=True, not_after=T0.replace(minute=4)
+        )
+        assert last_modified == T0.replace(minute=4)
+        assert etags == ["etag-z"]
+
+    def test_never_moves_backwards(self):
+        outcomes = [(_blob("a", 1), False)]
+        last_modified, _ = advance_watermark(T0.replace(minute=2), [], outcomes, listing_complete=True)
+        assert last_modified == T0.replace(minute=2)
+
+
+@pytest.mark.unit
+class TestIncrementalImport:
+    @pytest.mark.asyncio
+    async def test_second_run_only_imports_new_blobs(self, db_session):
+        modified = {"a.pdf": _blob("a", 1)["last_modified"], "b.pdf": _blob("b", 2)["last_modified"]}
+        browser = FakeBrowser(["a.pdf", "b.pdf"], modified=modified)
+        ingestion = FakeIngestion()
+        service = _service(browser, ingestion=ingestion)
+
+        first = await service.import_blobs("invoices", incremental=True, db=db_session)
+        assert first["successful"] == 2
+
+        browser.names.append("c.pdf")
+        modified["c.pdf"] = _blob("c", 3)["last_modified"]
+        second = await service.import_blobs("invoices", incremental=True, db=db_session)
+
+        assert second["successful"] == 1
+        assert second["skipped"] == 2
+        assert ingestion.ingested == ["a.pdf", "b.pdf", "c.pdf"]
+        assert second["watermark"]["last_modified"] == T0.replace(minute=3).isoformat()
+
+    @pytest.mark.asyncio
+    async def test_capped_runs_take_oldest_blobs_and_advance(self, db_session):
+        # Listed in name order, modified in the reverse order
+        modified = {name: _blob(name, 9 - i)["last_modified"] for i, name in enumerate(["a.pdf", "b.pdf", "c.pdf"])}
+        browser = FakeBrowser(["a.pdf", "b.pdf", "c.pdf"], modified=modified)
+        ingestion = FakeIngestion()
+        service = _service(browser, ingestion=ingestion, download_concurrency=1)
+
+        first = await service.import_blobs("invoices", max_files=2, incremental=True, db=db_session)
+        assert first["truncated"] is True
+        assert ingestion.ingested == ["c.pdf", "b.pdf"]
+        assert first["watermark"] == {"last_modified": T0.replace(minute=8).isoformat(), "etag_count": 1}
+
+        second = await service.import_blobs("invoices", max_files=2, incremental=True, db=db_session)
+        assert second["truncated"] is False
+        assert ingestion.ingested == ["c.pdf", "b.pdf", "a.pdf"]
+        assert second["watermark"] == {"last_modified": T0.replace(minute=9).isoformat(), "etag_count": 1}
+
+    @pytest.mark.asyncio
+    async def test_capped_runs_keep_only_the_oldest_while_listing(self, db_session, monkeypatch):
+        names = [f"{i:02d}.pdf" for i in range(12)]
+        # Modified in the reverse of listing order, so the oldest are listed last
+        browser = FakeBrowser(names, modified={name: _blob(name, 30 - i)["last_modified"] for i, name in enumerate(names)})
+        ingestion = FakeIngestion()
+        service = _service(browser, ingestion=ingestion, download_concurrency=1, page_size=2)
+        kept = []
+        nsmallest = heapq.nsmallest
+
+        def recording_nsmallest(n, iterable, key=None):
+            iterable = list(iterable)
+            kept.append(len(iterable))
+            return nsmallest(n, iterable, key=key)
+
+        monkeypatch.setattr("src.services.blob_import_service.heapq.nsmallest", recording_nsmallest)
+        summary = await service.import_blobs("invoices", max_files=2, incremental=True, db=db_session)
+
+        assert summary["truncated"] is True
+        assert ingestion.ingested == ["11.pdf", "10.pdf"]
+        # Never more than max_files + 1 + page_size blobs held
+        assert max(kept) <= 5
+
+    @pytest.mark.asyncio
+    async def test_duplicate_content_is_skipped(self, db_session):
+        browser = FakeBrowser(["copy.pdf"], modified={"copy.pdf": _blob("copy", 1)["last_modified"]})
+        ingestion = FakeIngestion(known_content={b"%PDF-copy.pdf"})
+        service = _service(browser, ingestion=ingestion)
+
+        summary = await service.import_blobs("invoices", incremental=True, db=db_session)
+
+        assert summary["successful"] == 0
+        assert summary["skipped"] == 1
+        assert summary["duplicates"][0]["invoice_id"] == "existing"
+
+    @pytest.mark.asyncio
+    async def test_failed_extraction_is_retried_next_run(self, db_session):
+        browser = FakeBrowser(["a.pdf"], modified={"a.pdf": _blob("a", 1)["last_modified"]})
+        ingestion = FakeIngestion()
+        extraction = FakeExtraction(raise_for={"inv-a.pdf"})
+        service = _service(browser, ingestion=ingestion, extraction=extraction)
+
+        first = await service.import_blobs("invoices", incremental=True, db=db_session)
+        assert first["failed"] == 1
+
+        # The content is now ingested (extraction FAILED), so the retry sees a duplicate
+        ingestion.known_content.add(b"%PDF-a.pdf")
+        ingestion.known_state = "FAILED"
+        second = await service.import_blobs("invoices", incremental=True, db=db_session)
+
+        assert second["successful"] == 1
+        assert second["duplicates"] == []
+        assert extraction.extracted == ["inv-a.pdf", "existing"]
+        assert second["watermark"]["last_modified"] == T0.replace(minute=1).isoformat()
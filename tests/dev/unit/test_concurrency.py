@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from datetime import datetime
 from decimal import Decimal
@@ -107,3 +109,99 @@ async def test_invalid_transition_processing_to_validated(db_session):
     )
     assert success is False
 
+
+
+def _lease_invoice(inv_id: str) -> Invoice:
+    return Invoice(id=inv_id, file_path="p.pdf", file_name="p.pdf", upload_date=datetime.utcnow())
+
+
+async def _expire_lease(db_session, invoice_id):
+    from datetime import timedelta
+    from sqlalchemy import update
+    from src.models.db_models import Invoice as InvoiceDB
+
+    await db_session.execute(
+        update(InvoiceDB)
+        .where(InvoiceDB.id == invoice_id)
+        .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_can_be_reclaimed_and_fences_old_owner(db_session):
+    inv = _lease_invoice("c-lease-1")
+    await DatabaseService.save_invoice(inv, db=db_session)
+    assert await DatabaseService.claim_for_extraction(inv.id, lease_owner="dead", db=db_session) is True
+    assert await DatabaseService.claim_for_extraction(inv.id, lease_owner="other", db=db_session) is False
+
+    await _expire_lease(db_session, inv.id)
+    assert await DatabaseService.claim_for_extraction(inv.id, lease_owner="other", db=db_session) is True
+
+    # The dead owner can neither heartbeat nor write its result any more
+    assert await DatabaseService.renew_extraction_lease(inv.id, "dead", db=db_session) is False
+    assert await DatabaseService.set_extraction_result(inv.id, {}, lease_owner="dead", db=db_session) is False
+    assert await DatabaseService.renew_extraction_lease(inv.id, "other", db=db_session) is True
+    assert await DatabaseService.set_extraction_result(inv.id, {}, lease_owner="other", db=db_session) is True
+
+
+@pytest.mark.asyncio
+async def test_failure_write_is_fenced_on_lease(db_session):
+    inv = _lease_invoice("c-lease-fail")
+    await DatabaseService.save_invoice(inv, db=db_session)
+    await DatabaseService.claim_for_extraction(inv.id, lease_owner="dead", db=db_session)
+    await _expire_lease(db_session, inv.id)
+    await DatabaseService.claim_for_extraction(inv.id, lease_owner="other", db=db_session)
+
+    # The dead owner cannot fail the invoice or clear the new owner's lease
+    assert await DatabaseService.set_extraction_failed(inv.id, "late", lease_owner="dead", db=db_session) is False
+    assert await DatabaseService.get_state(inv.id, db=db_session) == "PROCESSING"
+    assert await DatabaseService.renew_extraction_lease(inv.id, "other", db=db_session) is True
+
+    # Nor an invoice the new owner already finished
+    await DatabaseService.set_extraction_result(inv.id, {}, lease_owner="other", db=db_session)
+    assert await DatabaseService.set_extraction_failed(inv.id, "late", lease_owner="other", db=db_session) is False
+    assert await DatabaseService.get_state(inv.id, db=db_session) == "EXTRACTED"
+
+
+@pytest.mark.asyncio
+async def test_lease_heartbeat_survives_database_errors(monkeypatch):
+    from src.extraction.extraction_service import ExtractionService
+
+    results = [RuntimeError("database is locked"), True, False]
+    calls = []
+    sleep = asyncio.sleep
+
+    async def flaky_renew(invoice_id, lease_owner):
+        calls.append(invoice_id)
+        result = results[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(DatabaseService, "renew_extraction_lease", flaky_renew)
+    monkeypatch.setattr(asyncio, "sleep", lambda seconds: sleep(0))
+    service = ExtractionService(doc_intelligence_client=object(), file_handler=object(), field_extractor=object())
+
+    # Keeps renewing after the error and stops only once the lease is gone
+    await asyncio.wait_for(service._keep_extraction_lease("c-lease-hb", "owner"), 1)
+    assert calls == ["c-lease-hb"] * 3
+
+
+@pytest.mark.asyncio
+async def test_reaper_requeues_expired_leases_and_unblocks_reextract(db_session):
+    inv = _lease_invoice("c-lease-2")
+    live = _lease_invoice("c-lease-3")
+    await DatabaseService.save_invoice(inv, db=db_session)
+    await DatabaseService.save_invoice(live, db=db_session)
+    await DatabaseService.claim_for_extraction(inv.id, lease_owner="dead", db=db_session)
+    await DatabaseService.claim_for_extraction(live.id, lease_owner="alive", db=db_session)
+
+    assert await DatabaseService.reset_for_reextract(inv.id, db=db_session) is False
+    await _expire_lease(db_session, inv.id)
+
+    assert await DatabaseService.reset_for_reextract(inv.id, db=db_session) is True
+    assert await DatabaseService.get_state(inv.id, db=db_session) == InvoiceState.PENDING.value
+    # Live leases are left alone
+    assert await DatabaseService.reap_expired_leases(db=db_session) == []
+    assert await DatabaseService.get_state(live.id, db=db_session) == InvoiceState.PROCESSING.value
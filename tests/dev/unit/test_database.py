@@ -0,0 +1,81 @@
+"""Unit tests for the per-backend engine factory"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.database import Base, create_engine_for_url, engine_options, sqlite_pragmas
+from src.models.db_models import Invoice
+from src.models.line_item_db_models import LineItem  # noqa: F401
+
+
+@pytest.mark.unit
+class TestEngineFactory:
+    @pytest.mark.asyncio
+    async def test_sqlite_connections_get_pragmas(self, tmp_path, monkeypatch):
+        from src.config import settings
+        monkeypatch.setattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 12000)
+        monkeypatch.setattr(settings, "SQLITE_CACHE_SIZE_KB", 8192)
+        monkeypatch.setattr(settings, "SQLITE_MMAP_SIZE_BYTES", 1048576)
+        engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}", echo=False)
+
+        try:
+            async with engine.connect() as conn:
+                values = {
+                    name: (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                    for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+                }
+        finally:
+            await engine.dispose()
+
+        assert values["journal_mode"].lower() == "wal"
+        assert values["synchronous"] == 1  # NORMAL
+        assert values["busy_timeout"] == 12000
+        assert values["cache_size"] == -8192
+        assert values["mmap_size"] == 1048576
+
+    def test_in_memory_sqlite_skips_file_only_pragmas(self):
+        names = [name for name, _ in sqlite_pragmas(in_memory=True)]
+
+        assert "journal_mode" not in names
+        assert "mmap_size" not in names
+        assert "busy_timeout" in names
+
+    def test_server_backends_get_a_sized_pool(self, monkeypatch):
+        from src.config import settings
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+        monkeypatch.setattr(settings, "DB_POOL_RECYCLE_SECONDS", 600)
+
+        options = engine_options("mssql+aioodbc://user:pw@server:1433/db?driver=ODBC+Driver+18+for+SQL+Server")
+
+        assert options["pool_size"] == 7
+        assert options["max_overflow"] == 3
+        assert options["pool_recycle"] == 600
+        assert options["pool_pre_ping"] is True
+        assert "connect_args" not in options
+        assert "pool_size" not in engine_options("sqlite+aiosqlite:///./x.db")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writers_do_not_hit_locks(self, tmp_path):
+        engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'writers.db'}", echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def write(writer: int):
+            for n in range(10):
+                async with session_factory() as session:
+                    session.add(Invoice(id=f"w{writer}-{n}", file_path="x.pdf", file_name="x.pdf"))
+                    await session.commit()
+
+        try:
+            await asyncio.gather(*(write(w) for w in range(8)))
+            async with session_factory() as session:
+                count = (await session.execute(text("SELECT COUNT(*) FROM invoices"))).scalar()
+        finally:
+            await engine.dispose()
+
+        assert count == 80
@@ -119,6 +119,133 @@ class TestDatabaseService:
         assert len(invoices) == 1
         assert invoices[0].status == "approved"
     
+    @pytest.mark.asyncio
+    async def test_list_invoice_summaries(
+        self,
+        db_session,
+        sample_invoice
+    ):
+        """Test summary projection matches the full listing"""
+        invoice1 = sample_invoice.model_copy()
+        invoice1.line_items = [
+            LineItem(line_number=n, description=f"Item {n}", amount=Decimal("1.00")) for n in range(1, 4)
+        ]
+        invoice2 = sample_invoice.model_copy()
+        invoice2.id = "test-invoice-456"
+        invoice2.status = "approved"
+        invoice2.line_items = []
+        
+        await DatabaseService.save_invoice(invoice1, db=db_session)
+        await DatabaseService.save_invoice(invoice2, db=db_session)
+        
+        summaries = await DatabaseService.list_invoice_summaries(skip=0, limit=10, db=db_session)
+        approved = await DatabaseService.list_invoice_summaries(status="approved", db=db_session)
+        
+        by_id = {s["invoice_id"]: s for s in summaries}
+        assert set(by_id) == {invoice1.id, invoice2.id}
+        assert by_id[invoice1.id]["line_item_count"] == 3
+        assert by_id[invoice1.id]["invoice_number"] == invoice1.invoice_number
+        assert by_id[invoice1.id]["total_amount"] == invoice1.total_amount
+        assert by_id[invoice2.id]["line_item_count"] == 0
+        assert [s["invoice_id"] for s in approved] == [invoice2.id]
+    
+    @pytest.mark.asyncio
+    async def test_list_invoice_summaries_counts_legacy_json_line_items(
+        self,
+        db_session,
+        sample_invoice
+    ):
+        """Invoices with line items only in the JSON column are still counted"""
+        from sqlalchemy import delete
+        from src.models.line_item_db_models import LineItem as LineItemDB
+        
+        invoice = sample_invoice.model_copy()
+        invoice.line_items = [
+            LineItem(line_number=n, description=f"Item {n}", amount=Decimal("1.00")) for n in range(1, 3)
+        ]
+        await DatabaseService.save_invoice(invoice, db=db_session)
+        await db_session.execute(delete(LineItemDB).where(LineItemDB.invoice_id == invoice.id))
+        await db_session.commit()
+        
+        summaries = await DatabaseService.list_invoice_summaries(db=db_session)
+        
+        assert summaries[0]["line_item_count"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_list_invoice_page_walks_keyset_cursor(
+        self,
+        db_session,
+        sample_invoice
+    ):
+        """Cursor pages cover every invoice once, including upload_date ties"""
+        same_time = datetime(2026, 1, 5, 12, 0, 0)
+        for n in range(7):
+            invoice = sample_invoice.model_copy()
+            invoice.id = f"page-{n}"
+            invoice.upload_date = same_time if n < 4 else datetime(2026, 1, 1, n, 0, 0)
+            await DatabaseService.save_invoice(invoice, db=db_session)
+        
+        seen = []
+        cursor = None
+        while True:
+            page = await DatabaseService.list_invoice_page(limit=3, cursor=cursor, db=db_session)
+            seen.extend(row["invoice_id"] for row in page["invoices"])
+            assert page["total"] == 7
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                assert cursor is None
+                break
+        
+        assert seen == ["page-3", "page-2", "page-1", "page-0", "page-6", "page-5", "page-4"]
+    
+    @pytest.mark.asyncio
+    async def test_list_invoice_page_filters_and_cached_total(
+        self,
+        db_session,
+        sample_invoice,
+        monkeypatch
+    ):
+        """Filters apply to rows and totals; totals are reused within the cache TTL"""
+        from src.config import settings
+        monkeypatch.setattr(settings, "INVOICE_COUNT_CACHE_SECONDS", 60)
+        for n, (vendor, state) in enumerate([("Acme", "EXTRACTED"), ("Acme", "PENDING"), ("Other", "EXTRACTED")]):
+            invoice = sample_invoice.model_copy()
+            invoice.id = f"filter-{n}"
+            invoice.vendor_name = vendor
+            invoice.processing_state = state
+            invoice.upload_date = datetime(2026, 2, n + 1)
+            await DatabaseService.save_invoice(invoice, db=db_session)
+        
+        page = await DatabaseService.list_invoice_page(
+            vendor_name="Acme", processing_state="EXTRACTED", db=db_session
+        )
+        dated = await DatabaseService.list_invoice_page(
+            upload_date_from=datetime(2026, 2, 2), upload_date_to=datetime(2026, 2, 3), db=db_session
+        )
+        
+        assert [row["invoice_id"] for row in page["invoices"]] == ["filter-0"]
+        assert page["total"] == 1
+        assert [row["invoice_id"] for row in dated["invoices"]] == ["filter-1"]
+        
+        extra = sample_invoice.model_copy()
+        extra.id = "filter-3"
+        extra.vendor_name = "Acme"
+        extra.processing_state = "EXTRACTED"
+        await DatabaseService.save_invoice(extra, db=db_session)
+        
+        assert await DatabaseService.count_invoices(vendor_name="Acme", processing_state="EXTRACTED", db=db_session) == 1
+        assert await DatabaseService.count_invoices(
+            vendor_name="Acme", processing_state="EXTRACTED", use_cache=False, db=db_session
+        ) == 2
+    
+    @pytest.mark.asyncio
+    async def test_list_invoice_page_rejects_bad_cursor(self, db_session):
+        """Malformed cursors raise InvalidCursor"""
+        from src.services.db_service import InvalidCursor
+        
+        with pytest.raises(InvalidCursor):
+            await DatabaseService.list_invoice_page(cursor="not-a-cursor", db=db_session)
+    
     @pytest.mark.asyncio
     async def test_update_invoice_status(
         self,
@@ -148,3 +275,98 @@ class TestDatabaseService:
         )
         assert updated.status == "approved"
 
+    
+    @pytest.mark.asyncio
+    async def test_review_events_recorded_with_winning_update(
+        self,
+        db_session,
+        sample_invoice
+    ):
+        """Review events are appended with the update and skipped on stale writes"""
+        await DatabaseService.save_invoice(invoice=sample_invoice, db=db_session)
+        
+        for version, status in enumerate(["needs_review", "validated"]):
+            assert await DatabaseService.update_with_review_version(
+                invoice_id=sample_invoice.id,
+                patch={"review_status": status},
+                expected_review_version=version,
+                db=db_session,
+                review_event={"status": status, "reviewer": "alice", "notes": f"pass {version}"},
+            )
+        stale = await DatabaseService.update_with_review_version(
+            invoice_id=sample_invoice.id,
+            patch={"review_status": "rejected"},
+            expected_review_version=0,
+            db=db_session,
+            review_event={"status": "rejected", "reviewer": "bob", "notes": None},
+        )
+        
+        history = await DatabaseService.list_review_events(sample_invoice.id, db=db_session)
+        assert stale is False
+        assert [(e["status"], e["review_version"]) for e in history] == [("needs_review", 1), ("validated", 2)]
+        assert history[0]["reviewer"] == "alice" and history[0]["timestamp"]
+    
+    @pytest.mark.asyncio
+    async def test_list_review_events_pages(self, db_session):
+        """History pages in either order without loading the rest"""
+        from src.models.db_models import InvoiceReviewEvent
+        
+        for n in range(5):
+            db_session.add(InvoiceReviewEvent(
+                invoice_id="inv-history", status=f"s{n}", created_at=datetime(2026, 1, 1, 12, n)
+            ))
+        db_session.add(InvoiceReviewEvent(invoice_id="other", status="x", created_at=datetime(2026, 1, 1)))
+        await db_session.commit()
+        
+        oldest = await DatabaseService.list_review_events("inv-history", skip=1, limit=2, db=db_session)
+        newest = await DatabaseService.list_review_events("inv-history", limit=2, newest_first=True, db=db_session)
+        
+        assert [e["status"] for e in oldest] == ["s1", "s2"]
+        assert [e["status"] for e in newest] == ["s4", "s3"]
+    
+    @pytest.mark.asyncio
+    async def test_claim_batch_for_extraction(self, db_session):
+        """Bulk claim takes up to N eligible invoices, oldest first, and returns their file info"""
+        from src.models.db_models import Invoice as InvoiceDB
+        
+        states = ["PENDING", "PENDING", "FAILED", "EXTRACTED", "PROCESSING", "PENDING"]
+        for n, state in enumerate(states):
+            db_session.add(InvoiceDB(
+                id=f"claim-{n}", file_path=f"raw/{n}.pdf", file_name=f"{n}.pdf",
+                upload_date=datetime(2026, 1, n + 1), processing_state=state,
+            ))
+        await db_session.commit()
+        
+        first = await DatabaseService.claim_batch_for_extraction(limit=2, lease_owner="batch-a", db=db_session)
+        rest = await DatabaseService.claim_batch_for_extraction(lease_owner="batch-b", db=db_session)
+        none_left = await DatabaseService.claim_batch_for_extraction(lease_owner="batch-c", db=db_session)
+        
+        assert first == [
+            {"invoice_id": "claim-0", "file_path": "raw/0.pdf", "file_name": "0.pdf", "upload_date": datetime(2026, 1, 1)},
+            {"invoice_id": "claim-1", "file_path": "raw/1.pdf", "file_name": "1.pdf", "upload_date": datetime(2026, 1, 2)},
+        ]
+        assert [row["invoice_id"] for row in rest] == ["claim-2", "claim-5"]
+        assert none_left == []
+        assert await DatabaseService.get_states(["claim-0", "claim-3", "missing"], db=db_session) == {
+            "claim-0": "PROCESSING", "claim-3": "EXTRACTED",
+        }
+        assert await DatabaseService.renew_owner_leases("batch-b", db=db_session) == 2
+    
+    @pytest.mark.asyncio
+    async def test_claim_batch_without_returning(self, db_session):
+        """Dialects without UPDATE ... RETURNING claim through select / update / read back"""
+        from unittest.mock import patch
+        from src.models.db_models import Invoice as InvoiceDB
+        
+        for n in range(3):
+            db_session.add(InvoiceDB(id=f"fallback-{n}", file_path=f"{n}.pdf", file_name=f"{n}.pdf", processing_state="PENDING"))
+        await db_session.commit()
+        
+        dialect = db_session.get_bind().dialect
+        with patch.object(dialect, "update_returning", False):
+            claimed = await DatabaseService.claim_batch_for_extraction(
+                invoice_ids=["fallback-0", "fallback-2"], lease_owner="batch", db=db_session
+            )
+        
+        assert sorted(row["invoice_id"] for row in claimed) == ["fallback-0", "fallback-2"]
+        assert (await DatabaseService.get_states(["fallback-1"], db=db_session)) == {"fallback-1": "PENDING"}
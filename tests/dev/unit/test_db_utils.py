@@ -0,0 +1,95 @@
+"""Unit tests for the trusted (model_construct) DB -> Pydantic read path"""
+
+from decimal import Decimal
+from typing import Union, get_args, get_origin
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_utils import (
+    _INVOICE_FIELDS,
+    _LINE_ITEM_FIELDS,
+    db_to_pydantic_invoice,
+    json_to_line_items,
+)
+from src.models.invoice import Address, Invoice, InvoiceExtensions, InvoiceSubtype, LineItem, ShiftServiceExtension
+from src.models.line_item_db_models import LineItem as LineItemDB
+from src.services.db_service import DatabaseService
+
+
+def _field_type(annotation):
+    """Unwrap Optional[X] to X and generics (Dict[...]) to their origin"""
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    return get_origin(annotation) or annotation
+
+
+async def _load(db_session, invoice_id):
+    db_session.expire_all()
+    result = await db_session.execute(
+        select(InvoiceDB).options(selectinload(InvoiceDB.line_items_relationship)).where(InvoiceDB.id == invoice_id)
+    )
+    return result.scalar_one()
+
+
+def _assert_same(trusted: Invoice, validated: Invoice):
+    assert trusted.model_dump() == validated.model_dump()
+    assert trusted.model_fields_set == validated.model_fields_set
+    assert [type(item) for item in trusted.line_items] == [type(item) for item in validated.line_items]
+
+
+@pytest.mark.unit
+class TestTrustedConversion:
+    @pytest.mark.parametrize("model,table,fields", [
+        (Invoice, InvoiceDB.__table__, _INVOICE_FIELDS),
+        (LineItem, LineItemDB.__table__, _LINE_ITEM_FIELDS),
+    ], ids=["invoice", "line_item"])
+    def test_columns_hold_the_field_types(self, model, table, fields):
+        """model_construct skips coercion, so each copied column must already hold the field's type"""
+        for name in fields:
+            assert issubclass(table.columns[name].type.python_type, _field_type(model.model_fields[name].annotation)), name
+
+    @pytest.mark.asyncio
+    async def test_trusted_matches_validated(self, db_session, sample_invoice):
+        invoice = sample_invoice.model_copy(update={
+            "vendor_address": Address(street="1 Main St", city="Ottawa", province="ON"),
+            "remit_to_address": Address(postal_code="K1A 0B1"),
+            "tax_breakdown": {"GST": Decimal("65.25"), "PST": Decimal("0.0039")},
+            "invoice_subtype": InvoiceSubtype.SHIFT_SERVICE_INVOICE,
+            "extensions": InvoiceExtensions(shift_service=ShiftServiceExtension(service_location="YOW")),
+            "scan_profile": {"is_scanned": False},
+        })
+        await DatabaseService.save_invoice(invoice, db=db_session)
+        row = await _load(db_session, invoice.id)
+
+        trusted = db_to_pydantic_invoice(row)
+        _assert_same(trusted, db_to_pydantic_invoice(row, validate=True))
+        assert trusted.vendor_address == invoice.vendor_address
+        assert trusted.tax_breakdown == invoice.tax_breakdown
+        assert trusted.line_items == invoice.line_items
+        assert isinstance(trusted.extensions.shift_service, ShiftServiceExtension)
+        assert trusted.scan_profile is not row.scan_profile
+
+    @pytest.mark.asyncio
+    async def test_legacy_row_defaults_and_json_line_items(self, db_session):
+        db_session.add(InvoiceDB(
+            id="legacy-row", file_path="x.pdf", file_name="x.pdf", currency=None, extraction_confidence=None,
+            invoice_subtype="RETIRED_SUBTYPE",
+            line_items=[{"description": "Legacy", "amount": "12.50", "quantity": 2}],
+        ))
+        await db_session.commit()
+        row = await _load(db_session, "legacy-row")
+
+        trusted = db_to_pydantic_invoice(row)
+        _assert_same(trusted, db_to_pydantic_invoice(row, validate=True))
+        assert (trusted.currency, trusted.extraction_confidence, trusted.field_confidence) == ("CAD", 0.0, {})
+        assert trusted.invoice_subtype is None
+        assert trusted.line_items[0].line_number == 1
+        assert trusted.line_items[0].amount == Decimal("12.50")
+        assert trusted.line_items[0].quantity == Decimal("2")
+
+    def test_json_line_items_trusted_matches_validated(self):
+        data = [{"line_number": 3, "description": "A", "amount": "1.10", "confidence": 0.5, "tax_amount": None}]
+        assert json_to_line_items(data, trusted=True) == json_to_line_items(data)
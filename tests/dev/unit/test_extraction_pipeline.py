@@ -0,0 +1,167 @@
+"""Unit tests for the stage-pipelined extraction engine"""
+
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from src.extraction.extraction_service import ExtractionContext
+from src.services.extraction_pipeline import ExtractionPipeline, StageLimiter
+
+
+class FakeStagedService:
+    """Mimics ExtractionService's stage API and records per-resource concurrency"""
+
+    def __init__(self, delays=None, conflict=(), fail_in_di=()):
+        self.delays = delays or {}
+        self.conflict = set(conflict)
+        self.fail_in_di = set(fail_in_di)
+        self.active = defaultdict(int)
+        self.max_active = defaultdict(int)
+        self.order = []
+        self.released = []
+
+    def _stage(self, resource, name):
+        async def stage(ctx):
+            self.active[resource] += 1
+            self.max_active[resource] = max(self.max_active[resource], self.active[resource])
+            try:
+                await asyncio.sleep(self.delays.get(resource, 0.001))
+                if resource == "di" and ctx.invoice_id in self.fail_in_di:
+                    raise RuntimeError("DI throttled")
+                self.order.append((ctx.invoice_id, name))
+                if name == "finalize":
+                    ctx.result = {"invoice_id": ctx.invoice_id, "status": "extracted", "errors": []}
+            finally:
+                self.active[resource] -= 1
+        stage.__name__ = f"_stage_{name}"
+        return stage
+
+    async def claim_extraction(self, ctx):
+        if ctx.invoice_id in self.conflict:
+            ctx.result = {"invoice_id": ctx.invoice_id, "status": "conflict", "errors": ["busy"]}
+            return False
+        return True
+
+    def extraction_stages(self):
+        return [
+            ("download", self._stage("download", "download")),
+            ("di", self._stage("di", "analyze")),
+            ("map", self._stage("map", "map")),
+            ("db", self._stage("db", "persist")),
+            ("llm", self._stage("llm", "refine")),
+            ("db", self._stage("db", "finalize")),
+        ]
+
+    def release_extraction(self, ctx):
+        self.released.append(ctx.invoice_id)
+
+    async def fail_extraction(self, ctx, exc):
+        ctx.errors.append(str(exc))
+        ctx.result = {"invoice_id": ctx.invoice_id, "status": "error", "errors": ctx.errors}
+        return ctx.result
+
+
+def _contexts(n):
+    return [
+        ExtractionContext(invoice_id=f"inv-{i}", file_identifier=f"{i}.pdf", file_name=f"{i}.pdf", upload_date=datetime.utcnow())
+        for i in range(n)
+    ]
+
+
+@pytest.mark.unit
+class TestExtractionPipeline:
+    @pytest.mark.asyncio
+    async def test_results_in_input_order(self):
+        service = FakeStagedService()
+        pipeline = ExtractionPipeline(extraction_service=service)
+
+        results = await pipeline.run(_contexts(10))
+
+        assert [r["invoice_id"] for r in results] == [f"inv-{i}" for i in range(10)]
+        assert all(r["status"] == "extracted" for r in results)
+        assert sorted(service.released) == sorted(f"inv-{i}" for i in range(10))
+        assert all(stat["count"] > 0 for stat in pipeline.stats.values())
+
+    @pytest.mark.asyncio
+    async def test_each_resource_has_its_own_limit(self):
+        service = FakeStagedService(delays={"di": 0.03, "download": 0.01})
+        pipeline = ExtractionPipeline(
+            extraction_service=service,
+            concurrency={"di": 2, "download": 6, "db": 1},
+        )
+
+        await pipeline.run(_contexts(12))
+
+        assert service.max_active["di"] == 2
+        assert 2 < service.max_active["download"] <= 6
+        # Both persist stages share the single db slot
+        assert service.max_active["db"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_stage_does_not_block_fast_stages(self):
+        # With one slot around the whole extraction this would take ~n * (di + download)
+        service = FakeStagedService(delays={"di": 0.02, "download": 0.02})
+        pipeline = ExtractionPipeline(extraction_service=service, concurrency={"di": 1, "download": 1})
+
+        start = time.perf_counter()
+        await pipeline.run(_contexts(8))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 8 * 0.04
+
+    @pytest.mark.asyncio
+    async def test_conflicts_and_stage_errors_finish_early(self):
+        service = FakeStagedService(conflict={"inv-1"}, fail_in_di={"inv-2"})
+        pipeline = ExtractionPipeline(extraction_service=service)
+
+        results = await pipeline.run(_contexts(4))
+
+        assert [r["status"] for r in results] == ["extracted", "conflict", "error", "extracted"]
+        assert results[2]["errors"] == ["DI throttled"]
+        assert not any(inv == "inv-2" and stage == "map" for inv, stage in service.order)
+
+    @pytest.mark.asyncio
+    async def test_max_in_flight_bounds_claimed_invoices(self):
+        service = FakeStagedService(delays={"llm": 0.02})
+        claimed = 0
+        peak = 0
+        original_claim = service.claim_extraction
+        original_release = service.release_extraction
+
+        async def claim(ctx):
+            nonlocal claimed, peak
+            claimed += 1
+            peak = max(peak, claimed)
+            return await original_claim(ctx)
+
+        def release(ctx):
+            nonlocal claimed
+            claimed -= 1
+            original_release(ctx)
+
+        service.claim_extraction = claim
+        service.release_extraction = release
+        pipeline = ExtractionPipeline(extraction_service=service, max_in_flight=3)
+
+        await pipeline.run(_contexts(10))
+
+        assert peak <= 3
+
+
+@pytest.mark.unit
+class TestStageLimiter:
+    @pytest.mark.asyncio
+    async def test_rate_limit_spaces_starts(self):
+        limiter = StageLimiter(concurrency=5, rate_per_second=50)
+        starts = []
+
+        async def call():
+            async with limiter:
+                starts.append(time.monotonic())
+
+        await asyncio.gather(*(call() for _ in range(5)))
+
+        assert starts[-1] - starts[0] >= 4 / 50 * 0.9
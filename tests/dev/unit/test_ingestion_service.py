@@ -44,7 +44,124 @@ class TestIngestionService:
         mock_file_handler.upload_file.assert_called_once()
         mock_pdf_processor.validate_file.assert_called_once()
         mock_pdf_processor.get_pdf_info.assert_called_once()
-    
+
+    @pytest.mark.asyncio
+    async def test_ingest_invoice_caches_scan_profile(
+        self,
+        db_session,
+        sample_pdf_content,
+        mock_file_handler,
+        mock_pdf_processor
+    ):
+        """Scanned-page detection runs once at ingestion and is stored on the invoice"""
+        from src.services.db_service import DatabaseService
+
+        service = IngestionService(
+            file_handler=mock_file_handler,
+            pdf_processor=mock_pdf_processor
+        )
+
+        result = await service.ingest_invoice(
+            file_content=sample_pdf_content,
+            file_name="test_invoice.pdf",
+            db=db_session,
+        )
+
+        assert result["status"] == "uploaded"
+        profile = await DatabaseService.get_scan_profile(result["invoice_id"], db=db_session)
+        assert profile is not None
+        assert "pages" in profile
+        assert profile["is_scanned"] == result["is_scanned"]
+
+    @pytest.mark.asyncio
+    async def test_ingest_invoice_skip_duplicates(
+        self,
+        db_session,
+        sample_pdf_content,
+        mock_file_handler,
+        mock_pdf_processor
+    ):
+        """Re-ingesting identical content returns the existing invoice when skip_duplicates is set"""
+        service = IngestionService(
+            file_handler=mock_file_handler,
+            pdf_processor=mock_pdf_processor
+        )
+
+        first = await service.ingest_invoice(
+            file_content=sample_pdf_content,
+            file_name="test_invoice.pdf",
+            db=db_session,
+        )
+        second = await service.ingest_invoice(
+            file_content=sample_pdf_content,
+            file_name="copy_of_test_invoice.pdf",
+            db=db_session,
+            skip_duplicates=True,
+        )
+
+        assert first["status"] == "uploaded"
+        assert second["status"] == "duplicate"
+        assert second["invoice_id"] == first["invoice_id"]
+        assert (second["processing_state"], second["file_path"]) == ("PENDING", first["file_path"])
+        mock_file_handler.upload_file.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_reingesting_same_content_keeps_hash_on_first_invoice(
+        self,
+        db_session,
+        sample_pdf_content,
+        mock_file_handler,
+        mock_pdf_processor
+    ):
+        """Without skip_duplicates a copy is ingested, but only the first invoice owns the content hash"""
+        from src.services.db_service import DatabaseService
+
+        service = IngestionService(
+            file_handler=mock_file_handler,
+            pdf_processor=mock_pdf_processor
+        )
+
+        first = await service.ingest_invoice(sample_pdf_content, "a.pdf", db=db_session)
+        second = await service.ingest_invoice(sample_pdf_content, "b.pdf", db=db_session)
+
+        copy = await DatabaseService.get_invoice(second["invoice_id"], db=db_session)
+        assert first["status"] == second["status"] == "uploaded"
+        assert copy.content_sha256 is None
+        assert await DatabaseService.find_invoice_id_by_content_hash(
+            (await DatabaseService.get_invoice(first["invoice_id"], db=db_session)).content_sha256, db=db_session
+        ) == first["invoice_id"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_is_caught_by_unique_hash(
+        self,
+        db_session,
+        sample_pdf_content,
+        mock_file_handler,
+        mock_pdf_processor,
+        monkeypatch
+    ):
+        """If another upload commits the same content after the lookup, the unique index reports the duplicate"""
+        from src.services.db_service import DatabaseService
+
+        service = IngestionService(
+            file_handler=mock_file_handler,
+            pdf_processor=mock_pdf_processor
+        )
+        first = await service.ingest_invoice(sample_pdf_content, "a.pdf", db=db_session)
+
+        real_lookup = DatabaseService.find_invoice_id_by_content_hash
+        calls = []
+
+        async def lookup_misses_once(content_sha256, db=None):
+            calls.append(content_sha256)
+            return None if len(calls) == 1 else await real_lookup(content_sha256, db=db)
+
+        monkeypatch.setattr(DatabaseService, "find_invoice_id_by_content_hash", staticmethod(lookup_misses_once))
+        second = await service.ingest_invoice(sample_pdf_content, "b.pdf", db=db_session, skip_duplicates=True)
+
+        assert second["status"] == "duplicate"
+        assert second["invoice_id"] == first["invoice_id"]
+
     @pytest.mark.asyncio
     async def test_ingest_invoice_validation_failed(
         self,
@@ -0,0 +1,156 @@
+"""Unit tests for the invoice full-text search index"""
+
+from datetime import datetime
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.extraction.extraction_service import ExtractionService
+from src.models import database
+from src.models.db_models import INVOICE_SEARCH_FTS_DDL, Invoice as InvoiceDB
+from src.models.db_utils_search import fts5_match, number_search_text, search_terms
+from src.services import db_service
+from src.services.db_service import DatabaseService
+
+
+_SEARCH_MIGRATION = Path(__file__).parents[3] / "alembic" / "versions" / "20260109_add_invoice_search.py"
+
+
+async def _ids(query, db_session, **kwargs):
+    page = await DatabaseService.search_invoices(query, db=db_session, **kwargs)
+    return [row["invoice_id"] for row in page["invoices"]]
+
+
+@pytest.fixture
+async def indexed_invoices(db_session):
+    rows = (
+        ("s-acme", "Acme Office Supplies", "INV-2024-001234", "PO-2024-0567", [{"description": "Ergonomic chair"}],
+         "INVOICE Acme Office Supplies ... Net 30"),
+        ("s-secure", "SecureTech Services", "SRV-5678", None, [{"description": "Security system maintenance"}],
+         "SERVICE INVOICE SecureTech ... Acme building access"),
+        ("s-temp", "TempStaff Solutions", "TS-9876", "PO-2024-0890", [{"description": "Timesheet week 1"}], None),
+    )
+    for n, (invoice_id, vendor, number, po, lines, text) in enumerate(rows):
+        db_session.add(InvoiceDB(
+            id=invoice_id, file_path=f"{invoice_id}.pdf", file_name=f"{invoice_id}.pdf", vendor_name=vendor,
+            invoice_number=number, po_number=po, line_items=lines, upload_date=datetime(2026, 1, n + 1),
+        ))
+        await db_session.commit()
+        await DatabaseService.index_invoice_for_search(invoice_id, document_text=text, db=db_session)
+
+
+@pytest.mark.unit
+class TestSearchText:
+    def test_create_all_and_migration_build_the_same_fts_schema(self):
+        spec = spec_from_file_location("search_migration", _SEARCH_MIGRATION)
+        migration = module_from_spec(spec)
+        spec.loader.exec_module(migration)
+
+        assert migration.SQLITE_FTS_DDL == INVOICE_SEARCH_FTS_DDL
+
+    def test_number_fragments(self):
+        text = number_search_text(["PO-12345", None])
+        assert text.split() == ["PO-12345", "PO12345", "O12345", "12345", "2345", "345"]
+
+    def test_query_terms_are_quoted_prefixes(self):
+        assert search_terms('acme  "chair* -"') == ["acme", "chair*"]
+        assert fts5_match(["acme", "chair*"]) == '"acme"* "chair*"*'
+
+
+@pytest.mark.unit
+class TestInvoiceSearch:
+    @pytest.mark.asyncio
+    async def test_matches_each_indexed_source(self, db_session, indexed_invoices):
+        assert await _ids("TempStaff", db_session) == ["s-temp"]
+        assert await _ids("4001", db_session) == ["s-acme"]
+        assert await _ids("inv-2024", db_session) == ["s-acme"]
+        assert await _ids("0890", db_session) == ["s-temp"]
+        assert await _ids("ergonomic", db_session) == ["s-acme"]
+        assert await _ids("maint", db_session) == ["s-secure"]
+        assert await _ids("acme net", db_session) == ["s-acme"]
+        assert await _ids("missing", db_session) == []
+        assert await _ids('"', db_session) == []
+
+    @pytest.mark.asyncio
+    async def test_ranked_pages_with_snippets(self, db_session, indexed_invoices):
+        page = await DatabaseService.search_invoices("acme", limit=1, db=db_session)
+
+        # The vendor hit outranks the passing mention in another invoice's OCR text
+        assert [row["invoice_id"] for row in page["invoices"]] == ["s-acme"]
+        assert (page["total"], page["has_more"]) == (2, True)
+        second = await DatabaseService.search_invoices("acme", skip=1, limit=1, include_total=False, db=db_session)
+        [row] = second["invoices"]
+        assert row["invoice_id"] == "s-secure"
+        assert row["snippet"] == "SERVICE INVOICE SecureTech ... **Acme** building access"
+        assert page["invoices"][0]["rank"] > row["rank"]
+        assert second["total"] is None
+
+    @pytest.mark.asyncio
+    async def test_review_update_reindexes(self, db_session, indexed_invoices):
+        assert await DatabaseService.update_with_review_version(
+            "s-temp", {"vendor_name": "Staffing Partners"}, 0, db=db_session
+        )
+
+        assert await _ids("staffing", db_session) == ["s-temp"]
+        assert await _ids("tempstaff", db_session) == []
+        # The OCR text is kept
+        assert await _ids("timesheet", db_session) == ["s-temp"]
+
+    @pytest.mark.asyncio
+    async def test_substring_fallback_without_fts(self, db_session, indexed_invoices, monkeypatch):
+        async def no_fts(session):
+            return False
+
+        monkeypatch.setattr(db_service, "sqlite_fts_ready", no_fts)
+        page = await DatabaseService.search_invoices("acme", db=db_session)
+
+        # Newest first, no rank / snippet
+        assert [row["invoice_id"] for row in page["invoices"]] == ["s-secure", "s-acme"]
+        assert {(row["rank"], row["snippet"]) for row in page["invoices"]} == {(None, None)}
+        assert page["total"] == 2
+        # LIKE wildcards in the query match literally
+        assert (await DatabaseService.search_invoices("a_me", db=db_session))["total"] == 0
+        assert (await DatabaseService.search_invoices("ac%", db=db_session))["total"] == 0
+
+    @pytest.mark.asyncio
+    async def test_missing_fts_table_is_rechecked(self, db_session, indexed_invoices, monkeypatch):
+        ready = db_service.sqlite_fts_ready
+        checks = []
+
+        async def late_fts(session):
+            checks.append(session)
+            return len(checks) > 1 and await ready(session)
+
+        monkeypatch.setattr(db_service, "sqlite_fts_ready", late_fts)
+        first = await DatabaseService.search_invoices("acme", db=db_session)
+        second = await DatabaseService.search_invoices("acme", db=db_session)
+        await DatabaseService.search_invoices("acme", db=db_session)
+
+        # Not found is not cached; found is
+        assert first["invoices"][0]["rank"] is None
+        assert second["invoices"][0]["rank"] is not None
+        assert len(checks) == 2
+
+    @pytest.mark.asyncio
+    async def test_extraction_indexes_document_text(
+        self, db_engine, db_session, mock_document_intelligence_client, mock_file_handler, sample_invoice
+    ):
+        db_session.add(InvoiceDB(id="s-extract", file_path="x.pdf", file_name="x.pdf", processing_state="PENDING"))
+        await db_session.commit()
+        mock_document_intelligence_client.analyze_invoice.return_value = {"content": "Courier delivery to YOW"}
+        field_extractor = MagicMock()
+        field_extractor.extract_invoice.return_value = sample_invoice.model_copy(update={"id": "s-extract"})
+        service = ExtractionService(
+            doc_intelligence_client=mock_document_intelligence_client,
+            file_handler=mock_file_handler,
+            field_extractor=field_extractor,
+        )
+
+        with patch.object(database, "engine", db_engine), patch("src.extraction.extraction_service.settings.USE_LLM_FALLBACK", False):
+            result = await service.extract_invoice("s-extract", "x.pdf", "x.pdf", datetime.utcnow())
+
+        assert result["status"] == "extracted"
+        assert await _ids("courier", db_session) == ["s-extract"]
+        assert await _ids(sample_invoice.vendor_name, db_session) == ["s-extract"]
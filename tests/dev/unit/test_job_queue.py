@@ -0,0 +1,177 @@
+"""Unit tests for the durable extraction job queue and worker"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from src.models.db_models import ExtractionJob
+from src.models.invoice import Invoice, InvoiceState
+from src.services.db_service import DatabaseService
+from src.services.job_queue import ExtractionJobQueue, JobState
+from src.workers.extraction_worker import ExtractionWorker
+
+
+async def _save_invoices(db_session, *invoice_ids):
+    for invoice_id in invoice_ids:
+        await DatabaseService.save_invoice(
+            Invoice(
+                id=invoice_id,
+                file_path=f"storage/{invoice_id}.pdf",
+                file_name=f"{invoice_id}.pdf",
+                upload_date=datetime.utcnow(),
+                processing_state=InvoiceState.PENDING,
+            ),
+            db=db_session,
+        )
+
+
+async def _expire_lease(db_session, job_id):
+    await db_session.execute(
+        update(ExtractionJob)
+        .where(ExtractionJob.id == job_id)
+        .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+
+
+class FakeExtraction:
+    def __init__(self, status="extracted", raises=None):
+        self.status = status
+        self.raises = raises
+        self.calls = []
+
+    async def extract_invoice(self, invoice_id, file_identifier, file_name, upload_date, db=None):
+        self.calls.append(invoice_id)
+        if self.raises:
+            raise self.raises
+        return {"invoice_id": invoice_id, "status": self.status, "errors": ["boom"] if self.status != "extracted" else []}
+
+
+@pytest.mark.unit
+class TestExtractionJobQueue:
+    @pytest.mark.asyncio
+    async def test_enqueue_returns_job_ids_and_dedupes_active_jobs(self, db_session):
+        await _save_invoices(db_session, "inv-1", "inv-2")
+
+        first = await ExtractionJobQueue.enqueue(["inv-1", "inv-2", "missing"], db=db_session)
+        second = await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+
+        assert [j["invoice_id"] for j in first["jobs"]] == ["inv-1", "inv-2"]
+        assert all(j["created"] for j in first["jobs"])
+        assert first["not_found"] == ["missing"]
+        assert second["jobs"][0]["job_id"] == first["jobs"][0]["job_id"]
+        assert second["jobs"][0]["created"] is False
+
+    @pytest.mark.asyncio
+    async def test_concurrent_enqueue_reuses_the_winning_job(self, db_session, monkeypatch):
+        await _save_invoices(db_session, "inv-1")
+        winner = await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+        enqueue_once = ExtractionJobQueue._enqueue_once
+        passes = []
+
+        async def first_pass_misses_active_job(session, unique_ids, max_attempts):
+            # As if the winner committed between this pass's lookup and insert
+            passes.append(unique_ids)
+            if len(passes) == 1:
+                with monkeypatch.context() as patched:
+                    patched.setattr(JobState, "ACTIVE", ())
+                    return await enqueue_once(session, unique_ids, max_attempts)
+            return await enqueue_once(session, unique_ids, max_attempts)
+
+        monkeypatch.setattr(ExtractionJobQueue, "_enqueue_once", staticmethod(first_pass_misses_active_job))
+        loser = await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+
+        assert len(passes) == 2
+        assert loser["jobs"] == [{"invoice_id": "inv-1", "job_id": winner["jobs"][0]["job_id"], "created": False}]
+        assert len(await ExtractionJobQueue.list_jobs(invoice_id="inv-1", db=db_session)) == 1
+
+    @pytest.mark.asyncio
+    async def test_job_is_claimed_once(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+
+        job = await ExtractionJobQueue.claim_next("worker-a", db=db_session)
+        assert job["state"] == JobState.RUNNING
+        assert job["attempts"] == 1
+        assert job["lease_owner"] == "worker-a"
+        assert await ExtractionJobQueue.claim_next("worker-b", db=db_session) is None
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed_and_fences_old_owner(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+        job = await ExtractionJobQueue.claim_next("worker-a", db=db_session)
+
+        await _expire_lease(db_session, job["job_id"])
+        reclaimed = await ExtractionJobQueue.claim_next("worker-b", db=db_session)
+
+        assert reclaimed["job_id"] == job["job_id"]
+        assert reclaimed["attempts"] == 2
+        # The dead worker's late result is dropped
+        assert await ExtractionJobQueue.complete(job["job_id"], "worker-a", db=db_session) is False
+        assert await ExtractionJobQueue.complete(job["job_id"], "worker-b", db=db_session) is True
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_is_retried_with_backoff_then_fails(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        await ExtractionJobQueue.enqueue(["inv-1"], max_attempts=2, db=db_session)
+
+        job = await ExtractionJobQueue.claim_next("w", db=db_session)
+        state = await ExtractionJobQueue.fail(job["job_id"], "w", "boom", job["attempts"], job["max_attempts"], db=db_session)
+        assert state == JobState.QUEUED
+        # Backoff: not claimable yet
+        assert await ExtractionJobQueue.claim_next("w", db=db_session) is None
+
+        await db_session.execute(
+            update(ExtractionJob).values(available_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        job = await ExtractionJobQueue.claim_next("w", db=db_session)
+        state = await ExtractionJobQueue.fail(job["job_id"], "w", "boom", job["attempts"], job["max_attempts"], db=db_session)
+
+        assert state == JobState.FAILED
+        stored = await ExtractionJobQueue.get_job(job["job_id"], db=db_session)
+        assert stored["last_error"] == "boom"
+        assert stored["finished_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_fail_expired_closes_out_last_attempt(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        await ExtractionJobQueue.enqueue(["inv-1"], max_attempts=1, db=db_session)
+        job = await ExtractionJobQueue.claim_next("w", db=db_session)
+        await _expire_lease(db_session, job["job_id"])
+
+        assert await ExtractionJobQueue.fail_expired(db=db_session) == 1
+        assert (await ExtractionJobQueue.get_job(job["job_id"], db=db_session))["state"] == JobState.FAILED
+
+
+@pytest.mark.unit
+class TestExtractionWorker:
+    @pytest.mark.asyncio
+    async def test_run_once_completes_job(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        enqueued = await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+        extraction = FakeExtraction()
+        worker = ExtractionWorker(extraction_service=extraction, worker_id="w")
+
+        assert await worker.run_once(db=db_session) is True
+        assert await worker.run_once(db=db_session) is False
+
+        job = await ExtractionJobQueue.get_job(enqueued["jobs"][0]["job_id"], db=db_session)
+        assert job["state"] == JobState.SUCCEEDED
+        assert job["result"]["status"] == "extracted"
+        assert extraction.calls == ["inv-1"]
+
+    @pytest.mark.asyncio
+    async def test_failed_extraction_is_requeued(self, db_session):
+        await _save_invoices(db_session, "inv-1")
+        enqueued = await ExtractionJobQueue.enqueue(["inv-1"], db=db_session)
+        worker = ExtractionWorker(extraction_service=FakeExtraction(raises=RuntimeError("DI down")), worker_id="w")
+
+        await worker.run_once(db=db_session)
+
+        job = await ExtractionJobQueue.get_job(enqueued["jobs"][0]["job_id"], db=db_session)
+        assert job["state"] == JobState.QUEUED
+        assert job["last_error"] == "DI down"
+        assert job["available_at"] > datetime.utcnow()
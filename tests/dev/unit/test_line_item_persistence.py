@@ -0,0 +1,105 @@
+"""Unit tests for set-based line item persistence"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_utils_line_items import get_line_items_from_table, save_line_items_to_table
+from src.models.invoice import LineItem
+from src.models.line_item_db_models import LineItem as LineItemDB
+
+
+def _lines(count, start=1, description="Item"):
+    return [
+        LineItem(
+            line_number=n,
+            description=f"{description} {n}",
+            quantity=Decimal("2"),
+            unit_price=Decimal("5.00"),
+            amount=Decimal("10.00"),
+            confidence=0.9,
+        )
+        for n in range(start, start + count)
+    ]
+
+
+async def _row_ids(session, invoice_id):
+    result = await session.execute(
+        select(LineItemDB.line_number, LineItemDB.id).where(LineItemDB.invoice_id == invoice_id)
+    )
+    return dict(result.all())
+
+
+@pytest.fixture
+async def invoice_id(db_session):
+    db_session.add(InvoiceDB(id="inv-lines", file_path="x.pdf", file_name="x.pdf"))
+    await db_session.commit()
+    return "inv-lines"
+
+
+@pytest.mark.unit
+class TestLineItemPersistence:
+    @pytest.mark.asyncio
+    async def test_new_invoice_is_bulk_inserted(self, db_session, invoice_id):
+        counts = await save_line_items_to_table(db_session, invoice_id, _lines(25))
+        await db_session.commit()
+
+        stored = await get_line_items_from_table(db_session, invoice_id)
+        assert counts == {"inserted": 25, "updated": 0, "deleted": 0, "unchanged": 0}
+        assert [item.line_number for item in stored] == list(range(1, 26))
+        assert stored[0].amount == Decimal("10.00")
+
+    @pytest.mark.asyncio
+    async def test_single_line_edit_touches_one_row(self, db_session, invoice_id):
+        await save_line_items_to_table(db_session, invoice_id, _lines(100))
+        await db_session.commit()
+        before = await _row_ids(db_session, invoice_id)
+
+        edited = _lines(100)
+        edited[41] = edited[41].model_copy(update={"description": "Corrected", "amount": Decimal("12.50")})
+        counts = await save_line_items_to_table(db_session, invoice_id, edited)
+        await db_session.commit()
+
+        stored = await get_line_items_from_table(db_session, invoice_id)
+        assert counts == {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 99}
+        assert await _row_ids(db_session, invoice_id) == before
+        assert stored[41].description == "Corrected"
+        assert stored[41].amount == Decimal("12.50")
+
+    @pytest.mark.asyncio
+    async def test_added_and_removed_lines(self, db_session, invoice_id):
+        await save_line_items_to_table(db_session, invoice_id, _lines(5))
+        await db_session.commit()
+
+        counts = await save_line_items_to_table(db_session, invoice_id, _lines(3) + _lines(2, start=10))
+        await db_session.commit()
+
+        stored = await get_line_items_from_table(db_session, invoice_id)
+        assert counts == {"inserted": 2, "updated": 0, "deleted": 2, "unchanged": 3}
+        assert [item.line_number for item in stored] == [1, 2, 3, 10, 11]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_line_numbers_replace_all(self, db_session, invoice_id):
+        await save_line_items_to_table(db_session, invoice_id, _lines(3))
+        await db_session.commit()
+
+        duplicated = _lines(2) + _lines(1, start=2, description="Other")
+        counts = await save_line_items_to_table(db_session, invoice_id, duplicated)
+        await db_session.commit()
+
+        stored = await get_line_items_from_table(db_session, invoice_id)
+        assert counts["deleted"] == 3 and counts["inserted"] == 3
+        assert sorted(item.description for item in stored) == ["Item 1", "Item 2", "Other 2"]
+
+    @pytest.mark.asyncio
+    async def test_empty_list_clears_line_items(self, db_session, invoice_id):
+        await save_line_items_to_table(db_session, invoice_id, _lines(4))
+        await db_session.commit()
+
+        counts = await save_line_items_to_table(db_session, invoice_id, [])
+        await db_session.commit()
+
+        assert counts["deleted"] == 4
+        assert await get_line_items_from_table(db_session, invoice_id) == []
@@ -0,0 +1,46 @@
+"""Alembic migration tests: data survives an upgrade/downgrade round trip"""
+
+import sqlite3
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+_ALEMBIC_DIR = Path(__file__).parents[3] / "alembic"
+
+
+def _alembic_config(db_path: Path) -> Config:
+    # No ini file, so alembic leaves the test run's logging config alone
+    config = Config()
+    config.set_main_option("script_location", str(_ALEMBIC_DIR))
+    config.set_main_option("sqlalchemy.url", f"sqlite+aiosqlite:///{db_path}")
+    return config
+
+
+def _hashes(db_path: Path) -> dict:
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT id, content_sha256 FROM invoices"))
+
+
+class TestAccessIndexesMigration:
+    def test_downgrade_restores_hashes_cleared_for_the_unique_index(self, tmp_path):
+        db_path = tmp_path / "migrations.db"
+        config = _alembic_config(db_path)
+        command.upgrade(config, "20260106_add_list_indexes")
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany(
+                "INSERT INTO invoices (id, file_path, file_name, upload_date, status,"
+                " processing_state, review_version, content_sha256)"
+                " VALUES (?, 'p.pdf', 'p.pdf', ?, 'uploaded', 'PENDING', 0, ?)",
+                [
+                    ("first", "2026-01-01 00:00:00", "same"),
+                    ("copy", "2026-01-02 00:00:00", "same"),
+                    ("other", "2026-01-03 00:00:00", "different"),
+                ],
+            )
+
+        command.upgrade(config, "20260107_add_access_indexes")
+        assert _hashes(db_path) == {"first": "same", "copy": None, "other": "different"}
+
+        command.downgrade(config, "20260106_add_list_indexes")
+        assert _hashes(db_path) == {"first": "same", "copy": "same", "other": "different"}
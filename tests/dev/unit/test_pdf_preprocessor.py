@@ -0,0 +1,119 @@
+"""Unit tests for PDFPreprocessor image optimization."""
+
+from io import BytesIO
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+Image = pytest.importorskip("PIL.Image")
+
+from src.ingestion import pdf_preprocessor
+from src.ingestion.pdf_preprocessor import PDFPreprocessor, _page_render_dpi
+
+
+def _make_scanned_pdf(page_sizes) -> bytes:
+    """Build an image-only PDF with one noisy page per (width_pt, height_pt)."""
+    doc = fitz.open()
+    for index, (width, height) in enumerate(page_sizes):
+        img = Image.new("RGB", (int(width), int(height)), (255, 255, 255))
+        # Stripe each page differently so page order is observable
+        for x in range(0, img.width, 10 + index):
+            for y in range(img.height):
+                img.putpixel((x, y), (0, 0, 0))
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        page = doc.new_page(width=width, height=height)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.unit
+class TestPageRenderDpi:
+    def test_uses_target_dpi_within_budget(self):
+        # US Letter at 150 DPI is ~2.1 MP, well within budget
+        assert _page_render_dpi(612, 792, 150, 600, 12_000_000) == 150
+
+    def test_capped_by_max_dpi(self):
+        assert _page_render_dpi(612, 792, 400, 300, 0) == 300
+
+    def test_oversized_page_lowered_to_pixel_budget(self):
+        # 36x48 inch poster: 300 DPI would be ~155 MP
+        dpi = _page_render_dpi(36 * 72, 48 * 72, 300, 600, 12_000_000)
+        assert dpi < 300
+        assert (36 * dpi) * (48 * dpi) <= 12_000_000
+
+    def test_budget_wins_over_target_dpi(self):
+        dpi = _page_render_dpi(100 * 72, 100 * 72, 300, 600, 1_000_000)
+        assert dpi == 10
+
+
+@pytest.mark.unit
+class TestOptimizeScannedPdf:
+    def test_serial_preserves_page_count_order_and_size(self):
+        sizes = [(200, 300), (300, 200), (250, 250)]
+        pdf_bytes = _make_scanned_pdf(sizes)
+        pre = PDFPreprocessor(
+            enable_image_optimization=True,
+            target_dpi=72,
+            max_workers=1,
+            page_chunk_size=2,
+        )
+
+        out = pre._optimize_scanned_pdf(pdf_bytes, "scan.pdf")
+
+        doc = fitz.open(stream=out, filetype="pdf")
+        assert len(doc) == 3
+        assert [(round(p.rect.width), round(p.rect.height)) for p in doc] == sizes
+        doc.close()
+
+    def test_page_pixel_budget_applied(self):
+        pdf_bytes = _make_scanned_pdf([(720, 720)])
+        pre = PDFPreprocessor(
+            enable_image_optimization=True,
+            target_dpi=300,
+            max_workers=1,
+            max_page_pixels=2_000_000,
+        )
+
+        out = pre._optimize_scanned_pdf(pdf_bytes, "scan.pdf")
+
+        doc = fitz.open(stream=out, filetype="pdf")
+        info = doc[0].get_image_info()
+        assert info[0]["width"] * info[0]["height"] <= 2_000_000
+        doc.close()
+
+    def test_parallel_matches_serial(self):
+        pdf_bytes = _make_scanned_pdf([(200, 200)] * 4)
+        serial = PDFPreprocessor(
+            enable_image_optimization=True, target_dpi=72, max_workers=1, page_chunk_size=1
+        )._optimize_scanned_pdf(pdf_bytes, "scan.pdf")
+        parallel = PDFPreprocessor(
+            enable_image_optimization=True, target_dpi=72, max_workers=2, page_chunk_size=1
+        )._optimize_scanned_pdf(pdf_bytes, "scan.pdf")
+
+        serial_doc = fitz.open(stream=serial, filetype="pdf")
+        parallel_doc = fitz.open(stream=parallel, filetype="pdf")
+        assert len(parallel_doc) == len(serial_doc) == 4
+        for s_page, p_page in zip(serial_doc, parallel_doc):
+            s_img = s_page.get_images()[0][0]
+            p_img = p_page.get_images()[0][0]
+            assert serial_doc.extract_image(s_img)["image"] == parallel_doc.extract_image(p_img)["image"]
+        serial_doc.close()
+        parallel_doc.close()
+
+    def test_pool_reused_across_document_sizes(self):
+        pre = PDFPreprocessor(enable_image_optimization=True, target_dpi=72, max_workers=3, page_chunk_size=1)
+        pre._optimize_scanned_pdf(_make_scanned_pdf([(100, 100)] * 2), "small.pdf")
+        pool = pdf_preprocessor._page_executors[3]
+
+        out = pre._optimize_scanned_pdf(_make_scanned_pdf([(100, 100)] * 5), "large.pdf")
+
+        # A 2-chunk document does not resize (and shut down) the 3-worker pool
+        assert pdf_preprocessor._page_executors[3] is pool
+        assert len(fitz.open(stream=out, filetype="pdf")) == 5
+
+    def test_invalid_pdf_returns_original(self):
+        pre = PDFPreprocessor(enable_image_optimization=True, max_workers=1)
+        assert pre._optimize_scanned_pdf(b"not a pdf", "bad.pdf") == b"not a pdf"
@@ -0,0 +1,116 @@
+"""Unit tests for priority classes and weighted fair queuing"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.extraction.extraction_service import ExtractionContext
+from src.services.priority_scheduler import (
+    Priority,
+    PriorityLimiter,
+    current_priority,
+    normalize_priority,
+    priority_scope,
+)
+
+
+async def _queue(limiter, priority, order, hold=None):
+    async with limiter.slot(priority):
+        order.append(priority)
+        if hold is not None:
+            await hold.wait()
+
+
+@pytest.mark.unit
+class TestPriorityScope:
+    def test_scope_sets_and_restores_priority(self):
+        assert current_priority() == Priority.NORMAL
+        with priority_scope("interactive"):
+            assert current_priority() == Priority.INTERACTIVE
+            ctx = ExtractionContext(invoice_id="inv-1", file_identifier="a.pdf", file_name="a.pdf", upload_date=datetime.utcnow())
+            assert ctx.priority == Priority.INTERACTIVE
+        assert current_priority() == Priority.NORMAL
+
+    def test_unknown_priority_is_rejected(self):
+        with pytest.raises(ValueError):
+            normalize_priority("urgent")
+
+
+@pytest.mark.unit
+class TestPriorityLimiter:
+    @pytest.mark.asyncio
+    async def test_interactive_takes_next_slot_ahead_of_queued_bulk(self):
+        limiter = PriorityLimiter(concurrency=1)
+        order = []
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_queue(limiter, Priority.BULK, order, hold=gate))
+        await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(_queue(limiter, Priority.BULK, order)) for _ in range(5)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_queue(limiter, Priority.INTERACTIVE, order)))
+        await asyncio.sleep(0)
+
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+
+        assert order[1] == Priority.INTERACTIVE
+
+    @pytest.mark.asyncio
+    async def test_slots_are_shared_by_weight_under_contention(self):
+        limiter = PriorityLimiter(concurrency=1, weights={Priority.NORMAL: 4, Priority.BULK: 1})
+        order = []
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_queue(limiter, Priority.BULK, order, hold=gate))
+        await asyncio.sleep(0)
+
+        tasks = [
+            asyncio.create_task(_queue(limiter, priority, order))
+            for _ in range(20)
+            for priority in (Priority.BULK, Priority.NORMAL)
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+
+        # Roughly 4:1 while both classes wait; bulk is slowed, not starved
+        served = order[1:21]
+        assert 15 <= served.count(Priority.NORMAL) <= 17
+        assert served.count(Priority.BULK) >= 3
+
+    @pytest.mark.asyncio
+    async def test_bulk_uses_all_idle_capacity(self):
+        limiter = PriorityLimiter(concurrency=3)
+
+        for _ in range(3):
+            await asyncio.wait_for(limiter.acquire(Priority.BULK), 0.1)
+
+        assert limiter.stats()["active"] == 3
+
+    @pytest.mark.asyncio
+    async def test_reserved_slot_is_kept_for_interactive(self):
+        limiter = PriorityLimiter(concurrency=2, reserved=1)
+        await limiter.acquire(Priority.BULK)
+
+        blocked = asyncio.create_task(limiter.acquire(Priority.BULK))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await asyncio.wait_for(limiter.acquire(Priority.INTERACTIVE), 0.1)
+        blocked.cancel()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_a_slot(self):
+        limiter = PriorityLimiter(concurrency=1)
+        await limiter.acquire(Priority.BULK)
+        waiter = asyncio.create_task(limiter.acquire(Priority.NORMAL))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+        await asyncio.wait_for(limiter.acquire(Priority.BULK), 0.1)
+        assert limiter.stats()["classes"]["normal"]["waiting"] == 0
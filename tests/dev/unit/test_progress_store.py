@@ -0,0 +1,134 @@
+"""Unit tests for the bounded progress stores"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.config import settings
+from src.services.progress_store import MemoryProgressStore, SQLiteProgressStore
+from src.services.progress_tracker import ProcessingStep, ProgressTracker
+
+
+def _counter(state):
+    state = state or {"invoice_id": "inv-1", "count": 0}
+    state["count"] += 1
+    return state
+
+
+@pytest.mark.unit
+class TestMemoryProgressStore:
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entries_are_evicted(self):
+        store = MemoryProgressStore(max_entries=2)
+        for invoice_id in ("a", "b"):
+            await store.mutate(invoice_id, lambda _, i=invoice_id: {"invoice_id": i})
+        await store.get("a")  # "b" is now least recently used
+
+        await store.mutate("c", lambda _: {"invoice_id": "c"})
+
+        assert await store.get("b") is None
+        assert await store.get("a") is not None
+        assert store.stats()["entries"] == 2
+        assert store.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_after_ttl(self):
+        store = MemoryProgressStore(ttl_seconds=0.05)
+        await store.mutate("a", lambda _: {"invoice_id": "a"})
+
+        await asyncio.sleep(0.1)
+
+        assert await store.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_recreated_entry_gets_a_newer_version(self):
+        store = MemoryProgressStore()
+        _, first = await store.mutate("a", lambda _: {"invoice_id": "a"})
+        await store.delete("a")
+
+        _, second = await store.mutate("a", lambda _: {"invoice_id": "a"})
+
+        assert second > first
+
+
+@pytest.mark.unit
+class TestSQLiteProgressStore:
+    @pytest.mark.asyncio
+    async def test_workers_sharing_the_file_see_each_others_progress(self, tmp_path):
+        path = str(tmp_path / "progress.sqlite3")
+        worker_a, worker_b = SQLiteProgressStore(path), SQLiteProgressStore(path)
+        try:
+            _, version = await worker_a.mutate("inv-1", lambda _: {"invoice_id": "inv-1", "status": "running"})
+
+            state, seen = await worker_b.get("inv-1")
+            changed = await worker_b.changed_since({"inv-1": 0, "inv-2": 0})
+            unchanged = await worker_b.changed_since({"inv-1": version})
+        finally:
+            worker_a.close()
+            worker_b.close()
+
+        assert state["status"] == "running" and seen == version
+        assert [s["invoice_id"] for s, _ in changed] == ["inv-1"]
+        assert unchanged == []
+
+    def test_concurrent_writers_do_not_lose_updates(self, tmp_path):
+        path = str(tmp_path / "progress.sqlite3")
+        stores = [SQLiteProgressStore(path) for _ in range(2)]
+
+        def write(store):
+            for _ in range(25):
+                store._mutate_sync("inv-1", _counter)
+
+        threads = [threading.Thread(target=write, args=(store,)) for store in stores for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        state, _ = stores[0]._get_sync("inv-1")
+        for store in stores:
+            store.close()
+        assert state["count"] == 100
+
+    def test_overflow_and_expired_rows_are_evicted(self, tmp_path):
+        store = SQLiteProgressStore(str(tmp_path / "progress.sqlite3"), max_entries=3, ttl_seconds=60)
+        for index in range(5):
+            store._mutate_sync(f"inv-{index}", lambda _, i=index: {"invoice_id": f"inv-{i}"})
+            time.sleep(0.001)
+
+        store._evict_sync()
+
+        assert store.stats()["entries"] == 3
+        assert store._get_sync("inv-0") is None
+        assert store._get_sync("inv-4") is not None
+        store.close()
+
+
+@pytest.mark.unit
+class TestSharedProgressTracker:
+    @pytest.mark.asyncio
+    async def test_subscriber_receives_progress_written_by_another_worker(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "PROGRESS_STORE_POLL_SECONDS", 0.02, raising=False)
+        path = str(tmp_path / "progress.sqlite3")
+        other_worker = SQLiteProgressStore(path)
+        tracker = ProgressTracker()
+        tracker.use_store(SQLiteProgressStore(path))
+        try:
+            async with tracker.subscribe(["inv-1"]) as feed:
+                await other_worker.mutate(
+                    "inv-1",
+                    lambda _: {"invoice_id": "inv-1", "status": "running", "current_step": ProcessingStep.EXTRACTION.value},
+                )
+                relayed = await feed.get(timeout=1)
+                # Written locally: delivered once, not again by the relay
+                await tracker.complete("inv-1")
+                local = await feed.get(timeout=1)
+                assert await feed.get(timeout=0.1) is None
+        finally:
+            await tracker.aclose()
+            other_worker.close()
+
+        assert relayed["status"] == "running"
+        assert local["status"] == "complete"
@@ -1,5 +1,7 @@
 """Unit tests for ProgressTracker"""
 
+import asyncio
+
 import pytest
 from unittest.mock import patch
 
@@ -170,3 +172,113 @@ class TestProgressTracker:
         # Should handle concurrent updates gracefully
         assert progress is not None
         assert 0 <= progress["progress_percentage"] <= 100
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestProgressSubscriptions:
+    """Test push-based progress subscriptions"""
+
+    async def test_subscriber_gets_current_state_then_changes(self):
+        tracker = ProgressTracker()
+        await tracker.clear("sub-invoice-1")
+        await tracker.start("sub-invoice-1", ProcessingStep.EXTRACTION, "Extraction started")
+
+        async with tracker.subscribe(["sub-invoice-1"]) as feed:
+            current = await feed.get(timeout=1)
+            await tracker.update("sub-invoice-1", 60, "Analyzing")
+            update = await feed.get(timeout=1)
+            await tracker.complete("sub-invoice-1")
+            final = await feed.get(timeout=1)
+            assert feed.all_done
+
+        assert current["message"] == "Extraction started"
+        assert update["progress_percentage"] == 60
+        assert final["status"] == "complete"
+        assert "sub-invoice-1" not in tracker._subscribers
+
+    async def test_slow_subscriber_gets_latest_state_only(self):
+        tracker = ProgressTracker()
+        await tracker.clear("sub-invoice-2")
+
+        async with tracker.subscribe(["sub-invoice-2"]) as feed:
+            await tracker.start("sub-invoice-2", ProcessingStep.EXTRACTION)
+            for pct in (10, 20, 30):
+                await tracker.update("sub-invoice-2", pct)
+
+            latest = await feed.get(timeout=1)
+            assert await feed.get(timeout=0.01) is None
+
+        assert latest["progress_percentage"] == 30
+
+    async def test_one_subscription_follows_many_invoices(self):
+        tracker = ProgressTracker()
+        for invoice_id in ("sub-invoice-3", "sub-invoice-4"):
+            await tracker.clear(invoice_id)
+
+        async with tracker.subscribe(["sub-invoice-3"]) as feed:
+            await feed.add(["sub-invoice-4"])
+            await tracker.start("sub-invoice-4", ProcessingStep.EXTRACTION)
+            await tracker.start("sub-invoice-3", ProcessingStep.EXTRACTION)
+            received = {(await feed.get(timeout=1))["invoice_id"] for _ in range(2)}
+
+            await feed.remove(["sub-invoice-3"])
+            await tracker.update("sub-invoice-3", 50)
+            assert await feed.get(timeout=0.01) is None
+
+        assert received == {"sub-invoice-3", "sub-invoice-4"}
+
+    async def test_restarting_a_finished_invoice_runs_again(self):
+        tracker = ProgressTracker()
+        await tracker.clear("sub-invoice-5")
+        await tracker.start("sub-invoice-5", ProcessingStep.EXTRACTION)
+        await tracker.complete("sub-invoice-5")
+
+        await tracker.start("sub-invoice-5", ProcessingStep.EXTRACTION, "Re-extracting")
+
+        progress = await tracker.get("sub-invoice-5")
+        assert progress["status"] == "running"
+        assert progress["steps"][ProcessingStep.EXTRACTION.value]["status"] == "running"
+
+
+@pytest.mark.unit
+class TestProgressStreamingRoutes:
+    """Test the SSE and WebSocket progress endpoints"""
+
+    def test_sse_stream_ends_when_invoices_finish(self, test_client):
+        tracker = ProgressTracker()
+
+        async def setup():
+            for invoice_id in ("sse-invoice-1", "sse-invoice-2"):
+                await tracker.clear(invoice_id)
+                await tracker.start(invoice_id, ProcessingStep.EXTRACTION)
+                await tracker.complete(invoice_id)
+
+        asyncio.run(setup())
+
+        response = test_client.get("/api/progress/stream", params={"invoice_ids": "sse-invoice-1,sse-invoice-2"})
+
+        events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert events == ["progress", "progress", "done"]
+
+    def test_websocket_multiplexes_subscriptions(self, test_client):
+        tracker = ProgressTracker()
+
+        async def setup():
+            for invoice_id in ("ws-invoice-1", "ws-invoice-2"):
+                await tracker.clear(invoice_id)
+                await tracker.start(invoice_id, ProcessingStep.EXTRACTION, f"{invoice_id} started")
+
+        asyncio.run(setup())
+
+        with test_client.websocket_connect("/api/progress/ws?invoice_ids=ws-invoice-1") as ws:
+            first = [ws.receive_json() for _ in range(2)]
+            ws.send_json({"subscribe": ["ws-invoice-2"]})
+            second = [ws.receive_json() for _ in range(2)]
+
+        assert {m["event"] for m in first} == {"subscribed", "progress"}
+        assert [m["invoice_id"] for m in first if m["event"] == "progress"] == ["ws-invoice-1"]
+        assert [m["invoice_id"] for m in second if m["event"] == "progress"] == ["ws-invoice-2"]
+        assert [m["invoice_ids"] for m in second if m["event"] == "subscribed"] == [["ws-invoice-1", "ws-invoice-2"]]
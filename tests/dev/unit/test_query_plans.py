@@ -0,0 +1,110 @@
+"""Query-plan regression tests: hot queries must be served by indexes
+
+Each case runs the real service call against the test schema, captures the
+SQL it issues and checks SQLite's EXPLAIN QUERY PLAN. A case fails if any
+statement falls back to a full table scan, or uses a different index than
+the one planned for that access path.
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select
+
+from src.models.db_models import Invoice as InvoiceDB
+from src.models.db_utils_line_items import save_line_items_to_table
+from src.services.db_service import DatabaseService, encode_invoice_cursor
+from src.services.job_queue import ExtractionJobQueue
+
+# "SCAN invoices" (or "SCAN TABLE invoices" on older SQLite) without USING INDEX
+TABLE_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+
+HOT_QUERIES = [
+    # name, call, index expected in the plan, whether ORDER BY must come from the index
+    ("invoice_list", lambda db: DatabaseService.list_invoice_page(limit=20, include_total=False, db=db),
+     "ix_invoices_upload_date_id", True),
+    ("invoice_list_cursor", lambda db: DatabaseService.list_invoice_page(
+        limit=20, cursor=encode_invoice_cursor(datetime(2026, 1, 1), "inv"), include_total=False, db=db),
+     "ix_invoices_upload_date_id (upload_date<?)", True),
+    ("invoice_list_by_status", lambda db: DatabaseService.list_invoice_page(
+        status="extracted", include_total=False, db=db),
+     "ix_invoices_status_upload_date", True),
+    ("invoice_list_by_state", lambda db: DatabaseService.list_invoice_page(
+        processing_state="EXTRACTED", include_total=False, db=db),
+     "ix_invoices_processing_state_upload_date", True),
+    ("invoice_list_by_vendor", lambda db: DatabaseService.list_invoice_page(
+        vendor_name="Acme", include_total=False, db=db),
+     "ix_invoices_vendor_name_upload_date", True),
+    ("invoice_count_by_status", lambda db: DatabaseService.count_invoices(status="extracted", use_cache=False, db=db),
+     "ix_invoices_status_upload_date", False),
+    ("invoice_ids_by_state", lambda db: DatabaseService.list_invoice_ids_by_state(["PENDING", "FAILED"], db=db),
+     "ix_invoices_processing_state_upload_date", False),
+    ("content_hash_lookup", lambda db: DatabaseService.find_invoice_id_by_content_hash("ab" * 32, db=db),
+     "ux_invoices_content_sha256", False),
+    ("transition_state", lambda db: DatabaseService.transition_state(
+        "inv", {"PENDING"}, "PROCESSING", error_on_invalid=False, db=db),
+     "sqlite_autoindex_invoices_1 (id=?)", False),
+    ("claim_for_extraction", lambda db: DatabaseService.claim_for_extraction("inv", db=db),
+     "sqlite_autoindex_invoices_1 (id=?)", False),
+    ("claim_batch_for_extraction", lambda db: DatabaseService.claim_batch_for_extraction(
+        limit=32, from_states=["PENDING"], lease_owner="w", db=db),
+     "ix_invoices_processing_state_lease", False),
+    ("reap_expired_leases", lambda db: DatabaseService.reap_expired_leases(db=db),
+     "processing_state=?", False),
+    ("vendor_invoice_number_lookup", lambda db: db.execute(
+        select(InvoiceDB.id).where(InvoiceDB.vendor_name == "Acme", InvoiceDB.invoice_number == "INV-1")),
+     "ix_invoices_vendor_name_invoice_number", False),
+    ("line_items_for_invoice", lambda db: save_line_items_to_table(db, "inv", []),
+     "line_items USING INDEX", False),
+    ("review_history_page", lambda db: DatabaseService.list_review_events("inv", skip=100, limit=50, db=db),
+     "ix_invoice_review_events_invoice_id_created_at", True),
+    ("invoice_search", lambda db: DatabaseService.search_invoices("acme 2024", db=db),
+     "VIRTUAL TABLE INDEX", False),
+    ("search_document_write", lambda db: DatabaseService.index_invoice_for_search("inv", db=db),
+     "ux_invoice_search_documents_invoice_id", False),
+    ("job_claim", lambda db: ExtractionJobQueue.claim_next("worker", db=db),
+     "ix_extraction_jobs_state_available_at", False),
+]
+
+
+@pytest.fixture
+def captured_sql(db_engine):
+    """SQL statements executed on the test engine while the fixture is active"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def _explain(db_engine, statements):
+    plans = []
+    async with db_engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            plans.append((statement, [row[-1] for row in rows]))
+    return plans
+
+
+@pytest.mark.unit
+class TestQueryPlans:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("name,call,expected_index,ordered", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+    async def test_hot_query_uses_index(self, db_engine, db_session, captured_sql, name, call, expected_index, ordered):
+        await call(db_session)
+        statements = list(captured_sql)
+        captured_sql.clear()
+        plans = await _explain(db_engine, statements)
+
+        assert plans, f"{name} issued no SQL"
+        details = [detail for _, plan in plans for detail in plan]
+        scans = [detail for detail in details if TABLE_SCAN.match(detail)]
+        assert not scans, f"{name} falls back to a table scan: {plans}"
+        assert any(expected_index in detail for detail in details), f"{name} does not use {expected_index}: {plans}"
+        if ordered:
+            assert not any("TEMP B-TREE" in detail for detail in details), f"{name} sorts instead of reading index order: {plans}"
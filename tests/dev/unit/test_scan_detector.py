@@ -0,0 +1,110 @@
+"""Unit tests for the shared scanned-document detector."""
+
+from io import BytesIO
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+Image = pytest.importorskip("PIL.Image")
+
+from src.extraction.extraction_service import ExtractionService
+from src.ingestion.scan_detector import detect_scanned_pages, is_cacheable_profile, is_scanned_pdf, select_sample_pages
+from src.models.db_models import Invoice as InvoiceDB
+from src.services.db_service import DatabaseService
+
+TEXT = "Invoice 12345 issued by Acme Corporation for consulting services rendered in March. " * 3
+
+
+def _png(width: int, height: int) -> bytes:
+    buf = BytesIO()
+    Image.new("L", (width, height), 200).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _make_pdf(kinds) -> bytes:
+    """Build a PDF where each entry is 'text', 'scanned' or 'stamped' (full-page image + short header)."""
+    doc = fitz.open()
+    for kind in kinds:
+        page = doc.new_page(width=612, height=792)
+        if kind == "text":
+            page.insert_textbox(fitz.Rect(36, 36, 576, 756), TEXT, fontsize=10)
+        else:
+            page.insert_image(page.rect, stream=_png(200, 260))
+            if kind == "stamped":
+                page.insert_text((36, 20), "RECEIVED 2025-01-01 ACCOUNTS PAYABLE DEPT 0042", fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.unit
+class TestSelectSamplePages:
+    def test_all_pages_when_under_limit(self):
+        assert select_sample_pages(3, 5) == [0, 1, 2]
+
+    def test_includes_first_and_last(self):
+        pages = select_sample_pages(100, 5)
+        assert pages[0] == 0
+        assert pages[-1] == 99
+        assert len(pages) == 5
+
+    def test_empty_document(self):
+        assert select_sample_pages(0, 5) == []
+
+
+@pytest.mark.unit
+class TestDetectScannedPages:
+    def test_text_pdf(self):
+        profile = detect_scanned_pages(_make_pdf(["text", "text"]))
+        assert profile["is_scanned"] is False
+        assert profile["classification"] == "text"
+        assert profile["pages"] == {"1": "text", "2": "text"}
+        assert profile["method"] == "pymupdf"
+
+    def test_scanned_pdf(self):
+        profile = detect_scanned_pages(_make_pdf(["scanned", "scanned", "scanned"]))
+        assert profile["is_scanned"] is True
+        assert profile["classification"] == "scanned"
+        assert profile["page_count"] == 3
+
+    def test_image_with_thin_text_layer_is_scanned(self):
+        profile = detect_scanned_pages(_make_pdf(["stamped"]), min_text_chars=20)
+        assert profile["pages"] == {"1": "scanned"}
+
+    def test_mixed_document_reports_per_page_map(self):
+        # Text cover page followed by scanned pages: page 1 alone would say "text"
+        profile = detect_scanned_pages(_make_pdf(["text", "scanned", "scanned", "scanned"]))
+        assert profile["classification"] == "mixed"
+        assert profile["pages"]["1"] == "text"
+        assert profile["pages"]["4"] == "scanned"
+        assert profile["is_scanned"] is True
+
+    def test_samples_large_documents(self):
+        profile = detect_scanned_pages(_make_pdf(["text"] * 12), max_samples=3)
+        assert profile["page_count"] == 12
+        assert profile["sampled_pages"] == [1, 7, 12]
+
+    def test_invalid_pdf_is_not_scanned(self):
+        profile = detect_scanned_pages(b"not a pdf")
+        assert profile["is_scanned"] is False
+        assert is_scanned_pdf(b"not a pdf") is False
+        assert is_cacheable_profile(profile) is False
+        assert is_cacheable_profile(detect_scanned_pages(_make_pdf(["text"]))) is True
+
+
+@pytest.mark.unit
+class TestResolveIsScanned:
+    @pytest.mark.asyncio
+    async def test_failed_detection_is_redone_not_cached(self, db_session):
+        db_session.add(InvoiceDB(
+            id="scan-1", file_path="raw/scan-1.pdf", file_name="scan-1.pdf",
+            scan_profile={"is_scanned": False, "method": "error"},
+        ))
+        await db_session.commit()
+        service = ExtractionService(doc_intelligence_client=object(), file_handler=object(), field_extractor=object())
+
+        assert await service._resolve_is_scanned("scan-1", b"not a pdf", db=db_session) is False
+        assert (await DatabaseService.get_scan_profile("scan-1", db=db_session))["method"] == "error"
+
+        assert await service._resolve_is_scanned("scan-1", _make_pdf(["scanned"]), db=db_session) is True
+        assert (await DatabaseService.get_scan_profile("scan-1", db=db_session))["method"] == "pymupdf"
@@ -0,0 +1,80 @@
+"""Unit tests for the application-scoped service container"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.services.service_container import ServiceContainer, get_service_container
+
+
+@pytest.mark.unit
+class TestServiceContainer:
+    def test_services_are_built_once(self):
+        container = ServiceContainer()
+
+        first = container.extraction_service
+        second = container.extraction_service
+
+        assert first is second
+        assert first.file_handler is container.file_handler
+        assert first.field_extractor is container.field_extractor
+
+    def test_blob_extraction_service_shares_clients_and_caches(self):
+        container = ServiceContainer()
+        container._instances["azure_file_handler"] = MagicMock(name="azure_file_handler")
+
+        local = container.extraction_service
+        blob = container.azure_extraction_service
+
+        assert blob is not local
+        assert blob.file_handler is container.azure_file_handler
+        assert blob._llm_cache is local._llm_cache
+        assert blob._image_cache is local._image_cache
+        assert blob.doc_intelligence_client is local.doc_intelligence_client
+
+    def test_batch_services_share_the_extraction_service(self):
+        container = ServiceContainer()
+
+        first = container.batch_processing_service()
+        second = container.batch_processing_service()
+
+        assert first is not second
+        assert first.extraction_service is second.extraction_service is container.extraction_service
+
+    def test_worker_uses_the_container_extraction_service(self, monkeypatch):
+        from src.workers.extraction_worker import ExtractionWorker
+
+        container = ServiceContainer()
+        monkeypatch.setattr("src.services.service_container.get_service_container", lambda: container)
+
+        assert ExtractionWorker(worker_id="w").extraction_service is container.extraction_service
+
+    def test_process_wide_container_is_shared(self):
+        assert get_service_container() is get_service_container()
+
+    @pytest.mark.asyncio
+    async def test_close_releases_clients(self):
+        container = ServiceContainer()
+        closable = MagicMock()
+        closable.aclose = AsyncMock()
+        container._instances["client"] = closable
+
+        await container.close()
+
+        closable.aclose.assert_awaited_once()
+        assert container._instances == {}
+
+    @pytest.mark.asyncio
+    async def test_extraction_service_reuses_openai_client(self):
+        container = ServiceContainer()
+        service = container.extraction_service
+
+        with patch("src.extraction.extraction_service.AsyncAzureOpenAI") as client_class:
+            client_class.return_value.close = AsyncMock()
+            first = service._get_aoai_client("https://aoai.example")
+            second = service._get_aoai_client("https://aoai.example")
+            await service.aclose()
+
+        assert first is second
+        assert client_class.call_count == 1
+        client_class.return_value.close.assert_awaited_once()
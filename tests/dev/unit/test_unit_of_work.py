@@ -0,0 +1,104 @@
+"""Unit tests for batching database writes with UnitOfWork"""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from src.extraction.extraction_service import ExtractionService
+from src.models import database
+from src.models.db_models import Invoice as InvoiceDB
+from src.services.db_service import DatabaseService
+from src.services.unit_of_work import UnitOfWork, reset_unit_of_work_stats, unit_of_work_stats
+
+
+async def _row(db_session, invoice_id):
+    db_session.expire_all()
+    result = await db_session.execute(
+        select(InvoiceDB.processing_state, InvoiceDB.scan_profile, InvoiceDB.vendor_name).where(InvoiceDB.id == invoice_id)
+    )
+    return result.one()
+
+
+@pytest.fixture
+async def pending_invoice(db_session):
+    db_session.add(InvoiceDB(id="inv-uow", file_path="x.pdf", file_name="x.pdf", processing_state="PENDING"))
+    await db_session.commit()
+    return "inv-uow"
+
+
+@pytest.mark.unit
+class TestUnitOfWork:
+    @pytest.mark.asyncio
+    async def test_deferred_writes_share_one_commit(self, db_engine, db_session, pending_invoice):
+        uow = UnitOfWork(pending_invoice, engine=db_engine)
+        assert await uow.run(lambda s: DatabaseService.claim_for_extraction(pending_invoice, lease_owner="w", db=s))
+
+        uow.defer(lambda s: DatabaseService.set_scan_profile(pending_invoice, {"is_scanned": False}, db=s))
+        uow.defer(lambda s: DatabaseService.set_extraction_result(pending_invoice, {"vendor_name": "Acme"}, lease_owner="w", db=s))
+        assert await _row(db_session, pending_invoice) == ("PROCESSING", None, None)
+
+        await uow.commit()
+
+        assert await _row(db_session, pending_invoice) == ("EXTRACTED", {"is_scanned": False}, "Acme")
+        assert (uow.writes, uow.commits, uow.pending) == (3, 2, 0)
+
+    @pytest.mark.asyncio
+    async def test_failed_write_rolls_back_the_batch(self, db_engine, db_session, pending_invoice):
+        async def failing(session):
+            raise ValueError("state mismatch")
+
+        uow = UnitOfWork(pending_invoice, engine=db_engine)
+        uow.defer(lambda s: DatabaseService.set_scan_profile(pending_invoice, {"is_scanned": True}, db=s))
+        with pytest.raises(ValueError):
+            await uow.run(failing)
+
+        assert await _row(db_session, pending_invoice) == ("PENDING", None, None)
+        assert uow.commits == 0
+
+    @pytest.mark.asyncio
+    async def test_write_that_rolls_back_quietly(self, db_engine, db_session, pending_invoice):
+        async def rolled_back(session):
+            await session.execute(select(InvoiceDB.id))
+            await session.rollback()
+            return False
+
+        uow = UnitOfWork(pending_invoice, engine=db_engine)
+        assert await uow.run(rolled_back) is False
+
+        uow.defer(lambda s: DatabaseService.set_scan_profile(pending_invoice, {"is_scanned": True}, db=s))
+        with pytest.raises(RuntimeError):
+            await uow.run(rolled_back)
+        assert await _row(db_session, pending_invoice) == ("PENDING", None, None)
+
+    @pytest.mark.asyncio
+    async def test_caller_session_commits_each_write(self, db_session, pending_invoice):
+        uow = UnitOfWork(pending_invoice, db=db_session)
+        uow.defer(lambda s: DatabaseService.set_scan_profile(pending_invoice, {"is_scanned": False}, db=s))
+        await uow.run(lambda s: DatabaseService.claim_for_extraction(pending_invoice, db=s))
+
+        assert (uow.writes, uow.commits) == (2, 2)
+
+    @pytest.mark.asyncio
+    async def test_extraction_pass_commit_count(
+        self, db_engine, db_session, pending_invoice, mock_document_intelligence_client, mock_file_handler, sample_invoice
+    ):
+        field_extractor = MagicMock()
+        field_extractor.extract_invoice.return_value = sample_invoice.model_copy(update={"id": pending_invoice})
+        service = ExtractionService(
+            doc_intelligence_client=mock_document_intelligence_client,
+            file_handler=mock_file_handler,
+            field_extractor=field_extractor,
+        )
+        reset_unit_of_work_stats()
+
+        with patch.object(database, "engine", db_engine), patch("src.extraction.extraction_service.settings.USE_LLM_FALLBACK", False):
+            result = await service.extract_invoice(pending_invoice, "x.pdf", "x.pdf", datetime.utcnow())
+
+        assert result["status"] == "extracted"
+        assert (await _row(db_session, pending_invoice))[0] == "EXTRACTED"
+        # Claim, then the result and search document in the final commit
+        assert unit_of_work_stats() == {
+            "units": 1, "writes": 3, "commits": 2, "commits_per_unit": 2.0, "commit_histogram": {2: 1},
+        }
@@ -0,0 +1,101 @@
+"""
+Performance benchmarks for scanned-PDF image optimization.
+
+This test suite measures:
+1. Serial vs page-parallel optimization time on multi-page scans
+2. Effect of the per-page pixel budget on output size
+
+Requirements:
+- PyMuPDF and Pillow (tests skip otherwise)
+- No Azure services needed
+"""
+
+import os
+import time
+from io import BytesIO
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+Image = pytest.importorskip("PIL.Image")
+
+from src.ingestion.pdf_preprocessor import PDFPreprocessor
+
+
+def create_scanned_pdf(page_count: int, width_pt: int = 612, height_pt: int = 792) -> bytes:
+    """Create an image-only multi-page PDF that looks like a 100 DPI scan"""
+    doc = fitz.open()
+    img_w, img_h = width_pt * 100 // 72, height_pt * 100 // 72
+    for i in range(page_count):
+        img = Image.effect_noise((img_w, img_h), 40 + i % 20).convert("L")
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        page = doc.new_page(width=width_pt, height=height_pt)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _time_optimize(preprocessor: PDFPreprocessor, pdf_bytes: bytes) -> tuple:
+    start = time.perf_counter()
+    output = preprocessor._optimize_scanned_pdf(pdf_bytes, "benchmark.pdf")
+    return time.perf_counter() - start, output
+
+
+@pytest.mark.integration
+@pytest.mark.performance
+@pytest.mark.slow
+class TestScannedPdfOptimizationPerformance:
+    """Benchmarks for page-parallel scanned-PDF optimization"""
+
+    @pytest.mark.parametrize("page_count", [4, 16])
+    def test_parallel_vs_serial(self, page_count):
+        """Compare serial and page-parallel optimization on a multi-page scan"""
+        pdf_bytes = create_scanned_pdf(page_count)
+        workers = os.cpu_count() or 1
+
+        serial = PDFPreprocessor(
+            enable_image_optimization=True, target_dpi=150, max_workers=1, page_chunk_size=4
+        )
+        parallel = PDFPreprocessor(
+            enable_image_optimization=True, target_dpi=150, max_workers=workers, page_chunk_size=2
+        )
+
+        # Warm the shared worker pool so start-up cost is not attributed to the run;
+        # one chunk per worker so every worker process is started
+        _time_optimize(parallel, create_scanned_pdf(2 * workers))
+
+        serial_time, serial_out = _time_optimize(serial, pdf_bytes)
+        parallel_time, parallel_out = _time_optimize(parallel, pdf_bytes)
+
+        print(f"\n=== Scanned PDF Optimization ({page_count} pages, {workers} workers) ===")
+        print(f"Input: {len(pdf_bytes) / 1024:.0f} KB")
+        print(f"Serial:   {serial_time * 1000:.0f} ms ({serial_time * 1000 / page_count:.1f} ms/page)")
+        print(f"Parallel: {parallel_time * 1000:.0f} ms ({parallel_time * 1000 / page_count:.1f} ms/page)")
+        print(f"Speedup:  {serial_time / parallel_time:.2f}x")
+
+        assert fitz.open(stream=serial_out, filetype="pdf").page_count == page_count
+        assert fitz.open(stream=parallel_out, filetype="pdf").page_count == page_count
+        if workers > 1 and page_count >= 16:
+            assert parallel_time < serial_time, "Page-parallel optimization should beat serial"
+
+    @pytest.mark.parametrize("max_page_pixels", [2_000_000, 8_000_000])
+    def test_pixel_budget_bounds_output(self, max_page_pixels):
+        """Per-page pixel budget keeps oversized pages from exploding output size"""
+        pdf_bytes = create_scanned_pdf(2, width_pt=18 * 72, height_pt=24 * 72)
+        preprocessor = PDFPreprocessor(
+            enable_image_optimization=True,
+            target_dpi=300,
+            max_workers=1,
+            max_page_pixels=max_page_pixels,
+        )
+
+        elapsed, output = _time_optimize(preprocessor, pdf_bytes)
+
+        doc = fitz.open(stream=output, filetype="pdf")
+        for page in doc:
+            info = page.get_image_info()[0]
+            assert info["width"] * info["height"] <= max_page_pixels
+        print(f"\n=== Pixel Budget {max_page_pixels:,} px/page ===")
+        print(f"Time: {elapsed * 1000:.0f} ms, Output: {len(output) / 1024:.0f} KB")